@@ -5,8 +5,9 @@ import logging
 import os
 from dotenv import load_dotenv
 from app.utils.config import FLASK_SECRET_KEY, MAX_CONTENT_LENGTH, ensure_directories
-from app.utils.logger import logger
+from app.utils.logger import logger, init_request_logging
 from app.api.routes import init_routes
+from app.utils import metrics, tracing
 
 # .env 파일 로드
 load_dotenv()
@@ -29,5 +30,14 @@ def create_app():
     # Initialize routes
     init_routes(app)
     
+    # Per-route request metrics (/metrics)
+    metrics.init_app(app)
+    
+    # Request IDs and access records
+    init_request_logging(app)
+    
+    # Request root spans (TRACE_SAMPLE_RATE > 0)
+    tracing.init_app(app)
+    
     logger.info("Application initialized successfully")
     return app 
\ No newline at end of file
@@ -1,21 +1,125 @@
-from flask import request, jsonify, session, render_template
+from flask import request, jsonify, session, render_template, Response, stream_with_context, send_file, url_for, redirect
+from werkzeug.exceptions import RequestEntityTooLarge
+from itsdangerous import URLSafeTimedSerializer, BadData
+import os
 import uuid
 import json
 from app.utils.logger import logger
 from app.services.slide_service import (
-    ppt_sessions, 
     create_session, 
     get_session_slides,
+    get_session_deck,
+    deck_etag,
+    replace_session_slides,
+    patch_session_slides,
+    get_session_element,
+    update_session_element,
+    delete_session_element,
+    SlideVersionConflict,
+    update_session_theme,
+    step_session_history,
+    get_session_history,
     generate_slides_from_topic,
+    stream_slides_from_topic,
     add_elements_with_ai
 )
 from app.services.ai_service import (
     generate_ai_response,
+    stream_ai_response,
     suggest_design_improvements,
     generate_slide_content,
     analyze_slide,
     generate_title_suggestions
 )
+from app.services.deck_analysis import analyze_deck
+from app.services.response_cache import response_cache
+from app.services.session_store import get_session_store
+from app.services.content_store import get_content_store
+from app.services.single_flight import single_flight
+from app.services.export_service import (
+    create_export_job,
+    get_export_job,
+    export_download_name,
+    output_path,
+    ExportError
+)
+from app.services.export_renderers import CONTENT_TYPES
+from app.services.blob_store import get_blob_store, BlobError
+from app.services.broadcast import (
+    create_broadcast,
+    get_broadcast,
+    end_broadcast,
+    follow,
+    BroadcastError
+)
+from app.services.collab import open_doc, poll, reload_doc, CollabError
+from app.services.deck_history import HistoryError
+from app.utils.json_patch import JSONPatchError
+from app.utils.metrics import render_metrics, set_session_store_size, set_content_store_stats
+from app.utils.config import SESSION_STORE_BACKEND, COLLAB_POLL_TIMEOUT, COLLAB_INVITE_TTL
+from app.utils.wire_format import encode_payload, choose_media_type, choose_encoding
+
+def cache_bypass_requested():
+    """Whether the client asked to skip the AI response cache"""
+    if request.headers.get('X-AI-Cache', '').lower() == 'bypass':
+        return True
+    return 'no-cache' in request.headers.get('Cache-Control', '').lower()
+
+def sse_event(data, event=None):
+    """Format a server-sent event"""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+def sse_response(events):
+    """Wrap an event generator in an unbuffered text/event-stream response"""
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def export_job_status(record):
+    """Public view of an export job record"""
+    job = {key: record.get(key) for key in ('id', 'state', 'format', 'total', 'done', 'cached', 'size', 'error')}
+    job['progress'] = round(record['done'] / record['total'], 4) if record.get('total') else 0.0
+    job['status_url'] = url_for('export_status', job_id=record['id'])
+    if record.get('state') == 'done':
+        job['download_url'] = url_for('export_download', job_id=record['id'])
+    return job
+
+# Content-addressed URLs never change meaning, so clients may cache them forever
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def image_urls(digest, renditions):
+    """URLs of an uploaded image and its renditions"""
+    return {
+        'image_url': url_for('get_image', digest=digest),
+        'renditions': {name: url_for('get_image_rendition', digest=digest, rendition=name)
+                       for name in renditions}
+    }
+
+def send_immutable(path, mimetype, etag):
+    """Serve a content-addressed file with a strong ETag, Range support and immutable caching"""
+    response = send_file(os.path.abspath(path), mimetype=mimetype, conditional=True,
+                         etag=etag, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def collab_invites(app):
+    """Signs co-editing invitations: the token carries the session ID to join"""
+    return URLSafeTimedSerializer(app.secret_key, salt='collab-invite')
+
+def collab_position():
+    """(since, epoch, client ID) of a co-editing request, from the query string"""
+    since = request.args.get('since', type=int)
+    return since, request.args.get('epoch'), request.args.get('client', '')[:64]
+
+def collab_response(body):
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 def init_routes(app):
     """Initialize all routes for the application"""
@@ -58,6 +162,32 @@ def init_routes(app):
             logger.error(f"AI chat error: {str(e)}")
             return jsonify({'error': f'AI 응답 생성 중 오류 발생: {str(e)}'}), 500
     
+    @app.route('/api/ai/chat/stream', methods=['POST'])
+    def ai_chat_stream():
+        """Stream the AI chat response as server-sent events"""
+        data = request.get_json()
+        prompt = data.get('prompt')
+        context = data.get('context', {})
+        
+        if not prompt:
+            return jsonify({'error': 'Prompt is required'}), 400
+        
+        # 컨텍스트에 세션 ID 추가
+        session_id = session.get('session_id')
+        if session_id:
+            context['session_id'] = session_id
+        
+        def events():
+            try:
+                for delta in stream_ai_response(prompt, context):
+                    yield sse_event({'delta': delta})
+                yield sse_event({'success': True}, event='done')
+            except Exception as e:
+                logger.error(f"AI chat stream error: {str(e)}")
+                yield sse_event({'error': f'AI 응답 생성 중 오류 발생: {str(e)}'}, event='error')
+        
+        return sse_response(events())
+    
     @app.route('/api/ai/design-suggestions', methods=['POST'])
     def design_suggestions():
         """Get AI design improvement suggestions"""
@@ -147,6 +277,41 @@ def init_routes(app):
             logger.error(f"Slide analysis error: {str(e)}")
             return jsonify({'error': f'슬라이드 분석 중 오류 발생: {str(e)}'}), 500
     
+    @app.route('/api/ai/analyze-deck', methods=['POST'])
+    def analyze_deck_api():
+        """Analyze every slide (or the given slideIndexes) plus deck-level consistency"""
+        try:
+            data = request.get_json(silent=True) or {}
+            slide_indexes = data.get('slideIndexes')
+            
+            if slide_indexes is not None and not isinstance(slide_indexes, list):
+                return jsonify({'error': 'slideIndexes must be a list'}), 400
+            
+            # 프론트엔드가 슬라이드를 직접 보낸 경우 그대로 분석, 아니면 세션 슬라이드 사용
+            slides = data.get('slides')
+            if slides is None:
+                session_id = session.get('session_id')
+                if not session_id:
+                    return jsonify({'error': 'No session ID found'}), 400
+                slides = get_session_slides(session_id)
+            if not isinstance(slides, list):
+                return jsonify({'error': 'slides must be a list'}), 400
+            
+            try:
+                result = analyze_deck(slides, slide_indexes)
+            except IndexError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'success': True,
+                'slides': result['slides'],
+                'deck': result['deck']
+            })
+            
+        except Exception as e:
+            logger.error(f"Deck analysis error: {str(e)}")
+            return jsonify({'error': f'덱 분석 중 오류 발생: {str(e)}'}), 500
+    
     @app.route('/api/ai/analyze', methods=['POST', 'OPTIONS'])
     def analyze_content_api():
         """Analyze slide content from frontend captured data"""
@@ -225,7 +390,8 @@ def init_routes(app):
                 slide_count = 20
             
             # Generate slides
-            slides_data = generate_slides_from_topic(session_id, topic, slide_count)
+            slides_data = generate_slides_from_topic(session_id, topic, slide_count,
+                                                     use_cache=not cache_bypass_requested())
             
             return jsonify({
                 'success': True,
@@ -236,6 +402,36 @@ def init_routes(app):
             logger.error(f"Error generating presentation: {str(e)}")
             return jsonify({'error': f'Error generating presentation: {str(e)}'}), 500
     
+    @app.route('/generate_from_topic/stream', methods=['POST'])
+    def generate_from_topic_stream():
+        """Stream generated slides as server-sent events, one event per slide"""
+        session_id = session.get('session_id')
+        if not session_id:
+            return jsonify({'error': 'No session ID found'}), 400
+            
+        data = request.get_json()
+        topic = data.get('topic')
+        slide_count = data.get('slide_count', 5)
+        
+        if not topic:
+            return jsonify({'error': 'Topic is required'}), 400
+            
+        # Limit slide count
+        slide_count = max(1, min(slide_count, 20))
+        
+        def events():
+            count = 0
+            try:
+                for slide in stream_slides_from_topic(session_id, topic, slide_count):
+                    yield sse_event({'index': count, 'slide': slide}, event='slide')
+                    count += 1
+                yield sse_event({'success': True, 'count': count}, event='done')
+            except Exception as e:
+                logger.error(f"Error streaming presentation: {str(e)}")
+                yield sse_event({'error': f'Error generating presentation: {str(e)}'}, event='error')
+        
+        return sse_response(events())
+    
     @app.route('/edit_slide_ai', methods=['POST'])
     def edit_slide_ai():
         """Edit slide elements using AI suggestions"""
@@ -280,33 +476,165 @@ def init_routes(app):
             if not slides:
                 return jsonify({'error': 'No slides data provided'}), 400
             
-            # Update slides in session
-            ppt_sessions[session_id]['slides'] = slides
+            # Update slides in session; inline base64 images go to the image store
+            # and the client adopts the rewritten slides
+            version, moved = replace_session_slides(session_id, slides, base_version=data.get('version'))
             
-            return jsonify({
+            response = {
                 'success': True,
-                'message': '슬라이드가 저장되었습니다.'
-            })
+                'message': '슬라이드가 저장되었습니다.',
+                'version': version
+            }
+            if moved:
+                response['slides'] = slides
+            return jsonify(response)
             
+        except SlideVersionConflict as e:
+            return jsonify({'error': str(e), 'version': e.current_version}), 409
         except Exception as e:
             logger.error(f"Error saving slides: {str(e)}")
             return jsonify({'error': f'Error saving slides: {str(e)}'}), 500
     
-    @app.route('/get_slides', methods=['GET'])
-    def get_slides():
-        """Get all slides for the current session"""
+    @app.route('/patch_slides', methods=['POST', 'PATCH'])
+    def patch_slides():
+        """Apply JSON Patch operations to the current slides"""
         try:
             session_id = session.get('session_id')
             if not session_id:
                 return jsonify({'error': 'No session ID found'}), 400
+                
+            data = request.get_json()
+            operations = data.get('ops')
             
-            slides = get_session_slides(session_id)
+            if not operations:
+                return jsonify({'error': 'No patch operations provided'}), 400
+            
+            version = patch_session_slides(session_id, operations, base_version=data.get('version'))
             
             return jsonify({
                 'success': True,
-                'slides': slides
+                'version': version
             })
             
+        except SlideVersionConflict as e:
+            return jsonify({'error': str(e), 'version': e.current_version}), 409
+        except JSONPatchError as e:
+            return jsonify({'error': f'Invalid patch: {str(e)}'}), 400
+        except KeyError:
+            return jsonify({'error': 'Session not found'}), 404
+        except Exception as e:
+            logger.error(f"Error patching slides: {str(e)}")
+            return jsonify({'error': f'Error patching slides: {str(e)}'}), 500
+    
+    @app.route('/api/elements/<element_id>', methods=['GET'])
+    def get_element(element_id):
+        """Get a single slide element by ID"""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            
+            element, slide_index = get_session_element(session_id, element_id)
+            if element is None:
+                return jsonify({'error': 'Element not found'}), 404
+            
+            return jsonify({
+                'success': True,
+                'element': element,
+                'slide_index': slide_index
+            })
+            
+        except Exception as e:
+            logger.error(f"Error retrieving element: {str(e)}")
+            return jsonify({'error': f'Error retrieving element: {str(e)}'}), 500
+    
+    @app.route('/api/elements/<element_id>', methods=['PATCH'])
+    def update_element(element_id):
+        """Update properties of a single slide element by ID"""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            
+            data = request.get_json()
+            changes = data.get('changes')
+            
+            if not isinstance(changes, dict) or not changes:
+                return jsonify({'error': 'No element changes provided'}), 400
+            
+            element, version = update_session_element(session_id, element_id, changes,
+                                                      base_version=data.get('version'))
+            
+            return jsonify({
+                'success': True,
+                'element': element,
+                'version': version
+            })
+            
+        except SlideVersionConflict as e:
+            return jsonify({'error': str(e), 'version': e.current_version}), 409
+        except KeyError:
+            return jsonify({'error': 'Element not found'}), 404
+        except Exception as e:
+            logger.error(f"Error updating element: {str(e)}")
+            return jsonify({'error': f'Error updating element: {str(e)}'}), 500
+    
+    @app.route('/api/elements/<element_id>', methods=['DELETE'])
+    def delete_element(element_id):
+        """Delete a single slide element by ID"""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            
+            data = request.get_json(silent=True) or {}
+            version = delete_session_element(session_id, element_id,
+                                             base_version=data.get('version', request.args.get('version', type=int)))
+            
+            return jsonify({
+                'success': True,
+                'version': version
+            })
+            
+        except SlideVersionConflict as e:
+            return jsonify({'error': str(e), 'version': e.current_version}), 409
+        except KeyError:
+            return jsonify({'error': 'Element not found'}), 404
+        except Exception as e:
+            logger.error(f"Error deleting element: {str(e)}")
+            return jsonify({'error': f'Error deleting element: {str(e)}'}), 500
+    
+    @app.route('/get_slides', methods=['GET'])
+    def get_slides():
+        """Get all slides for the current session"""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            
+            slides, version, deck_id = get_session_deck(session_id)
+            
+            media_type = choose_media_type(request.headers.get('Accept'))
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+            variant = f"{'msgpack' if media_type != 'application/json' else 'json'}.{encoding or 'identity'}"
+            etag = deck_etag(session_id, deck_id, version, variant)
+            
+            # Revalidate on every load; unchanged decks cost a 304 with no body
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                body, media_type, encoding = encode_payload(
+                    {'success': True, 'slides': slides, 'version': version},
+                    request.headers.get('Accept'), request.headers.get('Accept-Encoding'))
+                response = Response(body, mimetype=media_type)
+                if encoding:
+                    response.headers['Content-Encoding'] = encoding
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.update(('Accept', 'Accept-Encoding', 'Cookie'))
+            return response
+            
         except Exception as e:
             logger.error(f"Error retrieving slides: {str(e)}")
             return jsonify({'error': f'Error retrieving slides: {str(e)}'}), 500
@@ -326,7 +654,7 @@ def init_routes(app):
                 return jsonify({'error': 'Theme is required'}), 400
             
             # Update theme in session
-            ppt_sessions[session_id]['theme'] = theme
+            update_session_theme(session_id, theme)
             
             return jsonify({
                 'success': True,
@@ -337,6 +665,45 @@ def init_routes(app):
             logger.error(f"Error updating theme: {str(e)}")
             return jsonify({'error': f'Error updating theme: {str(e)}'}), 500
     
+    @app.route('/api/history', methods=['GET'])
+    def history_state():
+        """Undo/redo availability of the current deck"""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            return jsonify(get_session_history(session_id))
+        except Exception as e:
+            logger.error(f"History state error: {str(e)}")
+            return jsonify({'error': f'History state error: {str(e)}'}), 500
+    
+    @app.route('/api/history/<action>', methods=['POST'])
+    def history_step(action):
+        """Undo or redo the last change to the deck; returns the restored slides and theme"""
+        if action not in ('undo', 'redo'):
+            return jsonify({'error': 'Unknown history action'}), 404
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            slides, theme, version, state = step_session_history(session_id, -1 if action == 'undo' else 1)
+            # Co-editors (if any) reload the restored deck as a snapshot
+            reload_doc(session_id)
+            return jsonify({
+                'success': True,
+                'version': version,
+                'slides': slides,
+                'theme': theme,
+                'history': state
+            })
+        except HistoryError as e:
+            return jsonify({'error': str(e), 'history': get_session_history(session_id)}), e.status
+        except KeyError:
+            return jsonify({'error': '세션을 찾을 수 없습니다.'}), 404
+        except Exception as e:
+            logger.error(f"History {action} error: {str(e)}")
+            return jsonify({'error': f'History {action} error: {str(e)}'}), 500
+    
     @app.route('/api/ai/suggest-titles', methods=['POST'])
     def suggest_titles():
         """Suggest titles based on content or theme"""
@@ -350,7 +717,8 @@ def init_routes(app):
                 return jsonify({'error': 'Content or theme is required'}), 400
             
             # 제목 추천 생성
-            titles = generate_title_suggestions(content, theme, count)
+            titles = generate_title_suggestions(content, theme, count,
+                                                use_cache=not cache_bypass_requested())
             
             return jsonify({
                 'success': True,
@@ -359,4 +727,337 @@ def init_routes(app):
             
         except Exception as e:
             logger.error(f"Title suggestion error: {str(e)}")
-            return jsonify({'error': f'제목 추천 생성 중 오류 발생: {str(e)}'}), 500 
\ No newline at end of file
+            return jsonify({'error': f'제목 추천 생성 중 오류 발생: {str(e)}'}), 500 
+    
+    @app.route('/api/ai/cache-stats', methods=['GET'])
+    def ai_cache_stats():
+        """Report AI response cache hit/miss and request coalescing counters"""
+        return jsonify({
+            'success': True,
+            'stats': response_cache.stats(),
+            'single_flight': single_flight.stats()
+        })
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus metrics (all workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+        try:
+            set_session_store_size(SESSION_STORE_BACKEND, len(get_session_store()))
+            set_content_store_stats(get_content_store().stats())
+        except Exception as e:
+            logger.error(f"Session store size error: {str(e)}")
+        body, content_type = render_metrics()
+        return Response(body, content_type=content_type)
+    
+    @app.route('/api/export', methods=['POST'])
+    def export_presentation():
+        """Start a background export job (pdf, pptx, html or images)"""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            data = request.get_json()
+            fmt = data.get('format')
+            
+            # Export the posted deck, or the session's saved slides
+            slides = data.get('slides')
+            if slides is None:
+                slides = get_session_slides(session_id)
+            
+            record = create_export_job(fmt, slides, data.get('title') or 'Presentation', session_id)
+            
+            return jsonify({
+                'success': True,
+                'job': export_job_status(record)
+            }), 202
+            
+        except ExportError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Export error: {str(e)}")
+            return jsonify({'error': f'Export error: {str(e)}'}), 500
+    
+    def owned_export_job(job_id):
+        """The export job if it belongs to the caller's session, else None"""
+        session_id = session.get('session_id')
+        if not session_id:
+            return None
+        record = get_export_job(job_id)
+        if record is None or record.get('session_id') != session_id:
+            return None
+        return record
+    
+    @app.route('/api/export/<job_id>', methods=['GET'])
+    def export_status(job_id):
+        """Report the progress of an export job"""
+        record = owned_export_job(job_id)
+        if record is None:
+            return jsonify({'error': 'Export job not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'job': export_job_status(record)
+        })
+    
+    @app.route('/api/export/<job_id>/download', methods=['GET'])
+    def export_download(job_id):
+        """Stream a finished export file"""
+        record = owned_export_job(job_id)
+        if record is None:
+            return jsonify({'error': 'Export job not found'}), 404
+        if record.get('state') != 'done':
+            return jsonify({'error': 'Export is not ready', 'job': export_job_status(record)}), 409
+        
+        path = output_path(job_id, record['format'])
+        if not os.path.exists(path):
+            return jsonify({'error': 'Export file has expired'}), 410
+        
+        return send_file(os.path.abspath(path),
+                         mimetype=CONTENT_TYPES[record['format']][0],
+                         as_attachment=True,
+                         download_name=export_download_name(record),
+                         conditional=True)
+    
+    @app.route('/upload_image', methods=['POST', 'PUT'])
+    def upload_image():
+        """Store an uploaded image (multipart field 'image' or the raw request body)"""
+        try:
+            if request.mimetype == 'multipart/form-data':
+                upload = request.files.get('image')
+                if upload is None:
+                    return jsonify({'error': 'No image provided'}), 400
+                stream = upload.stream
+            else:
+                # Raw body: read straight from the socket in chunks
+                stream = request.stream
+            
+            store = get_blob_store()
+            meta, existed = store.put_stream(stream)
+            
+            result = {
+                'success': True,
+                'hash': meta['hash'],
+                'mime': meta['mime'],
+                'size': meta['size'],
+                'width': meta.get('width'),
+                'height': meta.get('height'),
+                'deduplicated': existed
+            }
+            result.update(image_urls(meta['hash'], store.renditions))
+            return jsonify(result), 200 if existed else 201
+            
+        except BlobError as e:
+            return jsonify({'error': str(e)}), 400
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'Image is too large'}), 413
+        except Exception as e:
+            logger.error(f"Image upload error: {str(e)}")
+            return jsonify({'error': f'Image upload error: {str(e)}'}), 500
+    
+    @app.route('/images/<digest>', methods=['GET'])
+    def get_image(digest):
+        """Serve an original image by content hash"""
+        store = get_blob_store()
+        meta = store.info(digest)
+        if meta is None:
+            return jsonify({'error': 'Image not found'}), 404
+        return send_immutable(store.path(digest), meta['mime'], digest)
+    
+    @app.route('/images/<digest>/<rendition>', methods=['GET'])
+    def get_image_rendition(digest, rendition):
+        """Serve a downscaled rendition of an image (generated on first request)"""
+        store = get_blob_store()
+        meta = store.info(digest)
+        if meta is None or rendition not in store.renditions:
+            return jsonify({'error': 'Image not found'}), 404
+        path = store.rendition_path(digest, rendition)
+        return send_immutable(path, store.rendition_mime(path, meta), f"{digest}-{rendition}")
+    
+    @app.route('/api/broadcast', methods=['POST'])
+    def start_broadcast():
+        """Open a live broadcast of the current deck (or the posted slides) for an audience"""
+        try:
+            data = request.get_json(silent=True) or {}
+            slides = data.get('slides')
+            if slides is None:
+                session_id = session.get('session_id')
+                if not session_id:
+                    return jsonify({'error': 'No session ID found'}), 400
+                slides = get_session_slides(session_id)
+            
+            broadcast = create_broadcast(slides, str(data.get('title') or ''))
+            if isinstance(data.get('slideIndex'), int):
+                broadcast.publish(slide=data['slideIndex'])
+            
+            return jsonify({
+                'success': True,
+                'broadcastId': broadcast.id,
+                'token': broadcast.token,
+                'viewerUrl': url_for('broadcast_viewer', broadcast_id=broadcast.id, _external=True),
+                'eventsUrl': url_for('broadcast_events', broadcast_id=broadcast.id)
+            }), 201
+            
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Broadcast start error: {str(e)}")
+            return jsonify({'error': f'Broadcast start error: {str(e)}'}), 500
+    
+    @app.route('/api/broadcast/<broadcast_id>/state', methods=['POST'])
+    def publish_broadcast_state(broadcast_id):
+        """Presenter: publish the slide index and/or laser pointer ({"x", "y"} in 0-1, or null)"""
+        try:
+            broadcast = get_broadcast(broadcast_id, request.headers.get('X-Broadcast-Token', ''))
+            data = request.get_json(silent=True) or {}
+            broadcast.publish(slide=data.get('slide'), laser=data['laser'] if 'laser' in data else False)
+            return jsonify({'success': True, 'seq': broadcast.seq})
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Broadcast publish error: {str(e)}")
+            return jsonify({'error': f'Broadcast publish error: {str(e)}'}), 500
+    
+    @app.route('/api/broadcast/<broadcast_id>/deck', methods=['PUT'])
+    def update_broadcast_deck(broadcast_id):
+        """Presenter: replace the slides shown to viewers"""
+        try:
+            broadcast = get_broadcast(broadcast_id, request.headers.get('X-Broadcast-Token', ''))
+            data = request.get_json(silent=True) or {}
+            broadcast.set_deck(data.get('slides'))
+            return jsonify({'success': True, 'deckVersion': broadcast.deck_version})
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Broadcast deck update error: {str(e)}")
+            return jsonify({'error': f'Broadcast deck update error: {str(e)}'}), 500
+    
+    @app.route('/api/broadcast/<broadcast_id>', methods=['DELETE'])
+    def stop_broadcast(broadcast_id):
+        """Presenter: end the broadcast (viewers receive a final ended state)"""
+        try:
+            end_broadcast(broadcast_id, request.headers.get('X-Broadcast-Token', ''))
+            return jsonify({'success': True})
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Broadcast stop error: {str(e)}")
+            return jsonify({'error': f'Broadcast stop error: {str(e)}'}), 500
+    
+    @app.route('/api/broadcast/<broadcast_id>/snapshot', methods=['GET'])
+    def broadcast_snapshot(broadcast_id):
+        """Viewer: the deck as rendered SVG slides, shared by every viewer of this deck version"""
+        try:
+            broadcast = get_broadcast(broadcast_id)
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        
+        body, encoding, etag = broadcast.snapshot(request.headers.get('Accept-Encoding'))
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    @app.route('/api/broadcast/<broadcast_id>/events', methods=['GET'])
+    def broadcast_events(broadcast_id):
+        """Viewer: presenter state as server-sent events (latest state only, coalesced)"""
+        try:
+            broadcast = get_broadcast(broadcast_id)
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        if broadcast.is_full():
+            return jsonify({'error': '시청자 수가 한도에 도달했습니다.'}), 503
+        return sse_response(follow(broadcast))
+    
+    @app.route('/broadcast/<broadcast_id>', methods=['GET'])
+    def broadcast_viewer(broadcast_id):
+        """Audience page following a broadcast"""
+        try:
+            get_broadcast(broadcast_id)
+        except BroadcastError as e:
+            return jsonify({'error': str(e)}), e.status
+        return render_template('viewer.html', broadcast_id=broadcast_id)
+    
+    @app.route('/api/collab/invite', methods=['POST'])
+    def collab_invite():
+        """Link that lets another editor join the current deck"""
+        session_id = session.get('session_id')
+        if not session_id:
+            return jsonify({'error': 'No session ID found'}), 400
+        token = collab_invites(app).dumps(session_id)
+        return jsonify({
+            'success': True,
+            'inviteUrl': url_for('collab_join', token=token, _external=True),
+            'expiresIn': COLLAB_INVITE_TTL
+        })
+    
+    @app.route('/collab/join/<token>', methods=['GET'])
+    def collab_join(token):
+        """Switch this browser to the invited deck and open the editor"""
+        try:
+            session['session_id'] = collab_invites(app).loads(token, max_age=COLLAB_INVITE_TTL)
+        except BadData:
+            return jsonify({'error': '초대 링크가 만료되었거나 올바르지 않습니다.'}), 403
+        return redirect(url_for('index', collab=1))
+    
+    @app.route('/api/collab', methods=['GET'])
+    def collab_changes():
+        """Join or catch up: snapshot plus operation tail, or only the operations after ?since="""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            since, epoch, client_id = collab_position()
+            return collab_response(open_doc(session_id).changes(since, epoch, client_id)[1])
+        except CollabError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Co-editing join error: {str(e)}")
+            return jsonify({'error': f'Co-editing join error: {str(e)}'}), 500
+    
+    @app.route('/api/collab/poll', methods=['GET'])
+    def collab_poll():
+        """Long-poll fallback for the co-editing WebSocket: waits for operations after ?since="""
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            since, epoch, client_id = collab_position()
+            timeout = min(request.args.get('timeout', COLLAB_POLL_TIMEOUT, type=float), COLLAB_POLL_TIMEOUT)
+            return collab_response(poll(open_doc(session_id), since, epoch, client_id, max(timeout, 0)))
+        except CollabError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Co-editing poll error: {str(e)}")
+            return jsonify({'error': f'Co-editing poll error: {str(e)}'}), 500
+    
+    @app.route('/api/collab/ops', methods=['POST'])
+    def collab_submit():
+        """
+        Apply a batch of co-editing operations.
+        
+        Body: {"clientId", "ops": [...], "since", "epoch"}. The response lists the
+        cids of skipped operations and the changes after ``since``, which include
+        the batch itself.
+        """
+        try:
+            session_id = session.get('session_id')
+            if not session_id:
+                return jsonify({'error': 'No session ID found'}), 400
+            data = request.get_json(silent=True) or {}
+            client_id = str(data.get('clientId') or '')[:64]
+            doc = open_doc(session_id)
+            _, skipped = doc.submit(client_id, data.get('ops'))
+            since = data.get('since') if isinstance(data.get('since'), int) else None
+            _, changes = doc.changes(since, data.get('epoch'), client_id)
+            return collab_response(b'{"skipped":' + json.dumps(skipped).encode() + b',"changes":' + changes + b'}')
+        except CollabError as e:
+            return jsonify({'error': str(e)}), e.status
+        except Exception as e:
+            logger.error(f"Co-editing submit error: {str(e)}")
+            return jsonify({'error': f'Co-editing submit error: {str(e)}'}), 500
@@ -0,0 +1,375 @@
+"""
+ASGI entry point - serves the LLM-bound routes with async handlers
+
+    uvicorn app.asgi:application --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 app.asgi:application
+
+``/api/ai/chat``, ``/api/ai/suggest-titles`` and ``/generate_from_topic`` are
+handled by coroutines built on the async AI service, so a pending upstream call
+does not occupy a thread and one process can hold hundreds of them. Broadcast
+viewer streams (SSE at ``/api/broadcast/<id>/events``, WebSocket at
+``/api/broadcast/<id>/ws``) are coroutines as well, so one process can serve
+thousands of viewers, and so is the co-editing WebSocket (``/api/collab/ws``;
+the Flask app offers long polling instead). Every other request is passed to the Flask app through
+asgiref's WSGI adapter.
+"""
+
+import asyncio
+import json
+import re
+import time
+from urllib.parse import parse_qs, urlsplit
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+from app.utils.logger import logger, new_request_id, bind_request_id, unbind_request_id, log_request
+from app.utils.metrics import observe_request
+from app.utils.config import COLLAB_ALLOWED_ORIGINS
+from app.utils.tracing import start_request_span, end_request_span
+from app.services.async_llm_client import close_async_llm_client
+from app.services.broadcast import get_broadcast, follow_async, BroadcastError
+from app.services import collab
+from app.services.async_ai_service import (
+    generate_ai_response_async,
+    generate_title_suggestions_async,
+    generate_slides_from_topic_async
+)
+
+flask_app = create_app()
+wsgi_application = WsgiToAsgi(flask_app)
+
+
+async def read_json(receive):
+    """Read and decode a JSON request body"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return json.loads(body) if body else {}
+
+
+async def send_json(send, data, status=200):
+    """Send a JSON response"""
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def request_headers(scope):
+    return {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+
+def origin_allowed(headers):
+    """
+    Whether a WebSocket handshake may act with the session cookie. Browsers
+    send ``Origin`` on every handshake; it must be the requested host or one
+    of ``COLLAB_ALLOWED_ORIGINS``, so other sites cannot open the socket
+    with the visitor's cookie. Non-browser clients without it carry their
+    cookie explicitly.
+    """
+    origin = headers.get('origin')
+    if origin is None:
+        return True
+    origin = origin.strip().lower()
+    if origin in COLLAB_ALLOWED_ORIGINS:
+        return True
+    return bool(headers.get('host')) and urlsplit(origin).netloc == headers['host'].strip().lower()
+
+
+def flask_session_id(headers):
+    """Read session_id from the signed Flask session cookie"""
+    cookie_name = flask_app.config.get('SESSION_COOKIE_NAME', 'session')
+    for part in headers.get('cookie', '').split(';'):
+        name, _, value = part.strip().partition('=')
+        if name == cookie_name and value:
+            serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+            try:
+                data = serializer.loads(value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+            except Exception:
+                return None
+            return data.get('session_id')
+    return None
+
+
+def cache_bypass_requested(headers):
+    """Whether the client asked to skip the AI response cache"""
+    if headers.get('x-ai-cache', '').lower() == 'bypass':
+        return True
+    return 'no-cache' in headers.get('cache-control', '').lower()
+
+
+async def ai_chat(scope, receive, send):
+    """Generate AI response for chat messages"""
+    try:
+        data = await read_json(receive)
+        prompt = data.get('prompt')
+        context = data.get('context', {})
+
+        if not prompt:
+            return await send_json(send, {'error': 'Prompt is required'}, 400)
+
+        # 컨텍스트에 세션 ID 추가
+        session_id = flask_session_id(request_headers(scope))
+        if session_id:
+            context['session_id'] = session_id
+
+        response = await generate_ai_response_async(prompt, context)
+        await send_json(send, {'success': True, 'response': response})
+
+    except Exception as e:
+        logger.error(f"AI chat error: {str(e)}")
+        await send_json(send, {'error': f'AI 응답 생성 중 오류 발생: {str(e)}'}, 500)
+
+
+async def suggest_titles(scope, receive, send):
+    """Suggest titles based on content or theme"""
+    try:
+        data = await read_json(receive)
+        content = data.get('content', '')
+        theme = data.get('theme', '')
+        count = data.get('count', 5)
+
+        if not content and not theme:
+            return await send_json(send, {'error': 'Content or theme is required'}, 400)
+
+        titles = await generate_title_suggestions_async(
+            content, theme, count, use_cache=not cache_bypass_requested(request_headers(scope)))
+        await send_json(send, {'success': True, 'titles': titles})
+
+    except Exception as e:
+        logger.error(f"Title suggestion error: {str(e)}")
+        await send_json(send, {'error': f'제목 추천 생성 중 오류 발생: {str(e)}'}, 500)
+
+
+async def generate_from_topic(scope, receive, send):
+    """Generate presentation slides from a topic"""
+    try:
+        headers = request_headers(scope)
+        session_id = flask_session_id(headers)
+        if not session_id:
+            return await send_json(send, {'error': 'No session ID found'}, 400)
+
+        data = await read_json(receive)
+        topic = data.get('topic')
+        slide_count = data.get('slide_count', 5)
+
+        if not topic:
+            return await send_json(send, {'error': 'Topic is required'}, 400)
+
+        # Limit slide count
+        slide_count = max(1, min(slide_count, 20))
+
+        slides_data = await generate_slides_from_topic_async(
+            session_id, topic, slide_count, use_cache=not cache_bypass_requested(headers))
+        await send_json(send, {'success': True, 'slides': slides_data})
+
+    except Exception as e:
+        logger.error(f"Error generating presentation: {str(e)}")
+        await send_json(send, {'error': f'Error generating presentation: {str(e)}'}, 500)
+
+
+async def wait_disconnect(receive, message_type='http.disconnect'):
+    while (await receive())['type'] != message_type:
+        pass
+
+
+async def run_until_disconnect(coroutine, receive, message_type='http.disconnect'):
+    """Run ``coroutine`` until it finishes or the client goes away; True if it finished"""
+    task = asyncio.ensure_future(coroutine)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive, message_type))
+    done, _ = await asyncio.wait({task, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    for pending in (task, disconnect):
+        if pending not in done:
+            pending.cancel()
+    if task in done:
+        task.result()
+        return True
+    return False
+
+
+async def broadcast_events(scope, receive, send, broadcast_id):
+    """Viewer SSE stream; one coroutine per viewer instead of one thread"""
+    try:
+        broadcast = get_broadcast(broadcast_id)
+    except BroadcastError as e:
+        return await send_json(send, {'error': str(e)}, e.status)
+    if broadcast.is_full():
+        return await send_json(send, {'error': '시청자 수가 한도에 도달했습니다.'}, 503)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+
+    async def send_frame(frame, data):
+        await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+
+    async def send_keepalive():
+        await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+
+    if await run_until_disconnect(follow_async(broadcast, send_frame, send_keepalive), receive):
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+async def broadcast_socket(scope, receive, send, broadcast_id):
+    """Viewer WebSocket: each message is the JSON state, as in the SSE stream"""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    try:
+        broadcast = get_broadcast(broadcast_id)
+        if broadcast.is_full():
+            raise BroadcastError('시청자 수가 한도에 도달했습니다.', 503)
+    except BroadcastError:
+        return await send({'type': 'websocket.close', 'code': 1008})
+    await send({'type': 'websocket.accept'})
+
+    async def send_frame(frame, data):
+        await send({'type': 'websocket.send', 'text': data})
+
+    if await run_until_disconnect(follow_async(broadcast, send_frame), receive, 'websocket.disconnect'):
+        await send({'type': 'websocket.close', 'code': 1000})
+
+
+async def collab_socket(scope, receive, send):
+    """
+    Co-editing WebSocket for the deck of the caller's session.
+
+    Query: ``client``, and ``since``/``epoch`` of a previous connection to
+    resume from. The server sends changes as in ``GET /api/collab`` whenever the
+    log moves; the editor sends ``{"ops": [...]}`` batches and gets
+    ``{"type": "ack", "seq", "skipped"}`` after the batch's own changes.
+    """
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    headers = request_headers(scope)
+    if not origin_allowed(headers):
+        logger.warning(f"Co-editing WebSocket refused for origin {headers.get('origin')!r}")
+        # Closing before accepting answers the handshake with 403
+        return await send({'type': 'websocket.close', 'code': 1008})
+    session_id = flask_session_id(headers)
+    try:
+        if not session_id:
+            raise collab.CollabError('No session ID found')
+        doc = await asyncio.to_thread(collab.open_doc, session_id)
+    except collab.CollabError:
+        return await send({'type': 'websocket.close', 'code': 1008})
+    await send({'type': 'websocket.accept'})
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    client_id = query.get('client', [''])[0][:64]
+    since = query.get('since', [''])[0]
+
+    async def send_changes(body):
+        await send({'type': 'websocket.send', 'text': body.decode('utf-8')})
+
+    flush, run = collab.subscribe(doc, int(since) if since.isdigit() else None,
+                                  query.get('epoch', [None])[0], send_changes, client_id)
+    pusher = asyncio.ensure_future(run())
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            if message['type'] != 'websocket.receive':
+                continue
+            try:
+                data = json.loads(message.get('text') or message.get('bytes') or '{}')
+                seq, skipped = await asyncio.to_thread(doc.submit, client_id, data.get('ops'))
+                await flush()
+                reply = {'type': 'ack', 'seq': seq, 'skipped': skipped}
+            except collab.CollabError as e:
+                reply = {'type': 'error', 'error': str(e)}
+            except (ValueError, AttributeError):
+                reply = {'type': 'error', 'error': 'Invalid message'}
+            await send({'type': 'websocket.send', 'text': json.dumps(reply, ensure_ascii=False)})
+    finally:
+        pusher.cancel()
+
+
+# Viewer streams handled here rather than by a Flask thread each
+BROADCAST_PATH = re.compile(r'^/api/broadcast/([\w-]+)/(events|ws)$')
+
+
+ASYNC_ROUTES = {
+    ('POST', '/api/ai/chat'): ai_chat,
+    ('POST', '/api/ai/suggest-titles'): suggest_titles,
+    ('POST', '/generate_from_topic'): generate_from_topic
+}
+
+
+async def observed(handler, scope, receive, send):
+    """Run an async route handler, recording its status, latency and request ID like the Flask routes"""
+    started = time.perf_counter()
+    status = 500
+    headers = request_headers(scope)
+    request_id = new_request_id(headers.get('x-request-id'))
+    token = bind_request_id(request_id)
+    trace_span, trace_token = start_request_span(scope['method'], scope['path'], headers.get('traceparent'))
+
+    async def send_with_status(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            message = dict(message, headers=list(message.get('headers', [])) + [(b'x-request-id', request_id.encode())])
+        await send(message)
+
+    error = None
+    try:
+        await handler(scope, receive, send_with_status)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        observe_request(scope['method'], scope['path'], status, seconds)
+        log_request(scope['method'], scope['path'], scope['path'], status, seconds)
+        end_request_span(trace_span, trace_token, status, error)
+        unbind_request_id(token)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_llm_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    match = BROADCAST_PATH.match(scope.get('path', ''))
+    if match is not None:
+        broadcast_id, kind = match.groups()
+        if scope['type'] == 'websocket' and kind == 'ws':
+            return await broadcast_socket(scope, receive, send, broadcast_id)
+        if scope['type'] == 'http' and scope['method'] == 'GET' and kind == 'events':
+            return await observed(lambda *args: broadcast_events(*args, broadcast_id), scope, receive, send)
+
+    if scope['type'] == 'websocket' and scope.get('path') == '/api/collab/ws':
+        return await collab_socket(scope, receive, send)
+
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+        if handler is not None:
+            return await observed(handler, scope, receive, send)
+
+    await wsgi_application(scope, receive, send)
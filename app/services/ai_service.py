@@ -6,30 +6,99 @@ Uses OpenAI's API for generating responses and suggestions
 import os
 import json
 import random
-import requests
 import re
 from dotenv import load_dotenv
 from app.utils.logger import logger
+from app.utils.tracing import traced
+from app.services.llm_client import get_llm_client, extract_message_content
+from app.services.response_cache import response_cache, make_cache_key
+from app.services.single_flight import single_flight
+from app.services.slide_context import slide_context_text
+from app.services import slide_analyzer
 
 # .env 파일 로드
 load_dotenv()
 
 # OpenAI API 키 (환경 변수에서 로드)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 
 # AI 모델 설정
 DEFAULT_MODEL = "gpt-3.5-turbo"
 ADVANCED_MODEL = "gpt-4" if os.getenv("USE_GPT4", "false").lower() == "true" else DEFAULT_MODEL
 
-def generate_ai_response(prompt, context=None):
+# 요청 파라미터 (동기/비동기 서비스 공통)
+CHAT_PARAMS = {"temperature": 0.7, "max_tokens": 1000}
+TITLE_PARAMS = {"temperature": 0.8, "max_tokens": 500}
+
+@traced
+def complete_chat(messages, model=DEFAULT_MODEL, use_cache=None, **params):
+    """
+    공유 LLM 클라이언트로 채팅 완성을 요청하고 응답 텍스트를 반환합니다.
+    
+    Args:
+        messages (list): 채팅 메시지 목록
+        model (str): 사용할 모델
+        use_cache (bool | None): 응답 캐시 및 동일 요청 병합 사용 여부 (결정적인 엔드포인트 전용).
+            None은 캐시 대상이 아닌 요청, False는 클라이언트가 no-cache로 명시적으로 우회한 요청
+        **params: 추가 요청 파라미터 (temperature, max_tokens 등)
+        
+    Returns:
+        str | None: 응답 텍스트, 유효한 결과가 없으면 None
+    """
+    def call():
+        result = get_llm_client().chat_completion(messages, model, **params)
+        content = extract_message_content(result)
+        if content is None:
+            logger.error(f"API 응답에서 유효한 결과를 찾을 수 없습니다: {result}")
+        return content
+    
+    if use_cache is None:
+        return call()
+    if not use_cache:
+        return response_cache.get_or_compute(None, call, bypass=True)
+    
+    key = make_cache_key(messages, model, params)
+    # 캐시 미스 시 동시에 들어온 동일 요청은 하나의 업스트림 호출을 공유
+    return response_cache.get_or_compute(key, lambda: single_flight.do(key, call))
+
+def build_chat_messages(prompt, context):
+    """
+    채팅 요청에 사용할 메시지 목록을 구성합니다.
+    
+    Args:
+        prompt (str | list): 사용자 프롬프트 또는 완성된 메시지 목록
+        context (dict): 추가 컨텍스트 정보
+        
+    Returns:
+        list: 채팅 메시지 목록
+    """
+    # 메시지 목록이 직접 전달된 경우 그대로 사용
+    if isinstance(prompt, list):
+        return prompt
+    
+    # 시스템 메시지 생성
+    system_message = "당신은 프레젠테이션을 만드는 데 도움을 주는 전문적인 AI 비서입니다. 슬라이드 디자인, 내용 작성, 프레젠테이션 구성에 관한 질문에 답변하고 제안을 제공합니다."
+    
+    # 현재 슬라이드 요약 추가 (원본 JSON 대신 토큰 예산 내의 요약)
+    current_slide = context.get('current_slide') or context.get('currentSlide')
+    if isinstance(current_slide, dict):
+        system_message += f"\n현재 작업 중인 슬라이드:\n{slide_context_text(current_slide)}"
+    
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+
+@traced
+def generate_ai_response(prompt, context=None, use_cache=None):
     """
     OpenAI API를 사용하여 AI 응답을 생성합니다.
     실제 API 키가 없는 경우 더미 응답을 반환합니다.
     
     Args:
-        prompt (str): 사용자 프롬프트
+        prompt (str | list): 사용자 프롬프트 또는 완성된 메시지 목록
         context (dict): 추가 컨텍스트 정보
+        use_cache (bool | None): 동일한 요청에 대해 캐시된 응답을 재사용할지 여부 (complete_chat 참고)
         
     Returns:
         str: AI 응답
@@ -43,47 +112,58 @@ def generate_ai_response(prompt, context=None):
         return generate_dummy_response(prompt)
     
     try:
-        # 시스템 메시지 생성
-        system_message = "당신은 프레젠테이션을 만드는 데 도움을 주는 전문적인 AI 비서입니다. 슬라이드 디자인, 내용 작성, 프레젠테이션 구성에 관한 질문에 답변하고 제안을 제공합니다."
-        
-        # 현재 세션 정보 추가
-        if 'current_slide' in context:
-            system_message += f"\n현재 작업 중인 슬라이드: {json.dumps(context['current_slide'], ensure_ascii=False)}"
-        
-        # API 요청 헤더
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {OPENAI_API_KEY}"
-        }
-        
-        # API 요청 데이터
-        data = {
-            "model": DEFAULT_MODEL,
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
+        messages = build_chat_messages(prompt, context)
         
-        # API 요청 전송
-        response = requests.post(OPENAI_API_URL, headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
+        # 공유 LLM 클라이언트로 API 요청 전송
+        ai_response = complete_chat(
+            messages,
+            DEFAULT_MODEL,
+            use_cache=use_cache,
+            **CHAT_PARAMS
+        )
         
-        # 응답 추출
-        if 'choices' in result and len(result['choices']) > 0:
-            ai_response = result['choices'][0]['message']['content'].strip()
+        if ai_response is not None:
             return ai_response
         else:
-            logger.error(f"API 응답에서 유효한 결과를 찾을 수 없습니다: {result}")
             return "죄송합니다. 응답을 생성하는 데 문제가 발생했습니다."
             
     except Exception as e:
         logger.error(f"OpenAI API 호출 중 오류 발생: {str(e)}")
         return f"AI 응답 생성 중 오류가 발생했습니다: {str(e)}"
 
+@traced
+def stream_ai_response(prompt, context=None):
+    """
+    generate_ai_response의 스트리밍 버전입니다. 업스트림의 stream=true 응답을 받는 대로 전달합니다.
+    
+    Args:
+        prompt (str | list): 사용자 프롬프트 또는 완성된 메시지 목록
+        context (dict): 추가 컨텍스트 정보
+        
+    Yields:
+        str: 응답 텍스트 조각
+    """
+    if not context:
+        context = {}
+    
+    # API 키가 없는 경우 더미 응답 반환
+    if not OPENAI_API_KEY:
+        logger.warning("OpenAI API 키가 설정되지 않았습니다. 더미 응답을 반환합니다.")
+        yield generate_dummy_response(prompt)
+        return
+    
+    try:
+        messages = build_chat_messages(prompt, context)
+        for delta in get_llm_client().stream_chat_completion(
+            messages,
+            DEFAULT_MODEL,
+            **CHAT_PARAMS
+        ):
+            yield delta
+    except Exception as e:
+        logger.error(f"OpenAI API 스트리밍 중 오류 발생: {str(e)}")
+        yield f"AI 응답 생성 중 오류가 발생했습니다: {str(e)}"
+
 def generate_dummy_response(prompt):
     """AI API 없이 더미 응답을 생성합니다"""
     
@@ -119,9 +199,11 @@ def generate_dummy_response(prompt):
             "청중의 관심을 유지하기 위해 다양한 시각적 요소를 활용하고, 슬라이드 간 자연스러운 전환을 만드는 것이 중요합니다."
         ])
 
+@traced
 def suggest_design_improvements(slide):
     """
-    슬라이드 디자인 개선을 위한 AI 제안을 생성합니다.
+    슬라이드 디자인 개선 제안을 생성합니다.
+    LLM 호출 없이 로컬 분석기에서 발견한 문제로부터 제안을 만듭니다.
     
     Args:
         slide (dict): 분석할 슬라이드 데이터
@@ -129,30 +211,9 @@ def suggest_design_improvements(slide):
     Returns:
         list: 디자인 개선 제안 목록
     """
-    # 더미 디자인 제안
-    suggestions = [
-        {
-            "type": "color",
-            "title": "색상 조화 개선",
-            "description": "현재 슬라이드의 색상이 조화롭지 않습니다. 더 일관된 색상 팔레트를 사용하세요.",
-            "suggestion": "파란색 계열(#336699)과 보완색인 주황색(#FF9933)을 강조색으로 사용해보세요."
-        },
-        {
-            "type": "layout",
-            "title": "요소 배치 최적화",
-            "description": "슬라이드 요소들이 균형 있게 배치되어 있지 않습니다.",
-            "suggestion": "주요 내용을 슬라이드 중앙에 배치하고, 관련 이미지는 오른쪽에 정렬하세요."
-        },
-        {
-            "type": "typography",
-            "title": "폰트 일관성 유지",
-            "description": "여러 다른 폰트를 사용하면 시각적 혼란을 줄 수 있습니다.",
-            "suggestion": "제목에는 Arial 또는 Pretendard, 본문에는 Calibri 또는 Roboto를 일관되게 사용하세요."
-        }
-    ]
-    
-    return suggestions
+    return slide_analyzer.design_suggestions(slide_analyzer.analyze(slide))
 
+@traced
 def generate_slide_content(prompt, content_type="text"):
     """
     AI를 사용하여 슬라이드 콘텐츠를 생성합니다.
@@ -192,40 +253,60 @@ def generate_slide_content(prompt, content_type="text"):
             "content": f"{prompt}는 현대 비즈니스 환경에서 중요한 역할을 합니다. 효과적으로 활용하면 생산성을 향상시키고 의사결정을 개선할 수 있습니다. 이 주제에 대한 깊은 이해는 조직의 성공에 기여할 수 있는 핵심 요소입니다."
         }
 
+@traced
 def analyze_slide(slide):
     """
     슬라이드 콘텐츠를 분석하고 피드백을 제공합니다.
+    LLM 호출 없이 로컬 분석기로 계산하므로 결과가 결정적이고 빠릅니다.
     
     Args:
         slide (dict): 분석할 슬라이드 데이터
         
     Returns:
-        dict: 분석 결과와 개선 제안
+        dict: 분석 결과와 개선 제안 (점수, 검사별 점수, 문제 목록 포함)
     """
-    # 더미 분석 결과
-    analysis = {
-        "readability": {
-            "score": random.choice(["good", "average", "poor"]),
-            "feedback": "텍스트 양이 적절하고 가독성이 좋습니다."
-        },
-        "content_quality": {
-            "score": random.choice(["good", "average", "poor"]),
-            "feedback": "핵심 메시지가 명확하게 전달되고 있습니다."
-        },
-        "visual_balance": {
-            "score": random.choice(["good", "average", "poor"]),
-            "feedback": "요소들이 균형 있게 배치되어 있습니다."
-        },
-        "improvements": [
-            "더 강렬한 제목을 사용하여 청중의 관심을 끌어보세요.",
-            "핵심 포인트를 3-5개로 제한하여 집중력을 높이세요.",
-            "관련 이미지나 그래픽을 추가하여 시각적 효과를 높이세요."
-        ]
-    }
-    
-    return analysis
+    return slide_analyzer.analyze(slide)
 
-def generate_title_suggestions(content='', theme='', count=5):
+def build_title_messages(content, theme, count):
+    """제목 추천 요청에 사용할 메시지 목록을 구성합니다"""
+    # 시스템 메시지 생성
+    system_message = "당신은 프레젠테이션 제목 추천 전문가입니다. 제공된 콘텐츠나 주제에 기반하여 매력적이고 전문적인 제목을 추천해 주세요."
+    
+    # 프롬프트 생성
+    prompt = "다음 정보를 바탕으로 프레젠테이션 제목을 추천해 주세요:\n"
+    
+    if content:
+        prompt += f"콘텐츠: {content}\n"
+    
+    if theme:
+        prompt += f"주제/테마: {theme}\n"
+    
+    prompt += f"\n{count}개의 서로 다른 제목을 제안해 주세요. 각 제목은 간결하면서도 매력적이어야 합니다. 번호를 매겨서 목록 형태로 제공해 주세요."
+    
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_title_list(ai_response, count):
+    """AI 응답에서 제목 목록을 추출합니다"""
+    titles = []
+    for line in ai_response.split('\n'):
+        # 번호가 붙은 라인 찾기 (예: "1. 제목", "2) 제목", "- 제목")
+        if re.match(r'^\d+[\.\)]\s+|^[-*]\s+', line.strip()):
+            title = re.sub(r'^\d+[\.\)]\s+|^[-*]\s+', '', line.strip())
+            if title:
+                titles.append(title)
+    
+    # 추출된 제목이 없다면 전체 응답을 줄바꿈으로 분리
+    if not titles:
+        titles = [line.strip() for line in ai_response.split('\n') if line.strip()]
+    
+    # 요청한 개수만큼 반환
+    return titles[:count]
+
+@traced
+def generate_title_suggestions(content='', theme='', count=5, use_cache=True):
     """
     콘텐츠나 테마에 기반한 제목을 추천합니다.
     
@@ -233,6 +314,7 @@ def generate_title_suggestions(content='', theme='', count=5):
         content (str): 슬라이드 콘텐츠
         theme (str): 프레젠테이션 테마 또는 주제
         count (int): 생성할 제목 개수
+        use_cache (bool): 동일한 입력에 대해 캐시된 응답을 재사용할지 여부
         
     Returns:
         list: 추천 제목 목록
@@ -243,63 +325,20 @@ def generate_title_suggestions(content='', theme='', count=5):
         return generate_dummy_titles(content, theme, count)
     
     try:
-        # 시스템 메시지 생성
-        system_message = "당신은 프레젠테이션 제목 추천 전문가입니다. 제공된 콘텐츠나 주제에 기반하여 매력적이고 전문적인 제목을 추천해 주세요."
+        messages = build_title_messages(content, theme, count)
         
-        # 프롬프트 생성
-        prompt = "다음 정보를 바탕으로 프레젠테이션 제목을 추천해 주세요:\n"
+        # 공유 LLM 클라이언트로 API 요청 전송
+        ai_response = complete_chat(
+            messages,
+            DEFAULT_MODEL,
+            use_cache=use_cache,
+            **TITLE_PARAMS
+        )
         
-        if content:
-            prompt += f"콘텐츠: {content}\n"
-        
-        if theme:
-            prompt += f"주제/테마: {theme}\n"
-        
-        prompt += f"\n{count}개의 서로 다른 제목을 제안해 주세요. 각 제목은 간결하면서도 매력적이어야 합니다. 번호를 매겨서 목록 형태로 제공해 주세요."
-        
-        # API 요청 헤더
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {OPENAI_API_KEY}"
-        }
-        
-        # API 요청 데이터
-        data = {
-            "model": DEFAULT_MODEL,
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.8,
-            "max_tokens": 500
-        }
-        
-        # API 요청 전송
-        response = requests.post(OPENAI_API_URL, headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
-        
-        # 응답 추출 및 파싱
-        if 'choices' in result and len(result['choices']) > 0:
-            ai_response = result['choices'][0]['message']['content'].strip()
-            
-            # 응답에서 제목 목록 추출
-            titles = []
-            for line in ai_response.split('\n'):
-                # 번호가 붙은 라인 찾기 (예: "1. 제목", "2) 제목", "- 제목")
-                if re.match(r'^\d+[\.\)]\s+|^[-*]\s+', line.strip()):
-                    title = re.sub(r'^\d+[\.\)]\s+|^[-*]\s+', '', line.strip())
-                    if title:
-                        titles.append(title)
-            
-            # 추출된 제목이 없다면 전체 응답을 줄바꿈으로 분리
-            if not titles:
-                titles = [line.strip() for line in ai_response.split('\n') if line.strip()]
-            
-            # 요청한 개수만큼 반환
-            return titles[:count]
+        # 응답 파싱
+        if ai_response is not None:
+            return parse_title_list(ai_response, count)
         else:
-            logger.error(f"API 응답에서 유효한 결과를 찾을 수 없습니다: {result}")
             return generate_dummy_titles(content, theme, count)
             
     except Exception as e:
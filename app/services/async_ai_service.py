@@ -0,0 +1,187 @@
+"""
+Async AI Service Module - asyncio versions of the AI and slide generation services
+
+Served by the ASGI entry point (app/asgi.py). Prompt construction, response
+parsing, caching and session storage are shared with the sync services; only
+the upstream calls differ, so waiting on the LLM never blocks a thread.
+"""
+
+import asyncio
+from app.utils.logger import logger
+from app.utils.config import SLIDE_GENERATION_WORKERS
+from app.utils.json_stream import parse_array_items
+from app.services.async_llm_client import get_async_llm_client
+from app.services.llm_client import extract_message_content
+from app.services.response_cache import response_cache, make_cache_key
+from app.services.single_flight import single_flight
+from app.services.slide_schema import validate_slide
+from app.services import ai_service
+from app.services.ai_service import (
+    DEFAULT_MODEL,
+    CHAT_PARAMS,
+    TITLE_PARAMS,
+    build_chat_messages,
+    build_title_messages,
+    parse_title_list,
+    generate_dummy_response,
+    generate_dummy_titles
+)
+from app.services.slide_service import (
+    build_topic_messages,
+    build_outline_messages,
+    build_slide_body_messages,
+    parse_outline,
+    should_generate_in_parallel,
+    assign_element_ids,
+    save_session_slides,
+    create_demo_slides
+)
+
+
+async def complete_chat_async(messages, model=DEFAULT_MODEL, use_cache=None, **params):
+    """
+    complete_chat의 비동기 버전입니다.
+
+    Returns:
+        str | None: 응답 텍스트, 유효한 결과가 없으면 None
+    """
+    async def call():
+        result = await get_async_llm_client().chat_completion(messages, model, **params)
+        content = extract_message_content(result)
+        if content is None:
+            logger.error(f"API 응답에서 유효한 결과를 찾을 수 없습니다: {result}")
+        return content
+
+    if use_cache is None:
+        return await call()
+    if not use_cache:
+        return await response_cache.get_or_compute_async(None, call, bypass=True)
+
+    key = make_cache_key(messages, model, params)
+
+    # 캐시 미스 시 동시에 들어온 동일 요청은 하나의 업스트림 호출을 공유
+    return await response_cache.get_or_compute_async(key, lambda: single_flight.do_async(key, call))
+
+
+async def generate_ai_response_async(prompt, context=None, use_cache=None):
+    """
+    generate_ai_response의 비동기 버전입니다.
+
+    Args:
+        prompt (str | list): 사용자 프롬프트 또는 완성된 메시지 목록
+        context (dict): 추가 컨텍스트 정보
+        use_cache (bool | None): 동일한 요청에 대해 캐시된 응답을 재사용할지 여부 (complete_chat 참고)
+
+    Returns:
+        str: AI 응답
+    """
+    if not context:
+        context = {}
+
+    # API 키가 없는 경우 더미 응답 반환
+    if not ai_service.OPENAI_API_KEY:
+        logger.warning("OpenAI API 키가 설정되지 않았습니다. 더미 응답을 반환합니다.")
+        return generate_dummy_response(prompt)
+
+    try:
+        messages = build_chat_messages(prompt, context)
+        ai_response = await complete_chat_async(messages, DEFAULT_MODEL, use_cache=use_cache, **CHAT_PARAMS)
+        if ai_response is not None:
+            return ai_response
+        return "죄송합니다. 응답을 생성하는 데 문제가 발생했습니다."
+    except Exception as e:
+        logger.error(f"OpenAI API 호출 중 오류 발생: {str(e)}")
+        return f"AI 응답 생성 중 오류가 발생했습니다: {str(e)}"
+
+
+async def generate_title_suggestions_async(content='', theme='', count=5, use_cache=True):
+    """
+    generate_title_suggestions의 비동기 버전입니다.
+
+    Returns:
+        list: 추천 제목 목록
+    """
+    # API 키가 없는 경우 더미 응답 반환
+    if not ai_service.OPENAI_API_KEY:
+        logger.warning("OpenAI API 키가 설정되지 않았습니다. 더미 제목을 반환합니다.")
+        return generate_dummy_titles(content, theme, count)
+
+    try:
+        messages = build_title_messages(content, theme, count)
+        ai_response = await complete_chat_async(messages, DEFAULT_MODEL, use_cache=use_cache, **TITLE_PARAMS)
+        if ai_response is not None:
+            return parse_title_list(ai_response, count)
+        return generate_dummy_titles(content, theme, count)
+    except Exception as e:
+        logger.error(f"제목 추천 중 오류 발생: {str(e)}")
+        return generate_dummy_titles(content, theme, count)
+
+
+def _is_error_response(api_response):
+    return '오류' in api_response or '잔액' in api_response
+
+
+async def _generate_slide_body_async(topic, outline, index, use_cache):
+    """Async counterpart of slide_service.generate_slide_body"""
+    fallback = {"title": outline[index]["title"], "content": outline[index]["summary"], "elements": []}
+    try:
+        api_response = await generate_ai_response_async(build_slide_body_messages(topic, outline, index),
+                                                        use_cache=use_cache)
+        if _is_error_response(api_response):
+            return fallback
+        items, _ = parse_array_items(api_response)
+        for item in items:
+            slide = validate_slide(item)
+            if slide is not None:
+                return slide
+        logger.warning(f"No slide JSON for outline item {index}, using outline text")
+    except Exception as e:
+        logger.error(f"Slide body generation error ({index}): {str(e)}")
+    return fallback
+
+
+async def generate_slides_in_parallel_async(topic, slide_count, use_cache=True):
+    """Async counterpart of slide_service.generate_slides_in_parallel"""
+    api_response = await generate_ai_response_async(build_outline_messages(topic, slide_count),
+                                                    use_cache=use_cache)
+    if _is_error_response(api_response):
+        return []
+    outline = parse_outline(api_response, slide_count)
+    if not outline:
+        return []
+
+    limit = asyncio.Semaphore(SLIDE_GENERATION_WORKERS)
+
+    async def bounded(index):
+        async with limit:
+            return await _generate_slide_body_async(topic, outline, index, use_cache)
+
+    return list(await asyncio.gather(*(bounded(i) for i in range(len(outline)))))
+
+
+async def generate_slides_from_topic_async(session_id, topic, slide_count, use_cache=True):
+    """Async counterpart of slide_service.generate_slides_from_topic"""
+    slides_data = []
+    try:
+        if should_generate_in_parallel(slide_count):
+            slides_data = await generate_slides_in_parallel_async(topic, slide_count, use_cache)
+
+        if not slides_data:
+            logger.info(f"Generating slides for topic: {topic}, count: {slide_count}")
+            api_response = await generate_ai_response_async(build_topic_messages(topic, slide_count),
+                                                            use_cache=use_cache)
+            if not _is_error_response(api_response):
+                items, complete = parse_array_items(api_response)
+                slides_data = [slide for slide in map(validate_slide, items) if slide is not None]
+                if slides_data and not complete:
+                    logger.warning(f"Truncated AI response, keeping {len(slides_data)} of {slide_count} slides")
+    except Exception as e:
+        logger.error(f"Presentation generation error: {str(e)}")
+        slides_data = []
+
+    # Session writes are short blocking calls; keep them off the event loop
+    if not slides_data:
+        return await asyncio.to_thread(create_demo_slides, session_id, topic, slide_count)
+
+    assign_element_ids(slides_data)
+    return await asyncio.to_thread(save_session_slides, session_id, slides_data)
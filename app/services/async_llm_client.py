@@ -0,0 +1,169 @@
+"""
+Async LLM Client Module - asyncio counterpart of llm_client for the ASGI entry point
+
+One client per event loop keeps connections alive in pooled
+``httpx.AsyncClient`` instances, and a waiting call costs a coroutine instead of
+a worker thread, so one process can
+hold hundreds of pending upstream calls. Timeouts, retries and backoff follow
+the same settings as the sync client.
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import time
+from app.utils.logger import logger
+from app.utils.metrics import observe_llm
+from app.utils.tracing import traced, set_attributes, trace_headers, KIND_CLIENT
+from app.utils.config import (
+    OPENAI_API_URL,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_QUEUE_TIMEOUT,
+    ASYNC_LLM_MAX_CONCURRENCY
+)
+from app.services.llm_client import LLMError, RETRYABLE_STATUS_CODES
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - only needed for the ASGI entry point
+    httpx = None
+
+
+class AsyncLLMClient:
+    """Pooled asyncio client for an OpenAI-compatible chat completion endpoint"""
+
+    # httpcore scans its whole pool on every request, which gets quadratic with
+    # hundreds of open connections; spread them over several smaller pools instead
+    CONNECTIONS_PER_POOL = 64
+
+    def __init__(self, api_url=OPENAI_API_URL, api_key=None,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 backoff_max=LLM_BACKOFF_MAX, max_concurrency=ASYNC_LLM_MAX_CONCURRENCY,
+                 queue_timeout=LLM_QUEUE_TIMEOUT):
+        if httpx is None:
+            raise RuntimeError("The async LLM client requires the 'httpx' package")
+        self.api_url = api_url
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        pool_count = max(1, -(-max_concurrency // self.CONNECTIONS_PER_POOL))
+        per_pool = -(-max_concurrency // pool_count)
+        self._pools = [
+            httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=per_pool, max_keepalive_connections=per_pool),
+                headers={"Content-Type": "application/json"}
+            )
+            for _ in range(pool_count)
+        ]
+        self._next_pool = itertools.cycle(self._pools)
+
+    def _headers(self):
+        headers = trace_headers()
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when the server sends it"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def post(self, payload):
+        """Send a chat completion request with timeouts and bounded retries"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await next(self._next_pool).post(self.api_url, headers=self._headers(), json=payload)
+                if response.status_code < 400:
+                    return response
+                last_error = LLMError(f"LLM API 오류 응답 ({response.status_code}): {response.text[:200]}",
+                                      response.status_code)
+                retry_after = response.headers.get("Retry-After")
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise last_error
+            except httpx.TransportError as e:
+                last_error = LLMError(f"LLM API 연결 오류: {str(e)}")
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"LLM call failed ({last_error}), retrying in {delay:.2f}s "
+                               f"({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+        raise last_error
+
+    @traced(name='llm.chat_completion', kind=KIND_CLIENT)
+    async def chat_completion(self, messages, model, **params):
+        """
+        Call the chat completion endpoint and return the decoded JSON result.
+
+        Args:
+            messages (list): Chat messages
+            model (str): Model name
+            **params: Extra request parameters (temperature, max_tokens, ...)
+
+        Returns:
+            dict: API response
+        """
+        payload = {"model": model, "messages": messages}
+        payload.update(params)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMError("LLM 동시 요청 한도를 초과했습니다. 잠시 후 다시 시도해주세요.", 503)
+        started = time.perf_counter()
+        try:
+            response = await self.post(payload)
+            result = response.json()
+        except BaseException:
+            observe_llm(model, time.perf_counter() - started, 'error')
+            raise
+        finally:
+            self._slots.release()
+        observe_llm(model, time.perf_counter() - started, usage=result.get('usage'))
+        usage = result.get('usage') if isinstance(result.get('usage'), dict) else {}
+        set_attributes(model=model, prompt_tokens=usage.get('prompt_tokens'),
+                       completion_tokens=usage.get('completion_tokens'))
+        return result
+
+    async def aclose(self):
+        """Close pooled connections"""
+        for pool in self._pools:
+            await pool.aclose()
+
+
+# One client per event loop: httpx connections cannot be shared across loops
+_clients = {}
+
+
+def get_async_llm_client():
+    """Return the shared async LLM client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncLLMClient()
+        _clients[loop] = client
+    return client
+
+
+async def close_async_llm_client():
+    """Close the client bound to the running event loop, if any"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
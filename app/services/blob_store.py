@@ -0,0 +1,329 @@
+"""
+Blob Store Module - Content-addressed storage for uploaded images
+
+Uploads are streamed to disk in fixed-size chunks while being hashed, so a
+file is never held in memory as a whole. The SHA-256 of the content is its
+address: uploading the same image twice stores it once. Downscaled renditions
+(editor canvas, slide thumbnails) are derived on first request and kept next
+to the original; they require Pillow and fall back to the original without it.
+
+Because a blob's URL names its content, responses can carry the hash as a
+strong ETag and be cached forever (``immutable``).
+
+Decks saved with images inlined as base64 data URLs are rewritten to point
+at the store (``externalize_images``), so deck JSON stays small and images
+load separately; exports inline them again (``inline_stored_images``).
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+from io import BytesIO
+from app.utils.logger import logger
+from app.utils.config import BLOB_STORE_DIR, IMAGE_RENDITIONS, MAX_CONTENT_LENGTH, INLINE_IMAGE_MIN_SIZE
+from app.services.single_flight import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - renditions are skipped without Pillow
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+
+# Images accepted for upload, keyed by the magic bytes they start with
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/gif': 'gif', 'image/webp': 'webp'}
+
+HASH_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# URL prefix the store's images are served under (see the /images/<hash> route)
+IMAGE_URL_PREFIX = '/images/'
+
+# A base64 image data URL, on its own or as a CSS url(...) value
+DATA_URL_PATTERN = re.compile(r'(url\(\s*["\']?)?data:image/[\w.+-]+;base64,', re.IGNORECASE)
+STORED_URL_PATTERN = re.compile(r'(url\(\s*["\']?)?/images/([0-9a-f]{64})(?:/[\w-]+)?(["\']?\s*\))?')
+
+
+class BlobError(ValueError):
+    """Raised for uploads that are rejected (unsupported type, too large, empty)"""
+
+
+def sniff_image_type(header):
+    """Return the MIME type of an image from its first bytes, or None"""
+    for signature, mime in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def image_dimensions(header, mime):
+    """Best-effort (width, height) from the start of an image file, or (None, None)"""
+    try:
+        if mime == 'image/png' and len(header) >= 24:
+            return struct.unpack('>II', header[16:24])
+        if mime == 'image/gif' and len(header) >= 10:
+            return struct.unpack('<HH', header[6:10])
+        if mime == 'image/jpeg':
+            i = 2
+            while i + 9 < len(header) and header[i] == 0xFF:
+                marker = header[i + 1]
+                length = struct.unpack('>H', header[i + 2:i + 4])[0]
+                if marker in (0xC0, 0xC1, 0xC2):
+                    height, width = struct.unpack('>HH', header[i + 5:i + 9])
+                    return width, height
+                i += 2 + length
+    except struct.error:
+        pass
+    return None, None
+
+
+def parse_renditions(spec):
+    """Parse 'name:max_px,...' into {name: max_px}"""
+    renditions = {}
+    for item in spec.split(','):
+        name, _, size = item.strip().partition(':')
+        if name and size.isdigit():
+            renditions[name] = int(size)
+    return renditions
+
+
+class BlobStore:
+    """Content-addressed files under ``root/<aa>/<sha256>``"""
+
+    # Enough of the file to read JPEG dimensions past typical EXIF blocks
+    HEADER_BYTES = 256 * 1024
+
+    def __init__(self, root=BLOB_STORE_DIR, renditions=None, max_size=MAX_CONTENT_LENGTH):
+        self.root = root
+        self.renditions = parse_renditions(IMAGE_RENDITIONS) if renditions is None else renditions
+        self.max_size = max_size
+        self._renders = SingleFlight()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest, rendition=None):
+        name = digest if rendition is None else f"{digest}.{rendition}"
+        return os.path.join(self.root, digest[:2], name)
+
+    def _meta_path(self, digest):
+        return self.path(digest) + '.json'
+
+    def exists(self, digest):
+        return bool(HASH_PATTERN.fullmatch(digest or '')) and os.path.exists(self.path(digest))
+
+    def info(self, digest):
+        """Metadata of a stored blob, or None"""
+        if not self.exists(digest):
+            return None
+        try:
+            with open(self._meta_path(digest), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'hash': digest, 'mime': 'application/octet-stream', 'size': os.path.getsize(self.path(digest))}
+
+    def put_stream(self, stream, allowed_types=EXTENSIONS):
+        """
+        Store the content of a binary stream, reading it in chunks.
+
+        Args:
+            stream: Object with ``read(n)``
+            allowed_types: MIME types accepted (sniffed from the content, not trusted from the client)
+
+        Returns:
+            tuple: (metadata dict, True if the content was already stored)
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        header = b''
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise BlobError(f"File is larger than {self.max_size} bytes")
+                    if len(header) < self.HEADER_BYTES:
+                        header += chunk[:self.HEADER_BYTES - len(header)]
+                    hasher.update(chunk)
+                    out.write(chunk)
+
+            if size == 0:
+                raise BlobError("Empty upload")
+            mime = sniff_image_type(header)
+            if mime is None or mime not in allowed_types:
+                raise BlobError("Unsupported image type")
+
+            digest = hasher.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                os.remove(tmp_path)
+                return self.info(digest), True
+
+            width, height = image_dimensions(header, mime)
+            meta = {'hash': digest, 'mime': mime, 'size': size, 'width': width, 'height': height}
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(self._meta_path(digest), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, target)
+            return meta, False
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put_bytes(self, data, allowed_types=EXTENSIONS):
+        """Store an in-memory payload"""
+        return self.put_stream(BytesIO(data), allowed_types)
+
+    def rendition_path(self, digest, name):
+        """
+        Path of a downscaled rendition, generating it on first use.
+
+        Returns the original's path when the rendition is unknown, Pillow is
+        missing, or the image is already small enough.
+        """
+        original = self.path(digest)
+        max_px = self.renditions.get(name)
+        meta = self.info(digest) or {}
+        if max_px is None or Image is None or meta.get('mime') == 'image/gif':
+            return original
+        if meta.get('width') and meta.get('height') and max(meta['width'], meta['height']) <= max_px:
+            return original
+
+        target = self.path(digest, name)
+        if os.path.exists(target):
+            return target
+        # Concurrent requests for the same rendition render it once
+        return self._renders.do(target, lambda: self._render(original, target, max_px))
+
+    def _render(self, original, target, max_px):
+        if os.path.exists(target):
+            return target
+        tmp_path = None
+        try:
+            with Image.open(original) as image:
+                image.draft('RGB', (max_px, max_px))  # JPEG: decode at reduced scale
+                image.thumbnail((max_px, max_px))
+                has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.rendition-')
+                with os.fdopen(fd, 'wb') as out:
+                    if has_alpha:
+                        image.save(out, 'PNG', optimize=True)
+                    else:
+                        image.convert('RGB').save(out, 'JPEG', quality=85, optimize=True, progressive=True)
+            os.replace(tmp_path, target)
+            return target
+        except Exception as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logger.error(f"Rendition error for {os.path.basename(original)}: {str(e)}")
+            return original
+
+    @staticmethod
+    def rendition_mime(path, meta):
+        """MIME type of a file returned by ``rendition_path``"""
+        with open(path, 'rb') as f:
+            return sniff_image_type(f.read(16)) or meta.get('mime', 'application/octet-stream')
+
+
+def _store_data_url(text, store):
+    """``text`` with its data URL replaced by the stored image's URL, or None to keep it"""
+    match = DATA_URL_PATTERN.match(text)
+    if match is None:
+        return None
+    wrapper = match.group(1) or ''
+    end = len(text)
+    if wrapper:
+        end = len(text.rstrip())
+        if text[end - 1:end] != ')':
+            return None
+        end -= 1
+        while text[end - 1].isspace():
+            end -= 1
+        quote = wrapper.rstrip()[-1]
+        if quote in '"\'':
+            if text[end - 1] != quote:
+                return None
+            end -= 1
+    try:
+        data = binascii.a2b_base64(text[match.end():end])
+        meta, _ = store.put_bytes(data)
+    except (binascii.Error, BlobError):
+        return None
+    url = IMAGE_URL_PREFIX + meta['hash']
+    return wrapper + url + text[end:] if wrapper else url
+
+
+def externalize_images(value, store, min_length=INLINE_IMAGE_MIN_SIZE):
+    """
+    Move base64 image data URLs found anywhere in ``value`` (a deck, slide,
+    element or edit operation) into ``store``, replacing them in place with
+    ``/images/<hash>``. Images the store rejects (unsupported type, too large)
+    stay inline.
+
+    Returns:
+        int: Number of data URLs replaced
+    """
+    if isinstance(value, dict):
+        items = list(value.items())
+    elif isinstance(value, list):
+        items = list(enumerate(value))
+    else:
+        return 0
+    moved = 0
+    for key, item in items:
+        if isinstance(item, str):
+            if len(item) >= min_length:
+                url = _store_data_url(item, store)
+                if url is not None:
+                    value[key] = url
+                    moved += 1
+        elif isinstance(item, (dict, list)):
+            moved += externalize_images(item, store, min_length)
+    return moved
+
+
+def inline_stored_images(value, store):
+    """Copy of ``value`` with URLs of stored images replaced by data URLs (for self-contained exports)"""
+    if isinstance(value, dict):
+        return {key: inline_stored_images(item, store) for key, item in value.items()}
+    if isinstance(value, list):
+        return [inline_stored_images(item, store) for item in value]
+    if isinstance(value, str) and IMAGE_URL_PREFIX in value:
+        match = STORED_URL_PATTERN.fullmatch(value)
+        meta = store.info(match.group(2)) if match else None
+        if meta is not None:
+            with open(store.path(meta['hash']), 'rb') as f:
+                data_url = f"data:{meta['mime']};base64,{base64.b64encode(f.read()).decode('ascii')}"
+            return (match.group(1) or '') + data_url + (match.group(3) or '')
+    return value
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """Return the process-wide blob store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore()
+    return _store
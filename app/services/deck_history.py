@@ -0,0 +1,542 @@
+"""
+Deck History Module - Server-side undo/redo with structurally shared versions
+
+Every committed change of a session's deck is recorded as a version. Versions
+do not copy the deck:
+
+- Slides are interned in the shared content store (``content_store``), so a
+  slide is stored once however many versions and sessions contain it; each
+  history counts the references its chunks hold.
+- A version is a tuple of chunks; a chunk is an interned tuple of consecutive
+  slide keys. Chunk boundaries are content defined (a slide whose hash ends
+  a chunk always ends it), so inserting, removing or editing a slide only
+  changes the chunk around it and every other chunk is shared with the
+  previous version.
+
+So a version costs one pointer per chunk (about one per 16 slides) plus the
+chunks and slides the edit actually changed. Undo and redo move a cursor; the
+restored deck reuses the current slide objects for every shared chunk and
+decodes only the slides that differ. Recording re-encodes only the slides
+the edit touched.
+
+That history lives in the process that recorded it, like the memory session
+store; after a restart it starts again from the deck as first loaded. With a
+store shared between workers (SQLite, Redis), ``StoredDeckHistory`` keeps the
+same versions as records in the record store instead, so every worker undoes
+against the same history.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from app.utils.logger import logger
+from app.services.content_store import get_content_store
+from app.services.session_store import get_session_store, get_record_store
+from app.utils.config import (
+    HISTORY_MAX_VERSIONS,
+    HISTORY_MAX_AGE,
+    HISTORY_MAX_BYTES,
+    HISTORY_COALESCE,
+    HISTORY_MAX_SESSIONS
+)
+
+# Content-defined chunking: a slide whose key has these low bits clear ends a chunk
+# (about 16 slides per chunk); CHUNK_MAX bounds a run without such a slide
+CHUNK_MASK = 0xF
+CHUNK_MAX = 64
+
+
+class HistoryError(Exception):
+    """Undo/redo request that cannot be served; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+def _chunk(keys):
+    chunks = []
+    current = []
+    for key in keys:
+        current.append(key)
+        if not key[-1] & CHUNK_MASK or len(current) >= CHUNK_MAX:
+            chunks.append(tuple(current))
+            current = []
+    if current:
+        chunks.append(tuple(current))
+    return chunks
+
+
+class _Version:
+    __slots__ = ('chunks', 'theme', 'created', 'slide_count')
+
+    def __init__(self, chunks, theme):
+        self.chunks = chunks
+        self.theme = theme
+        self.created = time.time()
+        self.slide_count = sum(len(chunk) for chunk in chunks)
+
+
+class SessionHistory:
+    """Versions of one session's deck and the slides and chunks they share"""
+
+    def __init__(self, content=None):
+        self.content = content or get_content_store()
+        self.versions = []
+        self.cursor = -1
+        self.store_version = None  # session version the cursor's deck was written as
+        self.restored = False  # the current version came from undo/redo
+        self.closed = False  # dropped from the registry; its references are released
+        self.bytes = 0
+        self._slides = {}  # key -> [shared key, size, chunk refcount]
+        self._chunks = {}  # chunk -> [interned chunk, version refcount]
+        self._encoded = {}  # id(slide) -> (slide, key) as last recorded
+        self.lock = threading.Lock()
+
+    # -- reference counting ------------------------------------------------
+
+    def _intern(self, chunk, fresh):
+        entry = self._chunks.get(chunk)
+        if entry is None:
+            keys = []
+            for key in chunk:
+                slide = self._slides.get(key)
+                if slide is None:
+                    encoded = fresh[key]
+                    if not isinstance(encoded, tuple):
+                        encoded = self.content.encode(encoded)[1:]
+                    size = len(encoded[0]) + sum(len(value) for value in encoded[1].values())
+                    key = self.content.add(key, *encoded)
+                    slide = self._slides[key] = [key, size, 0]
+                    self.bytes += size
+                slide[2] += 1
+                keys.append(slide[0])
+            chunk = tuple(keys)
+            entry = self._chunks[chunk] = [chunk, 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release(self, version):
+        for chunk in version.chunks:
+            entry = self._chunks[chunk]
+            entry[1] -= 1
+            if entry[1]:
+                continue
+            del self._chunks[chunk]
+            for key in chunk:
+                slide = self._slides[key]
+                slide[2] -= 1
+                if not slide[2]:
+                    del self._slides[key]
+                    self.bytes -= slide[1]
+                    self.content.release(key)
+
+    def close(self):
+        """Release every version (the history is being dropped)"""
+        self.closed = True
+        while self.versions:
+            self._release(self.versions.pop())
+        self.cursor = -1
+        self._encoded = {}
+
+    # -- versions ----------------------------------------------------------
+
+    @property
+    def current(self):
+        return self.versions[self.cursor] if self.versions else None
+
+    def _encode(self, slides, touched):
+        """
+        Content store key per slide, and {key: (encoded, payloads)} for the
+        slides that were encoded. With ``touched`` (the slides changed in place
+        since the last record) every other slide object that was recorded last
+        time keeps its key instead of being re-encoded.
+        """
+        keys = []
+        fresh = {}
+        if touched is None:
+            self._encoded = {}
+            for slide in slides:
+                key, encoded, payloads = self.content.encode(slide)
+                keys.append(key)
+                fresh[key] = (encoded, payloads)
+            return keys, fresh
+        dirty = {id(slide) for slide in touched}
+        cache, self._encoded = self._encoded, {}
+        for slide in slides:
+            entry = None if id(slide) in dirty else cache.get(id(slide))
+            if entry is None or entry[0] is not slide:
+                key, encoded, payloads = self.content.encode(slide)
+                fresh[key] = (encoded, payloads)
+                entry = (slide, key)
+            else:
+                # Stored while it is in the last recorded version; encoded again only if not
+                fresh.setdefault(entry[1], slide)
+            self._encoded[id(slide)] = entry
+            keys.append(entry[1])
+        return keys, fresh
+
+    def record(self, data, coalesce=True, amend=False, touched=None):
+        """
+        Record the session's deck as the newest version (dropping any redo
+        versions). With ``amend`` the deck replaces the current version
+        instead, keeping undo and redo as they are. ``touched`` lists the
+        slides changed in place, when the caller knows them.
+        """
+        if self.closed:
+            return
+        keys, fresh = self._encode(data.get('slides', []), touched)
+        chunks = _chunk(keys)
+        theme = data.get('theme', 'default')
+        self.store_version = data.get('version', 0)
+
+        current = self.current
+        if current is not None and current.theme == theme and current.chunks == tuple(chunks):
+            return  # nothing changed (e.g. a save without edits)
+
+        # References for the new version are taken before any are dropped, so
+        # slides it shares with dropped versions stay stored
+        version = _Version(tuple(self._intern(chunk, fresh) for chunk in chunks), theme)
+        if amend and current is not None:
+            self.versions[self.cursor] = version
+            self._release(current)
+            return
+
+        while len(self.versions) > self.cursor + 1:
+            self._release(self.versions.pop())
+        # A burst of edits (typing, dragging) becomes one undo step
+        if (coalesce and not self.restored and len(self.versions) > 1
+                and time.time() - current.created < HISTORY_COALESCE):
+            self._release(self.versions.pop())
+
+        self.versions.append(version)
+        self.cursor = len(self.versions) - 1
+        self.restored = False
+        self._prune()
+
+    def _prune(self):
+        cutoff = time.time() - HISTORY_MAX_AGE if HISTORY_MAX_AGE > 0 else None
+        while len(self.versions) > 1 and (
+                len(self.versions) > HISTORY_MAX_VERSIONS
+                or self.bytes > HISTORY_MAX_BYTES
+                or (cutoff is not None and self.versions[0].created < cutoff)):
+            self._release(self.versions.pop(0))
+            self.cursor -= 1
+        if self.cursor < 0:
+            # The undone-to version was pruned: the oldest one left becomes current,
+            # and no longer matches the stored deck
+            self.cursor = 0
+            self.store_version = None
+
+    def materialize(self, version, current_slides):
+        """
+        Slides of ``version``. Chunks shared with the current version reuse
+        ``current_slides`` (the deck as the current version was written);
+        only slides in other chunks are decoded.
+        """
+        reusable = {}
+        offset = 0
+        for chunk in self.current.chunks:
+            reusable[id(chunk)] = current_slides[offset:offset + len(chunk)]
+            offset += len(chunk)
+        slides = []
+        for chunk in version.chunks:
+            shared = reusable.get(id(chunk))
+            if shared is not None:
+                slides.extend(shared)
+            else:
+                slides.extend(self.content.load_slide(key) for key in chunk)
+        return slides
+
+    def state(self):
+        return {
+            'versions': len(self.versions),
+            'position': self.cursor,
+            'canUndo': self.cursor > 0,
+            'canRedo': self.cursor < len(self.versions) - 1,
+            'bytes': self.bytes,
+            'uniqueSlides': len(self._slides)
+        }
+
+
+class DeckHistory:
+    """Per-session histories, least recently used dropped beyond ``HISTORY_MAX_SESSIONS``"""
+
+    def __init__(self, max_sessions=HISTORY_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, create=False):
+        dropped = []
+        with self._lock:
+            history = self._histories.get(session_id)
+            if history is None:
+                if not create:
+                    return None
+                history = self._histories[session_id] = SessionHistory()
+                while len(self._histories) > self.max_sessions:
+                    dropped.append(self._histories.popitem(last=False)[1])
+            self._histories.move_to_end(session_id)
+        for old in dropped:
+            with old.lock:
+                old.close()
+        return history
+
+    def discard(self, session_id):
+        with self._lock:
+            history = self._histories.pop(session_id, None)
+        if history is not None:
+            with history.lock:
+                history.close()
+
+    def record(self, session_id, data, amend=False, touched=None):
+        """Record a committed change; call inside the session's store transaction"""
+        history = self.get(session_id, create=True)
+        with history.lock:
+            history.record(data, amend=amend, touched=touched)
+
+    def seed(self, session_id, data, touched=None):
+        """Start a history from the deck as loaded, so the first edit can be undone"""
+        if self.get(session_id) is not None:
+            return
+        history = self.get(session_id, create=True)
+        with history.lock:
+            if history.current is None:
+                history.record(data, coalesce=False, touched=touched)
+
+    def step(self, session_id, data, delta):
+        """
+        Move ``delta`` versions back (-1, undo) or forward (+1, redo) and write
+        that version's deck into ``data``; call inside the session's store
+        transaction and bump the session version afterwards.
+
+        Raises:
+            HistoryError: nothing to undo or redo
+        """
+        history = self.get(session_id, create=True)
+        with history.lock:
+            if history.current is None or data.get('version', 0) != history.store_version:
+                # Changed outside this process's history (e.g. by another worker): keep that state as the newest
+                history.record(data, coalesce=False)
+            target = history.cursor + delta
+            if not 0 <= target < len(history.versions):
+                raise HistoryError('되돌릴 변경 사항이 없습니다.' if delta < 0 else '다시 실행할 변경 사항이 없습니다.')
+            version = history.versions[target]
+            data['slides'] = history.materialize(version, data.get('slides', []))
+            data['theme'] = version.theme
+            history.cursor = target
+            history.restored = True
+            return history.state()
+
+    def written(self, session_id, version):
+        """Note the session version a restored deck was written as"""
+        history = self.get(session_id)
+        if history is not None:
+            with history.lock:
+                history.store_version = version
+
+    def state(self, session_id):
+        history = self.get(session_id)
+        if history is None:
+            return {'versions': 0, 'position': -1, 'canUndo': False, 'canRedo': False,
+                    'bytes': 0, 'uniqueSlides': 0}
+        with history.lock:
+            return history.state()
+
+
+class StoredDeckHistory:
+    """
+    Per-session histories kept in the record store, for session stores that
+    several worker processes share (SQLite, Redis).
+
+    A session's history is one index record (``history:<session>``) listing
+    each version as slide keys, plus one record per distinct slide
+    (``history:<session>:<key>``), written when a version first uses it and
+    deleted when no version does. A commit rewrites the index and writes only
+    the slides the edit changed. Calls that change a history run inside the
+    session's store transaction, which serialises them across workers; with
+    SQLite the records are written in that same transaction.
+    """
+
+    KEY_PREFIX = 'history:'
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else get_record_store()
+
+    def _index_key(self, session_id):
+        return f"{self.KEY_PREFIX}{session_id}"
+
+    def _slide_key(self, session_id, key):
+        return f"{self.KEY_PREFIX}{session_id}:{key}"
+
+    @staticmethod
+    def _encode(slides):
+        """Key per slide, and {key: (slide, encoded size)}"""
+        keys = []
+        encoded = {}
+        for slide in slides:
+            text = json.dumps(slide, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            key = hashlib.sha1(text).hexdigest()[:20]
+            keys.append(key)
+            encoded[key] = (slide, len(text))
+        return keys, encoded
+
+    @staticmethod
+    def _referenced(index):
+        return {key for version in index['versions'] for key in version[0]}
+
+    def _load(self, session_id):
+        return self.store.get(self._index_key(session_id))
+
+    def _write(self, session_id, index, before, encoded):
+        """Save the index, storing slides it now uses and deleting those it no longer does"""
+        after = self._referenced(index)
+        for key in after - before:
+            slide, size = encoded[key]
+            self.store.set(self._slide_key(session_id, key), {'slide': slide})
+            index['sizes'][key] = size
+        for key in before - after:
+            self.store.delete(self._slide_key(session_id, key))
+            index['sizes'].pop(key, None)
+        self.store.set(self._index_key(session_id), index)
+
+    def _record(self, session_id, index, data, coalesce=True, amend=False):
+        keys, encoded = self._encode(data.get('slides', []))
+        theme = data.get('theme', 'default')
+        index['store_version'] = data.get('version', 0)
+        before = self._referenced(index)
+        versions = index['versions']
+        current = versions[index['cursor']] if versions else None
+        if current is not None and current[1] == theme and current[0] == keys:
+            self.store.set(self._index_key(session_id), index)
+            return  # nothing changed (e.g. a save without edits)
+
+        version = [keys, theme, time.time()]
+        if amend and current is not None:
+            versions[index['cursor']] = version
+        else:
+            del versions[index['cursor'] + 1:]
+            # A burst of edits (typing, dragging) becomes one undo step
+            if (coalesce and not index['restored'] and len(versions) > 1
+                    and time.time() - current[2] < HISTORY_COALESCE):
+                versions.pop()
+            versions.append(version)
+            index['cursor'] = len(versions) - 1
+            index['restored'] = False
+            self._prune(index, before | set(keys), encoded)
+        self._write(session_id, index, before, encoded)
+
+    @staticmethod
+    def _prune(index, keys, encoded):
+        versions = index['versions']
+        sizes = {key: index['sizes'].get(key) or encoded[key][1] for key in keys}
+        cutoff = time.time() - HISTORY_MAX_AGE if HISTORY_MAX_AGE > 0 else None
+        while len(versions) > 1:
+            referenced = {key for version in versions for key in version[0]}
+            if not (len(versions) > HISTORY_MAX_VERSIONS
+                    or sum(sizes[key] for key in referenced) > HISTORY_MAX_BYTES
+                    or (cutoff is not None and versions[0][2] < cutoff)):
+                break
+            versions.pop(0)
+            index['cursor'] -= 1
+        if index['cursor'] < 0:
+            # The undone-to version was pruned (see SessionHistory._prune)
+            index['cursor'] = 0
+            index['store_version'] = None
+
+    @staticmethod
+    def _new_index():
+        return {'versions': [], 'cursor': -1, 'store_version': None, 'restored': False, 'sizes': {}}
+
+    def record(self, session_id, data, amend=False, touched=None):
+        """Record a committed change; call inside the session's store transaction (``touched`` is not used)"""
+        self._record(session_id, self._load(session_id) or self._new_index(), data, amend=amend)
+
+    def seed(self, session_id, data, touched=None):
+        """Start a history from the deck as loaded, so the first edit can be undone"""
+        if self._load(session_id) is None:
+            self._record(session_id, self._new_index(), data, coalesce=False)
+
+    def step(self, session_id, data, delta):
+        """Move ``delta`` versions back or forward, as ``DeckHistory.step``"""
+        index = self._load(session_id) or self._new_index()
+        if not index['versions'] or data.get('version', 0) != index['store_version']:
+            # Changed without being recorded (e.g. before the history existed): keep that state as the newest
+            self._record(session_id, index, data, coalesce=False)
+        target = index['cursor'] + delta
+        if not 0 <= target < len(index['versions']):
+            raise HistoryError('되돌릴 변경 사항이 없습니다.' if delta < 0 else '다시 실행할 변경 사항이 없습니다.')
+        keys, theme, _ = index['versions'][target]
+
+        current_keys, current = self._encode(data.get('slides', []))
+        slides = []
+        for key in keys:
+            if key in current:
+                slides.append(current[key][0])
+                continue
+            record = self.store.get(self._slide_key(session_id, key))
+            if record is None:
+                # Expired from the store while still in use: the history cannot be trusted
+                self.discard(session_id)
+                raise HistoryError('실행 취소 기록이 만료되었습니다.', status=410)
+            slides.append(record['slide'])
+        data['slides'] = slides
+        data['theme'] = theme
+        index['cursor'] = target
+        index['restored'] = True
+        self.store.set(self._index_key(session_id), index)
+        return self._state(index)
+
+    def written(self, session_id, version):
+        """Note the session version a restored deck was written as"""
+        index = self._load(session_id)
+        if index is not None:
+            index['store_version'] = version
+            self.store.set(self._index_key(session_id), index)
+
+    @staticmethod
+    def _state(index):
+        referenced = {key for version in index['versions'] for key in version[0]}
+        return {
+            'versions': len(index['versions']),
+            'position': index['cursor'],
+            'canUndo': index['cursor'] > 0,
+            'canRedo': index['cursor'] < len(index['versions']) - 1,
+            'bytes': sum(index['sizes'].get(key, 0) for key in referenced),
+            'uniqueSlides': len(referenced)
+        }
+
+    def state(self, session_id):
+        return self._state(self._load(session_id) or self._new_index())
+
+    def discard(self, session_id):
+        index = self._load(session_id)
+        if index is None:
+            return
+        for key in self._referenced(index):
+            self.store.delete(self._slide_key(session_id, key))
+        self.store.delete(self._index_key(session_id))
+
+
+_deck_history = None
+_deck_history_lock = threading.Lock()
+
+
+def get_deck_history():
+    """
+    Process-wide deck history, created on first use: in process with the
+    memory session store, in the record store when workers share sessions.
+    """
+    global _deck_history
+    if _deck_history is None:
+        with _deck_history_lock:
+            if _deck_history is None:
+                if get_session_store().live:
+                    _deck_history = DeckHistory()
+                else:
+                    _deck_history = StoredDeckHistory()
+                logger.info(f"Deck history enabled (max {HISTORY_MAX_VERSIONS} versions per session)")
+    return _deck_history
@@ -0,0 +1,247 @@
+"""
+Deck Model Module - Element ID generation and an id -> (slide, position) index
+
+Slides stay plain lists of dicts (the JSON shape the frontend and session store
+already use); ``Deck`` wraps such a list without copying it and keeps an index
+from element ID to its slide and position, so looking up, updating or removing
+an element is O(1) instead of a scan over every slide.
+
+Sessions read from a serializing store (SQLite, Redis) are new dicts on every
+request, so ``DeckIndexCache`` keeps each session's index for the deck ID and
+version it was built for and lends it to the next request's ``Deck``.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.utils.config import DECK_INDEX_CACHE_SESSIONS
+
+# Per-process prefix + counter: unique across processes and within the same
+# second, and shorter than a UUID
+_id_lock = threading.Lock()
+_id_counter = itertools.count()
+_id_pid = None
+_id_prefix = None
+
+_BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _base36(number):
+    digits = ''
+    while True:
+        number, rem = divmod(number, 36)
+        digits = _BASE36[rem] + digits
+        if not number:
+            return digits
+
+
+def new_element_id(kind='elem'):
+    """Return a new element ID that is unique across slides, sessions and workers"""
+    global _id_pid, _id_prefix, _id_counter
+    with _id_lock:
+        if _id_pid != os.getpid():
+            # Reseed after a fork so workers never share a prefix
+            _id_pid = os.getpid()
+            _id_prefix = _base36(int(time.time() * 1000)) + _base36(int.from_bytes(os.urandom(4), 'big'))
+            _id_counter = itertools.count()
+        return f"{kind}_{_id_prefix}{_base36(next(_id_counter))}"
+
+
+def slide_hash(slide):
+    """Content hash of a slide (key order independent)"""
+    payload = json.dumps(slide, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class Deck:
+    """
+    Index over a list of slide dicts, addressed by element ID.
+
+    An ``index`` passed in comes from ``DeckIndexCache``: lookups check the
+    slot it points to and rebuild the index if it does not match. Unless the
+    deck ``owns`` it (taken out of the cache by a writer), it is shared and
+    changes copy it first.
+    """
+
+    def __init__(self, slides, index=None, owns=False):
+        self.slides = slides
+        self._index = index
+        self._cached = index is not None  # not built from these slides: verify lookups
+        self._borrowed = index is not None and not owns
+
+    @property
+    def index(self):
+        """Mapping of element ID to (slide index, element position), built on first use"""
+        if self._index is None:
+            self._index = {}
+            for slide_index, slide in enumerate(self.slides):
+                self._index_slide(slide_index, slide)
+        return self._index
+
+    def _index_slide(self, slide_index, slide, start=0):
+        elements = slide.get('elements') or []
+        for position in range(start, len(elements)):
+            element_id = elements[position].get('id')
+            if element_id is not None:
+                self._index[element_id] = (slide_index, position)
+
+    def __contains__(self, element_id):
+        return element_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _holds(self, element_id, location):
+        try:
+            return self.slides[location[0]]['elements'][location[1]].get('id') == element_id
+        except (IndexError, KeyError, TypeError, AttributeError):
+            return False
+
+    def _own(self):
+        """The index, copied first if it is borrowed"""
+        if self._borrowed:
+            self._index = dict(self._index)
+            self._borrowed = False
+        return self.index
+
+    def share_index(self):
+        """The index, to be lent to later Decks over the same slides; copied before any further change"""
+        self._borrowed = True
+        return self.index
+
+    def _indexes_slide(self, slide_index):
+        """Whether the index holds every element of one slide where it is"""
+        for position, element in enumerate(self.slides[slide_index].get('elements') or []):
+            element_id = element.get('id')
+            if element_id is not None and self.index.get(element_id) != (slide_index, position):
+                return False
+        return True
+
+    def _rebuild(self):
+        self._index = None
+        self._cached = self._borrowed = False
+
+    def locate(self, element_id):
+        """Return (slide index, position) of an element, or None"""
+        location = self.index.get(element_id)
+        if self._cached and (location is None or not self._holds(element_id, location)):
+            # The cached index does not describe these slides
+            self._rebuild()
+            location = self.index.get(element_id)
+        return location
+
+    def get_element(self, element_id):
+        """Return the element dict, or None"""
+        location = self.locate(element_id)
+        if location is None:
+            return None
+        return self.slides[location[0]]['elements'][location[1]]
+
+    def ensure_ids(self):
+        """Give every element a unique ID, replacing missing or duplicated ones"""
+        self._index = {}
+        self._cached = self._borrowed = False
+        for slide_index, slide in enumerate(self.slides):
+            for position, element in enumerate(slide.get('elements') or []):
+                element_id = element.get('id')
+                if element_id is None or element_id in self._index:
+                    element_id = element['id'] = new_element_id()
+                self._index[element_id] = (slide_index, position)
+        return self
+
+    def add_elements(self, slide_index, elements):
+        """Append elements to a slide, assigning IDs that are missing or already taken"""
+        slide = self.slides[slide_index]
+        target = slide.setdefault('elements', [])
+        if self._cached and not self._indexes_slide(slide_index):
+            # Every ID must be known to tell a free one from a taken one
+            self._rebuild()
+        # Only the new elements are indexed
+        index = self._own()
+        for element in elements:
+            element_id = element.get('id')
+            if element_id is None or element_id in index:
+                element_id = element['id'] = new_element_id()
+            index[element_id] = (slide_index, len(target))
+            target.append(element)
+        return target
+
+    def update_element(self, element_id, changes):
+        """Merge ``changes`` into an element (``style`` is merged key by key); returns it or None"""
+        element = self.get_element(element_id)
+        if element is None:
+            return None
+        for key, value in changes.items():
+            if key == 'id':
+                continue
+            if key == 'style' and isinstance(value, dict) and isinstance(element.get('style'), dict):
+                element['style'].update(value)
+            else:
+                element[key] = value
+        return element
+
+    def remove_element(self, element_id):
+        """Remove an element; returns it or None"""
+        location = self.locate(element_id)
+        if location is None:
+            return None
+        del self._own()[element_id]
+        slide_index, position = location
+        slide = self.slides[slide_index]
+        element = slide['elements'].pop(position)
+        # Only the elements after it on the same slide shift
+        self._index_slide(slide_index, slide, start=position)
+        return element
+
+    def to_json(self):
+        """Slides in the stored JSON shape"""
+        return self.slides
+
+
+class DeckIndexCache:
+    """Element indexes of recently used sessions, each valid for one deck ID and version"""
+
+    def __init__(self, max_sessions=DECK_INDEX_CACHE_SESSIONS):
+        self.max_sessions = max_sessions
+        self._entries = OrderedDict()  # session ID -> ((deck ID, version), index)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(data):
+        return data.get('deck_id'), data.get('version', 0)
+
+    def deck(self, session_id, data, take=False):
+        """
+        ``Deck`` over a session's slides with the index cached for its version.
+        Readers borrow the index; a writer (inside the session transaction,
+        calling ``remember`` after the commit) can ``take`` it out of the cache
+        so its changes update the index in place instead of copying it.
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None) if take else self._entries.get(session_id)
+            if entry is not None and not take:
+                self._entries.move_to_end(session_id)
+        index = entry[1] if entry is not None and entry[0] == self._key(data) else None
+        return Deck(data.get('slides', []), index=index, owns=take)
+
+    def remember(self, session_id, data, deck):
+        """Cache ``deck``'s index for the session's current version (after the change is committed)"""
+        if self.max_sessions <= 0:
+            return
+        entry = (self._key(data), deck.share_index())
+        with self._lock:
+            self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+deck_index_cache = DeckIndexCache()
@@ -0,0 +1,833 @@
+"""
+Export Renderers Module - Builds PDF, PPTX, HTML and image exports from slide JSON
+
+Every format is produced in two steps:
+
+1. ``render_slide(fmt, slide)`` turns one slide into a self-contained part
+   (an SVG document, a PDF page content stream, or a PPTX slide part). This is
+   the CPU-heavy step; it runs in the export process pool and its result is
+   cached by the slide's content hash.
+2. ``assemble(fmt, parts, title)`` stitches the parts into the final file.
+
+Only the standard library is used, so pool workers start quickly. Coordinates
+follow the editor canvas (960x540 px, see .slide-canvas in main.css).
+"""
+
+import base64
+import hashlib
+import json
+import math
+import struct
+import zlib
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+SLIDE_WIDTH = 960
+SLIDE_HEIGHT = 540
+
+# Bump when rendering output changes so cached parts are not reused
+RENDERER_VERSION = 1
+
+EXPORT_FORMATS = ('pdf', 'pptx', 'html', 'images')
+
+# Per-slide part each export format is assembled from
+PART_FORMATS = {
+    'pdf': 'pdf',
+    'pptx': 'pptx',
+    'html': 'svg',
+    'images': 'svg'
+}
+
+NAMED_COLORS = {
+    'black': (0, 0, 0), 'white': (255, 255, 255), 'red': (255, 0, 0),
+    'green': (0, 128, 0), 'blue': (0, 0, 255), 'yellow': (255, 255, 0),
+    'orange': (255, 165, 0), 'purple': (128, 0, 128), 'gray': (128, 128, 128),
+    'grey': (128, 128, 128), 'pink': (255, 192, 203), 'brown': (165, 42, 42)
+}
+
+# Unit-square outlines for shapes the editor draws with clip paths
+POLYGONS = {
+    'triangle': [(0.5, 0), (0, 1), (1, 1)],
+    'right-triangle': [(0, 0), (0, 1), (1, 1)],
+    'pentagon': [(0.5, 0), (1, 0.38), (0.82, 1), (0.18, 1), (0, 0.38)],
+    'hexagon': [(0.25, 0), (0.75, 0), (1, 0.5), (0.75, 1), (0.25, 1), (0, 0.5)],
+    'star': [(0.5, 0), (0.61, 0.35), (0.98, 0.35), (0.68, 0.57), (0.79, 0.91),
+             (0.5, 0.7), (0.21, 0.91), (0.32, 0.57), (0.02, 0.35), (0.39, 0.35)],
+    'arrow': [(0, 0.3), (0.6, 0.3), (0.6, 0), (1, 0.5), (0.6, 1), (0.6, 0.7), (0, 0.7)],
+    'double-arrow': [(0, 0.5), (0.25, 0), (0.25, 0.3), (0.75, 0.3), (0.75, 0),
+                     (1, 0.5), (0.75, 1), (0.75, 0.7), (0.25, 0.7), (0.25, 1)],
+    'diamond': [(0.5, 0), (1, 0.5), (0.5, 1), (0, 0.5)]
+}
+
+PPTX_GEOMETRY = {
+    'rectangle': 'rect', 'square': 'rect', 'circle': 'ellipse', 'oval': 'ellipse',
+    'triangle': 'triangle', 'right-triangle': 'rtTriangle', 'pentagon': 'pentagon',
+    'hexagon': 'hexagon', 'arrow': 'rightArrow', 'double-arrow': 'leftRightArrow',
+    'star': 'star5', 'callout': 'wedgeRectCallout', 'diamond': 'diamond', 'line': 'line'
+}
+
+
+def part_hash(fmt, slide):
+    """Content hash identifying the rendered part of a slide"""
+    payload = json.dumps([RENDERER_VERSION, fmt, slide], sort_keys=True,
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Layout: slide JSON -> drawing primitives shared by every backend
+# ---------------------------------------------------------------------------
+
+def css_px(value, default):
+    """Numeric value of a CSS length such as 18, "18px" or "12pt" (units are dropped)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        number = value.strip().lower()
+        for suffix in ('px', 'pt'):
+            if number.endswith(suffix):
+                number = number[:-len(suffix)]
+        try:
+            return float(number)
+        except ValueError:
+            pass
+    return float(default)
+
+
+def parse_color(value, default=None):
+    """Return an (r, g, b) tuple for a CSS color, or ``default`` (None = transparent)"""
+    if not isinstance(value, str):
+        return default
+    value = value.strip().lower()
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value]
+    if value.startswith('#'):
+        digits = value[1:]
+        if len(digits) in (3, 4):
+            digits = ''.join(c * 2 for c in digits[:3])
+        try:
+            return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            return default
+    if value.startswith('rgb'):
+        parts = value[value.find('(') + 1:value.rfind(')')].split(',')
+        try:
+            if len(parts) == 4 and float(parts[3]) == 0:
+                return None
+            return tuple(max(0, min(255, int(float(p)))) for p in parts[:3])
+        except ValueError:
+            return default
+    if value == 'transparent':
+        return None
+    return default
+
+
+def _hex(color):
+    return '%02x%02x%02x' % color
+
+
+def char_width(ch, size):
+    """Approximate advance width; CJK and other wide glyphs are one em"""
+    if ch == ' ':
+        return size * 0.28
+    if ord(ch) >= 0x1100:
+        return size
+    return size * 0.55
+
+
+def text_width(text, size):
+    return sum(char_width(ch, size) for ch in text)
+
+
+def wrap_text(text, width, size):
+    """Greedy line wrapping, preferring breaks at spaces"""
+    lines = []
+    for paragraph in str(text).split('\n'):
+        line, line_width, last_space = '', 0.0, -1
+        for ch in paragraph:
+            advance = char_width(ch, size)
+            if line and line_width + advance > width:
+                if last_space > 0 and ch != ' ':
+                    lines.append(line[:last_space])
+                    line = line[last_space + 1:]
+                else:
+                    lines.append(line)
+                    line = ''
+                line_width = text_width(line, size)
+                last_space = -1
+                if ch == ' ' and not line:
+                    continue
+            if ch == ' ':
+                last_space = len(line)
+            line += ch
+            line_width += advance
+        lines.append(line)
+    return lines
+
+
+def _text_item(text, x, y, width, height, size, color, align, valign, bold=False, rotation=0):
+    return {
+        'kind': 'text', 'x': x, 'y': y, 'w': width, 'h': height,
+        'text': str(text), 'size': size, 'color': color, 'align': align,
+        'valign': valign, 'bold': bold, 'rotation': rotation
+    }
+
+
+def layout_slide(slide):
+    """
+    Convert a slide dict into a background color and a list of primitives.
+
+    Mirrors renderSlide/createElementNode in static/js/modules/slides.js.
+    """
+    background = parse_color(slide.get('backgroundColor') or slide.get('background'), (255, 255, 255))
+    items = []
+
+    if slide.get('title'):
+        items.append(_text_item(slide['title'], 0, 20, SLIDE_WIDTH, 60, 32, (0, 0, 0),
+                                'center', 'middle', bold=True))
+    if slide.get('content'):
+        items.append(_text_item(slide['content'], 60, 100, SLIDE_WIDTH - 120, SLIDE_HEIGHT - 140,
+                                18, (51, 51, 51), 'left', 'top'))
+
+    elements = [e for e in slide.get('elements') or [] if isinstance(e, dict)]
+    elements.sort(key=lambda e: css_px(e.get('zIndex'), 0))
+    for element in elements:
+        style = element.get('style') if isinstance(element.get('style'), dict) else {}
+        x, y = css_px(element.get('x'), 0), css_px(element.get('y'), 0)
+        width, height = css_px(element.get('width'), 100), css_px(element.get('height'), 100)
+        rotation = css_px(element.get('rotation'), 0)
+        stroke = parse_color(style.get('borderColor'))
+        stroke_width = css_px(style.get('borderWidth'), 1 if stroke else 0)
+        dashed = style.get('borderStyle') in ('dashed', 'dotted')
+        kind = element.get('type')
+        content = element.get('content') or ''
+
+        if kind == 'text':
+            items.append(_text_item(content, x, y, width, height, css_px(style.get('fontSize'), 16),
+                                    parse_color(style.get('textColor'), (0, 0, 0)),
+                                    style.get('textAlign') or 'center', 'middle',
+                                    bold=style.get('fontWeight') == 'bold', rotation=rotation))
+        elif kind == 'image':
+            items.append({'kind': 'image', 'x': x, 'y': y, 'w': width, 'h': height,
+                          'src': str(content), 'rotation': rotation})
+        elif kind == 'shape':
+            items.append({'kind': 'shape', 'shape': str(content) or 'rectangle',
+                          'x': x, 'y': y, 'w': width, 'h': height, 'rotation': rotation,
+                          'fill': parse_color(style.get('color'), (52, 152, 219)),
+                          'stroke': stroke, 'stroke_width': stroke_width, 'dashed': dashed})
+        else:
+            # Charts and tables are drawn as labelled placeholders
+            items.append({'kind': 'shape', 'shape': 'rectangle', 'x': x, 'y': y, 'w': width,
+                          'h': height, 'rotation': rotation, 'fill': (240, 240, 240),
+                          'stroke': (153, 153, 153), 'stroke_width': 1, 'dashed': True})
+            items.append(_text_item(str(kind or ''), x, y, width, height, 14, (102, 102, 102),
+                                    'center', 'middle', rotation=rotation))
+    return background, items
+
+
+def text_lines(item):
+    """Wrapped lines of a text item with their (x, baseline) positions"""
+    size = item['size']
+    line_height = size * 1.25
+    lines = wrap_text(item['text'], max(item['w'], size), size)
+    block = line_height * len(lines)
+    top = item['y'] + (item['h'] - block) / 2 if item['valign'] == 'middle' else item['y']
+    positioned = []
+    for i, line in enumerate(lines):
+        line_width = text_width(line, size)
+        if item['align'] == 'center':
+            x = item['x'] + (item['w'] - line_width) / 2
+        elif item['align'] == 'right':
+            x = item['x'] + item['w'] - line_width
+        else:
+            x = item['x']
+        positioned.append((line, x, top + line_height * i + size * 0.9))
+    return positioned
+
+
+def decode_data_url(src):
+    """Return (mime type, bytes) for a base64 data URL, or (None, None)"""
+    if not src.startswith('data:') or ';base64,' not in src:
+        return None, None
+    header, _, data = src.partition(';base64,')
+    try:
+        return header[5:].lower(), base64.b64decode(data)
+    except ValueError:
+        return None, None
+
+
+# ---------------------------------------------------------------------------
+# SVG (HTML and image exports)
+# ---------------------------------------------------------------------------
+
+def _svg_rgb(color):
+    return 'none' if color is None else '#' + _hex(color)
+
+
+def _svg_transform(item):
+    if not item.get('rotation'):
+        return ''
+    cx, cy = item['x'] + item['w'] / 2, item['y'] + item['h'] / 2
+    return f' transform="rotate({item["rotation"]:g} {cx:g} {cy:g})"'
+
+
+def render_svg(slide):
+    background, items = layout_slide(slide)
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+           f'viewBox="0 0 {SLIDE_WIDTH} {SLIDE_HEIGHT}" width="{SLIDE_WIDTH}" height="{SLIDE_HEIGHT}">',
+           f'<rect width="100%" height="100%" fill="{_svg_rgb(background)}"/>']
+    for item in items:
+        transform = _svg_transform(item)
+        if item['kind'] == 'shape':
+            paint = f'fill="{_svg_rgb(item["fill"])}"'
+            if item['stroke'] is not None and item['stroke_width']:
+                paint += f' stroke="{_svg_rgb(item["stroke"])}" stroke-width="{item["stroke_width"]:g}"'
+                if item['dashed']:
+                    paint += ' stroke-dasharray="6 4"'
+            x, y, w, h = item['x'], item['y'], item['w'], item['h']
+            if item['shape'] in ('circle', 'oval'):
+                out.append(f'<ellipse cx="{x + w / 2:g}" cy="{y + h / 2:g}" rx="{w / 2:g}" ry="{h / 2:g}" '
+                           f'{paint}{transform}/>')
+            elif item['shape'] in POLYGONS:
+                points = ' '.join(f'{x + px * w:g},{y + py * h:g}' for px, py in POLYGONS[item['shape']])
+                out.append(f'<polygon points="{points}" {paint}{transform}/>')
+            else:
+                out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" {paint}{transform}/>')
+        elif item['kind'] == 'image':
+            out.append(f'<image x="{item["x"]:g}" y="{item["y"]:g}" width="{item["w"]:g}" '
+                       f'height="{item["h"]:g}" preserveAspectRatio="none" '
+                       f'xlink:href="{escape(item["src"], {chr(34): "&quot;"})}"{transform}/>')
+        else:
+            weight = ' font-weight="bold"' if item['bold'] else ''
+            out.append(f'<g font-family="sans-serif" font-size="{item["size"]:g}" '
+                       f'fill="{_svg_rgb(item["color"])}"{weight}{transform}>')
+            for line, x, baseline in text_lines(item):
+                out.append(f'<text x="{x:g}" y="{baseline:g}" xml:space="preserve">{escape(line)}</text>')
+            out.append('</g>')
+    out.append('</svg>')
+    return '\n'.join(out).encode('utf-8')
+
+
+def assemble_html(parts, title):
+    sections = '\n'.join(f'<section class="slide">{part.decode("utf-8")}</section>' for part in parts)
+    return f"""<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<title>{escape(title)}</title>
+<style>
+body {{ margin: 0; background: #333; }}
+.slide {{ width: {SLIDE_WIDTH}px; max-width: 100%; margin: 24px auto; box-shadow: 0 2px 15px rgba(0, 0, 0, 0.4); }}
+.slide svg {{ display: block; width: 100%; height: auto; }}
+@media print {{ body {{ background: none; }} .slide {{ margin: 0; box-shadow: none; page-break-after: always; }} }}
+</style>
+</head>
+<body>
+{sections}
+</body>
+</html>
+""".encode('utf-8')
+
+
+def assemble_images(parts, title):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for number, part in enumerate(parts, 1):
+            archive.writestr(f'slide-{number:03d}.svg', part)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+# 960x540 px canvas at 96 dpi
+PDF_PAGE_WIDTH = SLIDE_WIDTH * 0.75
+PDF_PAGE_HEIGHT = SLIDE_HEIGHT * 0.75
+
+# Bezier control point offset for approximating a quarter ellipse
+KAPPA = 0.5523
+
+# Korean text uses a standard Adobe-Korea1 CID font that readers supply
+# themselves, so no font file has to be embedded
+PDF_CJK_FONT = 'HYGoThic-Medium'
+
+
+def _pdf_rgb(color, operator):
+    return ' '.join(f'{c / 255:.3f}' for c in color) + f' {operator}'
+
+
+def _jpeg_info(data):
+    """Return (width, height, components) of a baseline or progressive JPEG"""
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        if marker in (0xC0, 0xC1, 0xC2):
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height, data[i + 9]
+        i += 2 + length
+    return None
+
+
+def _png_image(data):
+    """Return (width, height, colors, idat) for 8-bit opaque, non-interlaced PNGs"""
+    if data[:8] != b'\x89PNG\r\n\x1a\n':
+        return None
+    pos, idat, header = 8, [], None
+    while pos + 8 <= len(data):
+        length, chunk = struct.unpack('>I4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if chunk == b'IHDR':
+            header = struct.unpack('>IIBBBBB', body)
+        elif chunk == b'IDAT':
+            idat.append(body)
+        pos += 12 + length
+    if header is None or header[2] != 8 or header[6] != 0 or header[3] not in (0, 2):
+        return None
+    return header[0], header[1], 1 if header[3] == 0 else 3, b''.join(idat)
+
+
+def _pdf_image(src):
+    """Return (image dictionary, stream) for an image the PDF can embed as-is, or None"""
+    mime, data = decode_data_url(src)
+    if not data:
+        return None
+    if mime in ('image/jpeg', 'image/jpg'):
+        info = _jpeg_info(data)
+        if info is None:
+            return None
+        width, height, components = info
+        space = {1: '/DeviceGray', 4: '/DeviceCMYK'}.get(components, '/DeviceRGB')
+        return (f'/Width {width} /Height {height} /ColorSpace {space} '
+                f'/BitsPerComponent 8 /Filter /DCTDecode'), data
+    if mime == 'image/png':
+        info = _png_image(data)
+        if info is None:
+            return None
+        width, height, colors, idat = info
+        space = '/DeviceGray' if colors == 1 else '/DeviceRGB'
+        return (f'/Width {width} /Height {height} /ColorSpace {space} /BitsPerComponent 8 '
+                f'/Filter /FlateDecode /DecodeParms << /Predictor 15 /Colors {colors} '
+                f'/BitsPerComponent 8 /Columns {width} >>'), idat
+    return None
+
+
+def _pdf_string(text):
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def _pdf_text_runs(line):
+    """Split a line into (font, operand) runs: ASCII in Helvetica, the rest in the CID font"""
+    runs = []
+    for ch in line:
+        ascii_char = ord(ch) < 128
+        if runs and runs[-1][0] == ascii_char:
+            runs[-1][1].append(ch)
+        else:
+            runs.append((ascii_char, [ch]))
+    result = []
+    for ascii_char, chars in runs:
+        if ascii_char:
+            result.append(('/F1', _pdf_string(''.join(chars))))
+        else:
+            code = ''.join('%04X' % (ord(c) if ord(c) <= 0xFFFF else 0x3F) for c in chars)
+            result.append(('/F2', f'<{code}>'))
+    return result
+
+
+def _pdf_path(item):
+    x, y, w, h = item['x'], item['y'], item['w'], item['h']
+    if item['shape'] in ('circle', 'oval'):
+        cx, cy, rx, ry = x + w / 2, y + h / 2, w / 2, h / 2
+        ox, oy = rx * KAPPA, ry * KAPPA
+        return (f'{cx + rx:.2f} {cy:.2f} m '
+                f'{cx + rx:.2f} {cy + oy:.2f} {cx + ox:.2f} {cy + ry:.2f} {cx:.2f} {cy + ry:.2f} c '
+                f'{cx - ox:.2f} {cy + ry:.2f} {cx - rx:.2f} {cy + oy:.2f} {cx - rx:.2f} {cy:.2f} c '
+                f'{cx - rx:.2f} {cy - oy:.2f} {cx - ox:.2f} {cy - ry:.2f} {cx:.2f} {cy - ry:.2f} c '
+                f'{cx + ox:.2f} {cy - ry:.2f} {cx + rx:.2f} {cy - oy:.2f} {cx + rx:.2f} {cy:.2f} c h')
+    if item['shape'] in POLYGONS:
+        points = [(x + px * w, y + py * h) for px, py in POLYGONS[item['shape']]]
+        path = f'{points[0][0]:.2f} {points[0][1]:.2f} m '
+        path += ' '.join(f'{px:.2f} {py:.2f} l' for px, py in points[1:])
+        return path + ' h'
+    return f'{x:.2f} {y:.2f} {w:.2f} {h:.2f} re'
+
+
+def _pdf_rotate(item):
+    if not item.get('rotation'):
+        return ''
+    angle = math.radians(item['rotation'])
+    cos, sin = math.cos(angle), math.sin(angle)
+    cx, cy = item['x'] + item['w'] / 2, item['y'] + item['h'] / 2
+    # translate(cx, cy) . rotate . translate(-cx, -cy)
+    e = cx - cos * cx + sin * cy
+    f = cy - sin * cx - cos * cy
+    return f'{cos:.5f} {sin:.5f} {-sin:.5f} {cos:.5f} {e:.2f} {f:.2f} cm\n'
+
+
+def render_pdf_page(slide):
+    """
+    Render a slide as a PDF page.
+
+    Returns:
+        tuple: (compressed content stream, [(XObject name, image dictionary, stream)])
+    """
+    background, items = layout_slide(slide)
+    images = []
+    # Work in editor pixels with y pointing down
+    ops = [f'0.75 0 0 -0.75 0 {PDF_PAGE_HEIGHT:g} cm',
+           _pdf_rgb(background, 'rg'), f'0 0 {SLIDE_WIDTH} {SLIDE_HEIGHT} re f']
+    for item in items:
+        ops.append('q')
+        ops.append(_pdf_rotate(item).rstrip())
+        if item['kind'] == 'shape':
+            paint = 'n'
+            if item['fill'] is not None:
+                ops.append(_pdf_rgb(item['fill'], 'rg'))
+                paint = 'f'
+            if item['stroke'] is not None and item['stroke_width']:
+                ops.append(_pdf_rgb(item['stroke'], 'RG'))
+                ops.append(f'{item["stroke_width"]:g} w')
+                if item['dashed']:
+                    ops.append('[6 4] 0 d')
+                paint = 'B' if paint == 'f' else 'S'
+            ops.append(f'{_pdf_path(item)} {paint}')
+        elif item['kind'] == 'image':
+            embedded = _pdf_image(item['src'])
+            if embedded is None:
+                ops.append('0.94 0.94 0.94 rg 0.6 0.6 0.6 RG 1 w')
+                ops.append(f'{item["x"]:.2f} {item["y"]:.2f} {item["w"]:.2f} {item["h"]:.2f} re B')
+            else:
+                name = f'Im{len(images) + 1}'
+                images.append((name,) + embedded)
+                ops.append(f'{item["w"]:.2f} 0 0 {-item["h"]:.2f} {item["x"]:.2f} '
+                           f'{item["y"] + item["h"]:.2f} cm /{name} Do')
+        else:
+            ops.append('BT ' + _pdf_rgb(item['color'], 'rg'))
+            for line, x, baseline in text_lines(item):
+                ops.append(f'1 0 0 -1 {x:.2f} {baseline:.2f} Tm')
+                for font, operand in _pdf_text_runs(line):
+                    ops.append(f'{font} {item["size"]:g} Tf {operand} Tj')
+            ops.append('ET')
+        ops.append('Q')
+    content = '\n'.join(op for op in ops if op).encode('latin-1', 'replace')
+    return zlib.compress(content), images
+
+
+def assemble_pdf(parts, title):
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages = add(None)
+    helvetica = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    descriptor = add(f'<< /Type /FontDescriptor /FontName /{PDF_CJK_FONT} /Flags 6 '
+                     f'/FontBBox [-6 -145 1003 880] /ItalicAngle 0 /Ascent 880 /Descent -120 '
+                     f'/CapHeight 880 /StemV 93 >>'.encode('latin-1'))
+    cid_font = add(f'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{PDF_CJK_FONT} '
+                   f'/CIDSystemInfo << /Registry (Adobe) /Ordering (Korea1) /Supplement 1 >> '
+                   f'/FontDescriptor {descriptor} 0 R /DW 1000 >>'.encode('latin-1'))
+    cjk = add(f'<< /Type /Font /Subtype /Type0 /BaseFont /{PDF_CJK_FONT}-UniKS-UCS2-H '
+              f'/Encoding /UniKS-UCS2-H /DescendantFonts [{cid_font} 0 R] >>'.encode('latin-1'))
+
+    page_ids = []
+    for content, images in parts:
+        content_id = add(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content)
+                         + content + b'\nendstream')
+        xobjects = ''
+        for name, dictionary, stream in images:
+            image_id = add(f'<< /Type /XObject /Subtype /Image {dictionary} /Length {len(stream)} >>\nstream\n'
+                           .encode('latin-1') + stream + b'\nendstream')
+            xobjects += f'/{name} {image_id} 0 R '
+        resources = f'/Font << /F1 {helvetica} 0 R /F2 {cjk} 0 R >>'
+        if xobjects:
+            resources += f' /XObject << {xobjects}>>'
+        page_ids.append(add(f'<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {PDF_PAGE_WIDTH:g} '
+                            f'{PDF_PAGE_HEIGHT:g}] /Resources << {resources} >> /Contents {content_id} 0 R >>'
+                            .encode('latin-1')))
+
+    objects[catalog - 1] = f'<< /Type /Catalog /Pages {pages} 0 R >>'.encode('latin-1')
+    kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+    objects[pages - 1] = f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'.encode('latin-1')
+    info = add(b'<< /Title <FEFF' + title.encode('utf-16-be').hex().upper().encode('ascii')
+               + b'> /Producer (Drive AI) >>')
+
+    out = BytesIO()
+    out.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b'%010d 00000 n \n' % offset)
+    out.write(b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+              % (len(objects) + 1, catalog, info, xref))
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# PPTX (Office Open XML)
+# ---------------------------------------------------------------------------
+
+EMU_PER_PX = 12700  # 960 px -> 12192000 EMU, the 16:9 slide width
+
+NS = ('xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+      'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+      'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"')
+
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+IMAGE_EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpeg', 'image/jpg': 'jpeg', 'image/gif': 'gif'}
+
+
+def _emu(px):
+    return int(round(px * EMU_PER_PX))
+
+
+def _xfrm(item):
+    rotation = f' rot="{int(item["rotation"] * 60000) % 21600000}"' if item.get('rotation') else ''
+    return (f'<a:xfrm{rotation}><a:off x="{_emu(item["x"])}" y="{_emu(item["y"])}"/>'
+            f'<a:ext cx="{_emu(max(item["w"], 1))}" cy="{_emu(max(item["h"], 1))}"/></a:xfrm>')
+
+
+def _solid(color):
+    return f'<a:solidFill><a:srgbClr val="{_hex(color)}"/></a:solidFill>'
+
+
+def _pptx_text_body(item):
+    anchor = 'ctr' if item['valign'] == 'middle' else 't'
+    align = {'center': 'ctr', 'right': 'r', 'justify': 'just'}.get(item['align'], 'l')
+    bold = ' b="1"' if item['bold'] else ''
+    size = max(100, int(round(item['size'] * 75)))  # px -> hundredths of a point
+    paragraphs = []
+    for line in item['text'].split('\n'):
+        run = ''
+        if line:
+            run = (f'<a:r><a:rPr lang="ko-KR" sz="{size}"{bold} dirty="0">{_solid(item["color"])}'
+                   f'<a:latin typeface="Arial"/><a:ea typeface="Malgun Gothic"/></a:rPr>'
+                   f'<a:t>{escape(line)}</a:t></a:r>')
+        paragraphs.append(f'<a:p><a:pPr algn="{align}"/>{run}'
+                          f'<a:endParaRPr lang="ko-KR" sz="{size}" dirty="0"/></a:p>')
+    return (f'<p:txBody><a:bodyPr wrap="square" lIns="0" tIns="0" rIns="0" bIns="0" anchor="{anchor}">'
+            f'<a:normAutofit/></a:bodyPr><a:lstStyle/>{"".join(paragraphs)}</p:txBody>')
+
+
+def render_pptx_slide(slide):
+    """
+    Render a slide as a PPTX slide part.
+
+    Returns:
+        tuple: (slide XML, [(relationship id, media file name, bytes)])
+    """
+    background, items = layout_slide(slide)
+    shapes, media = [], []
+    for shape_id, item in enumerate(items, 2):
+        name = f'{item["kind"].title()} {shape_id}'
+        if item['kind'] == 'image':
+            mime, data = decode_data_url(item['src'])
+            if data and mime in IMAGE_EXTENSIONS:
+                rel_id = f'rId{len(media) + 2}'
+                media_name = f'{hashlib.sha1(data).hexdigest()}.{IMAGE_EXTENSIONS[mime]}'
+                media.append((rel_id, media_name, data))
+                shapes.append(
+                    f'<p:pic><p:nvPicPr><p:cNvPr id="{shape_id}" name="{name}"/>'
+                    f'<p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+                    f'<p:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+                    f'<p:spPr>{_xfrm(item)}<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>')
+                continue
+            item = dict(item, kind='shape', shape='rectangle', fill=(240, 240, 240),
+                        stroke=(153, 153, 153), stroke_width=1, dashed=True)
+
+        if item['kind'] == 'shape':
+            geometry = PPTX_GEOMETRY.get(item['shape'], 'rect')
+            fill = _solid(item['fill']) if item['fill'] is not None else '<a:noFill/>'
+            if item['stroke'] is not None and item['stroke_width']:
+                dash = '<a:prstDash val="dash"/>' if item['dashed'] else ''
+                line = f'<a:ln w="{_emu(item["stroke_width"])}">{_solid(item["stroke"])}{dash}</a:ln>'
+            else:
+                line = '<a:ln><a:noFill/></a:ln>'
+            shapes.append(
+                f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+                f'<p:spPr>{_xfrm(item)}<a:prstGeom prst="{geometry}"><a:avLst/></a:prstGeom>{fill}{line}</p:spPr>'
+                f'</p:sp>')
+        else:
+            shapes.append(
+                f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/><p:cNvSpPr txBox="1"/><p:nvPr/>'
+                f'</p:nvSpPr><p:spPr>{_xfrm(item)}<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/>'
+                f'</p:spPr>{_pptx_text_body(item)}</p:sp>')
+
+    xml = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<p:sld {NS}><p:cSld>'
+           f'<p:bg><p:bgPr>{_solid(background)}<a:effectLst/></p:bgPr></p:bg><p:spTree>'
+           f'<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+           f'<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/><a:chOff x="0" y="0"/>'
+           f'<a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>{"".join(shapes)}</p:spTree></p:cSld>'
+           f'<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>')
+    return xml.encode('utf-8'), media
+
+
+def _pptx_theme():
+    fills = '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3
+    lines = ''.join(f'<a:ln w="{w}"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln>'
+                    for w in (6350, 12700, 19050))
+    colors = [('dk1', '000000'), ('lt1', 'FFFFFF'), ('dk2', '44546A'), ('lt2', 'E7E6E6'),
+              ('accent1', '3498DB'), ('accent2', 'ED7D31'), ('accent3', 'A5A5A5'),
+              ('accent4', 'FFC000'), ('accent5', '5B9BD5'), ('accent6', '70AD47'),
+              ('hlink', '0563C1'), ('folHlink', '954F72')]
+    scheme = ''.join(f'<a:{name}><a:srgbClr val="{value}"/></a:{name}>' for name, value in colors)
+    font = '<a:latin typeface="Arial"/><a:ea typeface="Malgun Gothic"/><a:cs typeface=""/>'
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<a:theme xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" name="Drive AI">'
+            f'<a:themeElements><a:clrScheme name="Drive AI">{scheme}</a:clrScheme>'
+            f'<a:fontScheme name="Drive AI"><a:majorFont>{font}</a:majorFont><a:minorFont>{font}</a:minorFont>'
+            f'</a:fontScheme><a:fmtScheme name="Drive AI"><a:fillStyleLst>{fills}</a:fillStyleLst>'
+            f'<a:lnStyleLst>{lines}</a:lnStyleLst><a:effectStyleLst>'
+            + '<a:effectStyle><a:effectLst/></a:effectStyle>' * 3 +
+            f'</a:effectStyleLst><a:bgFillStyleLst>{fills}</a:bgFillStyleLst></a:fmtScheme>'
+            f'</a:themeElements><a:objectDefaults/><a:extraClrSchemeLst/></a:theme>')
+
+
+def _rels(relationships):
+    body = ''.join(f'<Relationship Id="{rel_id}" Type="{rel_type}" Target="{target}"/>'
+                   for rel_id, rel_type, target in relationships)
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{PKG_REL_NS}">{body}</Relationships>')
+
+
+EMPTY_SP_TREE = ('<p:cSld><p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/>'
+                 '</p:nvGrpSpPr><p:grpSpPr/></p:spTree></p:cSld>')
+
+
+def assemble_pptx(parts, title):
+    buffer = BytesIO()
+    slide_count = len(parts)
+    media_types = set()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        written_media = set()
+        for number, (xml, media) in enumerate(parts, 1):
+            archive.writestr(f'ppt/slides/slide{number}.xml', xml)
+            relationships = [('rId1', f'{REL_NS}/slideLayout', '../slideLayouts/slideLayout1.xml')]
+            for rel_id, media_name, data in media:
+                relationships.append((rel_id, f'{REL_NS}/image', f'../media/{media_name}'))
+                media_types.add(media_name.rsplit('.', 1)[1])
+                if media_name not in written_media:
+                    written_media.add(media_name)
+                    archive.writestr(f'ppt/media/{media_name}', data)
+            archive.writestr(f'ppt/slides/_rels/slide{number}.xml.rels', _rels(relationships))
+
+        defaults = ''.join(f'<Default Extension="{ext}" ContentType="image/{ext}"/>' for ext in sorted(media_types))
+        slide_overrides = ''.join(
+            f'<Override PartName="/ppt/slides/slide{n}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.presentationml.slide+xml"/>'
+            for n in range(1, slide_count + 1))
+        archive.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            f'<Default Extension="xml" ContentType="application/xml"/>{defaults}'
+            '<Override PartName="/ppt/presentation.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"/>'
+            '<Override PartName="/ppt/slideMasters/slideMaster1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.presentationml.slideMaster+xml"/>'
+            '<Override PartName="/ppt/slideLayouts/slideLayout1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.presentationml.slideLayout+xml"/>'
+            '<Override PartName="/ppt/theme/theme1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+            '<Override PartName="/ppt/presProps.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.presentationml.presProps+xml"/>'
+            '<Override PartName="/docProps/core.xml" '
+            'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+            f'{slide_overrides}</Types>'))
+
+        archive.writestr('_rels/.rels', _rels([
+            ('rId1', f'{REL_NS}/officeDocument', 'ppt/presentation.xml'),
+            ('rId2', 'http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties',
+             'docProps/core.xml')
+        ]))
+        archive.writestr('docProps/core.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:title>{escape(title)}</dc:title><dc:creator>Drive AI</dc:creator></cp:coreProperties>'))
+
+        slide_ids = ''.join(f'<p:sldId id="{255 + n}" r:id="rId{n + 2}"/>' for n in range(1, slide_count + 1))
+        archive.writestr('ppt/presentation.xml', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<p:presentation {NS}>'
+            '<p:sldMasterIdLst><p:sldMasterId id="2147483648" r:id="rId1"/></p:sldMasterIdLst>'
+            f'<p:sldIdLst>{slide_ids}</p:sldIdLst>'
+            f'<p:sldSz cx="{_emu(SLIDE_WIDTH)}" cy="{_emu(SLIDE_HEIGHT)}"/><p:notesSz cx="6858000" cy="9144000"/>'
+            '</p:presentation>'))
+        archive.writestr('ppt/_rels/presentation.xml.rels', _rels(
+            [('rId1', f'{REL_NS}/slideMaster', 'slideMasters/slideMaster1.xml'),
+             ('rId2', f'{REL_NS}/presProps', 'presProps.xml')]
+            + [(f'rId{n + 2}', f'{REL_NS}/slide', f'slides/slide{n}.xml') for n in range(1, slide_count + 1)]
+            + [(f'rId{slide_count + 3}', f'{REL_NS}/theme', 'theme/theme1.xml')]))
+        archive.writestr('ppt/presProps.xml',
+                         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<p:presentationPr {NS}/>')
+        archive.writestr('ppt/slideMasters/slideMaster1.xml', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<p:sldMaster {NS}>{EMPTY_SP_TREE}'
+            '<p:clrMap bg1="lt1" tx1="dk1" bg2="lt2" tx2="dk2" accent1="accent1" accent2="accent2" '
+            'accent3="accent3" accent4="accent4" accent5="accent5" accent6="accent6" hlink="hlink" '
+            'folHlink="folHlink"/><p:sldLayoutIdLst><p:sldLayoutId id="2147483649" r:id="rId1"/>'
+            '</p:sldLayoutIdLst></p:sldMaster>'))
+        archive.writestr('ppt/slideMasters/_rels/slideMaster1.xml.rels', _rels([
+            ('rId1', f'{REL_NS}/slideLayout', '../slideLayouts/slideLayout1.xml'),
+            ('rId2', f'{REL_NS}/theme', '../theme/theme1.xml')
+        ]))
+        archive.writestr('ppt/slideLayouts/slideLayout1.xml', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<p:sldLayout {NS} type="blank" '
+            f'preserve="1">{EMPTY_SP_TREE}<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>'))
+        archive.writestr('ppt/slideLayouts/_rels/slideLayout1.xml.rels', _rels([
+            ('rId1', f'{REL_NS}/slideMaster', '../slideMasters/slideMaster1.xml')
+        ]))
+        archive.writestr('ppt/theme/theme1.xml', _pptx_theme())
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------------------------
+
+PART_RENDERERS = {
+    'svg': render_svg,
+    'pdf': render_pdf_page,
+    'pptx': render_pptx_slide
+}
+
+ASSEMBLERS = {
+    'pdf': assemble_pdf,
+    'pptx': assemble_pptx,
+    'html': assemble_html,
+    'images': assemble_images
+}
+
+CONTENT_TYPES = {
+    'pdf': ('application/pdf', 'pdf'),
+    'pptx': ('application/vnd.openxmlformats-officedocument.presentationml.presentation', 'pptx'),
+    'html': ('text/html', 'html'),
+    'images': ('application/zip', 'zip')
+}
+
+
+def render_slide(part_format, slide):
+    """Render one slide into the part used by ``part_format`` ('svg', 'pdf' or 'pptx')"""
+    return PART_RENDERERS[part_format](slide)
+
+
+def render_slides(part_format, slides):
+    """Render a batch of slides (one process pool task)"""
+    return [render_slide(part_format, slide) for slide in slides]
+
+
+def assemble(fmt, parts, title):
+    """Combine rendered slide parts into the final export file"""
+    return ASSEMBLERS[fmt](parts, title)
@@ -0,0 +1,265 @@
+"""
+Export Service Module - Background export jobs for /api/export
+
+An export request becomes a job: the request returns a job ID at once, a job
+thread renders the slides in a process pool (so CPU-heavy rendering never runs
+in a request worker), and the client polls for progress before downloading the
+finished file. Rendered slides are cached on disk by content hash, so
+re-exporting a deck after editing one slide only re-renders that slide.
+
+Job records live in the record store (the session backend, outside the
+session namespace) and files on disk, so any worker can answer progress and
+download requests for a job.
+"""
+
+import multiprocessing
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from app.utils.logger import logger
+from app.utils.config import (
+    EXPORT_WORKERS,
+    EXPORT_JOB_THREADS,
+    EXPORT_BATCH_SIZE,
+    EXPORT_DIR,
+    EXPORT_CACHE_DIR,
+    EXPORT_JOB_TTL,
+    EXPORT_CACHE_TTL
+)
+from app.services.session_store import get_record_store
+from app.services.blob_store import get_blob_store, inline_stored_images
+from app.services import export_renderers
+from app.services.export_renderers import EXPORT_FORMATS, PART_FORMATS, CONTENT_TYPES, part_hash
+
+# Prefix of job records in the record store
+JOB_KEY_PREFIX = 'export:'
+
+# Minimum interval between sweeps of expired export files and cached parts
+SWEEP_INTERVAL = 600
+
+_pool = None
+_pool_pid = None
+_job_threads = None
+_pool_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+class ExportError(Exception):
+    """Raised for export requests that cannot be served"""
+
+
+def get_render_pool():
+    """Process pool for slide rendering (created lazily, once per process)"""
+    global _pool, _pool_pid, _job_threads
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: forking a threaded server process can deadlock the child
+            _pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            if _pool_pid != os.getpid():
+                _job_threads = ThreadPoolExecutor(max_workers=EXPORT_JOB_THREADS,
+                                                  thread_name_prefix='export-job')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def discard_render_pool(pool):
+    """Drop a pool whose worker died so the next job starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def get_job_threads():
+    """Threads that coordinate export jobs (they wait on the pool, not render)"""
+    get_render_pool()
+    return _job_threads
+
+
+def _cache_path(digest):
+    return os.path.join(EXPORT_CACHE_DIR, digest[:2], digest)
+
+
+def load_cached_part(digest):
+    """Return a cached rendered part, or None"""
+    path = _cache_path(digest)
+    try:
+        with open(path, 'rb') as f:
+            part = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Discarding unreadable export cache entry {digest}: {str(e)}")
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return part
+
+
+def store_cached_part(digest, part):
+    """Write a rendered part to the cache atomically"""
+    path = _cache_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def output_path(job_id, fmt):
+    return os.path.join(EXPORT_DIR, f"{job_id}.{CONTENT_TYPES[fmt][1]}")
+
+
+def assemble_to_file(fmt, parts, title, path):
+    """Assemble the export and write it to ``path`` (runs in the process pool)"""
+    data = export_renderers.assemble(fmt, parts, title)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def _update_job(job_id, **changes):
+    store = get_record_store()
+    record = store.get(JOB_KEY_PREFIX + job_id) or {}
+    record.update(changes)
+    store.set(JOB_KEY_PREFIX + job_id, record)
+    return record
+
+
+def get_export_job(job_id):
+    """Return a job record, or None"""
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+        return None
+    return get_record_store().get(JOB_KEY_PREFIX + job_id)
+
+
+def _run_job(job_id, fmt, slides, title):
+    """Render missing parts in the pool, then assemble the file"""
+    pool = None
+    try:
+        _update_job(job_id, state='running')
+        part_format = PART_FORMATS[fmt]
+        digests = [part_hash(part_format, slide) for slide in slides]
+
+        parts = {}
+        for digest in set(digests):
+            part = load_cached_part(digest)
+            if part is not None:
+                parts[digest] = part
+
+        # Identical slides are rendered once
+        missing = {}
+        for digest, slide in zip(digests, slides):
+            if digest not in parts:
+                missing.setdefault(digest, slide)
+        cached_count = len(slides) - sum(1 for d in digests if d in missing)
+        _update_job(job_id, done=cached_count, cached=cached_count)
+
+        # Stored images are embedded for the renderers (parts stay keyed by the URL form)
+        blob_store = get_blob_store()
+        pending = [(digest, inline_stored_images(slide, blob_store)) for digest, slide in missing.items()]
+        pool = get_render_pool()
+        batches = {
+            pool.submit(export_renderers.render_slides, part_format,
+                        [slide for _, slide in pending[i:i + EXPORT_BATCH_SIZE]]): pending[i:i + EXPORT_BATCH_SIZE]
+            for i in range(0, len(pending), EXPORT_BATCH_SIZE)
+        }
+        rendered_digests = set()
+        for future in as_completed(batches):
+            for (digest, _), part in zip(batches[future], future.result()):
+                parts[digest] = part
+                rendered_digests.add(digest)
+                try:
+                    store_cached_part(digest, part)
+                except OSError as e:
+                    logger.warning(f"Could not cache rendered slide: {str(e)}")
+            done = sum(1 for d in digests if d in parts)
+            _update_job(job_id, done=done)
+
+        _update_job(job_id, state='assembling', done=len(slides))
+        path = output_path(job_id, fmt)
+        size = pool.submit(assemble_to_file, fmt, [parts[d] for d in digests], title, path).result()
+        _update_job(job_id, state='done', size=size, finished_at=time.time())
+        logger.info(f"Export {job_id} ({fmt}) finished: {len(slides)} slides, "
+                    f"{len(rendered_digests)} rendered, {cached_count} from cache")
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool) and pool is not None:
+            discard_render_pool(pool)
+        logger.error(f"Export {job_id} failed: {str(e)}")
+        _update_job(job_id, state='error', error=str(e), finished_at=time.time())
+
+
+def create_export_job(fmt, slides, title, session_id):
+    """
+    Queue an export and return its job record.
+
+    Args:
+        fmt (str): 'pdf', 'pptx', 'html' or 'images'
+        slides (list): Slides in the stored JSON shape
+        title (str): Presentation title
+        session_id (str): Owner of the job; only this session may poll or download it
+
+    Returns:
+        dict: Job record including 'id'
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported export format: {fmt}")
+    if not isinstance(slides, list) or not slides:
+        raise ExportError("No slides to export")
+    slides = [slide for slide in slides if isinstance(slide, dict)]
+
+    _maybe_sweep()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    record = {
+        'id': job_id,
+        'state': 'queued',
+        'format': fmt,
+        'title': str(title or 'Presentation'),
+        'total': len(slides),
+        'done': 0,
+        'cached': 0,
+        'session_id': session_id,
+        'created_at': time.time()
+    }
+    get_record_store().set(JOB_KEY_PREFIX + job_id, record)
+    get_job_threads().submit(_run_job, job_id, fmt, slides, record['title'])
+    return record
+
+
+def export_download_name(record):
+    """File name offered for a finished export"""
+    stem = re.sub(r'[\\/:*?"<>|\s]+', '_', record.get('title') or 'presentation').strip('_') or 'presentation'
+    return f"{stem}.{CONTENT_TYPES[record['format']][1]}"
+
+
+def _maybe_sweep():
+    """Delete expired export files and cached parts (at most every SWEEP_INTERVAL)"""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < SWEEP_INTERVAL:
+        return
+    _last_sweep = now
+    for directory, ttl in ((EXPORT_DIR, EXPORT_JOB_TTL), (EXPORT_CACHE_DIR, EXPORT_CACHE_TTL)):
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < now - ttl:
+                        os.remove(path)
+                        if directory == EXPORT_DIR:
+                            get_record_store().delete(JOB_KEY_PREFIX + name.split('.')[0])
+                except OSError:
+                    pass
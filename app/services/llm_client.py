@@ -0,0 +1,256 @@
+"""
+LLM Client Module - Shared HTTP client for OpenAI-compatible chat completion APIs
+
+Every upstream LLM call made by the services goes through a single pooled
+``requests.Session`` per worker process, so TLS connections are kept alive and
+reused. Calls are bounded by connect/read timeouts, retried a limited number of
+times with jittered exponential backoff, and throttled by a per-worker
+concurrency limit so a slow upstream cannot hold every worker thread.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from app.utils.logger import logger
+from app.utils.metrics import observe_llm
+from app.utils.tracing import traced, set_attributes, trace_headers, KIND_CLIENT
+from app.utils.config import (
+    OPENAI_API_URL,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_POOL_SIZE,
+    LLM_MAX_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT
+)
+
+# 재시도 대상 HTTP 상태 코드
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when an upstream LLM call fails after all retries"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMClient:
+    """Pooled, keep-alive client for an OpenAI-compatible chat completion endpoint"""
+
+    def __init__(self, api_url=OPENAI_API_URL, api_key=None,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 backoff_max=LLM_BACKOFF_MAX, pool_size=LLM_POOL_SIZE,
+                 max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT):
+        self.api_url = api_url
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Return the pooled session, rebuilding it after a fork (e.g. gunicorn workers)"""
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                          max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update({"Content-Type": "application/json"})
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def _headers(self):
+        headers = trace_headers()
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when the server sends it"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMError("LLM 동시 요청 한도를 초과했습니다. 잠시 후 다시 시도해주세요.", 503)
+
+    def post(self, payload, stream=False):
+        """
+        Send a chat completion request with timeouts and bounded retries.
+
+        Args:
+            payload (dict): Request body
+            stream (bool): Whether to keep the response body open for streaming
+
+        Returns:
+            requests.Response: Successful (2xx) response
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(self.api_url, headers=self._headers(), json=payload,
+                                             timeout=self.timeout, stream=stream)
+                if response.status_code < 400:
+                    return response
+                last_error = LLMError(f"LLM API 오류 응답 ({response.status_code}): {response.text[:200]}",
+                                      response.status_code)
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise last_error
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = LLMError(f"LLM API 연결 오류: {str(e)}")
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"LLM call failed ({last_error}), retrying in {delay:.2f}s "
+                               f"({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+        raise last_error
+
+    @traced(name='llm.chat_completion', kind=KIND_CLIENT)
+    def chat_completion(self, messages, model, **params):
+        """
+        Call the chat completion endpoint and return the decoded JSON result.
+
+        Args:
+            messages (list): Chat messages
+            model (str): Model name
+            **params: Extra request parameters (temperature, max_tokens, ...)
+
+        Returns:
+            dict: API response
+
+        Raises:
+            LLMError: The call failed or the response body is not a JSON object
+        """
+        payload = {"model": model, "messages": messages}
+        payload.update(params)
+
+        self._acquire_slot()
+        started = time.perf_counter()
+        try:
+            response = self.post(payload)
+            try:
+                result = response.json()
+            except ValueError:
+                result = None
+            if not isinstance(result, dict):
+                raise LLMError(f"LLM API 응답이 JSON 객체가 아닙니다: {response.text[:200]}", response.status_code)
+        except Exception:
+            observe_llm(model, time.perf_counter() - started, 'error')
+            raise
+        finally:
+            self._slots.release()
+        observe_llm(model, time.perf_counter() - started, usage=result.get('usage'))
+        usage = result.get('usage') if isinstance(result.get('usage'), dict) else {}
+        set_attributes(model=model, prompt_tokens=usage.get('prompt_tokens'),
+                       completion_tokens=usage.get('completion_tokens'))
+        return result
+
+    @traced(name='llm.stream_chat_completion', kind=KIND_CLIENT)
+    def stream_chat_completion(self, messages, model, **params):
+        """
+        Call the chat completion endpoint with ``stream=true`` and yield content deltas.
+
+        The concurrency slot is held until the stream is exhausted or closed.
+
+        Args:
+            messages (list): Chat messages
+            model (str): Model name
+            **params: Extra request parameters (temperature, max_tokens, ...)
+
+        Yields:
+            str: Content fragments in arrival order
+        """
+        payload = {"model": model, "messages": messages, "stream": True}
+        payload.update(params)
+
+        set_attributes(model=model)
+        self._acquire_slot()
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.post(payload, stream=True)
+            try:
+                for raw_line in response.iter_lines():
+                    # SSE bodies are UTF-8 regardless of the declared charset
+                    line = raw_line.decode("utf-8", errors="replace")
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        logger.warning(f"Skipping malformed stream chunk: {data[:100]}")
+                        continue
+                    for choice in chunk.get("choices", []):
+                        delta = choice.get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+                outcome = 'ok'
+            except GeneratorExit:
+                # The consumer stopped reading (e.g. the client disconnected)
+                outcome = 'cancelled'
+                raise
+            finally:
+                response.close()
+        finally:
+            self._slots.release()
+            observe_llm(model, time.perf_counter() - started, outcome)
+
+    def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the shared LLM client for this process"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
+
+
+def extract_message_content(result):
+    """Return the first choice's message content, or None if the response has none"""
+    if 'choices' in result and len(result['choices']) > 0:
+        return result['choices'][0]['message']['content'].strip()
+    return None
@@ -0,0 +1,260 @@
+"""
+Response Cache Module - Caches LLM completions for deterministic AI endpoints
+
+Entries are keyed on the normalized prompt messages, the model and the request
+parameters. The default backend is an in-process LRU with TTL; the SQLite
+backend stores entries in a shared file so every gunicorn worker benefits.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from app.utils.logger import logger
+from app.utils.metrics import record_cache
+from app.utils.config import (
+    AI_CACHE_BACKEND,
+    AI_CACHE_TTL,
+    AI_CACHE_MAX_ENTRIES,
+    AI_CACHE_PATH
+)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return _WHITESPACE_RE.sub(' ', str(text)).strip()
+
+
+def make_cache_key(messages, model, params=None):
+    """
+    Build a stable cache key for a chat completion request.
+
+    Args:
+        messages (list): Chat messages
+        model (str): Model name
+        params (dict): Request parameters (temperature, max_tokens, ...)
+
+    Returns:
+        str: Hex digest key
+    """
+    normalized = [
+        {"role": m.get("role"), "content": normalize_text(m.get("content", ""))}
+        for m in messages
+    ]
+    raw = json.dumps({"model": model, "messages": normalized, "params": params or {}},
+                     ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries=AI_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """SQLite-backed cache shared by every worker process on the host"""
+
+    # Reads and writes hit the disk: async callers run them in a thread
+    blocking = True
+
+    def __init__(self, path=AI_CACHE_PATH, max_entries=AI_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ai_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ai_cache_last_access ON ai_cache (last_access)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), now + ttl, now)
+        )
+        conn.execute("DELETE FROM ai_cache WHERE expires_at < ?", (now,))
+        conn.execute("""
+            DELETE FROM ai_cache WHERE key IN (
+                SELECT key FROM ai_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM ai_cache")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Cache front-end with hit/miss accounting"""
+
+    def __init__(self, backend=None, ttl=AI_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, field):
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _lookup(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"AI cache read error: {str(e)}")
+            value = None
+        self._count('hits' if value is not None else 'misses')
+        record_cache('ai_response', value is not None)
+        return value
+
+    def _store(self, key, value):
+        if value is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.error(f"AI cache write error: {str(e)}")
+
+    def get_or_compute(self, key, compute, bypass=False):
+        """
+        Return the cached value for ``key`` or compute and store it.
+
+        ``compute`` results of ``None`` are treated as failures and not cached.
+        With ``bypass`` (an explicit no-cache request) the cache is neither
+        read nor written; requests that are never cacheable should call
+        ``compute`` directly instead, so ``bypassed`` counts only the former.
+        """
+        if not self.enabled or bypass:
+            if bypass:
+                self._count('bypassed')
+            return compute()
+
+        value = self._lookup(key)
+        if value is None:
+            value = compute()
+            self._store(key, value)
+        return value
+
+    async def get_or_compute_async(self, key, compute, bypass=False):
+        """
+        Same as ``get_or_compute`` for a coroutine function ``compute``.
+        Lookups and stores on a blocking backend run in a worker thread.
+        """
+        if not self.enabled or bypass:
+            if bypass:
+                self._count('bypassed')
+            return await compute()
+
+        blocking = getattr(self.backend, 'blocking', False)
+        value = await asyncio.to_thread(self._lookup, key) if blocking else self._lookup(key)
+        if value is None:
+            value = await compute()
+            if blocking:
+                await asyncio.to_thread(self._store, key, value)
+            else:
+                self._store(key, value)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'entries': len(self.backend) if self.backend else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def clear(self):
+        if self.backend:
+            self.backend.clear()
+
+
+def create_response_cache(backend_name=AI_CACHE_BACKEND):
+    """Create a response cache for the configured backend"""
+    if backend_name == 'sqlite':
+        return ResponseCache(SQLiteCacheBackend())
+    if backend_name == 'memory':
+        return ResponseCache(MemoryCacheBackend())
+    return ResponseCache(None)
+
+
+response_cache = create_response_cache()
@@ -0,0 +1,569 @@
+"""
+Session Store Module - Pluggable storage for presentation sessions
+
+Replaces the old module-level ``ppt_sessions`` dict. Backends:
+
+- ``MemorySessionStore``: per-process LRU, bounded by ``SESSION_MAX_SESSIONS``;
+  sessions outside the ``SESSION_HOT_SESSIONS`` most recently used are packed
+  into the shared content store, so identical slides are held once
+- ``SQLiteSessionStore``: WAL-mode SQLite file shared by every worker process
+- ``RedisSessionStore``: any Redis-compatible server (Redis, Valkey, KeyDB, ...)
+
+Export jobs and cross-worker coordination records are kept in a separate
+record store (``get_record_store``) on the same backend.
+
+All writes go through ``transaction()``, which holds a per-session write lock
+for the read-modify-write cycle. Sessions idle for longer than
+``SESSION_IDLE_TTL`` seconds are expired.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.utils.logger import logger
+from app.services.content_store import get_content_store
+from app.utils.config import (
+    SESSION_STORE_BACKEND,
+    SESSION_STORE_PATH,
+    SESSION_STORE_URL,
+    SESSION_IDLE_TTL,
+    SESSION_MAX_SESSIONS,
+    SESSION_HOT_SESSIONS
+)
+
+# Number of striped in-process locks; keeps lock memory constant regardless of session count
+LOCK_STRIPES = 64
+
+# Minimum interval between idle-session sweeps
+EXPIRE_INTERVAL = 60
+
+# SQLite connections of the current thread, by database path
+_sqlite_local = threading.local()
+
+# Namespace of the record store (see create_record_store) in the SQLite file and in Redis
+RECORD_TABLE = 'records'
+RECORD_KEY_PREFIX = 'ppt:record:'
+
+
+def new_session_data():
+    """Default contents of a freshly created session"""
+    return {
+        'slides': [],
+        'theme': 'default',
+        'version': 0,
+        # Distinguishes a recreated session from an earlier one with the same ID
+        'deck_id': uuid.uuid4().hex[:12]
+    }
+
+
+class SessionStore:
+    """Base interface for presentation session storage"""
+
+    # Whether get() returns the stored dict itself (for recently used sessions at least),
+    # so unchanged slides keep their identity between writes
+    live = False
+
+    def __init__(self, idle_ttl=SESSION_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._last_expire = 0.0
+
+    def get(self, session_id):
+        """Return the session data dict, or None if it does not exist"""
+        raise NotImplementedError
+
+    def peek(self, session_id):
+        """
+        Session data for reading only: callers must not change it. Backends
+        that decode on every ``get`` may return a shared, cached copy.
+        """
+        return self.get(session_id)
+
+    def set(self, session_id, data):
+        """Store the full session data dict"""
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        """Remove a session"""
+        raise NotImplementedError
+
+    def expire_idle(self):
+        """Remove sessions idle for longer than ``idle_ttl``; returns the number removed"""
+        raise NotImplementedError
+
+    def claim(self, key, data, ttl):
+        """
+        Atomically store ``data`` under ``key`` unless a live record already exists.
+
+        Used for cross-worker coordination records (e.g. single-flight leases).
+        The record carries ``expires_at``; an expired record can be claimed again.
+
+        Returns:
+            bool: True if this caller now owns the record
+        """
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    @contextmanager
+    def lock(self, session_id):
+        """Per-session write lock (in-process)"""
+        with self._locks[hash(session_id) % LOCK_STRIPES]:
+            yield
+
+    @contextmanager
+    def transaction(self, session_id, create=False):
+        """
+        Read-modify-write a session under its write lock.
+
+        Yields the session dict (or None if it does not exist and ``create`` is
+        False). Changes made to the yielded dict are persisted on exit.
+        """
+        with self.lock(session_id):
+            data = self.get(session_id)
+            if data is None:
+                if not create:
+                    yield None
+                    return
+                data = new_session_data()
+            yield data
+            self.set(session_id, data)
+
+    def _maybe_expire(self):
+        now = time.time()
+        if now - self._last_expire >= EXPIRE_INTERVAL:
+            self._last_expire = now
+            try:
+                removed = self.expire_idle()
+                if removed:
+                    logger.info(f"Expired {removed} idle presentation sessions")
+            except Exception as e:
+                logger.error(f"Session expiry error: {str(e)}")
+
+
+class _Packed:
+    """A cold session: its slides as content store keys, every other field as is"""
+
+    __slots__ = ('fields', 'slides')
+
+    def __init__(self, data, content):
+        self.fields = {key: value for key, value in data.items() if key != 'slides'}
+        self.slides = tuple(content.put_slide(slide) for slide in data['slides'])
+
+    def unpack(self, content):
+        data = dict(self.fields)
+        data['slides'] = [content.load_slide(key) for key in self.slides]
+        return data
+
+    def release(self, content):
+        for key in self.slides:
+            content.release(key)
+
+
+def _packable(data):
+    return isinstance(data, dict) and isinstance(data.get('slides'), list)
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process session store with LRU eviction and idle expiry.
+
+    The ``hot_sessions`` most recently used sessions are kept as live dicts;
+    colder ones are packed into the content store and unpacked on next access.
+    """
+
+    live = True
+
+    def __init__(self, max_sessions=SESSION_MAX_SESSIONS, idle_ttl=SESSION_IDLE_TTL,
+                 hot_sessions=SESSION_HOT_SESSIONS, content=None):
+        super().__init__(idle_ttl)
+        self.max_sessions = max_sessions
+        self.hot_sessions = hot_sessions
+        self.content = content or get_content_store()
+        self._sessions = OrderedDict()
+        self._hot = OrderedDict()  # live sessions that can be packed, least recently used first
+        self._index_lock = threading.Lock()
+
+    def _touch(self, session_id, data):
+        """Mark a session used (index lock held); returns sessions that turned cold"""
+        self._sessions[session_id] = (data, time.time())
+        self._sessions.move_to_end(session_id)
+        if self.hot_sessions <= 0 or not _packable(data):
+            return []
+        self._hot[session_id] = None
+        self._hot.move_to_end(session_id)
+        cold = []
+        while len(self._hot) > self.hot_sessions:
+            cold.append(self._hot.popitem(last=False)[0])
+        return cold
+
+    def _discard(self, data):
+        if isinstance(data, _Packed):
+            data.release(self.content)
+
+    def _pack(self, session_ids):
+        """Pack sessions that turned cold, skipping any that are being written"""
+        for session_id in session_ids:
+            stripe = self._locks[hash(session_id) % LOCK_STRIPES]
+            if not stripe.acquire(blocking=False):
+                with self._index_lock:
+                    if session_id in self._sessions:
+                        self._hot[session_id] = None
+                        self._hot.move_to_end(session_id, last=False)
+                continue
+            try:
+                with self._index_lock:
+                    entry = self._sessions.get(session_id)
+                if entry is None or not _packable(entry[0]):
+                    continue
+                packed = _Packed(entry[0], self.content)
+                with self._index_lock:
+                    current = self._sessions.get(session_id)
+                    if current is not None and current[0] is entry[0] and session_id not in self._hot:
+                        self._sessions[session_id] = (packed, current[1])
+                        packed = None
+                if packed is not None:
+                    packed.release(self.content)
+            finally:
+                stripe.release()
+
+    def get(self, session_id):
+        with self._index_lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            data = entry[0]
+            if isinstance(data, _Packed):
+                packed, data = data, data.unpack(self.content)
+                packed.release(self.content)
+            cold = self._touch(session_id, data)
+        self._pack(cold)
+        return data
+
+    def set(self, session_id, data):
+        with self._index_lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry[0] is not data:
+                self._discard(entry[0])
+            cold = self._touch(session_id, data)
+            while len(self._sessions) > self.max_sessions:
+                evicted, (evicted_data, _) = self._sessions.popitem(last=False)
+                self._hot.pop(evicted, None)
+                self._discard(evicted_data)
+                logger.info(f"Evicted least recently used session {evicted}")
+        self._pack(cold)
+        self._maybe_expire()
+
+    def delete(self, session_id):
+        with self._index_lock:
+            entry = self._sessions.pop(session_id, None)
+            self._hot.pop(session_id, None)
+            if entry is not None:
+                self._discard(entry[0])
+
+    def expire_idle(self):
+        cutoff = time.time() - self.idle_ttl
+        removed = 0
+        with self._index_lock:
+            # Entries are kept in access order, so the idle ones are at the front
+            while self._sessions:
+                session_id, (data, last_access) = next(iter(self._sessions.items()))
+                if last_access >= cutoff:
+                    break
+                del self._sessions[session_id]
+                self._hot.pop(session_id, None)
+                self._discard(data)
+                removed += 1
+        return removed
+
+    def claim(self, key, data, ttl):
+        with self._index_lock:
+            entry = self._sessions.get(key)
+            if entry is not None and entry[0].get('expires_at', 0) > time.time():
+                return False
+            self._sessions[key] = (dict(data, expires_at=time.time() + ttl), time.time())
+            return True
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite (WAL) session store shared between worker processes"""
+
+    # Avoid a write on every read: only refresh last_access when it is this stale
+    TOUCH_INTERVAL = 60
+
+    # Sessions decoded for peek(), reused while their stored bytes are unchanged
+    READ_CACHE_SESSIONS = 64
+
+    def __init__(self, path=SESSION_STORE_PATH, idle_ttl=SESSION_IDLE_TTL, table='sessions'):
+        super().__init__(idle_ttl)
+        self.path = path
+        self.table = table
+        self._read_cache = OrderedDict()  # session ID -> (stored bytes, decoded data)
+        self._read_cache_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)")
+
+    def _connect(self):
+        # One connection per thread and database file, shared by the stores on
+        # that file: records written inside a session transaction (undo
+        # history) join it instead of waiting for its write lock
+        if getattr(_sqlite_local, 'pid', None) != os.getpid():
+            _sqlite_local.connections = {}
+            _sqlite_local.pid = os.getpid()
+        conn = _sqlite_local.connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _sqlite_local.connections[self.path] = conn
+        return conn
+
+    @staticmethod
+    def _encode(data):
+        return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 1)
+
+    @staticmethod
+    def _decode(blob):
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def _fetch(self, session_id):
+        """Stored bytes of a live session, or None"""
+        conn = self._connect()
+        row = conn.execute(f"SELECT data, last_access FROM {self.table} WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now - self.idle_ttl:
+            return None
+        if now - row[1] > self.TOUCH_INTERVAL:
+            conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE id = ?", (now, session_id))
+        return row[0]
+
+    def get(self, session_id):
+        blob = self._fetch(session_id)
+        return self._decode(blob) if blob is not None else None
+
+    def peek(self, session_id):
+        blob = self._fetch(session_id)
+        if blob is None:
+            return None
+        with self._read_cache_lock:
+            entry = self._read_cache.get(session_id)
+            if entry is not None and entry[0] == blob:
+                self._read_cache.move_to_end(session_id)
+                return entry[1]
+        data = self._decode(blob)
+        with self._read_cache_lock:
+            self._read_cache[session_id] = (blob, data)
+            self._read_cache.move_to_end(session_id)
+            while len(self._read_cache) > self.READ_CACHE_SESSIONS:
+                self._read_cache.popitem(last=False)
+        return data
+
+    def set(self, session_id, data):
+        self._connect().execute(
+            f"INSERT OR REPLACE INTO {self.table} (id, data, last_access) VALUES (?, ?, ?)",
+            (session_id, self._encode(data), time.time())
+        )
+        self._maybe_expire()
+
+    def delete(self, session_id):
+        self._connect().execute(f"DELETE FROM {self.table} WHERE id = ?", (session_id,))
+
+    def expire_idle(self):
+        cursor = self._connect().execute(f"DELETE FROM {self.table} WHERE last_access < ?",
+                                         (time.time() - self.idle_ttl,))
+        return cursor.rowcount
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Hold the database write lock: BEGIN IMMEDIATE, or a savepoint when the
+        thread's connection is already inside a transaction (e.g. a record
+        written during a session transaction on the same file).
+        """
+        conn = self._connect()
+        if conn.in_transaction:
+            conn.execute("SAVEPOINT store_write")
+            try:
+                yield conn
+                conn.execute("RELEASE store_write")
+            except BaseException:
+                conn.execute("ROLLBACK TO store_write")
+                conn.execute("RELEASE store_write")
+                raise
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, key, data, ttl):
+        with self._write_lock() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (key,)).fetchone()
+            if row is not None and self._decode(row[0]).get('expires_at', 0) > time.time():
+                return False
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (id, data, last_access) VALUES (?, ?, ?)",
+                (key, self._encode(dict(data, expires_at=time.time() + ttl)), time.time())
+            )
+            return True
+
+    def __len__(self):
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    @contextmanager
+    def transaction(self, session_id, create=False):
+        # BEGIN IMMEDIATE takes the database write lock, serialising the
+        # read-modify-write against other worker processes as well
+        with self.lock(session_id), self._write_lock() as conn:
+            data = self.get(session_id)
+            if data is None and create:
+                data = new_session_data()
+            yield data
+            if data is not None:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (id, data, last_access) VALUES (?, ?, ?)",
+                    (session_id, self._encode(data), time.time())
+                )
+        self._maybe_expire()
+
+
+class RedisSessionStore(SessionStore):
+    """Session store backed by a Redis-compatible server"""
+
+    KEY_PREFIX = 'ppt:session:'
+    LOCK_TIMEOUT = 30
+
+    def __init__(self, url=SESSION_STORE_URL, idle_ttl=SESSION_IDLE_TTL, key_prefix=KEY_PREFIX):
+        super().__init__(idle_ttl)
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+        self._claim_script = None
+
+    def _key(self, session_id):
+        return f"{self.key_prefix}{session_id}"
+
+    def get(self, session_id):
+        pipe = self.client.pipeline()
+        pipe.get(self._key(session_id))
+        pipe.expire(self._key(session_id), self.idle_ttl)
+        raw, _ = pipe.execute()
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, session_id, data):
+        self.client.set(self._key(session_id),
+                        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+                        ex=self.idle_ttl)
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id))
+
+    def expire_idle(self):
+        # Keys carry their own TTL, refreshed on every access
+        return 0
+
+    # Compare-and-set for claim(): a record whose expires_at has passed (e.g. a
+    # published single-flight result, kept for idle_ttl by set()) is replaced
+    CLAIM_SCRIPT = """
+        local current = redis.call('GET', KEYS[1])
+        if current then
+            local ok, record = pcall(cjson.decode, current)
+            if ok and type(record) == 'table' and tonumber(record['expires_at'] or 0) > tonumber(ARGV[2]) then
+                return 0
+            end
+        end
+        redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+        return 1
+    """
+
+    def claim(self, key, data, ttl):
+        now = time.time()
+        record = dict(data, expires_at=now + ttl)
+        if self._claim_script is None:
+            self._claim_script = self.client.register_script(self.CLAIM_SCRIPT)
+        return bool(self._claim_script(keys=[self._key(key)],
+                                       args=[json.dumps(record, ensure_ascii=False), repr(now), max(1, int(ttl))]))
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.key_prefix}*", count=500))
+
+    @contextmanager
+    def lock(self, session_id):
+        with super().lock(session_id):
+            with self.client.lock(f"{self._key(session_id)}:lock", timeout=self.LOCK_TIMEOUT):
+                yield
+
+
+def create_session_store(backend_name=SESSION_STORE_BACKEND):
+    """Create the session store for the configured backend"""
+    if backend_name == 'sqlite':
+        return SQLiteSessionStore()
+    if backend_name == 'redis':
+        return RedisSessionStore()
+    return MemorySessionStore()
+
+
+def create_record_store(backend_name=SESSION_STORE_BACKEND):
+    """
+    Create the store for records that are not presentation sessions (export
+    jobs, single-flight leases): the session backend, in its own namespace,
+    so records never evict sessions or count as sessions.
+    """
+    if backend_name == 'sqlite':
+        return SQLiteSessionStore(table=RECORD_TABLE)
+    if backend_name == 'redis':
+        return RedisSessionStore(key_prefix=RECORD_KEY_PREFIX)
+    return MemorySessionStore(hot_sessions=0)
+
+
+_store = None
+_record_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the process-wide session store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_session_store()
+    return _store
+
+
+def get_record_store():
+    """Return the process-wide record store"""
+    global _record_store
+    if _record_store is None:
+        with _store_lock:
+            if _record_store is None:
+                _record_store = create_record_store()
+    return _record_store
@@ -0,0 +1,173 @@
+"""
+Single-Flight Module - Coalesces identical in-flight AI requests
+
+When several requests for the same key arrive while an upstream call for that
+key is still running, only the first (the leader) calls upstream; the others
+wait and share its result. Within a worker this uses threading events (or
+asyncio futures for the async service). With ``SINGLE_FLIGHT_SHARED`` enabled,
+leaders also take a lease in the record store (the session backend, outside
+the session namespace) so followers in other worker processes poll for the
+published result instead of calling upstream.
+"""
+
+import asyncio
+import threading
+import time
+from app.utils.logger import logger
+from app.utils.config import SINGLE_FLIGHT_SHARED, SINGLE_FLIGHT_TIMEOUT
+
+# Prefix of cross-worker records in the record store
+SHARED_KEY_PREFIX = 'singleflight:'
+
+# How long a published result stays readable for late followers
+SHARED_RESULT_LINGER = 30
+
+SHARED_POLL_INTERVAL = 0.05
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self, store=None, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.store = store
+        self.timeout = timeout
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.coalesced_shared = 0
+
+    def do(self, key, fn):
+        """
+        Run ``fn()`` unless a call with the same key is already in flight, in
+        which case wait for and return that call's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                logger.warning("Single-flight leader timed out, calling upstream directly")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn) if self.store is not None else fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _do_shared(self, key, fn):
+        """Coordinate with other worker processes through the record store"""
+        record_key = SHARED_KEY_PREFIX + key
+        try:
+            is_leader = self.store.claim(record_key, {'state': 'pending'}, self.timeout)
+        except Exception as e:
+            logger.error(f"Single-flight lease error: {str(e)}")
+            return fn()
+
+        if is_leader:
+            try:
+                result = fn()
+            except BaseException:
+                self._release(record_key)
+                raise
+            if result is None:
+                self._release(record_key)
+            else:
+                try:
+                    self.store.set(record_key, {'state': 'done', 'result': result,
+                                                'expires_at': time.time() + SHARED_RESULT_LINGER})
+                except Exception as e:
+                    logger.error(f"Single-flight publish error: {str(e)}")
+            return result
+
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            record = self.store.get(record_key)
+            if record is None or record.get('expires_at', 0) < time.time():
+                # Leader failed or its lease lapsed
+                break
+            if record.get('state') == 'done':
+                with self._lock:
+                    self.coalesced_shared += 1
+                return record.get('result')
+            time.sleep(SHARED_POLL_INTERVAL)
+        return fn()
+
+    def _release(self, record_key):
+        try:
+            self.store.delete(record_key)
+        except Exception as e:
+            logger.error(f"Single-flight release error: {str(e)}")
+
+    async def do_async(self, key, coro_fn):
+        """Async counterpart of ``do`` for coroutines on one event loop (in-process only)"""
+        future = self._async_calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        self.leaders += 1
+        try:
+            result = await coro_fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody was waiting
+            future.exception()
+            raise
+        finally:
+            self._async_calls.pop(key, None)
+
+    def stats(self):
+        calls = self.leaders + self.coalesced
+        return {
+            'shared': self.store is not None,
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'coalesced_shared': self.coalesced_shared,
+            'coalesced_ratio': round(self.coalesced / calls, 4) if calls else 0.0
+        }
+
+
+def create_single_flight(shared=SINGLE_FLIGHT_SHARED):
+    """Create the single-flight group, optionally shared across workers"""
+    if shared:
+        from app.services.session_store import get_record_store
+        return SingleFlight(store=get_record_store())
+    return SingleFlight()
+
+
+single_flight = create_single_flight()
@@ -0,0 +1,504 @@
+"""
+Slide Analyzer Module - Deterministic local analysis of slide layout and text
+
+Replaces the canned analysis results with checks computed from the slide JSON
+in milliseconds, without an LLM round trip:
+
+- bounds: elements outside the 960x540 canvas
+- overlap: elements covering each other (a label fully inside a shape or
+  image is treated as intentional)
+- readability: amount of text, text overflowing its box, small font sizes
+- typography: number of distinct font sizes and families
+- contrast: WCAG contrast ratio of text against what is behind it
+- alignment: share of elements whose edges or centers line up with another
+  element or the slide center
+
+Geometry checks run over coordinate arrays; with numpy installed they are
+vectorized, otherwise the same checks run in pure Python.
+"""
+
+import math
+import re
+from app.services.export_renderers import SLIDE_WIDTH, SLIDE_HEIGHT, css_px, parse_color, text_width, wrap_text
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - pure Python fallback below
+    np = None
+
+# Weights of each check in the overall score
+CHECK_WEIGHTS = {
+    'bounds': 1.0,
+    'overlap': 1.5,
+    'readability': 1.5,
+    'typography': 1.0,
+    'contrast': 1.5,
+    'alignment': 1.0
+}
+
+# Overlaps smaller than this share of the smaller element are ignored
+OVERLAP_MIN_RATIO = 0.05
+# Edges within this many px count as aligned
+ALIGN_TOLERANCE = 4.0
+# Readability thresholds
+MAX_WORDS = 80
+MIN_FONT_SIZE = 14
+MAX_FONT_SIZES = 3
+MAX_FONT_FAMILIES = 2
+# WCAG AA: 4.5:1 for body text, 3:1 for large text (>= 24px, or >= 18.66px bold)
+MIN_CONTRAST = 4.5
+MIN_CONTRAST_LARGE = 3.0
+LINE_HEIGHT = 1.2
+
+# Fixed title/content blocks, as laid out by renderSlide in slides.js
+TITLE_BOX = (0, 20, SLIDE_WIDTH, 60, 32)
+CONTENT_BOX = (60, 100, SLIDE_WIDTH - 120, SLIDE_HEIGHT - 140, 18)
+
+DEFAULT_TEXT_COLOR = (0, 0, 0)
+DEFAULT_BACKGROUND = (255, 255, 255)
+DEFAULT_SHAPE_COLOR = (52, 152, 219)
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _plain_text(value):
+    return _TAG_RE.sub(' ', value) if isinstance(value, str) else ''
+
+
+def _bounding_box(x, y, width, height, rotation):
+    """Axis-aligned box (x0, y0, x1, y1) of a possibly rotated rectangle"""
+    if rotation % 180 == 0:
+        return x, y, x + width, y + height
+    angle = math.radians(rotation)
+    cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+    bw, bh = width * cos + height * sin, width * sin + height * cos
+    cx, cy = x + width / 2, y + height / 2
+    return cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2
+
+
+def collect_items(slide):
+    """
+    Flatten a slide into analyzable items.
+
+    Each item has id, type, box (x0, y0, x1, y1), and for text: text,
+    font_size, font_family, bold, color and the box's inner size.
+    """
+    items = []
+    for key, (x, y, width, height, size) in (('title', TITLE_BOX), ('content', CONTENT_BOX)):
+        value = slide.get(key)
+        if isinstance(value, list):
+            value = '\n'.join(map(str, value))
+        text = _plain_text(value).strip()
+        if not text:
+            continue
+        # The block covers its wrapped text, not the whole reserved area
+        lines = wrap_text(text, width, size)
+        used_width = min(width, max(text_width(line, size) for line in lines))
+        used_height = min(height, len(lines) * size * LINE_HEIGHT)
+        if key == 'title':
+            x += (width - used_width) / 2  # centered
+        items.append({'id': key, 'type': 'text', 'box': (x, y, x + used_width, y + used_height), 'text': text,
+                      'font_size': size, 'font_family': None, 'bold': key == 'title',
+                      'color': (0, 0, 0) if key == 'title' else (51, 51, 51),
+                      'inner': (width, height), 'fixed': True})
+
+    for position, element in enumerate(slide.get('elements') or []):
+        if not isinstance(element, dict):
+            continue
+        style = element.get('style') if isinstance(element.get('style'), dict) else {}
+        x, y = css_px(element.get('x'), 0), css_px(element.get('y'), 0)
+        width, height = css_px(element.get('width'), 100), css_px(element.get('height'), 100)
+        item = {
+            'id': element.get('id') or f"#{position}",
+            'type': element.get('type'),
+            'box': _bounding_box(x, y, width, height, css_px(element.get('rotation'), 0)),
+            'z': css_px(element.get('zIndex'), 0),
+            'order': position
+        }
+        if item['type'] == 'text':
+            item.update({
+                'text': _plain_text(element.get('content')).strip(),
+                'font_size': css_px(style.get('fontSize'), 16),
+                'font_family': style.get('fontFamily'),
+                'bold': style.get('fontWeight') in ('bold', '700', 700),
+                'color': parse_color(style.get('textColor'), DEFAULT_TEXT_COLOR),
+                'background': parse_color(style.get('backgroundColor')),
+                'inner': (width, height)
+            })
+        elif item['type'] == 'shape':
+            item['fill'] = parse_color(style.get('color'), DEFAULT_SHAPE_COLOR)
+        items.append(item)
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Geometry over coordinate arrays
+# ---------------------------------------------------------------------------
+
+def overlap_pairs(boxes):
+    """
+    Pairs of overlapping boxes.
+
+    Returns:
+        list: (i, j, intersection area) with i < j
+    """
+    n = len(boxes)
+    if n < 2:
+        return []
+    if np is not None:
+        arr = np.asarray(boxes, dtype=float)
+        x0, y0, x1, y1 = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+        w = np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :])
+        h = np.minimum(y1[:, None], y1[None, :]) - np.maximum(y0[:, None], y0[None, :])
+        area = np.where((w > 0) & (h > 0), w * h, 0.0)
+        rows, cols = np.nonzero(np.triu(area, 1))
+        return [(int(i), int(j), float(area[i, j])) for i, j in zip(rows, cols)]
+
+    # Sweep over x: only boxes whose x-ranges intersect are compared
+    order = sorted(range(n), key=lambda k: boxes[k][0])
+    pairs, active = [], []
+    for k in order:
+        x0, y0, x1, y1 = boxes[k]
+        active = [a for a in active if boxes[a][2] > x0]
+        for a in active:
+            ax0, ay0, ax1, ay1 = boxes[a]
+            w = min(x1, ax1) - max(x0, ax0)
+            h = min(y1, ay1) - max(y0, ay0)
+            if w > 0 and h > 0:
+                pairs.append((min(a, k), max(a, k), w * h))
+        active.append(k)
+    return pairs
+
+
+def aligned_mask(values, tolerance=ALIGN_TOLERANCE, guides=()):
+    """For each value, whether another value (or a guide) lies within ``tolerance``"""
+    n = len(values)
+    if n == 0:
+        return []
+    if np is not None:
+        v = np.asarray(values, dtype=float)
+        order = np.argsort(v, kind='stable')
+        close = np.diff(v[order]) <= tolerance
+        mask_sorted = np.zeros(n, dtype=bool)
+        mask_sorted[:-1] |= close
+        mask_sorted[1:] |= close
+        mask = np.zeros(n, dtype=bool)
+        mask[order] = mask_sorted
+        for guide in guides:
+            mask |= np.abs(v - guide) <= tolerance
+        return mask.tolist()
+
+    order = sorted(range(n), key=lambda k: values[k])
+    mask = [False] * n
+    for a, b in zip(order, order[1:]):
+        if values[b] - values[a] <= tolerance:
+            mask[a] = mask[b] = True
+    for k in range(n):
+        if not mask[k] and any(abs(values[k] - guide) <= tolerance for guide in guides):
+            mask[k] = True
+    return mask
+
+
+def _contains(outer, inner):
+    return (outer[0] <= inner[0] + 1 and outer[1] <= inner[1] + 1 and
+            outer[2] >= inner[2] - 1 and outer[3] >= inner[3] - 1)
+
+
+def _area(box):
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+# ---------------------------------------------------------------------------
+# Checks: each returns (score 0-100, issues, metrics)
+# ---------------------------------------------------------------------------
+
+def _issue(check, severity, message, element_ids=()):
+    return {'check': check, 'severity': severity, 'message': message, 'elements': list(element_ids)}
+
+
+def check_bounds(items):
+    issues = []
+    outside = []
+    for item in items:
+        x0, y0, x1, y1 = item['box']
+        area = _area(item['box'])
+        if area == 0:
+            continue
+        visible = _area((max(x0, 0), max(y0, 0), min(x1, SLIDE_WIDTH), min(y1, SLIDE_HEIGHT)))
+        if visible < area - 1:
+            hidden = 1 - visible / area
+            outside.append(item['id'])
+            severity = 'error' if hidden > 0.5 else 'warning'
+            issues.append(_issue('bounds', severity,
+                                 f"요소 {item['id']}의 {round(hidden * 100)}%가 슬라이드 밖에 있습니다.", [item['id']]))
+    score = 100 - min(100, 25 * sum(2 if i['severity'] == 'error' else 1 for i in issues))
+    return score, issues, {'out_of_bounds': len(outside)}
+
+
+def check_overlap(items):
+    boxes = [item['box'] for item in items]
+    issues = []
+    for i, j, area in overlap_pairs(boxes):
+        a, b = items[i], items[j]
+        smaller = min(_area(a['box']), _area(b['box'])) or 1
+        if area / smaller < OVERLAP_MIN_RATIO:
+            continue
+        # Text or an image placed entirely on a shape/image is a deliberate label or card
+        if (_contains(a['box'], b['box']) and a['type'] in ('shape', 'image') and b['type'] != 'image') or \
+           (_contains(b['box'], a['box']) and b['type'] in ('shape', 'image') and a['type'] != 'image'):
+            continue
+        text_involved = 'text' in (a['type'], b['type'])
+        issues.append(_issue('overlap', 'error' if text_involved else 'warning',
+                             f"요소 {a['id']}와(과) {b['id']}가 {round(area / smaller * 100)}% 겹칩니다.",
+                             [a['id'], b['id']]))
+    score = 100 - min(100, sum(20 if i['severity'] == 'error' else 10 for i in issues))
+    return score, issues, {'overlapping_pairs': len(issues)}
+
+
+def check_readability(items):
+    texts = [item for item in items if item['type'] == 'text' and item.get('text')]
+    words = sum(len(item['text'].split()) for item in texts)
+    characters = sum(len(item['text']) for item in texts)
+    issues = []
+    score = 100
+
+    if words > MAX_WORDS:
+        score -= min(40, (words - MAX_WORDS) // 2)
+        issues.append(_issue('readability', 'warning',
+                             f"텍스트가 {words}단어로 많습니다. 핵심 포인트 위주로 {MAX_WORDS}단어 이하로 줄이세요."))
+
+    for item in texts:
+        size = item['font_size']
+        if size < MIN_FONT_SIZE:
+            score -= 10
+            issues.append(_issue('readability', 'warning',
+                                 f"요소 {item['id']}의 글자 크기({size:g}px)가 작아 읽기 어렵습니다.", [item['id']]))
+        if item.get('fixed'):
+            continue
+        width, height = item['inner']
+        needed = len(wrap_text(item['text'], max(width, 1), size)) * size * LINE_HEIGHT
+        if needed > height * 1.05:
+            score -= 15
+            issues.append(_issue('readability', 'error',
+                                 f"요소 {item['id']}의 텍스트가 상자를 넘칩니다 (필요 높이 {round(needed)}px, 상자 {round(height)}px).",
+                                 [item['id']]))
+    return max(0, score), issues, {'words': words, 'characters': characters, 'text_elements': len(texts)}
+
+
+def check_typography(items):
+    texts = [item for item in items if item['type'] == 'text' and item.get('text') and not item.get('fixed')]
+    sizes = sorted({item['font_size'] for item in texts})
+    families = sorted({str(item['font_family']).split(',')[0].strip(' "\'') for item in texts if item['font_family']})
+    issues = []
+    score = 100
+    if len(sizes) > MAX_FONT_SIZES:
+        score -= 15 * (len(sizes) - MAX_FONT_SIZES)
+        issues.append(_issue('typography', 'warning',
+                             f"글자 크기가 {len(sizes)}종류({', '.join(f'{s:g}px' for s in sizes)})입니다. 제목/본문/강조 정도로 통일하세요."))
+    if len(families) > MAX_FONT_FAMILIES:
+        score -= 20 * (len(families) - MAX_FONT_FAMILIES)
+        issues.append(_issue('typography', 'warning',
+                             f"글꼴이 {len(families)}종류({', '.join(families)}) 사용되었습니다. 2종 이하로 줄이세요."))
+    return max(0, score), issues, {'font_sizes': sizes, 'font_families': families}
+
+
+def relative_luminance(color):
+    channels = []
+    for c in color:
+        c = c / 255
+        channels.append(c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4)
+    return 0.2126 * channels[0] + 0.7152 * channels[1] + 0.0722 * channels[2]
+
+
+def contrast_ratio(foreground, background):
+    """WCAG contrast ratio between two (r, g, b) colors"""
+    lighter, darker = sorted((relative_luminance(foreground), relative_luminance(background)), reverse=True)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def _backdrop(item, items, slide_background):
+    """Color behind the center of a text item: its own background, the topmost shape below it, or the slide"""
+    if item.get('background'):
+        return item['background']
+    if item.get('fixed'):
+        # Title and content are drawn before every element
+        return slide_background
+    cx = (item['box'][0] + item['box'][2]) / 2
+    cy = (item['box'][1] + item['box'][3]) / 2
+    stacking = (item['z'], item['order'])
+    below = [other for other in items
+             if other['type'] == 'shape' and other.get('fill') and (other['z'], other['order']) < stacking and
+             other['box'][0] <= cx <= other['box'][2] and other['box'][1] <= cy <= other['box'][3]]
+    if below:
+        return max(below, key=lambda other: (other['z'], other['order']))['fill']
+    return slide_background
+
+
+def check_contrast(items, slide_background):
+    issues = []
+    ratios = []
+    for item in items:
+        if item['type'] != 'text' or not item.get('text'):
+            continue
+        ratio = contrast_ratio(item['color'], _backdrop(item, items, slide_background))
+        ratios.append(ratio)
+        large = item['font_size'] >= 24 or (item['bold'] and item['font_size'] >= 18.66)
+        required = MIN_CONTRAST_LARGE if large else MIN_CONTRAST
+        if ratio < required:
+            issues.append(_issue('contrast', 'error' if ratio < required * 0.66 else 'warning',
+                                 f"요소 {item['id']}의 텍스트 대비가 {ratio:.1f}:1로 낮습니다 (권장 {required:g}:1 이상).",
+                                 [item['id']]))
+    score = 100 - min(100, sum(30 if i['severity'] == 'error' else 15 for i in issues))
+    return score, issues, {'min_contrast': round(min(ratios), 2) if ratios else None}
+
+
+def check_alignment(items):
+    movable = [item for item in items if not item.get('fixed')]
+    if len(movable) < 2:
+        return 100, [], {'aligned_ratio': 1.0}
+    boxes = [item['box'] for item in movable]
+    aligned = [False] * len(movable)
+    # Horizontal: left/center/right edges, with the slide center and margins as guides
+    for values, guides in (
+        ([b[0] for b in boxes], (0, 60)),
+        ([(b[0] + b[2]) / 2 for b in boxes], (SLIDE_WIDTH / 2,)),
+        ([b[2] for b in boxes], (SLIDE_WIDTH, SLIDE_WIDTH - 60)),
+        ([b[1] for b in boxes], ()),
+        ([(b[1] + b[3]) / 2 for b in boxes], (SLIDE_HEIGHT / 2,)),
+        ([b[3] for b in boxes], ()),
+    ):
+        aligned = [a or m for a, m in zip(aligned, aligned_mask(values, guides=guides))]
+    ratio = sum(aligned) / len(aligned)
+    stray = [item['id'] for item, ok in zip(movable, aligned) if not ok]
+    issues = []
+    if stray:
+        issues.append(_issue('alignment', 'info',
+                             f"{len(stray)}개 요소가 다른 요소나 슬라이드 중심선과 정렬되어 있지 않습니다.", stray))
+    return round(100 * ratio), issues, {'aligned_ratio': round(ratio, 2)}
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def _hex(color):
+    return '#%02x%02x%02x' % tuple(color)
+
+
+def _grade(score):
+    if score >= 80:
+        return 'good'
+    if score >= 50:
+        return 'average'
+    return 'poor'
+
+
+def _feedback(check_ids, issues, fallback):
+    messages = [issue['message'] for issue in issues if issue['check'] in check_ids]
+    return ' '.join(messages[:3]) if messages else fallback
+
+
+SUGGESTIONS = {
+    'bounds': ('layout', '슬라이드 밖 요소 정리', '일부 요소가 슬라이드 영역을 벗어나 발표 화면에서 잘립니다.',
+               '요소를 960x540 영역 안으로 옮기거나 크기를 줄이세요.'),
+    'overlap': ('layout', '겹치는 요소 분리', '요소들이 서로 겹쳐 내용을 가립니다.',
+                '겹친 요소를 나란히 배치하거나, 의도한 경우 한 요소가 다른 요소 안에 완전히 들어가도록 맞추세요.'),
+    'readability': ('content', '텍스트 양과 크기 조정', '텍스트가 많거나 작아 한눈에 읽기 어렵습니다.',
+                    '핵심 문장만 남기고 본문은 최소 14px 이상, 텍스트 상자는 내용에 맞게 키우세요.'),
+    'typography': ('typography', '글꼴 일관성 유지', '글자 크기와 글꼴 종류가 많아 시각적 위계가 흐려집니다.',
+                   '제목/본문/강조 3단계 크기와 1-2개의 글꼴만 사용하세요.'),
+    'contrast': ('color', '텍스트 대비 개선', '텍스트와 배경의 명도 대비가 낮아 읽기 어렵습니다.',
+                 '밝은 배경에는 어두운 글자(#333333 등), 어두운 배경에는 흰 글자를 사용하세요.'),
+    'alignment': ('layout', '정렬선 맞추기', '요소들이 공통 정렬선 없이 흩어져 있습니다.',
+                  '요소의 왼쪽 끝이나 중심을 서로 맞추고, 여백을 일정하게 유지하세요.'),
+}
+
+
+def analyze(slide):
+    """
+    Analyze a slide and return structured scores and issues.
+
+    Args:
+        slide (dict): Slide in the stored JSON shape
+
+    Returns:
+        dict: score (0-100), per-check scores, issues, metrics, and the
+        readability/content_quality/visual_balance/layout summaries, feedback,
+        suggestions and improvements fields the frontend reads
+    """
+    if not isinstance(slide, dict):
+        slide = {}
+    items = collect_items(slide)
+    background = parse_color(slide.get('backgroundColor') or slide.get('background'), DEFAULT_BACKGROUND)
+
+    results = {
+        'bounds': check_bounds(items),
+        'overlap': check_overlap(items),
+        'readability': check_readability(items),
+        'typography': check_typography(items),
+        'contrast': check_contrast(items, background),
+        'alignment': check_alignment(items),
+    }
+    scores = {name: int(result[0]) for name, result in results.items()}
+    issues = [issue for result in results.values() for issue in result[1]]
+    metrics = {
+        'elements': len(slide.get('elements') or []),
+        'background': _hex(background),
+        # Palette used by elements, for deck-level consistency checks
+        'colors': sorted({_hex(color) for item in items if not item.get('fixed')
+                          for color in (item.get('color'), item.get('fill')) if color})
+    }
+    for result in results.values():
+        metrics.update(result[2])
+
+    overall = round(sum(scores[name] * weight for name, weight in CHECK_WEIGHTS.items()) /
+                    sum(CHECK_WEIGHTS.values()))
+    layout_score = round((scores['bounds'] + scores['overlap'] + scores['alignment']) / 3)
+    failing = [name for name in CHECK_WEIGHTS if scores[name] < 80]
+    improvements = [SUGGESTIONS[name][3] for name in failing]
+
+    return {
+        'score': overall,
+        'scores': scores,
+        'issues': issues,
+        'metrics': metrics,
+        'readability': {
+            'score': _grade(scores['readability']),
+            'feedback': _feedback(('readability',), issues, '텍스트 양과 글자 크기가 적절합니다.')
+        },
+        'content_quality': {
+            'score': _grade(round((scores['readability'] + scores['typography']) / 2)),
+            'feedback': _feedback(('typography',), issues, '글꼴과 글자 크기가 일관됩니다.')
+        },
+        'visual_balance': {
+            'score': _grade(round((layout_score + scores['contrast']) / 2)),
+            'feedback': _feedback(('overlap', 'bounds', 'contrast'), issues, '요소들이 겹치지 않고 잘 보입니다.')
+        },
+        'layout': {
+            'score': _grade(layout_score),
+            'feedback': _feedback(('bounds', 'overlap', 'alignment'), issues, '요소들이 정돈되어 배치되어 있습니다.')
+        },
+        'feedback': _feedback(CHECK_WEIGHTS, [i for i in issues if i['severity'] != 'info'],
+                              '큰 문제가 발견되지 않았습니다.'),
+        'suggestions': improvements,
+        'improvements': improvements
+    }
+
+
+def design_suggestions(analysis):
+    """Design suggestions (type/title/description/suggestion) for the checks an analysis flagged"""
+    suggestions = []
+    for name in CHECK_WEIGHTS:
+        if analysis['scores'][name] >= 80:
+            continue
+        kind, title, description, suggestion = SUGGESTIONS[name]
+        details = [issue['message'] for issue in analysis['issues'] if issue['check'] == name]
+        suggestions.append({
+            'type': kind,
+            'title': title,
+            'description': details[0] if details else description,
+            'suggestion': suggestion,
+            'elements': sorted({e for issue in analysis['issues'] if issue['check'] == name
+                                for e in issue['elements']})
+        })
+    return suggestions
@@ -0,0 +1,257 @@
+"""
+Slide Context Module - Compact, token-budgeted slide summaries for AI prompts
+
+Instead of pasting a slide's raw JSON into a prompt (inline images and table
+data included), the builder describes it as one line per element: type, ID,
+position, size, the few style fields that matter for design advice, and the
+text content truncated. Binary payloads are replaced by a short marker.
+
+If the summary exceeds the token budget, text is truncated harder and finally
+trailing elements are collapsed into a count, so a prompt never grows with the
+size of the slide. Summaries are memoized by slide content hash.
+"""
+
+import json
+import math
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from app.utils.config import AI_CONTEXT_TOKEN_BUDGET, AI_CONTEXT_TEXT_LIMIT, AI_CONTEXT_CACHE_SIZE
+from app.utils.metrics import record_cache
+from app.services.deck_model import slide_hash
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - the estimator below is used instead
+    tiktoken = None
+
+SlideContext = namedtuple('SlideContext', ['text', 'tokens', 'truncated'])
+
+# Style fields included in element lines
+STYLE_FIELDS = ('fontSize', 'fontFamily', 'fontWeight', 'textColor', 'color', 'backgroundColor', 'textAlign')
+
+# Rows/series shown when summarizing tables and charts
+MAX_TABLE_ROWS = 3
+MAX_CHART_LABELS = 8
+
+# Text limits tried, as fractions of the configured limit, before dropping elements
+TRUNCATION_STEPS = (1, 0.5, 0.2)
+MIN_TEXT_LIMIT = 16
+
+_DATA_URL_RE = re.compile(r'data:([\w.+-]+/[\w.+-]+)?[^,]*,', re.IGNORECASE)
+_ASCII_RE = re.compile(r'[\x00-\x7f]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_encoding = None
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """
+    Number of tokens in ``text``.
+
+    Exact with the optional ``tiktoken`` package; otherwise a conservative
+    estimate (about 4 ASCII characters per token, one token per other
+    character, which over-counts Hangul slightly).
+    """
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        return len(_encoding.encode(text))
+    ascii_chars = len(_ASCII_RE.findall(text))
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def _clip(text, limit):
+    text = _WHITESPACE_RE.sub(' ', str(text)).strip()
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return str(round(value)) if value.is_integer() else f"{value:.1f}"
+    return str(value)
+
+
+def describe_blob(value):
+    """Short marker for an inline data URL, or None if ``value`` is not one"""
+    if not isinstance(value, str) or not value.startswith('data:'):
+        return None
+    match = _DATA_URL_RE.match(value)
+    header_length = match.end() if match else 5
+    mime = (match.group(1) if match else None) or 'binary'
+    size = (len(value) - header_length) * 3 // 4
+    return f"<{mime} {size // 1024}KB inline>" if size >= 1024 else f"<{mime} {size}B inline>"
+
+
+def _describe_table(rows, limit):
+    rows = [row for row in rows if isinstance(row, list)]
+    cols = max((len(row) for row in rows), default=0)
+    shown = ' / '.join(' | '.join(_clip(cell, 24) for cell in row) for row in rows[:MAX_TABLE_ROWS])
+    more = f" (+{len(rows) - MAX_TABLE_ROWS} rows)" if len(rows) > MAX_TABLE_ROWS else ''
+    return f"{len(rows)}x{cols} table: {_clip(shown, limit)}{more}"
+
+
+def _describe_chart(data, limit):
+    labels = data.get('labels') or []
+    datasets = data.get('datasets') or []
+    names = [str(d.get('label', '')) for d in datasets if isinstance(d, dict)]
+    text = f"{len(labels)} labels [{', '.join(map(str, labels[:MAX_CHART_LABELS]))}"
+    text += ', …]' if len(labels) > MAX_CHART_LABELS else ']'
+    if names:
+        text += f" series: {', '.join(names)}"
+    return _clip(text, limit)
+
+
+def describe_content(value, limit):
+    """Text form of an element's content: blobs as markers, tables/charts summarized"""
+    blob = describe_blob(value)
+    if blob is not None:
+        return blob
+    if isinstance(value, str):
+        if value.lstrip().startswith(('{', '[')):
+            try:
+                return describe_content(json.loads(value), limit)
+            except ValueError:
+                pass
+        return json.dumps(_clip(value, limit), ensure_ascii=False)
+    if isinstance(value, list) and value and all(isinstance(row, list) for row in value):
+        return _describe_table(value, limit)
+    if isinstance(value, dict):
+        if 'rows' in value and isinstance(value['rows'], list):
+            return _describe_table(value['rows'], limit)
+        if 'labels' in value or 'datasets' in value:
+            return _describe_chart(value, limit)
+        if 'data' in value and isinstance(value['data'], dict):
+            chart_type = value.get('type')
+            summary = _describe_chart(value['data'], limit)
+            return f"{chart_type} chart, {summary}" if chart_type else summary
+    return _clip(json.dumps(value, ensure_ascii=False, default=str), limit)
+
+
+def describe_element(element, limit=AI_CONTEXT_TEXT_LIMIT):
+    """One-line summary of a slide element"""
+    if not isinstance(element, dict):
+        return None
+    parts = [f"- {element.get('type', 'unknown')}"]
+    if element.get('id'):
+        parts.append(f"#{element['id']}")
+    parts.append(f"@({_number(element.get('x', 0))},{_number(element.get('y', 0))}) "
+                 f"{_number(element.get('width', 0))}x{_number(element.get('height', 0))}")
+    if element.get('rotation'):
+        parts.append(f"rot {_number(element['rotation'])}")
+    style = element.get('style')
+    if isinstance(style, dict):
+        styled = [f"{key}={_clip(style[key], 32)}" for key in STYLE_FIELDS if style.get(key)]
+        if styled:
+            parts.append(' '.join(styled))
+    for key in ('content', 'src', 'data'):
+        if element.get(key) not in (None, ''):
+            parts.append(f"{key}: {describe_content(element[key], limit)}")
+    return ' '.join(parts)
+
+
+def _header_lines(slide, limit):
+    lines = []
+    if slide.get('title'):
+        lines.append(f"title: {describe_content(slide['title'], limit)}")
+    if slide.get('content'):
+        content = slide['content']
+        if isinstance(content, list):
+            content = '\n'.join(map(str, content))
+        lines.append(f"content: {describe_content(content, limit * 2)}")
+    background = slide.get('background')
+    if background:
+        lines.append(f"background: {describe_blob(background) or _clip(background, 48)}")
+    return lines
+
+
+def _type_counts(elements):
+    counts = {}
+    for element in elements:
+        kind = element.get('type', 'unknown') if isinstance(element, dict) else 'unknown'
+        counts[kind] = counts.get(kind, 0) + 1
+    return ', '.join(f"{kind} {count}" for kind, count in sorted(counts.items()))
+
+
+def _render(slide, limit, max_elements=None):
+    elements = slide.get('elements') or []
+    lines = _header_lines(slide, limit)
+    if elements:
+        lines.append(f"elements ({len(elements)}: {_type_counts(elements)}):")
+        shown = elements if max_elements is None else elements[:max_elements]
+        lines.extend(line for line in (describe_element(e, limit) for e in shown) if line)
+        if len(shown) < len(elements):
+            lines.append(f"- … {len(elements) - len(shown)} more ({_type_counts(elements[len(shown):])})")
+    return '\n'.join(lines)
+
+
+def _fit(slide, budget, text_limit):
+    """Summary within ``budget`` tokens, degrading text length, then element count"""
+    for step in TRUNCATION_STEPS:
+        limit = max(MIN_TEXT_LIMIT, int(text_limit * step))
+        text = _render(slide, limit)
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            return SlideContext(text, tokens, step != 1)
+
+    # Drop trailing elements; binary search for the largest count that fits
+    elements = slide.get('elements') or []
+    low, high = 0, len(elements)
+    best = SlideContext(_render(slide, limit, 0), None, True)
+    while low <= high:
+        middle = (low + high) // 2
+        text = _render(slide, limit, middle)
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            best = SlideContext(text, tokens, True)
+            low = middle + 1
+        else:
+            high = middle - 1
+    if best.tokens is None:
+        # Even the header alone is over budget: cut it down to size
+        text = best.text
+        tokens = count_tokens(text)
+        while tokens > budget and text:
+            text = text[:int(len(text) * budget / tokens)]
+            tokens = count_tokens(text)
+        best = SlideContext(text, tokens, True)
+    return best
+
+
+def build_slide_context(slide, budget=AI_CONTEXT_TOKEN_BUDGET, text_limit=AI_CONTEXT_TEXT_LIMIT):
+    """
+    Compact text summary of a slide for use in an AI prompt.
+
+    Args:
+        slide (dict): Slide in the stored JSON shape
+        budget (int): Maximum number of tokens for the summary
+        text_limit (int): Characters kept from each text field before truncation
+
+    Returns:
+        SlideContext: (text, tokens, truncated)
+    """
+    if not isinstance(slide, dict):
+        return SlideContext('', 0, False)
+    key = (slide_hash(slide), budget, text_limit)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    record_cache('slide_context', cached is not None)
+    if cached is not None:
+        return cached
+
+    context = _fit(slide, budget, text_limit)
+    with _cache_lock:
+        _cache[key] = context
+        while len(_cache) > AI_CONTEXT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return context
+
+
+def slide_context_text(slide, budget=AI_CONTEXT_TOKEN_BUDGET):
+    """Just the summary text of ``build_slide_context``"""
+    return build_slide_context(slide, budget).text
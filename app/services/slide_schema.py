@@ -0,0 +1,112 @@
+"""
+Slide Schema Module - Validation for slide and element data produced by the LLM
+
+Invalid elements are dropped individually instead of discarding the whole
+response, and geometry fields are coerced to numbers so the editor can render
+them.
+"""
+
+from app.utils.logger import logger
+
+ELEMENT_TYPES = {'shape', 'text', 'image', 'chart', 'table'}
+
+# Geometry fields and their defaults
+NUMERIC_FIELDS = {
+    'x': 0,
+    'y': 0,
+    'width': 100,
+    'height': 100,
+    'rotation': 0,
+    'zIndex': 0
+}
+REQUIRED_NUMERIC_FIELDS = ('x', 'y', 'width', 'height')
+
+
+def _to_number(value):
+    """Coerce ints, floats and numeric strings such as "120" or "120px" to a number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text.endswith('px'):
+            text = text[:-2]
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        return int(number) if number.is_integer() else number
+    return None
+
+
+def validate_element(elem):
+    """
+    Validate and normalize a single slide element.
+
+    Args:
+        elem (dict): Element data from the LLM
+
+    Returns:
+        dict | None: Normalized element, or None if it cannot be used
+    """
+    if not isinstance(elem, dict):
+        return None
+
+    elem_type = elem.get('type')
+    if elem_type not in ELEMENT_TYPES:
+        logger.warning(f"Dropping element with unknown type: {elem_type!r}")
+        return None
+
+    normalized = dict(elem)
+    for field, default in NUMERIC_FIELDS.items():
+        if field not in elem:
+            if field in REQUIRED_NUMERIC_FIELDS:
+                normalized[field] = default
+            continue
+        number = _to_number(elem[field])
+        if number is None:
+            logger.warning(f"Dropping element with non-numeric {field}: {elem[field]!r}")
+            return None
+        normalized[field] = number
+
+    if normalized['width'] <= 0 or normalized['height'] <= 0:
+        logger.warning("Dropping element with non-positive size")
+        return None
+
+    if 'style' in normalized and not isinstance(normalized['style'], dict):
+        normalized['style'] = {}
+
+    if 'content' in normalized and not isinstance(normalized['content'], str):
+        normalized['content'] = str(normalized['content'])
+
+    return normalized
+
+
+def validate_elements(elements):
+    """Return the valid, normalized elements of a list"""
+    if not isinstance(elements, list):
+        return []
+    return [e for e in (validate_element(elem) for elem in elements) if e is not None]
+
+
+def validate_slide(slide):
+    """
+    Validate and normalize a single slide.
+
+    Args:
+        slide (dict): Slide data from the LLM
+
+    Returns:
+        dict | None: Normalized slide, or None if it is not a slide object
+    """
+    if not isinstance(slide, dict):
+        return None
+
+    normalized = dict(slide)
+    normalized['title'] = str(slide.get('title', ''))
+    content = slide.get('content', '')
+    normalized['content'] = '\n'.join(map(str, content)) if isinstance(content, list) else str(content)
+    if 'elements' in slide:
+        normalized['elements'] = validate_elements(slide['elements'])
+    return normalized
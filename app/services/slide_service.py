@@ -1,25 +1,271 @@
+import contextvars
+import hashlib
 import json
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.utils.logger import logger
-from app.services.ai_service import generate_ai_response
+from app.utils.tracing import traced, span
+from app.utils.config import SLIDE_GENERATION_MODE, SLIDE_PARALLEL_THRESHOLD, SLIDE_GENERATION_WORKERS
+from app.utils.json_stream import JSONArrayStream, parse_array_items
+from app.utils.json_patch import apply_patch, parse_pointer, JSONPatchError
+from app.services.slide_schema import validate_slide, validate_elements
+from app.services.deck_model import new_element_id, deck_index_cache
+from app.services.slide_context import slide_context_text
+from app.services.spatial_index import place_elements
+from app.services.ai_service import generate_ai_response, stream_ai_response
+from app.services.session_store import get_session_store, new_session_data
+from app.services.deck_history import get_deck_history
+from app.services.blob_store import get_blob_store, externalize_images
 
 # Store active presentation sessions
-ppt_sessions = {}
+session_store = get_session_store()
+deck_history = get_deck_history()
 
+# Shared pool for per-slide generation calls (created lazily, after any fork)
+_generation_pool = None
+_generation_pool_lock = threading.Lock()
+
+# Top-level session keys that slide patches may touch
+PATCHABLE_KEYS = ('slides', 'theme')
+class SlideVersionConflict(Exception):
+    """Raised when a save is based on an outdated version of the deck"""
+    
+    def __init__(self, current_version):
+        super().__init__(f"Slides were modified (current version {current_version})")
+        self.current_version = current_version
+
+def bump_version(data):
+    """Mark a session as modified and return its new version"""
+    data['version'] = data.get('version', 0) + 1
+    return data['version']
+
+def commit_version(session_id, data, amend=False, touched=None):
+    """
+    Mark a session as modified, record the change in its undo history and
+    return the new version. ``amend`` folds the change into the current undo
+    step (for normalizations such as assigned IDs) instead of adding one.
+    
+    ``touched`` lists the slides the change modified in place (None when not
+    known); with the in-process history of a live session store only those
+    are re-encoded.
+    """
+    version = bump_version(data)
+    deck_history.record(session_id, data, amend=amend, touched=touched)
+    return version
+
+def check_version(data, base_version):
+    """Raise SlideVersionConflict unless base_version matches the session (None skips the check)"""
+    if base_version is not None and base_version != data.get('version', 0):
+        raise SlideVersionConflict(data.get('version', 0))
+
+@traced
 def get_session_slides(session_id):
     """Get slides for a specific session"""
-    if session_id not in ppt_sessions:
+    data = session_store.get(session_id)
+    if data is None:
         return []
-    return ppt_sessions[session_id].get('slides', [])
+    return data.get('slides', [])
+
+@traced
+def get_session_deck(session_id):
+    """Get slides, version and deck ID for a specific session"""
+    data = session_store.get(session_id)
+    if data is None:
+        return [], 0, ''
+    # The deck as the editor loads it is the first undo step
+    deck_history.seed(session_id, data, touched=())
+    return data.get('slides', []), data.get('version', 0), data.get('deck_id', '')
+
+def deck_etag(session_id, deck_id, version, variant):
+    """Strong ETag for one encoding (``variant``) of a deck version"""
+    scope = hashlib.sha1(f"{session_id}:{deck_id}".encode('utf-8')).hexdigest()[:12]
+    return f"{scope}-{version}-{variant}"
 
+@traced
 def create_session(session_id):
     """Create a new presentation session"""
-    ppt_sessions[session_id] = {
-        'slides': [],
-        'theme': 'default'
-    }
-    return ppt_sessions[session_id]
+    data = new_session_data()
+    session_store.set(session_id, data)
+    deck_history.discard(session_id)
+    return data
+
+@traced
+def store_inline_images(value):
+    """
+    Move inline base64 images in ``value`` (slides, elements or operations)
+    into the image store, rewriting them to their URLs in place. Call before
+    taking the session lock; returns how many were moved.
+    """
+    try:
+        return externalize_images(value, get_blob_store())
+    except OSError as e:
+        logger.error(f"Inline images kept (image store unavailable): {str(e)}")
+        return 0
+
+@traced
+def replace_session_slides(session_id, slides, base_version=None):
+    """
+    Replace the slides of a session, creating the session if needed.
+    
+    Inline images in ``slides`` are moved to the image store first (rewriting
+    them in place). Returns (new version, number of images moved).
+    """
+    moved = store_inline_images(slides)
+    with session_store.transaction(session_id, create=True) as data:
+        check_version(data, base_version)
+        data['slides'] = slides
+        # Every slide is new: listing them keeps them known to the history, so
+        # later patches re-encode only what they change
+        return commit_version(session_id, data, touched=slides), moved
+
+@traced
+def save_session_slides(session_id, slides):
+    """Replace the slides of a session, creating the session if needed"""
+    replace_session_slides(session_id, slides)
+    return slides
+
+@traced
+def patch_session_slides(session_id, operations, base_version=None):
+    """
+    Apply JSON Patch operations to a session's slides and theme.
+    
+    Paths are rooted at the session, e.g. ``/slides/2/elements/0/x``. Returns
+    the new version; raises SlideVersionConflict, JSONPatchError or KeyError
+    (unknown session).
+    """
+    if not isinstance(operations, list):
+        raise JSONPatchError("Patch must be a list of operations")
+    for operation in operations:
+        paths = [operation.get('path')] if isinstance(operation, dict) else [None]
+        if isinstance(operation, dict) and 'from' in operation:
+            paths.append(operation.get('from'))
+        for path in paths:
+            tokens = parse_pointer(path)
+            if not tokens or tokens[0] not in PATCHABLE_KEYS:
+                raise JSONPatchError(f"Path is not patchable: {path}")
+            if len(tokens) == 1 and operation.get('op') in ('remove', 'move'):
+                raise JSONPatchError(f"Cannot remove or move {path}")
+        if operation.get('path') == '/slides' and operation.get('op') in ('add', 'replace') \
+                and not _is_slide_list(operation.get('value')):
+            raise JSONPatchError("/slides must be a list of slide objects")
+    store_inline_images(operations)
+    
+    with session_store.transaction(session_id) as data:
+        if data is None:
+            raise KeyError(session_id)
+        check_version(data, base_version)
+        touched = []
+        apply_patch(data, operations,
+                    before=lambda document, operation: _note_patched_slides(document, operation, touched),
+                    check=_check_patched_session)
+        return commit_version(session_id, data, touched=touched)
+
+def _is_slide_list(value):
+    return isinstance(value, list) and all(isinstance(slide, dict) for slide in value)
+
+def _check_patched_session(data):
+    """Reject a patch that leaves the slides or theme with the wrong type (it is rolled back)"""
+    if not _is_slide_list(data.get('slides')):
+        raise JSONPatchError("/slides must be a list of slide objects")
+    if not isinstance(data.get('theme', 'default'), str):
+        raise JSONPatchError("/theme must be a string")
+
+def _note_patched_slides(data, operation, touched):
+    """
+    Add the slides an operation changes in place (paths below ``/slides/<i>``)
+    to ``touched``. Slides added or replaced whole are new objects and are
+    encoded anyway; theme changes touch no slide.
+    """
+    paths = [operation.get('path')]
+    if operation.get('op') == 'move':
+        paths.append(operation.get('from'))
+    slides = data.get('slides')
+    for path in paths:
+        tokens = parse_pointer(path)
+        if len(tokens) > 2 and tokens[0] == 'slides' and tokens[1].isdigit() and isinstance(slides, list):
+            index = int(tokens[1])
+            if index < len(slides):
+                touched.append(slides[index])
+
+@traced
+def get_session_element(session_id, element_id):
+    """Get an element and the index of its slide, or (None, None)"""
+    data = session_store.peek(session_id)
+    if data is None:
+        return None, None
+    deck = deck_index_cache.deck(session_id, data)
+    location = deck.locate(element_id)
+    deck_index_cache.remember(session_id, data, deck)
+    if location is None:
+        return None, None
+    return deck.get_element(element_id), location[0]
+
+@traced
+def update_session_element(session_id, element_id, changes, base_version=None):
+    """
+    Merge changes into one element, addressed by ID.
+    
+    Returns (element, version); raises KeyError if the session or element does
+    not exist and SlideVersionConflict on a stale base version.
+    """
+    store_inline_images(changes)
+    with session_store.transaction(session_id) as data:
+        if data is None:
+            raise KeyError(session_id)
+        check_version(data, base_version)
+        deck = deck_index_cache.deck(session_id, data)
+        element = deck.update_element(element_id, changes)
+        if element is None:
+            raise KeyError(element_id)
+        slide = data['slides'][deck.locate(element_id)[0]]
+        version = commit_version(session_id, data, touched=(slide,))
+        deck_index_cache.remember(session_id, data, deck)
+        return element, version
+
+@traced
+def delete_session_element(session_id, element_id, base_version=None):
+    """Remove one element, addressed by ID; returns the new version"""
+    with session_store.transaction(session_id) as data:
+        if data is None:
+            raise KeyError(session_id)
+        check_version(data, base_version)
+        deck = deck_index_cache.deck(session_id, data, take=True)
+        location = deck.locate(element_id)
+        if location is None:
+            raise KeyError(element_id)
+        deck.remove_element(element_id)
+        version = commit_version(session_id, data, touched=(data['slides'][location[0]],))
+        deck_index_cache.remember(session_id, data, deck)
+        return version
+
+@traced
+def update_session_theme(session_id, theme):
+    """Update the theme of a session, creating the session if needed"""
+    with session_store.transaction(session_id, create=True) as data:
+        data['theme'] = theme
+        commit_version(session_id, data, touched=())
+
+@traced
+def step_session_history(session_id, delta):
+    """
+    Undo (``delta`` -1) or redo (+1) the last change to a session's deck.
+    
+    Returns (slides, theme, version, history state); raises KeyError (unknown
+    session) or HistoryError (nothing to undo or redo).
+    """
+    with session_store.transaction(session_id) as data:
+        if data is None:
+            raise KeyError(session_id)
+        state = deck_history.step(session_id, data, delta)
+        version = bump_version(data)
+        deck_history.written(session_id, version)
+        return data['slides'], data['theme'], version, state
+
+def get_session_history(session_id):
+    """Undo/redo availability and size of a session's history"""
+    return deck_history.state(session_id)
 
+@traced
 def create_demo_slides(session_id, topic, slide_count):
     """Create demo slides when API key is not available"""
     logger.warning("Creating demo slides without DeepSeek API")
@@ -70,79 +316,202 @@ def create_demo_slides(session_id, topic, slide_count):
         })
     
     # Save slides in session
-    ppt_sessions[session_id]['slides'] = slides_data
+    return save_session_slides(session_id, slides_data)
+
+def build_topic_messages(topic, slide_count):
+    """Build the chat messages asking for a deck on a topic"""
+    return [
+        {"role": "system", "content": """당신은 전문적인 PPT 디자인 전문가입니다. 
+        사용자가 입력한 주제와 슬라이드 개수에 맞춰 프레젠테이션 구조를 JSON 형식으로 만들어주세요.
+        각 슬라이드는 제목과 내용을 포함해야 하며, 필요에 따라 시각적 요소(도형, 텍스트 상자, 이미지 등)도 제안할 수 있습니다.
+        
+        응답은 다음 JSON 형식을 따라야 합니다:
+        [
+            {
+                "title": "슬라이드 제목",
+                "content": "슬라이드 내용",
+                "elements": [
+                    {
+                        "type": "shape",
+                        "content": "rectangle",
+                        "x": 100,
+                        "y": 100,
+                        "width": 200,
+                        "height": 100,
+                        "style": {
+                            "color": "#3498db",
+                            "borderStyle": "solid"
+                        }
+                    }
+                ]
+            }
+        ]
+        
+        JSON 형식으로만 응답하세요. 추가 설명은 포함하지 마세요."""},
+        {"role": "user", "content": f"""주제: {topic}
+        슬라이드 개수: {slide_count}
+        
+        위 주제에 맞는 프레젠테이션 슬라이드를 {slide_count}장 생성해주세요.
+        첫 번째 슬라이드는 타이틀 슬라이드로, 나머지는 내용 슬라이드로 구성해주세요.
+        내용 슬라이드는 논리적 흐름에 따라 구성하고, 각 슬라이드는 간결하고 명확한 내용으로 작성해주세요.
+        """}
+    ]
+
+def assign_element_ids(slides_data, taken=None):
+    """Give elements unique IDs, replacing missing ones and ones already in ``taken``"""
+    taken = set() if taken is None else taken
+    for slide in slides_data:
+        for elem in slide.get('elements') or []:
+            if elem.get('id') is None or elem['id'] in taken:
+                elem['id'] = new_element_id()
+            taken.add(elem['id'])
     return slides_data
 
-def generate_slides_from_topic(session_id, topic, slide_count):
+def build_outline_messages(topic, slide_count):
+    """Build the chat messages asking for a short deck outline"""
+    return [
+        {"role": "system", "content": """당신은 전문적인 PPT 디자인 전문가입니다.
+        사용자가 입력한 주제에 맞춰 프레젠테이션 개요를 JSON 배열로 만들어주세요.
+        각 항목은 {"title": "슬라이드 제목", "summary": "한 문장 요약"} 형식이어야 합니다.
+        
+        JSON 형식으로만 응답하세요. 추가 설명은 포함하지 마세요."""},
+        {"role": "user", "content": f"""주제: {topic}
+        슬라이드 개수: {slide_count}
+        
+        위 주제에 맞는 프레젠테이션 개요를 {slide_count}개 항목으로 작성해주세요.
+        첫 번째 항목은 타이틀 슬라이드로, 나머지는 논리적 흐름에 따른 내용 슬라이드로 구성해주세요.
+        """}
+    ]
+
+def build_slide_body_messages(topic, outline, index):
+    """Build the chat messages asking for the body of one slide of an outline"""
+    outline_text = "\n".join(f"{i + 1}. {item['title']}" for i, item in enumerate(outline))
+    item = outline[index]
+    messages = build_topic_messages(topic, 1)
+    messages[1] = {"role": "user", "content": f"""주제: {topic}
+        전체 개요:
+        {outline_text}
+        
+        위 개요의 {index + 1}번째 슬라이드 "{item['title']}"({item.get('summary', '')})만 생성해주세요.
+        {'타이틀 슬라이드로 구성해주세요.' if index == 0 else '간결하고 명확한 내용으로 작성해주세요.'}
+        응답은 슬라이드 1개를 담은 JSON 배열로 반환하세요.
+        """}
+    return messages
+
+def should_generate_in_parallel(slide_count):
+    """Whether a deck of this size uses outline + parallel per-slide generation"""
+    if SLIDE_GENERATION_MODE == 'parallel':
+        return slide_count > 1
+    if SLIDE_GENERATION_MODE == 'auto':
+        return slide_count >= SLIDE_PARALLEL_THRESHOLD
+    return False
+
+def get_generation_pool():
+    """Return the shared per-slide generation thread pool"""
+    global _generation_pool
+    if _generation_pool is None:
+        with _generation_pool_lock:
+            if _generation_pool is None:
+                _generation_pool = ThreadPoolExecutor(max_workers=SLIDE_GENERATION_WORKERS,
+                                                      thread_name_prefix='slide-gen')
+    return _generation_pool
+
+@traced
+def generate_slide_outline(topic, slide_count, use_cache=True):
+    """Phase 1: one short call returning [{"title", "summary"}, ...]"""
+    api_response = generate_ai_response(build_outline_messages(topic, slide_count), use_cache=use_cache)
+    if '오류' in api_response or '잔액' in api_response:
+        return []
+    return parse_outline(api_response, slide_count)
+
+def parse_outline(api_response, slide_count):
+    """Extract [{"title", "summary"}, ...] from an outline response"""
+    items, _ = parse_array_items(api_response)
+    outline = [
+        {"title": str(item["title"]), "summary": str(item.get("summary", ""))}
+        for item in items
+        if isinstance(item, dict) and item.get("title")
+    ]
+    return outline[:slide_count]
+
+@traced
+def generate_slide_body(topic, outline, index, use_cache=True):
+    """Phase 2: generate one slide of the outline, falling back to the outline entry"""
+    fallback = {"title": outline[index]["title"], "content": outline[index]["summary"], "elements": []}
+    try:
+        api_response = generate_ai_response(build_slide_body_messages(topic, outline, index),
+                                            use_cache=use_cache)
+        if '오류' in api_response or '잔액' in api_response:
+            return fallback
+        items, _ = parse_array_items(api_response)
+        for item in items:
+            slide = validate_slide(item)
+            if slide is not None:
+                return slide
+        logger.warning(f"No slide JSON for outline item {index}, using outline text")
+    except Exception as e:
+        logger.error(f"Slide body generation error ({index}): {str(e)}")
+    return fallback
+
+@traced
+def generate_slides_in_parallel(topic, slide_count, use_cache=True):
+    """
+    Two-phase generation: a short outline call, then slide bodies generated
+    concurrently and merged in outline order. Returns [] if the outline fails.
+    """
+    outline = generate_slide_outline(topic, slide_count, use_cache)
+    if not outline:
+        return []
+    
+    logger.info(f"Generating {len(outline)} slide bodies in parallel for topic: {topic}")
+    pool = get_generation_pool()
+    # Each task runs in a copy of this context, keeping the request ID and trace span
+    futures = [pool.submit(contextvars.copy_context().run, generate_slide_body, topic, outline, i, use_cache)
+               for i in range(len(outline))]
+    return [future.result() for future in futures]
+
+@traced
+def generate_slides_from_topic(session_id, topic, slide_count, use_cache=True):
     """Generate slides from a topic using DeepSeek API"""
+    if should_generate_in_parallel(slide_count):
+        try:
+            slides_data = generate_slides_in_parallel(topic, slide_count, use_cache)
+            if slides_data:
+                # Add IDs to elements for easier manipulation
+                assign_element_ids(slides_data)
+                return save_session_slides(session_id, slides_data)
+            logger.warning("Outline generation failed, falling back to single-call generation")
+        except Exception as e:
+            logger.error(f"Parallel presentation generation error: {str(e)}")
+    
     try:
         # Slide structure generation request message
-        messages = [
-            {"role": "system", "content": """당신은 전문적인 PPT 디자인 전문가입니다. 
-            사용자가 입력한 주제와 슬라이드 개수에 맞춰 프레젠테이션 구조를 JSON 형식으로 만들어주세요.
-            각 슬라이드는 제목과 내용을 포함해야 하며, 필요에 따라 시각적 요소(도형, 텍스트 상자, 이미지 등)도 제안할 수 있습니다.
-            
-            응답은 다음 JSON 형식을 따라야 합니다:
-            [
-                {
-                    "title": "슬라이드 제목",
-                    "content": "슬라이드 내용",
-                    "elements": [
-                        {
-                            "type": "shape",
-                            "content": "rectangle",
-                            "x": 100,
-                            "y": 100,
-                            "width": 200,
-                            "height": 100,
-                            "style": {
-                                "color": "#3498db",
-                                "borderStyle": "solid"
-                            }
-                        }
-                    ]
-                }
-            ]
-            
-            JSON 형식으로만 응답하세요. 추가 설명은 포함하지 마세요."""},
-            {"role": "user", "content": f"""주제: {topic}
-            슬라이드 개수: {slide_count}
-            
-            위 주제에 맞는 프레젠테이션 슬라이드를 {slide_count}장 생성해주세요.
-            첫 번째 슬라이드는 타이틀 슬라이드로, 나머지는 내용 슬라이드로 구성해주세요.
-            내용 슬라이드는 논리적 흐름에 따라 구성하고, 각 슬라이드는 간결하고 명확한 내용으로 작성해주세요.
-            """}
-        ]
+        messages = build_topic_messages(topic, slide_count)
         
         # Call DeepSeek API
         logger.info(f"Generating slides for topic: {topic}, count: {slide_count}")
-        api_response = generate_ai_response(messages)
+        api_response = generate_ai_response(messages, use_cache=use_cache)
         
         # Check for error messages
         if '오류' in api_response or '잔액' in api_response:
             # If there's an API error, create demo slides instead
             return create_demo_slides(session_id, topic, slide_count)
         
-        # Extract JSON part
+        # Extract JSON part, keeping every complete slide even if the output was truncated
         try:
-            # Find JSON block
-            json_start = api_response.find('[')
-            json_end = api_response.rfind(']') + 1
+            with span('slide_service.parse_slides', response_chars=len(api_response)):
+                items, complete = parse_array_items(api_response)
+                slides_data = [slide for slide in map(validate_slide, items) if slide is not None]
             
-            if json_start >= 0 and json_end > json_start:
-                json_part = api_response[json_start:json_end]
-                slides_data = json.loads(json_part)
+            if slides_data:
+                if not complete:
+                    logger.warning(f"Truncated AI response, keeping {len(slides_data)} of {slide_count} slides")
                 
                 # Add IDs to elements for easier manipulation
-                for slide_idx, slide in enumerate(slides_data):
-                    if 'elements' in slide:
-                        for elem_idx, elem in enumerate(slide['elements']):
-                            if 'id' not in elem:
-                                elem['id'] = f"elem_{slide_idx}_{elem_idx}_{int(time.time())}"
+                assign_element_ids(slides_data)
                 
                 # Store slides in session
-                ppt_sessions[session_id]['slides'] = slides_data
-                return slides_data
+                return save_session_slides(session_id, slides_data)
             else:
                 logger.error(f"JSON format not found: {api_response}")
                 return create_demo_slides(session_id, topic, slide_count)
@@ -155,15 +524,49 @@ def generate_slides_from_topic(session_id, topic, slide_count):
         logger.error(f"Presentation generation error: {str(e)}")
         return create_demo_slides(session_id, topic, slide_count)
 
+@traced
+def stream_slides_from_topic(session_id, topic, slide_count):
+    """Generate slides from a topic, yielding each slide as soon as its JSON is complete"""
+    logger.info(f"Streaming slides for topic: {topic}, count: {slide_count}")
+    messages = build_topic_messages(topic, slide_count)
+    stream = JSONArrayStream()
+    slides_data = []
+    element_ids = set()
+    
+    for fragment in stream_ai_response(messages):
+        for item in stream.feed(fragment):
+            slide = validate_slide(item)
+            if slide is None:
+                continue
+            assign_element_ids([slide], element_ids)
+            slides_data.append(slide)
+            yield slide
+        if stream.finished:
+            break
+    
+    if stream.truncated and slides_data:
+        logger.warning(f"Truncated AI stream, keeping {len(slides_data)} of {slide_count} slides")
+    
+    if not slides_data:
+        # Nothing usable arrived (API error or no JSON), fall back to demo slides
+        for slide in create_demo_slides(session_id, topic, slide_count):
+            yield slide
+        return
+    
+    # Store slides in session
+    save_session_slides(session_id, slides_data)
+
+@traced
 def add_elements_with_ai(session_id, slide_index, prompt):
     """Add elements to a slide using AI suggestions"""
-    if session_id not in ppt_sessions:
+    session_data = session_store.get(session_id)
+    if session_data is None:
         return None, "Session not found"
         
-    if slide_index >= len(ppt_sessions[session_id]['slides']):
+    if slide_index >= len(session_data['slides']):
         return None, "Slide index out of range"
         
-    current_slide = ppt_sessions[session_id]['slides'][slide_index]
+    current_slide = session_data['slides'][slide_index]
     
     # DeepSeek API slide edit request
     messages = [
@@ -192,10 +595,10 @@ def add_elements_with_ai(session_id, slide_index, prompt):
         가능한 도형 유형: rectangle, square, circle, oval, triangle, right-triangle, pentagon, hexagon, arrow, double-arrow, star, callout, line, curve
         
         JSON 형식으로만 응답하세요. 추가 설명은 포함하지 마세요."""},
-        {"role": "user", "content": f"""다음 슬라이드에 요청된 시각적 요소를 추가해주세요:
+        {"role": "user", "content": f"""다음 슬라이드에 요청된 시각적 요소를 추가해주세요.
+        기존 요소와 겹치지 않도록 배치하세요 (슬라이드 크기 960x540px).
         
-        제목: {current_slide.get('title', '')}
-        내용: {current_slide.get('content', '')}
+        {slide_context_text(current_slide)}
         
         요청: {prompt}
         
@@ -209,30 +612,34 @@ def add_elements_with_ai(session_id, slide_index, prompt):
     if '오류' in api_response or '잔액' in api_response:
         return None, api_response
     
-    # Extract JSON part
+    # Extract JSON part, keeping every complete element even if the output was truncated
     try:
-        # Find JSON block
-        json_start = api_response.find('[')
-        json_end = api_response.rfind(']') + 1
+        items, complete = parse_array_items(api_response)
+        elements_data = validate_elements(items)
         
-        if json_start >= 0 and json_end > json_start:
-            json_part = api_response[json_start:json_end]
-            elements_data = json.loads(json_part)
+        if elements_data:
+            if not complete:
+                logger.warning(f"Truncated AI response, keeping {len(elements_data)} elements")
             
-            # Add IDs to elements if they don't have one
-            for i, elem in enumerate(elements_data):
-                if 'id' not in elem:
-                    elem['id'] = f"elem_{slide_index}_{len(current_slide.get('elements', []))+i}_{int(time.time())}"
-            
-            # Update slide elements
-            if 'elements' in current_slide:
-                # Add to existing elements
-                current_slide['elements'].extend(elements_data)
-            else:
-                # Create elements array
-                current_slide['elements'] = elements_data
+            # The LLM call runs without the session lock, so re-read the slide
+            # under the lock before appending
+            with session_store.transaction(session_id) as session_data:
+                if session_data is None or slide_index >= len(session_data['slides']):
+                    return None, "Slide index out of range"
+                
+                # Move elements the LLM put on top of existing ones (or off the slide) to free space
+                slide = session_data['slides'][slide_index]
+                moved = place_elements(slide.get('elements') or [], elements_data)
+                if moved:
+                    logger.info(f"Moved {moved} AI elements to free space")
+                
+                # IDs that are missing or already used in the deck get a fresh one
+                deck = deck_index_cache.deck(session_id, session_data, take=True)
+                elements = deck.add_elements(slide_index, elements_data)
+                commit_version(session_id, session_data, touched=(slide,))
+                deck_index_cache.remember(session_id, session_data, deck)
             
-            return current_slide['elements'], None
+            return elements, None
         else:
             logger.error(f"JSON format not found: {api_response}")
             return None, "AI 응답에서 JSON 형식을 찾을 수 없습니다."
@@ -240,5 +647,3 @@ def add_elements_with_ai(session_id, slide_index, prompt):
     except Exception as e:
         logger.error(f"JSON parsing error: {str(e)}")
         return None, f"AI 응답 파싱 실패: {str(e)}"
-        
-import time  # Added for timestamp generation 
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+Spatial Index Module - Uniform grid over element bounding boxes
+
+Answers layout questions on a slide without scanning every element: which
+elements intersect a rectangle, whether a new element would collide, which
+elements are under a point, and where the nearest free spot for an element
+of a given size is. The slide is divided into square cells; each element is
+registered in the cells its box touches, so a query only looks at the few
+elements in the cells the query box touches.
+"""
+
+from collections import defaultdict
+from app.services.export_renderers import SLIDE_WIDTH, SLIDE_HEIGHT, css_px
+
+DEFAULT_CELL_SIZE = 64
+
+# Space kept between a placed element and its neighbours and the slide edge
+PLACEMENT_GAP = 16
+PLACEMENT_MARGIN = 40
+# Candidate positions are tried on a lattice with this spacing
+PLACEMENT_STEP = 16
+SNAP_TOLERANCE = 12
+
+# Elements covering most of the slide are backgrounds, not obstacles
+BACKGROUND_RATIO = 0.9
+
+SLIDE_BOUNDS = (0, 0, SLIDE_WIDTH, SLIDE_HEIGHT)
+
+
+def element_box(element):
+    """Bounding box (x0, y0, x1, y1) of an element dict"""
+    x, y = css_px(element.get('x'), 0), css_px(element.get('y'), 0)
+    return x, y, x + css_px(element.get('width'), 100), y + css_px(element.get('height'), 100)
+
+
+def _intersects(a, b, gap=0):
+    return a[0] < b[2] + gap and b[0] < a[2] + gap and a[1] < b[3] + gap and b[1] < a[3] + gap
+
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+class SpatialIndex:
+    """Uniform-grid index of keyed rectangles"""
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)
+        self._boxes = {}
+
+    @classmethod
+    def from_elements(cls, elements, cell_size=DEFAULT_CELL_SIZE, skip_backgrounds=True):
+        """Index the elements of a slide by ID (or position when an element has none)"""
+        index = cls(cell_size)
+        slide_area = SLIDE_WIDTH * SLIDE_HEIGHT
+        for position, element in enumerate(elements or []):
+            if not isinstance(element, dict):
+                continue
+            box = element_box(element)
+            if skip_backgrounds and (box[2] - box[0]) * (box[3] - box[1]) >= BACKGROUND_RATIO * slide_area:
+                continue
+            index.insert(element.get('id') or f"#{position}", box)
+        return index
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, key):
+        return key in self._boxes
+
+    def _cell_keys(self, box):
+        size = self.cell_size
+        for cx in range(int(box[0] // size), int(box[2] // size) + 1):
+            for cy in range(int(box[1] // size), int(box[3] // size) + 1):
+                yield cx, cy
+
+    def insert(self, key, box):
+        if key in self._boxes:
+            self.remove(key)
+        self._boxes[key] = tuple(box)
+        for cell in self._cell_keys(box):
+            self._cells[cell].add(key)
+
+    def remove(self, key):
+        box = self._boxes.pop(key, None)
+        if box is None:
+            return
+        for cell in self._cell_keys(box):
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._cells[cell]
+
+    def box(self, key):
+        return self._boxes.get(key)
+
+    def _candidates(self, box):
+        found = set()
+        for cell in self._cell_keys(box):
+            found.update(self._cells.get(cell, ()))
+        return found
+
+    def query(self, box, gap=0, exclude=()):
+        """Keys of the rectangles intersecting ``box`` (grown by ``gap``)"""
+        grown = (box[0] - gap, box[1] - gap, box[2] + gap, box[3] + gap)
+        return [key for key in self._candidates(grown)
+                if key not in exclude and _intersects(self._boxes[key], box, gap)]
+
+    def collides(self, box, gap=0, exclude=()):
+        """Whether ``box`` intersects any indexed rectangle"""
+        grown = (box[0] - gap, box[1] - gap, box[2] + gap, box[3] + gap)
+        return any(key not in exclude and _intersects(self._boxes[key], box, gap)
+                   for key in self._candidates(grown))
+
+    def hit_test(self, x, y):
+        """Keys of the rectangles containing the point (x, y)"""
+        return [key for key in self._cells.get((int(x // self.cell_size), int(y // self.cell_size)), ())
+                if self._boxes[key][0] <= x <= self._boxes[key][2] and self._boxes[key][1] <= y <= self._boxes[key][3]]
+
+    def snap(self, box, tolerance=SNAP_TOLERANCE, exclude=()):
+        """
+        Offset (dx, dy) that lines ``box`` up with the nearest neighbouring
+        left/center/right and top/middle/bottom edges within ``tolerance``.
+        """
+        neighbours = [self._boxes[key] for key in self._candidates(
+            (box[0] - 4 * self.cell_size, box[1] - 4 * self.cell_size,
+             box[2] + 4 * self.cell_size, box[3] + 4 * self.cell_size)) if key not in exclude]
+
+        def best(own, others):
+            offsets = [other - mine for mine in own for other in others if abs(other - mine) <= tolerance]
+            return min(offsets, key=abs) if offsets else 0
+
+        xs = [(b[0], (b[0] + b[2]) / 2, b[2]) for b in neighbours]
+        ys = [(b[1], (b[1] + b[3]) / 2, b[3]) for b in neighbours]
+        dx = best((box[0], (box[0] + box[2]) / 2, box[2]), [v for edges in xs for v in edges])
+        dy = best((box[1], (box[1] + box[3]) / 2, box[3]), [v for edges in ys for v in edges])
+        return dx, dy
+
+    def free_position(self, width, height, near=None, bounds=SLIDE_BOUNDS,
+                      gap=PLACEMENT_GAP, margin=PLACEMENT_MARGIN, step=PLACEMENT_STEP):
+        """
+        Top-left corner of the free spot closest to ``near`` where a
+        ``width`` x ``height`` box fits inside ``bounds`` without touching
+        indexed rectangles (keeping ``gap`` px between them).
+
+        Returns:
+            tuple | None: (x, y), or None if the slide has no room
+        """
+        min_x, min_y = bounds[0] + margin, bounds[1] + margin
+        max_x, max_y = bounds[2] - margin - width, bounds[3] - margin - height
+        if max_x < min_x or max_y < min_y:
+            # Too large for the margins: try the whole slide
+            min_x, min_y = bounds[0], bounds[1]
+            max_x, max_y = bounds[2] - width, bounds[3] - height
+            if max_x < min_x or max_y < min_y:
+                return None
+        near_x, near_y = near if near is not None else (min_x, min_y)
+        near_x = min(max(near_x, min_x), max_x)
+        near_y = min(max(near_y, min_y), max_y)
+
+        xs = sorted({near_x, min_x, max_x} | set(range(int(min_x), int(max_x) + 1, step)))
+        ys = sorted({near_y, min_y, max_y} | set(range(int(min_y), int(max_y) + 1, step)))
+        candidates = sorted(((x, y) for x in xs for y in ys),
+                            key=lambda p: (p[0] - near_x) ** 2 + (p[1] - near_y) ** 2)
+        for x, y in candidates:
+            if not self.collides((x, y, x + width, y + height), gap):
+                return x, y
+        return None
+
+
+def place_elements(existing, new_elements, bounds=SLIDE_BOUNDS):
+    """
+    Move new elements that would overlap existing ones (or leave the slide)
+    to the nearest free spot, in place.
+
+    A new element lying entirely inside an earlier new element (a label on a
+    shape the same request created) moves together with it.
+
+    Args:
+        existing (list): Elements already on the slide
+        new_elements (list): Elements about to be added
+
+    Returns:
+        int: Number of elements that were moved
+    """
+    index = SpatialIndex.from_elements(existing)
+    placed = []  # (original box, (dx, dy)) of new elements, for grouping
+    moved = 0
+    for position, element in enumerate(new_elements):
+        box = element_box(element)
+        width, height = box[2] - box[0], box[3] - box[1]
+
+        container = next((offset for original, offset in placed if _contains(original, box)), None)
+        if container is not None:
+            dx, dy = container
+        elif _contains(bounds, box) and not index.collides(box):
+            dx, dy = 0, 0
+        else:
+            spot = index.free_position(width, height, near=(box[0], box[1]), bounds=bounds)
+            if spot is None:
+                dx, dy = 0, 0
+            else:
+                dx, dy = spot[0] - box[0], spot[1] - box[1]
+                candidate = (box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy)
+                sx, sy = index.snap(candidate)
+                snapped = (candidate[0] + sx, candidate[1] + sy, candidate[2] + sx, candidate[3] + sy)
+                if (sx or sy) and _contains(bounds, snapped) and not index.collides(snapped):
+                    dx, dy = dx + sx, dy + sy
+
+        if dx or dy:
+            element['x'] = box[0] + dx
+            element['y'] = box[1] + dy
+            moved += 1
+        placed.append((box, (dx, dy)))
+        if container is None:
+            index.insert(element.get('id') or f"new#{position}",
+                         (box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy))
+    return moved
+
+
+def free_position_for(elements, width, height, near=None):
+    """Nearest free (x, y) for a new ``width`` x ``height`` element on a slide, or ``near``"""
+    spot = SpatialIndex.from_elements(elements).free_position(width, height, near=near)
+    return spot if spot is not None else (near or (PLACEMENT_MARGIN, PLACEMENT_MARGIN))
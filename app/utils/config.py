@@ -8,6 +8,136 @@ load_dotenv()
 DEEPSEAK_API_KEY = os.getenv('DEEPSEAK_API_KEY')
 FLASK_SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'default_secret_key')
 
+# LLM client settings (shared pooled HTTP client, see app/services/llm_client.py)
+OPENAI_API_URL = os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions')
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '3.05'))
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', '60'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '8'))
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '16'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))  # per worker process
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '30'))
+# Async client (ASGI entry point): concurrent upstream calls per event loop
+ASYNC_LLM_MAX_CONCURRENCY = int(os.getenv('ASYNC_LLM_MAX_CONCURRENCY', '256'))
+
+# AI response cache settings ('memory', 'sqlite' or 'none')
+AI_CACHE_BACKEND = os.getenv('AI_CACHE_BACKEND', 'memory')
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', '3600'))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024'))
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', 'cache/ai_cache.sqlite3')
+
+# Request coalescing: identical in-flight AI calls share one upstream request.
+# SINGLE_FLIGHT_SHARED also coalesces across workers through the record store (session backend, separate namespace).
+SINGLE_FLIGHT_SHARED = os.getenv('SINGLE_FLIGHT_SHARED', 'false').lower() == 'true'
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '120'))
+
+# Slide context in AI prompts: compact per-element summary capped at a token budget
+# (exact counts with the optional tiktoken package, an estimate otherwise)
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', '800'))
+AI_CONTEXT_TEXT_LIMIT = int(os.getenv('AI_CONTEXT_TEXT_LIMIT', '200'))  # characters per text field
+AI_CONTEXT_CACHE_SIZE = int(os.getenv('AI_CONTEXT_CACHE_SIZE', '512'))
+
+# Whole-deck analysis (/api/ai/analyze-deck): results are cached per slide content hash;
+# at least DECK_ANALYSIS_PARALLEL_THRESHOLD uncached slides are analyzed in the export process pool
+DECK_ANALYSIS_CACHE_SIZE = int(os.getenv('DECK_ANALYSIS_CACHE_SIZE', '4096'))
+DECK_ANALYSIS_PARALLEL_THRESHOLD = int(os.getenv('DECK_ANALYSIS_PARALLEL_THRESHOLD', '128'))
+DECK_ANALYSIS_BATCH_SIZE = int(os.getenv('DECK_ANALYSIS_BATCH_SIZE', '16'))  # slides per pool task
+
+# Slide generation ('single', 'parallel' or 'auto')
+# 'auto' switches to outline + parallel per-slide generation for decks of at least
+# SLIDE_PARALLEL_THRESHOLD slides; concurrency is also capped by LLM_MAX_CONCURRENCY
+SLIDE_GENERATION_MODE = os.getenv('SLIDE_GENERATION_MODE', 'auto')
+SLIDE_PARALLEL_THRESHOLD = int(os.getenv('SLIDE_PARALLEL_THRESHOLD', '6'))
+SLIDE_GENERATION_WORKERS = int(os.getenv('SLIDE_GENERATION_WORKERS', '4'))
+
+# Presentation session store ('memory', 'sqlite' or 'redis')
+# 'memory' is per-process only; use 'sqlite' or 'redis' with multiple gunicorn workers
+SESSION_STORE_BACKEND = os.getenv('SESSION_STORE_BACKEND', 'sqlite')
+SESSION_STORE_PATH = os.getenv('SESSION_STORE_PATH', 'data/sessions.sqlite3')
+SESSION_STORE_URL = os.getenv('SESSION_STORE_URL', 'redis://localhost:6379/0')
+SESSION_IDLE_TTL = int(os.getenv('SESSION_IDLE_TTL', str(7 * 24 * 3600)))
+SESSION_MAX_SESSIONS = int(os.getenv('SESSION_MAX_SESSIONS', '1000'))  # memory backend bound
+# Memory backend: the most recently used SESSION_HOT_SESSIONS sessions are kept as live dicts,
+# colder ones are packed into the content store (0 keeps every session live)
+SESSION_HOT_SESSIONS = int(os.getenv('SESSION_HOT_SESSIONS', '256'))
+# Element ID indexes of the most recently used decks kept per process (one per session and version)
+DECK_INDEX_CACHE_SESSIONS = int(os.getenv('DECK_INDEX_CACHE_SESSIONS', '1024'))
+
+# Content store: distinct slides, and strings of at least CONTENT_PAYLOAD_MIN characters
+# (image data URLs), are kept once per process and shared by cold sessions and undo history
+CONTENT_PAYLOAD_MIN = int(os.getenv('CONTENT_PAYLOAD_MIN', '1024'))
+
+# Server-side export (/api/export): slides are rendered in a process pool and
+# each rendered slide is cached on disk by content hash
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))
+EXPORT_JOB_THREADS = int(os.getenv('EXPORT_JOB_THREADS', '2'))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '8'))  # slides per pool task
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'data/exports')
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', 'cache/export_parts')
+EXPORT_JOB_TTL = int(os.getenv('EXPORT_JOB_TTL', '3600'))  # finished files are kept this long
+EXPORT_CACHE_TTL = int(os.getenv('EXPORT_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Content-addressed image store (/upload_image, /images/<hash>)
+# IMAGE_RENDITIONS: downscaled variants as name:max_px (longest side)
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', 'data/blobs')
+IMAGE_RENDITIONS = os.getenv('IMAGE_RENDITIONS', 'thumb:320,canvas:1920')
+# Base64 image data URLs of at least INLINE_IMAGE_MIN_SIZE characters in saved decks are
+# moved into the image store and replaced by their /images/<hash> URL
+INLINE_IMAGE_MIN_SIZE = int(os.getenv('INLINE_IMAGE_MIN_SIZE', '1024'))
+
+# Broadcast presenter mode (/api/broadcast): viewers get at most one state update per
+# BROADCAST_MIN_INTERVAL seconds (newer states replace pending ones) and a keep-alive when idle
+BROADCAST_MIN_INTERVAL = float(os.getenv('BROADCAST_MIN_INTERVAL', '0.1'))
+BROADCAST_KEEPALIVE = float(os.getenv('BROADCAST_KEEPALIVE', '15'))
+BROADCAST_IDLE_TTL = int(os.getenv('BROADCAST_IDLE_TTL', str(4 * 3600)))
+BROADCAST_MAX_VIEWERS = int(os.getenv('BROADCAST_MAX_VIEWERS', '10000'))  # per broadcast
+
+# Co-editing (/api/collab): each deck keeps an ordered operation log in the process serving it.
+# Every COLLAB_SNAPSHOT_OPS operations the log is folded into a snapshot, so joining an
+# editing session costs one snapshot plus at most that many operations
+COLLAB_SNAPSHOT_OPS = int(os.getenv('COLLAB_SNAPSHOT_OPS', '200'))
+COLLAB_MAX_BATCH = int(os.getenv('COLLAB_MAX_BATCH', '500'))  # operations per request or message
+COLLAB_POLL_TIMEOUT = float(os.getenv('COLLAB_POLL_TIMEOUT', '25'))  # long-poll fallback
+COLLAB_IDLE_TTL = int(os.getenv('COLLAB_IDLE_TTL', '3600'))
+COLLAB_INVITE_TTL = int(os.getenv('COLLAB_INVITE_TTL', str(7 * 24 * 3600)))
+# Origins (scheme://host[:port], comma separated) besides the app's own host allowed to open
+# the co-editing WebSocket, which is authenticated by the session cookie
+COLLAB_ALLOWED_ORIGINS = {origin.strip().rstrip('/').lower()
+                          for origin in os.getenv('COLLAB_ALLOWED_ORIGINS', '').split(',') if origin.strip()}
+
+# Server-side undo history (/api/history): versions share unchanged slides by content hash.
+# Edits within HISTORY_COALESCE seconds of the previous one become one undo step; the oldest
+# versions are dropped beyond HISTORY_MAX_VERSIONS, HISTORY_MAX_AGE seconds or HISTORY_MAX_BYTES
+# of slide data per session
+HISTORY_MAX_VERSIONS = int(os.getenv('HISTORY_MAX_VERSIONS', '100'))
+HISTORY_MAX_AGE = int(os.getenv('HISTORY_MAX_AGE', str(24 * 3600)))
+HISTORY_MAX_BYTES = int(os.getenv('HISTORY_MAX_BYTES', str(32 * 1024 * 1024)))
+HISTORY_COALESCE = float(os.getenv('HISTORY_COALESCE', '1.0'))
+HISTORY_MAX_SESSIONS = int(os.getenv('HISTORY_MAX_SESSIONS', '1000'))  # per process, least recently used dropped
+
+# Logging: records are queued and written by a background thread as JSON lines
+# LOG_FILE is rotated at LOG_MAX_BYTES (empty to log to the console only);
+# LOG_DEBUG_SAMPLE_RATE is the fraction of verbose debug payloads (full request bodies) kept
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'server.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_CONSOLE_FORMAT = os.getenv('LOG_CONSOLE_FORMAT', 'text')  # 'text' or 'json'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # records beyond this are dropped, never waited on
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.01'))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', '4000'))
+
+# Tracing: fraction of requests traced (0 disables tracing); spans are exported as
+# OTLP/JSON lines to TRACE_FILE and/or an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces)
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+TRACE_FILE = os.getenv('TRACE_FILE', 'data/traces.jsonl')
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', '')
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'ppt-agent')
+TRACE_BATCH_SIZE = int(os.getenv('TRACE_BATCH_SIZE', '512'))  # spans per export
+TRACE_FLUSH_INTERVAL = float(os.getenv('TRACE_FLUSH_INTERVAL', '2'))
+TRACE_QUEUE_SIZE = int(os.getenv('TRACE_QUEUE_SIZE', '10000'))
+
 # Server Configuration
 HOST = '0.0.0.0'  # Listen on all interfaces
 PORT = 5000
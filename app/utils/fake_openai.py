@@ -0,0 +1,182 @@
+"""
+Fake OpenAI Server - Local stand-in for the chat completion API
+
+Used by tests and benchmarks so the LLM client can be exercised without network
+access or an API key. Point the client at it with ``OPENAI_API_URL`` or by
+passing ``api_url=server.url`` to ``LLMClient``.
+
+    with FakeOpenAIServer(reply="안녕하세요", latency=0.2) as server:
+        client = LLMClient(api_url=server.url, api_key="test")
+        client.chat_completion([{"role": "user", "content": "hi"}], "gpt-3.5-turbo")
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out or gave up close the connection mid-response
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeOpenAIServer:
+    """
+    Minimal OpenAI-compatible ``/v1/chat/completions`` server.
+
+    Args:
+        reply (str | callable): Completion text, or ``reply(payload) -> str``
+        latency (float): Seconds to wait before answering each request
+        token_latency (float): Extra seconds per completion token (~4 characters),
+            to simulate generation time growing with output length
+        fail_first (int): Number of initial requests answered with ``fail_status``
+        fail_status (int): HTTP status used for the injected failures
+        chunk_size (int): Characters per chunk for ``stream=true`` requests
+        chunk_latency (float): Seconds between streamed chunks
+        raw_body (bytes): Sent as the 200 response body instead of a completion,
+            to simulate a misbehaving upstream
+    """
+
+    def __init__(self, reply="OK", latency=0.0, fail_first=0, fail_status=503,
+                 chunk_size=8, chunk_latency=0.0, token_latency=0.0, raw_body=None):
+        self.reply = reply
+        self.raw_body = raw_body
+        self.latency = latency
+        self.token_latency = token_latency
+        self.chunk_size = chunk_size
+        self.chunk_latency = chunk_latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def _render_reply(self, payload):
+        return self.reply(payload) if callable(self.reply) else self.reply
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for i in range(0, len(content), server.chunk_size):
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": {"content": content[i:i + server.chunk_size]}}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if server.chunk_latency:
+                        time.sleep(server.chunk_latency)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    self._handle_completion()
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _handle_completion(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests.append(payload)
+                    failing = len(server.requests) <= server.fail_first
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if failing:
+                    self._send_json(server.fail_status, {"error": {"message": "injected failure"}})
+                    return
+
+                if server.raw_body is not None:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(server.raw_body)))
+                    self.end_headers()
+                    self.wfile.write(server.raw_body)
+                    return
+
+                content = server._render_reply(payload)
+                if server.token_latency and not payload.get("stream"):
+                    time.sleep(len(content) / 4 * server.token_latency)
+                if payload.get("stream"):
+                    self._send_stream(content)
+                    return
+
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "model": payload.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": sum(len(str(m.get("content", ""))) for m in payload.get("messages", [])) // 4,
+                        "completion_tokens": len(content) // 4,
+                        "total_tokens": 0
+                    }
+                })
+
+        return Handler
+
+    def start(self):
+        self._httpd = _Server(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
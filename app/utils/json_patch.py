@@ -0,0 +1,161 @@
+"""
+JSON Patch (RFC 6902) for incremental slide saving
+
+Applies ``add``, ``remove``, ``replace``, ``move``, ``copy`` and ``test``
+operations in place, addressed with JSON Pointers (RFC 6901) such as
+``/slides/2/elements/0/x``. The work done is proportional to the number of
+operations, not the size of the document. If any operation fails, the ones
+already applied are undone so the document is left unchanged.
+"""
+
+import copy
+
+
+class JSONPatchError(ValueError):
+    """Raised for malformed operations or paths that do not resolve"""
+
+
+def parse_pointer(pointer):
+    """Split a JSON Pointer into unescaped reference tokens"""
+    if not isinstance(pointer, str):
+        raise JSONPatchError(f"Invalid path: {pointer!r}")
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JSONPatchError(f"Path must start with '/': {pointer}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _list_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JSONPatchError(f"Invalid array index: {token}")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JSONPatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _resolve(document, tokens):
+    """Return the container holding the last token"""
+    target = document
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            target = target[_list_index(target, token)]
+        elif isinstance(target, dict):
+            if token not in target:
+                raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+            target = target[token]
+        else:
+            raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+    if not isinstance(target, (list, dict)):
+        raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return target
+
+
+def _get(document, tokens):
+    if not tokens:
+        return document
+    container = _resolve(document, tokens)
+    key = tokens[-1]
+    if isinstance(container, list):
+        return container[_list_index(container, key)]
+    if key not in container:
+        raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return container[key]
+
+
+def _add(document, tokens, value, undo):
+    if not tokens:
+        raise JSONPatchError("Replacing the whole document is not supported")
+    container = _resolve(document, tokens)
+    key = tokens[-1]
+    if isinstance(container, list):
+        index = _list_index(container, key, allow_end=True)
+        container.insert(index, value)
+        undo.append(lambda: container.pop(index))
+    elif key in container:
+        old = container[key]
+        container[key] = value
+        undo.append(lambda: container.__setitem__(key, old))
+    else:
+        container[key] = value
+        undo.append(lambda: container.pop(key))
+
+
+def _remove(document, tokens, undo):
+    if not tokens:
+        raise JSONPatchError("Removing the whole document is not supported")
+    container = _resolve(document, tokens)
+    key = tokens[-1]
+    if isinstance(container, list):
+        index = _list_index(container, key)
+        old = container.pop(index)
+        undo.append(lambda: container.insert(index, old))
+    else:
+        if key not in container:
+            raise JSONPatchError(f"Path not found: /{'/'.join(tokens)}")
+        old = container.pop(key)
+        undo.append(lambda: container.__setitem__(key, old))
+    return old
+
+
+def _apply_operation(document, operation, undo):
+    if not isinstance(operation, dict):
+        raise JSONPatchError(f"Invalid operation: {operation!r}")
+    op = operation.get('op')
+    tokens = parse_pointer(operation.get('path'))
+
+    if op in ('add', 'replace', 'test') and 'value' not in operation:
+        raise JSONPatchError(f"'{op}' operation requires a value")
+
+    if op == 'add':
+        _add(document, tokens, operation['value'], undo)
+    elif op == 'remove':
+        _remove(document, tokens, undo)
+    elif op == 'replace':
+        _remove(document, tokens, undo)
+        _add(document, tokens, operation['value'], undo)
+    elif op in ('move', 'copy'):
+        from_tokens = parse_pointer(operation.get('from'))
+        if op == 'move':
+            if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                raise JSONPatchError("Cannot move a value into one of its children")
+            value = _remove(document, from_tokens, undo)
+        else:
+            value = copy.deepcopy(_get(document, from_tokens))
+        _add(document, tokens, value, undo)
+    elif op == 'test':
+        if _get(document, tokens) != operation['value']:
+            raise JSONPatchError(f"Test failed at {operation.get('path')}")
+    else:
+        raise JSONPatchError(f"Unsupported operation: {op!r}")
+
+
+def apply_patch(document, operations, before=None, check=None):
+    """
+    Apply a list of JSON Patch operations to ``document`` in place.
+
+    All-or-nothing: on error every operation already applied is rolled back
+    before ``JSONPatchError`` is raised. ``before(document, operation)`` is
+    called ahead of each operation, while its paths still resolve as written;
+    ``check(document)`` runs after the last one, and raising there rolls the
+    patch back as well.
+    """
+    if not isinstance(operations, list):
+        raise JSONPatchError("Patch must be a list of operations")
+    undo = []
+    try:
+        for operation in operations:
+            if before is not None:
+                before(document, operation)
+            _apply_operation(document, operation, undo)
+        if check is not None:
+            check(document)
+    except BaseException:
+        for revert in reversed(undo):
+            revert()
+        raise
+    return document
@@ -0,0 +1,141 @@
+"""
+Incremental JSON array parsing for streamed LLM output
+
+LLM responses for slides and elements are a JSON array, often wrapped in prose
+or code fences. ``JSONArrayStream`` is fed text fragments as they arrive and
+returns each top-level array item as soon as its closing bracket is seen.
+Because items are emitted one by one, trailing junk after the array is ignored
+and a truncated response still yields every item that was completed.
+"""
+
+import json
+from app.utils.logger import logger
+
+
+class JSONArrayStream:
+    """Extract complete top-level items from a JSON array fed in fragments"""
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0            # next unscanned index in _buffer
+        self._item_start = None  # index of the current item's first character
+        self._depth = 0          # 0 = before the array, 1 = between items
+        self._in_string = False
+        self._escape = False
+        self.started = False
+        self.finished = False
+
+    @property
+    def truncated(self):
+        """True if the array was opened but its closing bracket has not been seen"""
+        return self.started and not self.finished
+
+    def feed(self, text):
+        """
+        Add a fragment and return the items completed by it.
+
+        Args:
+            text (str): Next fragment of the response
+
+        Returns:
+            list: Parsed items, in order
+        """
+        if self.finished or not text:
+            return []
+
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        i = self._pos
+        length = len(buffer)
+
+        while i < length:
+            ch = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                i += 1
+                continue
+
+            if self._depth == 0:
+                # Skip any prose before the array opens
+                if ch == '[':
+                    self._depth = 1
+                    self.started = True
+                i += 1
+                continue
+
+            if self._depth == 1 and self._item_start is None:
+                if ch == ']':
+                    self.finished = True
+                    break
+                if ch in ' \t\r\n,':
+                    i += 1
+                    continue
+                self._item_start = i
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 1:
+                    items.extend(self._emit(buffer[self._item_start:i + 1]))
+                elif self._depth == 0:
+                    # Closing bracket of the array ends a pending scalar item
+                    items.extend(self._emit(buffer[self._item_start:i]))
+                    self.finished = True
+                    break
+            elif ch == ',' and self._depth == 1:
+                items.extend(self._emit(buffer[self._item_start:i]))
+            i += 1
+
+        # Drop consumed text so the buffer only holds the current item
+        keep_from = self._item_start if self._item_start is not None else i
+        self._buffer = buffer[keep_from:]
+        self._pos = i - keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+    def _emit(self, text):
+        self._item_start = None
+        text = text.strip()
+        if not text:
+            return []
+        try:
+            return [json.loads(text)]
+        except ValueError as e:
+            logger.warning(f"Skipping unparsable array item: {str(e)}")
+            return []
+
+
+def iter_array_items(fragments):
+    """Yield top-level JSON array items from an iterable of text fragments"""
+    stream = JSONArrayStream()
+    for fragment in fragments:
+        for item in stream.feed(fragment):
+            yield item
+        if stream.finished:
+            break
+
+
+def parse_array_items(text):
+    """
+    Parse the first JSON array in ``text``, recovering the valid prefix if it is truncated.
+
+    Args:
+        text (str): Full LLM response
+
+    Returns:
+        tuple: (items, complete) where ``complete`` is False if the array never closed
+    """
+    stream = JSONArrayStream()
+    items = stream.feed(text)
+    return items, stream.finished
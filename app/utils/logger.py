@@ -1,17 +1,262 @@
+"""
+Logger Module - Structured, non-blocking logging
+
+Request threads never touch a file or the console: the handler on the root
+logger only puts records on a bounded in-memory queue, and a background
+listener thread formats them and writes them out. The log file gets one JSON
+object per line and is rotated by size; the console gets the familiar text
+format (or JSON with ``LOG_CONSOLE_FORMAT=json``). If the queue is full the
+record is dropped and counted instead of making the request wait.
+
+Every record logged while a request is handled carries its request ID (taken
+from an ``X-Request-ID`` header or generated, and echoed in the response), and
+each request ends with an access record with its route, status and duration.
+Full request payloads are only logged at DEBUG level for a sampled fraction of
+requests (``debug_payload``).
+"""
+
+import atexit
+import contextvars
+import json
 import logging
 import os
+import queue
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, request
+from app.utils.config import (
+    LOG_LEVEL,
+    LOG_FILE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_CONSOLE_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_DEBUG_SAMPLE_RATE,
+    LOG_PAYLOAD_MAX_CHARS
+)
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+# Client-supplied request IDs are accepted only in this shape
+_REQUEST_ID_RE = re.compile(r'^[\w.:-]{1,64}$')
+
+# LogRecord attributes that are not user fields (anything else came from ``extra``)
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_queue_handler = None
+_listener = None
+
+
+def get_request_id():
+    """ID of the request being handled in this context, or None"""
+    return _request_id.get()
+
+
+def new_request_id(supplied=None):
+    """The client's request ID if it is well-formed, otherwise a fresh one"""
+    if supplied and _REQUEST_ID_RE.match(supplied):
+        return supplied
+    return uuid.uuid4().hex
+
+
+def bind_request_id(request_id):
+    """Attach ``request_id`` to records logged in this context; returns a token for ``unbind_request_id``"""
+    return _request_id.set(request_id)
+
+
+def unbind_request_id(token):
+    _request_id.reset(token)
+
+
+class _RequestIdFilter(logging.Filter):
+    """Stamps the current request ID on each record (runs in the caller's thread)"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of waiting"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Only the message is merged here; JSON formatting happens in the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _serialize_payload(payload):
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = text[:LOG_PAYLOAD_MAX_CHARS] + f"…(+{len(text) - LOG_PAYLOAD_MAX_CHARS} chars)"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request ID and extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = _serialize_payload(value) if key == 'payload' else value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The plain console format, with the request ID appended when there is one"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        request_id = getattr(record, 'request_id', None)
+        return f"{text} [{request_id}]" if request_id else text
+
+
+def _output_handlers():
+    handlers = []
+    if LOG_FILE:
+        directory = os.path.dirname(LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                           encoding='utf-8', delay=True)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if LOG_CONSOLE_FORMAT == 'json' else TextFormatter())
+    handlers.append(console)
+    return handlers
+
+
+def _start_listener(handlers):
+    global _listener
+    _queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork (e.g. gunicorn --preload); the old
+    # queue may have been locked mid-operation, so the child starts with a new one
+    if _listener is not None:
+        _start_listener(_listener.handlers)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    """Number of records dropped because the queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
 
 def setup_logger(name='ppt_agent'):
     """Set up and configure logger"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('server.log'),
-            logging.StreamHandler()  # Console output
-        ]
-    )
+    global _queue_handler
+    if _queue_handler is None:
+        _queue_handler = _NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(_RequestIdFilter())
+        _start_listener(_output_handlers())
+        atexit.register(stop_logging)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+
+        # Like logging.basicConfig: leave an already configured root logger alone
+        root = logging.getLogger()
+        if not root.handlers:
+            root.addHandler(_queue_handler)
+            root.setLevel(LOG_LEVEL)
     return logging.getLogger(name)
 
+
+def debug_payload(log, message, payload, **fields):
+    """
+    Log a verbose payload (e.g. a full request body) at DEBUG level for a
+    sampled fraction (``LOG_DEBUG_SAMPLE_RATE``) of calls.
+
+    The payload is serialized and truncated in the listener thread, so it must
+    not be modified after the call. Returns whether it was logged.
+    """
+    if not log.isEnabledFor(logging.DEBUG) or random.random() >= LOG_DEBUG_SAMPLE_RATE:
+        return False
+    log.debug(message, extra={'payload': payload, 'sample_rate': LOG_DEBUG_SAMPLE_RATE, **fields})
+    return True
+
+
 # Create main logger instance
-logger = setup_logger() 
\ No newline at end of file
+logger = setup_logger()
+access_logger = logging.getLogger('ppt_agent.access')
+
+
+def log_request(method, path, route, status, seconds):
+    """Access record for a finished request"""
+    access_logger.info(f"{method} {path} {status}", extra={
+        'method': method, 'path': path, 'route': route, 'status': status,
+        'duration_ms': round(seconds * 1000, 2)
+    })
+
+
+def init_request_logging(app):
+    """Assign each Flask request an ID (echoed as X-Request-ID) and log an access record"""
+
+    @app.before_request
+    def _bind_request_id():
+        g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+        g.request_id_token = bind_request_id(g.request_id)
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        request_id = g.get('request_id')
+        if request_id is not None:
+            response.headers['X-Request-ID'] = request_id
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            log_request(request.method, request.path, route, response.status_code,
+                        time.perf_counter() - g.log_started)
+        return response
+
+    @app.teardown_request
+    def _unbind_request_id(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            try:
+                unbind_request_id(token)
+            except ValueError:
+                # Created in a different context (e.g. copied into a streaming generator)
+                pass
@@ -0,0 +1,249 @@
+"""
+Metrics Module - Prometheus metrics for routes, LLM calls, caches and sessions
+
+Exposed at ``/metrics`` in the Prometheus text format. With the optional
+``prometheus_client`` package the standard client is used; when the
+``PROMETHEUS_MULTIPROC_DIR`` environment variable is set (an empty directory,
+cleared before the server starts) every gunicorn worker writes its samples
+there and ``/metrics`` aggregates all workers. Without the package a minimal
+built-in registry serves the same metric names for the current process only.
+"""
+
+import os
+import threading
+import time
+from flask import g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - built-in per-process registry below
+    prometheus_client = None
+    multiprocess = None
+
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+
+# ---------------------------------------------------------------------------
+# Built-in fallback registry (single process, no dependencies)
+# ---------------------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), **kwargs):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *values, **kwargs):
+        key = tuple(str(kwargs[name]) for name in self.labelnames) if kwargs else tuple(map(str, values))
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = float(value)
+
+
+class _Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def render(self):
+        lines = self._header()
+        for key, child in sorted(self._children.items()):
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, key)} {child.value}")
+        return lines
+
+
+class _Gauge(_Counter):
+    kind = 'gauge'
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def render(self):
+        lines = self._header()
+        for key, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {child.value}")
+        return lines
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+class _Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=HTTP_BUCKETS, **kwargs):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = self._header()
+        for key, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(child.buckets, child.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {child.count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {child.sum}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {child.count}")
+        return lines
+
+
+_registry = []
+
+if prometheus_client is not None:
+    Counter, Gauge, Histogram = prometheus_client.Counter, prometheus_client.Gauge, prometheus_client.Histogram
+else:
+    Counter, Gauge, Histogram = _Counter, _Gauge, _Histogram
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter('http_requests', 'HTTP requests by route and status',
+                        ['method', 'route', 'status'])
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce the response (headers for streams)',
+                         ['method', 'route'], buckets=HTTP_BUCKETS)
+LLM_REQUESTS = Counter('llm_requests', 'Upstream LLM calls by model and outcome',
+                       ['model', 'outcome'])
+LLM_LATENCY = Histogram('llm_request_duration_seconds', 'Upstream LLM call latency including retries',
+                        ['model'], buckets=LLM_BUCKETS)
+LLM_TOKENS = Counter('llm_tokens', 'Tokens reported by the LLM API',
+                     ['model', 'kind'])
+CACHE_LOOKUPS = Counter('cache_lookups', 'Cache lookups by cache and result (hit/miss)',
+                        ['cache', 'result'])
+# Shared stores report the same value from every worker, so the max is taken
+SESSION_STORE_SIZE = Gauge('session_store_sessions', 'Presentation sessions in the session store',
+                           ['backend'], multiprocess_mode='max')
+# Each process has its own content store, so live processes are summed
+CONTENT_STORE_ENTRIES = Gauge('content_store_entries', 'Distinct slides and payloads in the content store',
+                              ['kind'], multiprocess_mode='livesum')
+CONTENT_STORE_BYTES = Gauge('content_store_bytes', 'Encoded bytes held by the content store',
+                            multiprocess_mode='livesum')
+
+
+def observe_request(method, route, status, seconds):
+    HTTP_REQUESTS.labels(method=method, route=route, status=str(status)).inc()
+    HTTP_LATENCY.labels(method=method, route=route).observe(seconds)
+
+
+def observe_llm(model, seconds, outcome='ok', usage=None):
+    """Record one upstream LLM call; ``usage`` is the API's usage object, if any"""
+    LLM_REQUESTS.labels(model=model, outcome=outcome).inc()
+    LLM_LATENCY.labels(model=model).observe(seconds)
+    if isinstance(usage, dict):
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            if usage.get(kind):
+                LLM_TOKENS.labels(model=model, kind=kind.split('_')[0]).inc(usage[kind])
+
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def set_session_store_size(backend, size):
+    SESSION_STORE_SIZE.labels(backend=backend).set(size)
+
+
+def set_content_store_stats(stats):
+    for kind in ('slides', 'payloads'):
+        CONTENT_STORE_ENTRIES.labels(kind=kind).set(stats[kind])
+    CONTENT_STORE_BYTES.set(stats['bytes'])
+
+
+def render_metrics():
+    """Current metrics in the Prometheus text format: (body bytes, content type)"""
+    if prometheus_client is None:
+        lines = [line for metric in _registry for line in metric.render()]
+        return ('\n'.join(lines) + '\n').encode('utf-8'), CONTENT_TYPE
+    if MULTIPROCESS:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live gauges (call from gunicorn's ``child_exit`` hook)"""
+    if multiprocess is not None and MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def init_app(app):
+    """Time every Flask request and count it by route template (e.g. /api/elements/<element_id>)"""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+        return response
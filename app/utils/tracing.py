@@ -0,0 +1,433 @@
+"""
+Tracing Module - Lightweight request spans exported as OTLP/JSON
+
+Each sampled request gets a root span (the route), and the service functions
+it calls open child spans, so a slow ``/generate_from_topic`` shows how long
+the LLM call, JSON extraction, ID assignment and session write each took.
+Finished spans are batched by a background thread and written as OTLP/JSON
+``ExportTraceServiceRequest`` objects, one per line, to ``TRACE_FILE`` and/or
+POSTed to an OTLP/HTTP collector at ``TRACE_OTLP_ENDPOINT``.
+
+Tracing is off with ``TRACE_SAMPLE_RATE=0`` (the default): ``traced`` then
+returns functions unchanged and ``span`` returns a shared no-op, so disabled
+tracing costs nothing. Otherwise a fraction of requests is sampled; an incoming
+W3C ``traceparent`` header continues the caller's trace, and upstream LLM
+requests carry one as well.
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import requests
+from flask import g, request
+from app.utils.config import (
+    TRACE_SAMPLE_RATE,
+    TRACE_FILE,
+    TRACE_OTLP_ENDPOINT,
+    TRACE_SERVICE_NAME,
+    TRACE_BATCH_SIZE,
+    TRACE_FLUSH_INTERVAL,
+    TRACE_QUEUE_SIZE
+)
+from app.utils.logger import logger
+
+ENABLED = TRACE_SAMPLE_RATE > 0
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Current span; _UNSAMPLED marks a request that was not sampled, so its
+# children skip span creation without drawing a new sampling decision
+_current = contextvars.ContextVar('trace_span', default=None)
+_UNSAMPLED = object()
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns',
+                 'attributes', 'status', 'status_message', 'events')
+
+    def __init__(self, name, trace_id, parent_id=None, kind=KIND_INTERNAL, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = 0
+        self.status_message = None
+        self.events = []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc):
+        self.status = STATUS_ERROR
+        self.status_message = str(exc)
+        self.events.append({
+            'timeUnixNano': str(time.time_ns()),
+            'name': 'exception',
+            'attributes': _attributes({'exception.type': type(exc).__name__,
+                                       'exception.message': str(exc)})
+        })
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter.submit(self)
+
+    def to_otlp(self):
+        entry = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': _attributes(self.attributes),
+            'status': {'code': self.status}
+        }
+        if self.parent_id:
+            entry['parentSpanId'] = self.parent_id
+        if self.status_message:
+            entry['status']['message'] = self.status_message
+        if self.events:
+            entry['events'] = self.events
+        return entry
+
+
+def _attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}  # int64 is a string in OTLP/JSON
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _attributes(attributes):
+    return [{'key': key, 'value': _attribute_value(value)}
+            for key, value in attributes.items() if value is not None]
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+class _Exporter:
+    """Batches finished spans and writes them from a background thread"""
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_thread(self):
+        # Started lazily and again after a fork (the thread does not survive it)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(TRACE_QUEUE_SIZE)
+                    self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                    name='trace-export', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def submit(self, span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self, span_queue):
+        while True:
+            batch = []
+            deadline = time.monotonic() + TRACE_FLUSH_INTERVAL
+            stop = False
+            while len(batch) < TRACE_BATCH_SIZE:
+                try:
+                    span = span_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            if batch:
+                self.export(batch)
+            if stop:
+                return
+
+    def export(self, spans):
+        body = json.dumps(otlp_request(spans), ensure_ascii=False)
+        if TRACE_FILE:
+            try:
+                directory = os.path.dirname(TRACE_FILE)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                    f.write(body + '\n')
+            except OSError as e:
+                logger.warning(f"Trace file export failed: {str(e)}")
+        if TRACE_OTLP_ENDPOINT:
+            try:
+                requests.post(TRACE_OTLP_ENDPOINT, data=body.encode('utf-8'),
+                              headers={'Content-Type': 'application/json'}, timeout=5)
+            except requests.RequestException as e:
+                logger.warning(f"Trace collector export failed: {str(e)}")
+
+    def flush(self):
+        """Export queued spans and stop the thread (at interpreter exit)"""
+        if self._pid == os.getpid():
+            try:
+                self._queue.put(None, timeout=1)
+            except queue.Full:
+                return
+            self._thread.join(timeout=5)
+            self._pid = None
+
+
+_exporter = _Exporter()
+atexit.register(_exporter.flush)
+
+
+def otlp_request(spans):
+    """OTLP/JSON ExportTraceServiceRequest for a list of finished spans"""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': _attributes({'service.name': TRACE_SERVICE_NAME,
+                                                    'process.pid': os.getpid()})},
+            'scopeSpans': [{
+                'scope': {'name': 'ppt_agent'},
+                'spans': [span.to_otlp() for span in spans]
+            }]
+        }]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Spans
+# ---------------------------------------------------------------------------
+
+def current_span():
+    """The sampled span active in this context, or None"""
+    span = _current.get()
+    return span if isinstance(span, Span) else None
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span (no-op when not sampled)"""
+    span = current_span()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def trace_headers():
+    """W3C ``traceparent`` header for an outgoing request, if this context is sampled"""
+    span = current_span()
+    return {'traceparent': f"00-{span.trace_id}-{span.span_id}-01"} if span is not None else {}
+
+
+def start_span(name, kind=KIND_INTERNAL, attributes=None, traceparent=None):
+    """
+    Start a span as a child of the current one, or a new trace when there is
+    none (sampled at ``TRACE_SAMPLE_RATE`` unless ``traceparent`` decides).
+
+    Returns:
+        Span | None: The span, or None when this context is not sampled
+    """
+    if not ENABLED:
+        return None
+    parent = _current.get()
+    if parent is _UNSAMPLED:
+        return None
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    match = _TRACEPARENT_RE.match(traceparent or '')
+    if match:
+        if not int(match.group(3), 16) & 1:
+            return None
+        return Span(name, match.group(1), match.group(2), kind, attributes)
+    if random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    return Span(name, f"{random.getrandbits(128):032x}", None, kind, attributes)
+
+
+class _SpanScope:
+    """Context manager that makes a span current and ends it on exit"""
+
+    __slots__ = ('_name', '_kind', '_attributes', '_span', '_token')
+
+    def __init__(self, name, kind, attributes):
+        self._name = name
+        self._kind = kind
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._span = start_span(self._name, self._kind, self._attributes)
+        self._token = _current.set(self._span if self._span is not None else _UNSAMPLED)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if self._span is not None:
+            if exc is not None:
+                self._span.record_exception(exc)
+            self._span.end()
+        return False
+
+
+class _NoopScope:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopScope()
+
+
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """
+    Context manager for a child span; yields the Span, or None if not sampled.
+
+        with span('slide_service.parse_slides', slides=len(items)):
+            ...
+    """
+    if not ENABLED:
+        return _NOOP
+    return _SpanScope(name, kind, attributes)
+
+
+def traced(func=None, name=None, kind=KIND_INTERNAL):
+    """
+    Decorator that runs each call of a function in a span named
+    ``module.function``. Generator functions are timed from the first item
+    until they are exhausted or closed. Returns the function unchanged when
+    tracing is disabled.
+    """
+    if func is None:
+        return lambda f: traced(f, name, kind)
+    if not ENABLED:
+        return func
+    span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            current = start_span(span_name, kind)
+            if current is None:
+                yield from func(*args, **kwargs)
+                return
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    # Only current while the generator runs: it may be resumed from another context
+                    token = _current.set(current)
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        break
+                    finally:
+                        _current.reset(token)
+                    yield item
+            except GeneratorExit:
+                current.set_attribute('cancelled', True)
+                raise
+            except Exception as e:
+                current.record_exception(e)
+                raise
+            finally:
+                generator.close()
+                current.end()
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def coroutine_wrapper(*args, **kwargs):
+            with _SpanScope(span_name, kind, None):
+                return await func(*args, **kwargs)
+        return coroutine_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _SpanScope(span_name, kind, None):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Request spans
+# ---------------------------------------------------------------------------
+
+def start_request_span(method, route, traceparent=None):
+    """Root span of a request; returns (span or None, token for ``end_request_span``)"""
+    current = start_span(f"{method} {route}", KIND_SERVER,
+                         {'http.request.method': method, 'http.route': route}, traceparent)
+    return current, _current.set(current if current is not None else _UNSAMPLED)
+
+
+def end_request_span(current, token, status=None, exc=None):
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Created in a different context (e.g. copied into a streaming generator)
+        pass
+    if current is not None:
+        if status is not None:
+            current.set_attribute('http.response.status_code', status)
+            if status >= 500:
+                current.status = STATUS_ERROR
+        if exc is not None:
+            current.record_exception(exc)
+        current.end()
+
+
+def init_app(app):
+    """Open a root span for every Flask request (only when tracing is enabled)"""
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_request_span():
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.trace_span, g.trace_token = start_request_span(request.method, route,
+                                                         request.headers.get('traceparent'))
+
+    @app.after_request
+    def _record_status(response):
+        current = g.get('trace_span')
+        if current is not None:
+            current.set_attribute('http.response.status_code', response.status_code)
+            if response.status_code >= 500:
+                current.status = STATUS_ERROR
+        return response
+
+    @app.teardown_request
+    def _end_request_span(exc):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            end_request_span(g.pop('trace_span', None), token, exc=exc)
@@ -0,0 +1,92 @@
+"""
+Wire Format Module - Content negotiation for deck payloads
+
+Encodes a response body as compact JSON or, when the client asks for it with
+``Accept: application/msgpack`` and the optional ``msgpack`` package is
+installed, MessagePack. The body is then compressed with brotli (optional
+``brotli`` package) or gzip according to ``Accept-Encoding``.
+"""
+
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary encoding
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip is used instead
+    brotli = None
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _accepts(header, token):
+    """Whether an Accept/Accept-Encoding header lists ``token`` with a non-zero q"""
+    for part in (header or '').lower().split(','):
+        name, *params = [p.strip() for p in part.split(';')]
+        if name != token:
+            continue
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    return float(param[2:]) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def choose_media_type(accept):
+    """'application/msgpack' if requested and available, else 'application/json'"""
+    if msgpack is not None:
+        for media_type in MSGPACK_TYPES:
+            if _accepts(accept, media_type):
+                return media_type
+    return 'application/json'
+
+
+def choose_encoding(accept_encoding):
+    """Best supported content coding: 'br', 'gzip' or None"""
+    if brotli is not None and _accepts(accept_encoding, 'br'):
+        return 'br'
+    if _accepts(accept_encoding, 'gzip'):
+        return 'gzip'
+    return None
+
+
+def serialize(data, media_type='application/json'):
+    """Encode ``data`` in the given media type"""
+    if media_type in MSGPACK_TYPES:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body, encoding):
+    """Apply a content coding chosen by ``choose_encoding``"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def encode_payload(data, accept=None, accept_encoding=None):
+    """
+    Serialize and compress a payload for the client's Accept headers.
+
+    Returns:
+        tuple: (body bytes, media type, content encoding or None)
+    """
+    media_type = choose_media_type(accept)
+    body = serialize(data, media_type)
+    encoding = choose_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_SIZE else None
+    return compress(body, encoding), media_type, encoding
@@ -0,0 +1,93 @@
+"""
+Benchmark: co-editing operation log
+
+Several editors submit small element edits (moves, style changes, inserts) to
+one deck through the collab service, in the memory session store. Reports
+operations applied per second, how long the log tail grows before it is folded
+into a snapshot, and what a joining editor receives and costs: the snapshot
+plus tail served from the encoded cache versus replaying every operation since
+the deck was opened.
+
+    python -m benchmarks.bench_collab [slide_count] [operations] [editors]
+"""
+
+import json
+import os
+import sys
+import time
+
+# Must be set before the app package is imported
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+os.environ["LOG_FILE"] = ""
+
+from app.services import collab
+from app.services.collab import open_doc, _DeckEditor
+from app.services.slide_service import replace_session_slides
+from app.utils.config import COLLAB_SNAPSHOT_OPS
+
+
+def make_deck(slide_count):
+    return [{"title": f"슬라이드 {i + 1}", "content": "공동 편집 벤치마크",
+             "elements": [{"type": "text", "content": f"항목 {j}", "x": 40 + j * 10, "y": 100 + j * 40,
+                           "width": 300, "height": 40, "style": {"fontSize": "18px"}} for j in range(8)]}
+            for i in range(slide_count)]
+
+
+def main():
+    slide_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    editors = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    session_id = "bench-collab"
+    initial = make_deck(slide_count)
+    replace_session_slides(session_id, json.loads(json.dumps(initial)))
+    doc = open_doc(session_id)
+    slides = json.loads(doc.changes()[1])["snapshot"]["slides"]
+    element_ids = [e["id"] for s in slides for e in s["elements"]]
+    slide_ids = [s["id"] for s in slides]
+
+    log = []
+    started = time.perf_counter()
+    longest_tail = 0
+    for n in range(operations):
+        kind = n % 10
+        if kind < 7:
+            op = {"type": "update_element", "elementId": element_ids[n % len(element_ids)],
+                  "changes": {"x": n % 900, "y": (n * 7) % 500}}
+        elif kind < 9:
+            op = {"type": "update_element", "elementId": element_ids[(n * 3) % len(element_ids)],
+                  "changes": {"style": {"color": f"#{n % 4096:03x}"}}}
+        else:
+            op = {"type": "add_element", "slideId": slide_ids[n % len(slide_ids)], "after": None,
+                  "element": {"type": "shape", "x": 10, "y": 10, "width": 50, "height": 50}}
+        op["cid"] = n
+        doc.submit(f"editor-{n % editors}", [op])
+        log.append(op)
+        longest_tail = max(longest_tail, len(doc._tail))
+    elapsed = time.perf_counter() - started
+
+    repeat = 20
+    started = time.perf_counter()
+    for _ in range(repeat):
+        _, body = doc.changes()
+    join_ms = (time.perf_counter() - started) / repeat * 1000
+    join = json.loads(body)
+
+    started = time.perf_counter()
+    data = {"slides": json.loads(json.dumps(slides))}
+    editor = _DeckEditor(data)
+    for op in log:
+        editor.apply(op)
+    replay_bytes = len(json.dumps(slides, ensure_ascii=False)) + sum(len(json.dumps(op, ensure_ascii=False)) for op in log)
+    replay_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{slide_count} slides, {operations} single-operation batches from {editors} editors")
+    print(f"applied: {operations / elapsed:,.0f} ops/s ({elapsed / operations * 1e6:.0f} us per batch)")
+    print(f"log tail: at most {longest_tail} operations (COLLAB_SNAPSHOT_OPS={COLLAB_SNAPSHOT_OPS})")
+    print(f"join: snapshot + {len(join['ops'])} ops, {len(body):,} bytes, {join_ms:.2f} ms to build")
+    print(f"full replay instead: {operations} ops, {replay_bytes:,} bytes, {replay_ms:.1f} ms to apply")
+    print(f"sequence {join['seq']}, snapshot at {join['snapshotSeq']}; open logs: {len(collab._docs)}")
+
+
+if __name__ == "__main__":
+    main()
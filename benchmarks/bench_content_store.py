@@ -0,0 +1,125 @@
+"""
+Benchmark: cross-session content store
+
+Fills a memory session store with synthetic sessions the way the app
+produces them: demo decks (``create_demo_slides`` for a handful of topics),
+decks from a pool of AI generations (as repeated prompts served from the
+response cache produce), and decks embedding the same images as base64 data
+URLs. Some sessions get a small edit. Each session holds its own decoded
+copy, as it would after arriving in a request.
+
+Reports the memory traced for the sessions with every session held live
+(``hot_sessions=0``, the store before the content store) and with cold
+sessions packed into the content store, plus what reading a cold session
+costs.
+
+    python -m benchmarks.bench_content_store [sessions] [hot sessions]
+"""
+
+import base64
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Must be set before the app package is imported
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+os.environ["LOG_FILE"] = ""
+
+from app.services.content_store import ContentStore
+from app.services.session_store import MemorySessionStore, new_session_data, get_session_store
+from app.services.slide_service import create_demo_slides
+
+TOPICS = ["인공지능", "기후 변화", "마케팅 전략", "분기 실적", "신제품 출시", "팀 소개", "보안 교육", "데이터 분석"]
+
+
+def demo_decks():
+    decks = []
+    for topic in TOPICS:
+        for slide_count in (5, 8, 10):
+            create_demo_slides("bench-scratch", topic, slide_count)
+            decks.append(json.loads(json.dumps(get_session_store().get("bench-scratch")["slides"])))
+    return decks
+
+
+def ai_decks(rng, count=200):
+    return [[{"title": f"생성된 덱 {n} - {i + 1}", "content": "AI가 작성한 본문 " * 20,
+              "elements": [{"id": f"el-{n}-{i}-{j}", "type": "text", "content": f"요점 {j}: " + "내용 " * 15,
+                            "x": 60, "y": 120 + j * 70, "width": 680, "height": 60,
+                            "style": {"fontSize": "20px", "color": "#333333"}} for j in range(rng.randint(3, 6))]}
+             for i in range(8)] for n in range(count)]
+
+
+def image_decks(rng, count=100, images=40):
+    pool = ["data:image/png;base64," + base64.b64encode(rng.randbytes(45 * 1024)).decode() for _ in range(images)]
+    return [[{"title": f"사진 슬라이드 {i + 1}",
+              "elements": [{"id": f"img-{n}-{i}", "type": "image", "src": rng.choice(pool),
+                            "x": 100, "y": 100, "width": 600, "height": 400}]}
+             for i in range(6)] for n in range(count)]
+
+
+def workload(sessions, seed=7):
+    """(session ID, slides) pairs, each with its own copy of the deck"""
+    rng = random.Random(seed)
+    demo, ai, images = demo_decks(), ai_decks(rng), image_decks(rng)
+    for n in range(sessions):
+        kind = rng.random()
+        pool = demo if kind < 0.5 else ai if kind < 0.8 else images
+        slides = json.loads(json.dumps(rng.choice(pool)))
+        if rng.random() < 0.2:
+            slides[rng.randrange(len(slides))]["title"] = f"편집된 제목 {n}"
+        yield f"bench-{n}", slides
+
+
+def fill(sessions, hot_sessions, decks):
+    content = ContentStore()
+    store = MemorySessionStore(max_sessions=sessions + 1, hot_sessions=hot_sessions, content=content)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    elapsed = 0.0
+    for session_id, slides in decks:
+        data = new_session_data()
+        data["slides"] = slides
+        started = time.perf_counter()
+        store.set(session_id, data)
+        elapsed += time.perf_counter() - started
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return store, content, used, elapsed
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    hot_sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    print(f"{sessions} sessions: 50% demo decks, 30% from 200 AI decks, 20% embedding 40 images")
+
+    _, _, live_bytes, live_seconds = fill(sessions, 0, workload(sessions))
+    print(f"all live:     {live_bytes / 2 ** 20:8.1f} MB ({live_bytes / sessions / 1024:.1f} KB per session), "
+          f"{live_seconds / sessions * 1e6:.0f} us per write (traced)")
+
+    store, content, packed_bytes, packed_seconds = fill(sessions, hot_sessions, workload(sessions))
+    stats = content.stats()
+    print(f"{hot_sessions} hot + packed: {packed_bytes / 2 ** 20:6.1f} MB ({packed_bytes / sessions / 1024:.1f} KB per session), "
+          f"{packed_seconds / sessions * 1e6:.0f} us per write (traced)")
+    print(f"content store: {stats['slides']:,} distinct slides and {stats['payloads']} payloads for "
+          f"{stats['references']:,} slide references, {stats['bytes'] / 2 ** 20:.1f} MB encoded")
+    print(f"saved: {(1 - packed_bytes / live_bytes) * 100:.0f}%")
+
+    rng = random.Random(1)
+    reads = [f"bench-{rng.randrange(sessions - hot_sessions)}" for _ in range(200)]
+    started = time.perf_counter()
+    for session_id in reads:
+        store.get(session_id)
+    cold_ms = (time.perf_counter() - started) / len(reads) * 1000
+    started = time.perf_counter()
+    for _ in range(len(reads)):
+        store.get(reads[-1])
+    hot_ms = (time.perf_counter() - started) / len(reads) * 1000
+    print(f"read: {cold_ms:.3f} ms for a cold session (unpack, then pack the one it displaces), "
+          f"{hot_ms:.4f} ms for a hot one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: server-side undo history
+
+Edits one slide at a time in decks of growing size through the slide service
+(memory session store) and reports what each recorded version costs: the
+memory traced while recording, against a full copy of the deck per version.
+Then times undo and redo through the whole history.
+
+    python -m benchmarks.bench_history [edits] [deck sizes...]
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Must be set before the app package is imported
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+os.environ["LOG_FILE"] = ""
+os.environ["HISTORY_COALESCE"] = "0"  # every edit is its own undo step
+os.environ.setdefault("HISTORY_MAX_VERSIONS", "1000")
+
+from app.services.slide_service import (
+    replace_session_slides,
+    update_session_element,
+    step_session_history,
+    get_session_history,
+    session_store
+)
+
+
+def make_deck(slide_count):
+    return [{"title": f"슬라이드 {i + 1}", "content": "실행 취소 벤치마크",
+             "elements": [{"id": f"el-{i}-{j}", "type": "text", "content": f"항목 {j}", "x": 40, "y": 100 + j * 40,
+                           "width": 300, "height": 40, "style": {"fontSize": "18px"}} for j in range(8)]}
+            for i in range(slide_count)]
+
+
+def run(slide_count, edits):
+    session_id = f"bench-history-{slide_count}"
+    replace_session_slides(session_id, make_deck(slide_count))
+    deck_bytes = len(json.dumps(session_store.get(session_id)["slides"], ensure_ascii=False).encode())
+
+    def edit(n):
+        slide = (n * 7) % slide_count
+        update_session_element(session_id, f"el-{slide}-{n % 8}", {"x": 40 + n % 500})
+
+    # Timed untraced, then the same number of edits again with allocations traced
+    half = edits // 2
+    started = time.perf_counter()
+    for n in range(half):
+        edit(n)
+    record_ms = (time.perf_counter() - started) / half * 1000
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for n in range(half, edits):
+        edit(n)
+    per_version = (tracemalloc.get_traced_memory()[0] - before) / (edits - half)
+    tracemalloc.stop()
+
+    state = get_session_history(session_id)
+    started = time.perf_counter()
+    for _ in range(state["position"]):
+        step_session_history(session_id, -1)
+    for _ in range(state["position"]):
+        step_session_history(session_id, 1)
+    step_ms = (time.perf_counter() - started) / (2 * state["position"]) * 1000
+
+    print(f"{slide_count:>6} slides ({deck_bytes / 1024:,.0f} KB): {state['versions']} versions, "
+          f"{per_version / 1024:,.1f} KB per version vs {deck_bytes / 1024:,.0f} KB for a copy; "
+          f"commit {record_ms:.2f} ms, undo/redo {step_ms:.2f} ms")
+
+
+def main():
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    sizes = [int(size) for size in sys.argv[2:]] or [20, 200, 1000]
+    print(f"{edits} single-element edits per deck")
+    for slide_count in sizes:
+        run(slide_count, edits)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: inline images moved to the image store on save
+
+Saves decks whose image elements carry base64 data URLs (as decks built
+before uploads went to the image store do) through the slide service, and
+reports the deck JSON held by the session and sent back on every load,
+before and after the images are replaced by ``/images/<hash>`` URLs, plus
+what the extraction costs per save.
+
+    python -m benchmarks.bench_inline_images [decks] [images per deck] [image KB]
+"""
+
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Must be set before the app package is imported
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+os.environ["LOG_FILE"] = ""
+os.environ["BLOB_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-blobs-")
+
+from app.services.slide_service import replace_session_slides, session_store
+
+
+def fake_jpeg(size, seed):
+    """Bytes with a JPEG signature (the store sniffs types from content)"""
+    return b"\xff\xd8\xff\xe0" + seed.to_bytes(4, "big") + os.urandom(size - 8)
+
+
+def make_deck(deck, images, image_kb):
+    slides = []
+    for i in range(images):
+        data = fake_jpeg(image_kb * 1024, deck * images + i)
+        slides.append({"title": f"사진 {i + 1}", "content": "인라인 이미지 벤치마크",
+                       "elements": [{"id": f"img-{deck}-{i}", "type": "image",
+                                     "content": "data:image/jpeg;base64," + base64.b64encode(data).decode(),
+                                     "x": 100, "y": 80, "width": 600, "height": 400}]})
+    return slides
+
+
+def main():
+    decks = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    images = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    image_kb = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    print(f"{decks} decks, {images} images of {image_kb} KB each")
+
+    inline_bytes = stored_bytes = 0
+    first_seconds = again_seconds = 0.0
+    for deck in range(decks):
+        slides = make_deck(deck, images, image_kb)
+        inline_bytes += len(json.dumps(slides, ensure_ascii=False).encode())
+        started = time.perf_counter()
+        replace_session_slides(f"bench-inline-{deck}", slides)
+        first_seconds += time.perf_counter() - started
+        stored = session_store.get(f"bench-inline-{deck}")["slides"]
+        stored_bytes += len(json.dumps(stored, ensure_ascii=False).encode())
+        # Saving again finds nothing inline
+        started = time.perf_counter()
+        replace_session_slides(f"bench-inline-{deck}", stored)
+        again_seconds += time.perf_counter() - started
+
+    print(f"deck JSON: {inline_bytes / decks / 2 ** 20:.2f} MB inline -> {stored_bytes / decks / 1024:.1f} KB "
+          f"with image URLs ({(1 - stored_bytes / inline_bytes) * 100:.1f}% smaller)")
+    print(f"save: {first_seconds / decks * 1000:.1f} ms moving {images} images, "
+          f"{again_seconds / decks * 1000:.2f} ms once they are stored")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(os.environ["BLOB_STORE_DIR"], ignore_errors=True)
@@ -0,0 +1,76 @@
+"""
+Benchmark: single-call vs outline + parallel slide generation
+
+Runs both generation paths against a local fake LLM whose latency grows with
+the number of output tokens, and reports wall-clock time.
+
+    python -m benchmarks.bench_slide_generation [slide_count] [seconds_per_token]
+"""
+
+import json
+import os
+import sys
+import time
+
+# Must be set before the app package is imported
+os.environ["OPENAI_API_KEY"] = "benchmark"
+os.environ["AI_CACHE_BACKEND"] = "none"
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+
+from app.utils.fake_openai import FakeOpenAIServer
+from app.services import llm_client, slide_service
+from app.utils.config import SLIDE_GENERATION_WORKERS, LLM_MAX_CONCURRENCY
+
+
+def make_slide(index):
+    return {
+        "title": f"슬라이드 {index + 1}",
+        "content": "이 슬라이드는 벤치마크를 위한 예시 내용을 담고 있습니다. " * 3,
+        "elements": [
+            {"type": "shape", "content": "rectangle", "x": 100, "y": 100, "width": 200, "height": 100,
+             "style": {"color": "#3498db", "borderStyle": "solid"}},
+            {"type": "text", "content": "핵심 포인트", "x": 100, "y": 250, "width": 400, "height": 80,
+             "style": {"fontSize": "24px", "textAlign": "left"}}
+        ]
+    }
+
+
+def fake_reply(slide_count):
+    def reply(payload):
+        system = payload["messages"][0]["content"]
+        user = payload["messages"][-1]["content"]
+        if "개요" in system:
+            return json.dumps([{"title": f"슬라이드 {i + 1}", "summary": "요약"} for i in range(slide_count)],
+                              ensure_ascii=False)
+        if "만 생성해주세요" in user:
+            return json.dumps([make_slide(0)], ensure_ascii=False)
+        return json.dumps([make_slide(i) for i in range(slide_count)], ensure_ascii=False)
+    return reply
+
+
+def main():
+    slide_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    token_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.002
+
+    with FakeOpenAIServer(reply=fake_reply(slide_count), latency=0.05, token_latency=token_latency) as server:
+        llm_client._client = llm_client.LLMClient(api_url=server.url)
+
+        results = {}
+        for mode in ("single", "parallel"):
+            slide_service.SLIDE_GENERATION_MODE = mode
+            slide_service.create_session("benchmark")
+            calls_before = len(server.requests)
+            start = time.perf_counter()
+            slides = slide_service.generate_slides_from_topic("benchmark", "벤치마크", slide_count,
+                                                              use_cache=False)
+            elapsed = time.perf_counter() - start
+            results[mode] = elapsed
+            print(f"{mode:>8}: {elapsed:6.2f}s  slides={len(slides)}  "
+                  f"llm_calls={len(server.requests) - calls_before}")
+
+        print(f"speedup: {results['single'] / results['parallel']:.2f}x "
+              f"(workers={SLIDE_GENERATION_WORKERS}, llm_concurrency={LLM_MAX_CONCURRENCY})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: deck wire formats for /get_slides
+
+Compares the previous response (indented JSON, as jsonify produced in debug
+mode) with compact JSON and MessagePack, each uncompressed, gzip and brotli.
+Reports bytes on the wire and encode/decode time per deck. MessagePack and
+brotli rows are skipped when the optional packages are not installed.
+
+    python -m benchmarks.bench_wire_format [slide_count] [elements_per_slide]
+"""
+
+import base64
+import gzip
+import json
+import os
+import sys
+import time
+
+from app.utils import wire_format
+from app.utils.wire_format import msgpack, brotli
+
+
+def make_deck(slide_count, elements_per_slide):
+    slides = []
+    for i in range(slide_count):
+        elements = []
+        for j in range(elements_per_slide):
+            element = {"id": f"elem_bench{i:04d}{j:03d}", "type": "text" if j % 3 else "shape",
+                       "content": f"핵심 포인트 {j}" if j % 3 else "rectangle",
+                       "x": 40 + j * 12, "y": 120 + j * 8, "width": 240, "height": 60,
+                       "rotation": 0, "zIndex": j,
+                       "style": {"color": "#3498db", "fontSize": "18px", "textAlign": "left"}}
+            elements.append(element)
+        if i % 5 == 0:
+            image = 'data:image/png;base64,' + base64.b64encode(os.urandom(3000)).decode('ascii')
+            elements.append({"id": f"img_{i}", "type": "image", "content": image,
+                             "x": 600, "y": 100, "width": 300, "height": 200})
+        slides.append({"title": f"슬라이드 {i + 1}",
+                       "content": "이 슬라이드는 벤치마크를 위한 예시 내용을 담고 있습니다. " * 3,
+                       "elements": elements})
+    return {"success": True, "slides": slides, "version": 42}
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    slide_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    elements_per_slide = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    repeat = 5
+    deck = make_deck(slide_count, elements_per_slide)
+
+    encoders = [
+        ("json (indented, before)", lambda: json.dumps(deck, indent=2).encode('utf-8'), lambda b: json.loads(b)),
+        ("json (compact)", lambda: wire_format.serialize(deck), lambda b: json.loads(b)),
+    ]
+    if msgpack is not None:
+        encoders.append(("msgpack", lambda: wire_format.serialize(deck, 'application/msgpack'),
+                         lambda b: msgpack.unpackb(b, raw=False)))
+
+    codings = [("identity", lambda b: b, lambda b: b),
+               ("gzip", lambda b: wire_format.compress(b, 'gzip'), gzip.decompress)]
+    if brotli is not None:
+        codings.append(("br", lambda b: wire_format.compress(b, 'br'), brotli.decompress))
+
+    print(f"{slide_count} slides x {elements_per_slide} elements (+ an inline image every 5 slides)")
+    print(f"{'format':<26}{'coding':<10}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+    for name, encode, decode in encoders:
+        body, encode_ms = timed(encode, repeat)
+        for coding, compress, decompress in codings:
+            wire, compress_ms = timed(lambda: compress(body), repeat)
+            _, decode_ms = timed(lambda: decode(decompress(wire)), repeat)
+            print(f"{name:<26}{coding:<10}{len(wire):>12,}{encode_ms + compress_ms:>12.2f}{decode_ms:>12.2f}")
+    print("A revalidated load with an unchanged deck is a 304 with an empty body.")
+
+
+if __name__ == "__main__":
+    main()
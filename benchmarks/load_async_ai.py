@@ -0,0 +1,59 @@
+"""
+Load test: concurrent pending LLM calls through the ASGI entry point
+
+Fires N simultaneous /api/ai/suggest-titles requests at app.asgi in-process
+against a fake LLM with a fixed latency, and reports wall-clock time and the
+peak number of upstream calls in flight. With the sync Flask routes each
+pending call holds a worker thread; here they are all coroutines in one process.
+
+    python -m benchmarks.load_async_ai [requests] [upstream_latency_seconds]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+# Must be set before the app package is imported
+os.environ["OPENAI_API_KEY"] = "load-test"
+os.environ["AI_CACHE_BACKEND"] = "none"
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+os.environ["ASYNC_LLM_MAX_CONCURRENCY"] = str(CONCURRENCY)
+
+import httpx
+
+from app.utils.fake_openai import FakeOpenAIServer
+from app.services import async_llm_client
+from app.asgi import application
+
+
+async def run(server):
+    # Bind this loop's shared client to the fake server
+    async_llm_client._clients[asyncio.get_running_loop()] = async_llm_client.AsyncLLMClient(api_url=server.url)
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://asgi", timeout=60) as client:
+        async def one(i):
+            response = await client.post("/api/ai/suggest-titles", json={"content": f"부하 테스트 {i}", "count": 3})
+            return response.status_code == 200 and response.json().get("success")
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    await async_llm_client.close_async_llm_client()
+
+    ok = sum(1 for r in results if r)
+    print(f"requests={CONCURRENCY} ok={ok} upstream_latency={LATENCY:.2f}s")
+    print(f"wall={elapsed:.2f}s  peak_upstream_in_flight={server.max_in_flight}")
+    print(f"sync baseline (4 workers x 1 thread): ~{CONCURRENCY / 4 * LATENCY:.0f}s")
+
+
+def main():
+    with FakeOpenAIServer(reply="1. 제목 하나\n2. 제목 둘\n3. 제목 셋", latency=LATENCY) as server:
+        asyncio.run(run(server))
+
+
+if __name__ == "__main__":
+    main()
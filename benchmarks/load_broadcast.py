@@ -0,0 +1,138 @@
+"""
+Load test: one presenter, thousands of broadcast viewers in one process
+
+Opens a broadcast, connects N SSE viewers to app.asgi in-process (each viewer
+is a coroutine driving the ASGI app directly, as a server would), and has the
+presenter publish laser moves at 60 Hz plus a slide change every second from
+another thread, like the Flask presenter route does. A fraction of viewers is
+slow (each write takes 0.5 s); they must receive the latest state, not a
+backlog. Reports how long each slide change took to reach every viewer, how
+many frames were sent versus states published, and whether every viewer ended
+on the presenter's final slide.
+
+    python -m benchmarks.load_broadcast [viewers] [seconds] [slow_fraction]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+VIEWERS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+SLOW_FRACTION = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+
+# Must be set before the app package is imported
+os.environ["SESSION_STORE_BACKEND"] = "memory"
+os.environ["LOG_FILE"] = ""
+os.environ["BROADCAST_MAX_VIEWERS"] = str(VIEWERS + 1)
+
+from app.asgi import application
+from app.services.broadcast import create_broadcast, end_broadcast
+
+SLIDES = [{"title": f"슬라이드 {i + 1}", "content": "부하 테스트", "elements": [
+    {"id": f"s{i}-box", "type": "shape", "x": 100, "y": 200, "width": 300, "height": 150}
+]} for i in range(30)]
+
+
+class Viewer:
+    def __init__(self, broadcast_id, slow):
+        self.scope = {"type": "http", "method": "GET", "path": f"/api/broadcast/{broadcast_id}/events",
+                      "headers": [], "query_string": b""}
+        self.slow = slow
+        self.frames = 0
+        self.seen = {}  # slide index -> first time it was received
+        self.last_slide = None
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] != "http.response.body" or not message.get("body", b"").startswith(b"id:"):
+            return
+        self.frames += 1
+        body = message["body"]
+        # Cheaper than json.loads per frame; the state JSON is compact with "slide" as an int
+        start = body.index(b'"slide":') + 8
+        slide = int(body[start:body.index(b",", start)])
+        if slide not in self.seen:
+            self.seen[slide] = time.perf_counter()
+        self.last_slide = slide
+        if self.slow:
+            await asyncio.sleep(0.5)
+
+    async def run(self):
+        await application(self.scope, self.receive, self.send)
+
+
+def present(broadcast, changes, stop):
+    """Presenter thread: 60 Hz laser moves, a slide change every second"""
+    slide = 0
+    next_change = time.perf_counter() + 1
+    laser_moves = 0
+    while not stop.is_set():
+        now = time.perf_counter()
+        if now >= next_change:
+            slide = (slide + 1) % len(SLIDES)
+            changes.append((slide, time.perf_counter()))
+            broadcast.publish(slide=slide)
+            next_change += 1
+        broadcast.publish(laser={"x": (laser_moves % 100) / 100, "y": 0.5})
+        laser_moves += 1
+        time.sleep(1 / 60)
+    return laser_moves
+
+
+async def run():
+    broadcast = create_broadcast(SLIDES, "부하 테스트")
+    viewers = [Viewer(broadcast.id, slow=i < VIEWERS * SLOW_FRACTION) for i in range(VIEWERS)]
+
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(viewer.run()) for viewer in viewers]
+    while broadcast.viewers < VIEWERS:
+        await asyncio.sleep(0.05)
+    connect_time = time.perf_counter() - start
+
+    changes, stop = [], threading.Event()
+    presenter = threading.Thread(target=present, args=(broadcast, changes, stop))
+    cpu_start = time.process_time()
+    presenter.start()
+    await asyncio.sleep(DURATION)
+    stop.set()
+    presenter.join()
+    await asyncio.sleep(1)  # let the last change arrive
+    cpu = time.process_time() - cpu_start
+
+    end_broadcast(broadcast.id, broadcast.token)
+    for viewer in viewers:
+        viewer.disconnected.set()
+    await asyncio.gather(*tasks)
+
+    fast = [v for v in viewers if not v.slow]
+    slow = [v for v in viewers if v.slow]
+    delays = [(v.seen[slide] - published) * 1000 for slide, published in changes[:-1]
+              for v in fast if slide in v.seen]
+    complete = [max((v.seen[slide] - published) * 1000 for v in fast if slide in v.seen)
+                for slide, published in changes[:-1]]
+    final_slide = changes[-1][0]
+    stale = sum(1 for v in viewers if v.last_slide != final_slide)
+
+    print(f"viewers={VIEWERS} (slow={len(slow)}) duration={DURATION:.0f}s connect={connect_time:.2f}s")
+    print(f"published states={broadcast.seq}  frames/viewer: fast={statistics.mean(v.frames for v in fast):.0f}"
+          + (f" slow={statistics.mean(v.frames for v in slow):.0f}" if slow else ""))
+    print(f"slide change -> viewer: p50={statistics.median(delays):.1f}ms "
+          f"p99={statistics.quantiles(delays, n=100)[98]:.1f}ms  all viewers: max={max(complete):.1f}ms")
+    print(f"viewers not on the final slide: {stale}")
+    print(f"process CPU: {cpu:.1f}s over {DURATION + 1:.0f}s")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from app import create_app
 from app.utils.config import HOST, PORT, DEBUG
-from app.utils.logger import logger
+from app.utils.logger import logger, debug_payload, stop_logging
+from app.services.spatial_index import free_position_for
 import os
 import signal
 import sys
@@ -76,41 +77,34 @@ def kill_existing_server():
 @app.route('/api/ai/chat', methods=['POST'])
 def handle_ai_chat():
     data = request.json
-    print("AI 채팅 요청 수신:", data)
+    # 전체 요청 본문(모든 요소 포함)은 DEBUG 레벨에서 일부 요청만 샘플링해 기록
+    debug_payload(logger, "AI 채팅 요청 본문", data)
     
     try:
         prompt = data.get('prompt', '')
         context = data.get('context', {})
         
-        # 디버깅을 위해 컨텍스트 세부 정보 기록
-        print(f"현재 슬라이드 인덱스: {context.get('currentSlideIndex', 'N/A')}")
-        print(f"전체 슬라이드 수: {context.get('slideCount', 'N/A')}")
-        
-        # 현재 슬라이드 정보가 있으면 요약
+        # 현재 슬라이드 정보가 있으면 요소 타입 요약
         current_slide = context.get('currentSlide', None)
+        element_types = {}
         if current_slide:
-            print(f"현재 슬라이드 ID: {current_slide.get('id', 'N/A')}")
-            print(f"현재 슬라이드 배경: {current_slide.get('background', 'N/A')}")
             elements = current_slide.get('elements', [])
-            print(f"현재 슬라이드 요소 수: {len(elements)}")
-            
-            # 요소 타입 요약
-            element_types = {}
             for elem in elements:
                 elem_type = elem.get('type', 'unknown')
-                if elem_type in element_types:
-                    element_types[elem_type] += 1
-                else:
-                    element_types[elem_type] = 1
-            
-            print(f"요소 타입 요약: {element_types}")
+                element_types[elem_type] = element_types.get(elem_type, 0) + 1
         
-        # 선택된 요소 정보가 있으면 요약
+        # 선택된 요소 정보
         selected_elements = context.get('selectedElements', [])
-        if selected_elements:
-            print(f"선택된 요소 수: {len(selected_elements)}")
-            for i, elem in enumerate(selected_elements):
-                print(f"선택된 요소 {i+1} - 타입: {elem.get('type', 'N/A')}, ID: {elem.get('id', 'N/A')}")
+        
+        # 요약만 구조화된 필드로 기록 (기록은 백그라운드 스레드에서 처리)
+        logger.info("AI 채팅 요청 수신", extra={
+            'slide_index': context.get('currentSlideIndex'),
+            'slide_count': context.get('slideCount'),
+            'slide_id': current_slide.get('id') if current_slide else None,
+            'element_types': element_types,
+            'selected_elements': [elem.get('id') for elem in selected_elements],
+            'prompt_chars': len(prompt)
+        })
         
         # AI 응답 생성
         if current_slide:
@@ -144,20 +138,23 @@ def handle_ai_chat():
                 if action_type:
                     actions = []
                     if action_type == 'addText':
+                        # 기존 요소와 겹치지 않는 가장 가까운 빈 공간에 배치
+                        x, y = free_position_for(elements, 400, 100, near=(100, 100))
                         actions.append({
                             'type': 'addText',
                             'text': action_content,
-                            'x': 100,
-                            'y': 100,
+                            'x': x,
+                            'y': y,
                             'width': 400,
                             'height': 100
                         })
                     elif action_type == 'addShape':
+                        x, y = free_position_for(elements, 200, 150, near=(100, 100))
                         actions.append({
                             'type': 'addShape',
                             'shapeType': action_shape,
-                            'x': 100,
-                            'y': 100,
+                            'x': x,
+                            'y': y,
                             'width': 200,
                             'height': 150
                         })
@@ -180,7 +177,7 @@ def handle_ai_chat():
             'response': response
         })
     except Exception as e:
-        print(f"AI 채팅 처리 중 오류 발생: {str(e)}")
+        logger.error(f"AI 채팅 처리 중 오류 발생: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -192,9 +189,10 @@ if __name__ == '__main__':
         try:
             import psutil
         except ImportError:
-            print("psutil 패키지가 설치되어 있지 않습니다. 설치를 시도합니다...")
+            logger.warning("psutil 패키지가 설치되어 있지 않습니다. 설치를 시도합니다...")
             os.system(f"{sys.executable} -m pip install psutil")
-            print("psutil 설치 완료. 다시 시작합니다...")
+            logger.info("psutil 설치 완료. 다시 시작합니다...")
+            stop_logging()  # execv는 atexit을 실행하지 않으므로 대기 중인 로그를 먼저 기록
             os.execv(sys.executable, [sys.executable] + sys.argv)
             
         # 기존 서버 종료
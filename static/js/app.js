@@ -3059,7 +3059,7 @@ function exportPresentation(format) {
             // Show progress notification
             showNotification(`Preparing ${format.toUpperCase()} export...`);
             
-            // Call backend API for conversion
+            // Start a server-side export job, then poll until the file is ready
             fetch('/api/export', {
                 method: 'POST',
                 headers: {
@@ -3075,18 +3075,17 @@ function exportPresentation(format) {
                 if (!response.ok) {
                     throw new Error(`Export failed: ${response.status} ${response.statusText}`);
                 }
-                return response.blob();
+                return response.json();
             })
-            .then(blob => {
-                // Create a download link and click it
-                const url = URL.createObjectURL(blob);
+            .then(data => waitForExport(data.job))
+            .then(job => {
+                // Let the browser stream the download straight to disk
                 const a = document.createElement('a');
-                a.href = url;
+                a.href = job.download_url;
                 a.download = `presentation.${format === 'images' ? 'zip' : format}`;
                 document.body.appendChild(a);
                 a.click();
                 document.body.removeChild(a);
-                URL.revokeObjectURL(url);
                 
                 showNotification('Export completed successfully!', 'success');
             })
@@ -3107,6 +3106,30 @@ function exportPresentation(format) {
     }
 }
 
+// Poll an export job until it finishes, showing its progress
+function waitForExport(job, interval = 500) {
+    if (job.state === 'done') {
+        return Promise.resolve(job);
+    }
+    if (job.state === 'error') {
+        return Promise.reject(new Error(job.error || 'Export failed'));
+    }
+    
+    if (job.total) {
+        showNotification(`Exporting ${job.format.toUpperCase()}... ${Math.round(job.progress * 100)}%`);
+    }
+    
+    return new Promise(resolve => setTimeout(resolve, interval))
+        .then(() => fetch(job.status_url))
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Export status failed: ${response.status} ${response.statusText}`);
+            }
+            return response.json();
+        })
+        .then(data => waitForExport(data.job, Math.min(interval * 1.5, 2000)));
+}
+
 // Export presentation as JSON data
 function exportAsJSON() {
     // Create a JSON blob
@@ -1063,8 +1063,13 @@ function savePresentation() {
         currentSlideIndex: currentSlideIndex
     };
     
-    localStorage.setItem('presentation', JSON.stringify(data));
-    console.log('프레젠테이션이 저장되었습니다.');
+    try {
+        localStorage.setItem('presentation', JSON.stringify(data));
+        console.log('프레젠테이션이 저장되었습니다.');
+    } catch (error) {
+        // 용량 초과 등: 서버에 저장된 덱은 그대로 유지됨
+        console.error('로컬 저장 오류:', error);
+    }
 }
 
 // 프레젠테이션 내보내기
@@ -0,0 +1,447 @@
+/**
+ * Collab module: real-time co-editing of the session's deck
+ *
+ * Local changes are sent as small operations addressed by slide and element ID
+ * (see app/services/collab.py). The server orders every editor's operations
+ * into one log and pushes them to the others over a WebSocket, or through long
+ * polling when the server has no WebSocket endpoint. Operations of other
+ * editors are applied to the last server state, and local changes the server
+ * has not confirmed yet are replayed on top, so every editor converges on the
+ * server's order.
+ */
+
+const RECONNECT_DELAY = 1000;
+
+const clientId = `c${Date.now().toString(36)}${Math.random().toString(36).slice(2, 8)}`;
+let nextCid = 1;
+
+let collab = null;
+
+function clone(value) {
+    return JSON.parse(JSON.stringify(value));
+}
+
+function same(a, b) {
+    return JSON.stringify(a) === JSON.stringify(b);
+}
+
+function newId(kind) {
+    return `${kind}_${clientId}${Date.now().toString(36)}${Math.random().toString(36).slice(2, 6)}`;
+}
+
+// Give new slides and elements (and copies that kept their original's ID) an ID of their own
+function ensureIds(slides) {
+    const slideIds = new Set();
+    const elementIds = new Set();
+    slides.forEach(slide => {
+        if (!slide.id || slideIds.has(slide.id)) slide.id = newId('slide');
+        slideIds.add(slide.id);
+        (slide.elements || []).forEach(element => {
+            if (!element.id || elementIds.has(element.id)) element.id = newId('elem');
+            elementIds.add(element.id);
+        });
+    });
+}
+
+// ---------------------------------------------------------------------------
+// Applying operations (mirrors _DeckEditor on the server)
+// ---------------------------------------------------------------------------
+
+function insertAfter(items, item, after) {
+    let position = 0;
+    if (after !== null && after !== undefined) {
+        const index = items.findIndex(other => other.id === after);
+        position = index === -1 ? items.length : index + 1;
+    }
+    items.splice(position, 0, item);
+}
+
+function findElement(deck, elementId) {
+    for (const slide of deck.slides) {
+        const elements = slide.elements || [];
+        const index = elements.findIndex(element => element.id === elementId);
+        if (index !== -1) return { slide, elements, index };
+    }
+    return null;
+}
+
+function setFields(target, op, fixed) {
+    Object.entries(op.changes || {}).forEach(([key, value]) => {
+        if (fixed.includes(key)) return;
+        if (key === 'style' && value && typeof value === 'object' && target.style && typeof target.style === 'object') {
+            Object.entries(value).forEach(([styleKey, styleValue]) => {
+                if (styleValue === null) delete target.style[styleKey];
+                else target.style[styleKey] = styleValue;
+            });
+        } else {
+            target[key] = value;
+        }
+    });
+    (op.unset || []).forEach(key => {
+        if (!fixed.includes(key)) delete target[key];
+    });
+}
+
+function applyOp(deck, op) {
+    const slideIndex = id => deck.slides.findIndex(slide => slide.id === id);
+    switch (op.type) {
+        case 'insert_slide':
+            if (slideIndex(op.slide.id) === -1) insertAfter(deck.slides, clone(op.slide), op.after);
+            break;
+        case 'remove_slide': {
+            const index = slideIndex(op.slideId);
+            if (index !== -1) deck.slides.splice(index, 1);
+            break;
+        }
+        case 'move_slide': {
+            const index = slideIndex(op.slideId);
+            if (index !== -1 && op.after !== op.slideId) {
+                insertAfter(deck.slides, deck.slides.splice(index, 1)[0], op.after);
+            }
+            break;
+        }
+        case 'update_slide': {
+            const index = slideIndex(op.slideId);
+            if (index !== -1) setFields(deck.slides[index], op, ['id', 'elements']);
+            break;
+        }
+        case 'add_element': {
+            const index = slideIndex(op.slideId);
+            if (index !== -1 && !findElement(deck, op.element.id)) {
+                const slide = deck.slides[index];
+                slide.elements = slide.elements || [];
+                insertAfter(slide.elements, clone(op.element), op.after);
+            }
+            break;
+        }
+        case 'update_element': {
+            const found = findElement(deck, op.elementId);
+            if (found) setFields(found.elements[found.index], op, ['id']);
+            break;
+        }
+        case 'remove_element': {
+            const found = findElement(deck, op.elementId);
+            if (found) found.elements.splice(found.index, 1);
+            break;
+        }
+        case 'move_element': {
+            const found = findElement(deck, op.elementId);
+            const index = slideIndex(op.slideId);
+            if (found && index !== -1 && op.after !== op.elementId) {
+                const element = found.elements.splice(found.index, 1)[0];
+                const target = deck.slides[index];
+                target.elements = target.elements || [];
+                insertAfter(target.elements, element, op.after);
+            }
+            break;
+        }
+        case 'set_theme':
+            deck.theme = op.theme;
+            break;
+    }
+    return deck;
+}
+
+// ---------------------------------------------------------------------------
+// Turning a local edit into operations
+// ---------------------------------------------------------------------------
+
+// Fields that differ between two objects, as {changes, unset}
+function fieldChanges(before, after, fixed) {
+    const changes = {};
+    const unset = [];
+    Object.keys(after).forEach(key => {
+        if (fixed.includes(key) || same(before[key], after[key])) return;
+        const from = before[key];
+        const to = after[key];
+        if (key === 'style' && from && to && typeof from === 'object' && typeof to === 'object') {
+            // Send only the style keys that changed; null removes one
+            const style = {};
+            Object.keys(to).forEach(k => { if (!same(from[k], to[k])) style[k] = to[k]; });
+            Object.keys(from).forEach(k => { if (!(k in to)) style[k] = null; });
+            changes.style = style;
+        } else {
+            changes[key] = to;
+        }
+    });
+    Object.keys(before).forEach(key => {
+        if (!fixed.includes(key) && !(key in after)) unset.push(key);
+    });
+    return { changes, unset };
+}
+
+// Walk `items` in their new order, emitting an insert or a move wherever the simulated order differs
+function placeItems(order, items, isNew, insertOp, moveOp, ops) {
+    let previous = null;
+    items.forEach(item => {
+        const expected = previous === null ? 0 : order.indexOf(previous) + 1;
+        if (isNew(item)) {
+            ops.push(insertOp(item, previous));
+            order.splice(expected, 0, item.id);
+        } else if (order[expected] !== item.id) {
+            ops.push(moveOp(item, previous));
+            const current = order.indexOf(item.id);
+            if (current !== -1) order.splice(current, 1);
+            order.splice(previous === null ? 0 : order.indexOf(previous) + 1, 0, item.id);
+        }
+        previous = item.id;
+    });
+}
+
+function diffDeck(before, after) {
+    const ops = [];
+    const beforeSlides = new Map(before.map(slide => [slide.id, slide]));
+    const afterSlides = new Set(after.map(slide => slide.id));
+    const beforeElements = new Map(before.flatMap(slide => (slide.elements || []).map(e => [e.id, e])));
+    const afterHome = new Map();  // element ID -> slide ID
+    after.forEach(slide => (slide.elements || []).forEach(element => afterHome.set(element.id, slide.id)));
+
+    // Slide order and new slides; elements that already existed are moved into a new slide, not copied
+    placeItems(
+        before.filter(slide => afterSlides.has(slide.id)).map(slide => slide.id),
+        after,
+        slide => !beforeSlides.has(slide.id),
+        (slide, previous) => {
+            const copy = clone(slide);
+            if (slide.elements) copy.elements = copy.elements.filter(e => !beforeElements.has(e.id));
+            return { type: 'insert_slide', slide: copy, after: previous };
+        },
+        (slide, previous) => ({ type: 'move_slide', slideId: slide.id, after: previous }),
+        ops
+    );
+
+    after.forEach(slide => {
+        const old = beforeSlides.get(slide.id);
+        if (old) {
+            const { changes, unset } = fieldChanges(old, slide, ['id', 'elements']);
+            if (Object.keys(changes).length || unset.length) {
+                ops.push({ type: 'update_slide', slideId: slide.id, changes, unset });
+            }
+        }
+
+        // Element order, added and moved-in elements (a new slide already holds its added ones)
+        const elements = slide.elements || [];
+        placeItems(
+            (old ? old.elements || [] : elements.filter(e => !beforeElements.has(e.id)))
+                .filter(e => afterHome.get(e.id) === slide.id).map(e => e.id),
+            elements,
+            element => old !== undefined && !beforeElements.has(element.id),
+            (element, previous) => ({ type: 'add_element', slideId: slide.id, element: clone(element), after: previous }),
+            (element, previous) => ({ type: 'move_element', elementId: element.id, slideId: slide.id, after: previous }),
+            ops
+        );
+        elements.forEach(element => {
+            const from = beforeElements.get(element.id);
+            if (!from) return;
+            const { changes, unset } = fieldChanges(from, element, ['id']);
+            if (Object.keys(changes).length || unset.length) {
+                ops.push({ type: 'update_element', elementId: element.id, changes, unset });
+            }
+        });
+    });
+
+    // Removals last, so elements moved out of a removed slide are moved first
+    before.forEach(slide => {
+        if (!afterSlides.has(slide.id)) return;
+        (slide.elements || []).forEach(element => {
+            if (!afterHome.has(element.id)) ops.push({ type: 'remove_element', elementId: element.id });
+        });
+    });
+    before.forEach(slide => {
+        if (!afterSlides.has(slide.id)) ops.push({ type: 'remove_slide', slideId: slide.id });
+    });
+    return ops;
+}
+
+// ---------------------------------------------------------------------------
+// Sync
+// ---------------------------------------------------------------------------
+
+// Last server state plus operations sent but not yet confirmed
+function localBase() {
+    const deck = clone(collab.base);
+    collab.inflight.forEach(op => applyOp(deck, op));
+    return deck;
+}
+
+// Apply changes from the server and replay unconfirmed local edits on top
+function handleChanges(message) {
+    if (!message || (!message.snapshot && message.seq <= collab.seq && message.epoch === collab.epoch)) return;
+
+    const slides = collab.getSlides();
+    ensureIds(slides);
+    const unsent = collab.base ? diffDeck(localBase().slides, slides) : [];
+
+    if (message.snapshot) {
+        collab.base = message.snapshot;
+        collab.seq = message.snapshotSeq;
+    }
+    message.ops.forEach(op => {
+        if (op.seq <= collab.seq) return;
+        applyOp(collab.base, op);
+        collab.seq = op.seq;
+        if (op.client === clientId) {
+            collab.inflight = collab.inflight.filter(pending => pending.cid !== op.cid);
+        }
+    });
+    collab.seq = message.seq;
+    collab.epoch = message.epoch;
+
+    const deck = localBase();
+    unsent.forEach(op => applyOp(deck, op));
+    if (!same(deck.slides, slides)) {
+        collab.setSlides(deck.slides);
+    }
+}
+
+function handleAck(skipped) {
+    // Everything in the batch is now in the server state or was skipped
+    collab.inflight = [];
+    if (skipped && skipped.length) {
+        console.warn(`${skipped.length} edits were skipped: their target was removed by another editor`);
+    }
+    if (collab.dirty) {
+        collab.dirty = false;
+        submitChanges();
+    }
+}
+
+// Send local changes since the last server state (one batch in flight at a time)
+export function submitChanges() {
+    if (!collab || !collab.base) return Promise.resolve(false);
+    if (collab.inflight.length) {
+        collab.dirty = true;
+        return Promise.resolve(true);
+    }
+
+    const slides = collab.getSlides();
+    ensureIds(slides);
+    const ops = diffDeck(collab.base.slides, slides);
+    if (ops.length === 0) return Promise.resolve(true);
+    ops.forEach(op => { op.cid = nextCid++; });
+    collab.inflight = ops;
+
+    if (collab.socket && collab.socket.readyState === WebSocket.OPEN) {
+        collab.socket.send(JSON.stringify({ ops }));
+        return Promise.resolve(true);
+    }
+    return fetch('/api/collab/ops', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ clientId, ops, since: collab.seq, epoch: collab.epoch })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) throw new Error(data.error);
+        handleChanges(data.changes);
+        handleAck(data.skipped);
+        return true;
+    })
+    .catch(error => {
+        console.error('Error sending edits:', error);
+        collab.inflight = [];
+        return false;
+    });
+}
+
+function positionQuery() {
+    const params = new URLSearchParams({ client: clientId });
+    if (collab.epoch !== null) {
+        params.set('since', collab.seq);
+        params.set('epoch', collab.epoch);
+    }
+    return params.toString();
+}
+
+function connectSocket() {
+    const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${location.host}/api/collab/ws?${positionQuery()}`);
+    let opened = false;
+    collab.socket = socket;
+
+    socket.onopen = () => { opened = true; };
+    socket.onmessage = event => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'ack') {
+            handleAck(message.skipped);
+        } else if (message.type === 'error') {
+            console.error('Co-editing error:', message.error);
+            collab.inflight = [];
+        } else {
+            handleChanges(message);
+        }
+    };
+    socket.onclose = () => {
+        collab.socket = null;
+        if (!collab.active) return;
+        collab.inflight = [];
+        // No WebSocket endpoint (Flask server): poll instead
+        if (opened) setTimeout(connectSocket, RECONNECT_DELAY);
+        else pollChanges();
+    };
+}
+
+function pollChanges() {
+    if (!collab.active) return;
+    fetch(`/api/collab/poll?${positionQuery()}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) throw new Error(data.error);
+            handleChanges(data);
+            pollChanges();
+        })
+        .catch(error => {
+            console.error('Co-editing poll error:', error);
+            setTimeout(pollChanges, RECONNECT_DELAY);
+        });
+}
+
+export function isCollabActive() {
+    return collab !== null && collab.active;
+}
+
+/**
+ * Start co-editing the session's deck.
+ *
+ * @param {Function} getSlides - Returns the live slides array
+ * @param {Function} setSlides - Replaces the slides after changes from other editors
+ */
+export function startCollab(getSlides, setSlides) {
+    if (isCollabActive()) return Promise.resolve();
+    collab = {
+        active: true, getSlides, setSlides,
+        base: null, seq: 0, epoch: null,
+        inflight: [], dirty: false, socket: null
+    };
+    return fetch(`/api/collab?client=${clientId}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) throw new Error(data.error);
+            handleChanges(data);
+            if (typeof WebSocket !== 'undefined') connectSocket();
+            else pollChanges();
+        })
+        .catch(error => {
+            console.error('Error starting co-editing:', error);
+            collab = null;
+        });
+}
+
+export function stopCollab() {
+    if (!collab) return;
+    collab.active = false;
+    if (collab.socket) collab.socket.close();
+    collab = null;
+}
+
+// Link that lets someone else edit this deck
+export function createInvite() {
+    return fetch('/api/collab/invite', { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) throw new Error(data.error);
+            return data.inviteUrl;
+        });
+}
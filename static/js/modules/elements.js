@@ -742,16 +742,48 @@ function updateTextFormattingButtons() {
     if (alignRight) alignRight.classList.toggle('active', textAlign === 'right');
 }
 
+// Upload an image file to the image store; resolves to the URL to place on slides
+export function uploadImageFile(file) {
+    // Send the file as the raw body so the server can stream it to disk
+    return fetch('/upload_image', {
+        method: 'POST',
+        headers: {
+            'Content-Type': file.type || 'application/octet-stream'
+        },
+        body: file
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        // The canvas rendition is downscaled; the original stays at image_url
+        return data.renditions?.canvas || data.image_url;
+    });
+}
+
+// Read an image file as a data URL (used when the upload fails)
+function readImageFile(file) {
+    return new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onload = (e) => resolve(e.target.result);
+        reader.onerror = () => reject(reader.error);
+        reader.readAsDataURL(file);
+    });
+}
+
 // Handle image upload
 function handleImageUpload(event) {
     const file = event.target.files[0];
     if (!file || !file.type.startsWith('image/')) return;
     
-    const reader = new FileReader();
-    reader.onload = function(e) {
-        addImage(e.target.result);
-    };
-    reader.readAsDataURL(file);
+    uploadImageFile(file)
+        .catch(error => {
+            console.warn('Image upload failed, embedding the image instead:', error);
+            return readImageFile(file);
+        })
+        .then(addImage)
+        .catch(error => console.error('Error reading image:', error));
 }
 
 // Add image to the slide
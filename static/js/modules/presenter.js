@@ -10,6 +10,11 @@ let presentationTimer = null;
 let presentationStartTime = null;
 let timerInterval = null;
 
+// Live broadcast to audience viewers ({ broadcastId, token, viewerUrl })
+let broadcast = null;
+let laserInFlight = false;
+let pendingLaser = null;
+
 // Import slide functions
 import { getAllSlides, getCurrentSlideIndex } from './slides.js';
 
@@ -73,6 +78,9 @@ export function startPresentation() {
     // Start timer
     startPresentationTimer();
     
+    // Open a live broadcast so the audience can follow along
+    startBroadcast(slides);
+    
     console.log('Presentation started');
 }
 
@@ -276,6 +284,7 @@ function showPresenterControls() {
     presenterView.innerHTML = `
         <div class="presenter-header">
             <div class="presenter-timer" id="presenter-timer">00:00:00</div>
+            <div class="presenter-broadcast" id="presenter-broadcast"></div>
             <div class="presenter-controls">
                 <button id="prev-slide-btn" class="presenter-btn"><i class="fas fa-arrow-left"></i> Previous</button>
                 <button id="next-slide-btn" class="presenter-btn">Next <i class="fas fa-arrow-right"></i></button>
@@ -379,6 +388,17 @@ function showPresenterControls() {
         .laser-active {
             background-color: #e74c3c;
         }
+        
+        .presenter-broadcast {
+            font-size: 13px;
+            color: #555;
+        }
+        
+        .presenter-broadcast input {
+            width: 280px;
+            margin-left: 6px;
+            font-size: 12px;
+        }
     `;
     document.head.appendChild(style);
     
@@ -427,6 +447,7 @@ function setupPresenterControls() {
         if (event.data.type === 'slideChanged') {
             currentSlideIndex = event.data.index;
             updateSlidePreviews();
+            publishBroadcastState({ slide: currentSlideIndex });
         }
     });
     
@@ -443,6 +464,9 @@ function setupPresenterControls() {
                 x: presentationX,
                 y: presentationY
             }, '*');
+            
+            // Audience viewers get the position in 0-1 slide coordinates
+            publishLaser({ x: e.clientX / window.innerWidth, y: e.clientY / window.innerHeight });
         }
     });
 }
@@ -520,6 +544,9 @@ function navigateToSlide(index) {
     
     // Update previews
     updateSlidePreviews();
+    
+    // Follow along in audience viewers
+    publishBroadcastState({ slide: currentSlideIndex });
 }
 
 // Toggle laser pointer
@@ -533,6 +560,85 @@ function toggleLaserPointer() {
             state: isLaserActive ? 'on' : 'off'
         }, '*');
     }
+    
+    if (!isLaserActive) {
+        pendingLaser = null;
+        publishBroadcastState({ laser: null });
+    }
+}
+
+// Start a live broadcast of the presented slides
+async function startBroadcast(slides) {
+    try {
+        const response = await fetch('/api/broadcast', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                slides: slides,
+                title: document.title,
+                slideIndex: currentSlideIndex
+            })
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        if (!isPresenting) {
+            // The presentation ended before the broadcast was created
+            stopBroadcast(data);
+            return;
+        }
+        broadcast = data;
+        
+        const broadcastInfo = document.getElementById('presenter-broadcast');
+        if (broadcastInfo) {
+            broadcastInfo.innerHTML = `청중 링크:<input type="text" readonly>`;
+            const input = broadcastInfo.querySelector('input');
+            input.value = broadcast.viewerUrl;
+            input.addEventListener('focus', () => input.select());
+        }
+    } catch (error) {
+        // Presenting still works locally without an audience link
+        console.warn('Broadcast unavailable:', error);
+    }
+}
+
+// Publish presenter state to audience viewers (fire and forget)
+function publishBroadcastState(state) {
+    if (!broadcast) return Promise.resolve();
+    return fetch(`/api/broadcast/${broadcast.broadcastId}/state`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Broadcast-Token': broadcast.token
+        },
+        body: JSON.stringify(state)
+    }).catch(error => console.warn('Broadcast publish failed:', error));
+}
+
+// Send laser positions one request at a time, skipping to the latest position
+function publishLaser(position) {
+    pendingLaser = position;
+    if (laserInFlight || !broadcast) return;
+    
+    laserInFlight = true;
+    const laser = pendingLaser;
+    pendingLaser = null;
+    publishBroadcastState({ laser: laser }).finally(() => {
+        laserInFlight = false;
+        if (pendingLaser && isLaserActive) {
+            publishLaser(pendingLaser);
+        }
+    });
+}
+
+// End the broadcast; viewers see that the presentation is over
+function stopBroadcast(target) {
+    if (!target) return;
+    fetch(`/api/broadcast/${target.broadcastId}`, {
+        method: 'DELETE',
+        headers: { 'X-Broadcast-Token': target.token }
+    }).catch(error => console.warn('Broadcast end failed:', error));
 }
 
 // Start presentation timer
@@ -600,6 +706,11 @@ function endPresentation() {
         presenterView.remove();
     }
     
+    // End the audience broadcast
+    stopBroadcast(broadcast);
+    broadcast = null;
+    pendingLaser = null;
+    
     // Reset state
     isPresenting = false;
     presentationWindow = null;
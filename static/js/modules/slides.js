@@ -2,10 +2,20 @@
  * Slides module for managing slides and their content
  */
 
+import { isCollabActive, startCollab, submitChanges, createInvite } from './collab.js';
+
 // Store current slides
 let slides = [];
 let currentSlideIndex = 0;
 
+// Last state known to be on the server, used to send only the changes on save
+let savedSlides = null;
+let slidesVersion = null;
+let pendingSave = Promise.resolve();
+
+// Rejected saves are rebased on the server copy at most this many times in a row
+const MAX_REBASE_ATTEMPTS = 3;
+
 // Available transitions
 const slideTransitions = {
     none: {
@@ -111,6 +121,16 @@ function setupSlideControls() {
         newSlideBtn.addEventListener('click', addNewSlide);
     }
     
+    // Share button: invite another editor
+    const shareEditingBtn = document.getElementById('shareEditingBtn');
+    if (shareEditingBtn) {
+        shareEditingBtn.addEventListener('click', () => {
+            shareSlides()
+                .then(url => prompt('이 링크를 공유하면 함께 편집할 수 있습니다:', url))
+                .catch(error => console.error('Error creating invite:', error));
+        });
+    }
+    
     // Slides pane event delegation for slide selection
     const slidesPane = document.getElementById('slides-pane');
     if (slidesPane) {
@@ -303,6 +323,7 @@ export function loadSlides() {
         .then(data => {
             if (data.success) {
                 slides = data.slides;
+                rememberSavedState(data.version);
                 renderSlides();
                 
                 // Select the first slide if available
@@ -310,6 +331,11 @@ export function loadSlides() {
                     selectSlide(0);
                 }
                 
+                // Opened from a co-editing invitation
+                if (new URLSearchParams(location.search).has('collab')) {
+                    startCoEditing();
+                }
+                
                 return slides;
             } else {
                 console.error('Failed to load slides:', data.error);
@@ -324,6 +350,70 @@ export function loadSlides() {
 
 // Create slides from a topic
 export function createSlidesFromTopic(topic, slideCount) {
+    // Fall back to the blocking endpoint when the browser cannot read streamed bodies
+    if (typeof ReadableStream === 'undefined' || typeof TextDecoder === 'undefined') {
+        return createSlidesFromTopicBlocking(topic, slideCount);
+    }
+    
+    return fetch('/generate_from_topic/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ topic, slide_count: slideCount })
+    })
+    .then(response => {
+        if (!response.ok || !response.body) {
+            return createSlidesFromTopicBlocking(topic, slideCount);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        slides = [];
+        forgetSavedState();
+        
+        // Render each slide as soon as the server emits it
+        const handleEvent = (rawEvent) => {
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) return;
+            
+            const payload = JSON.parse(data);
+            if (eventName === 'slide') {
+                slides.push(payload.slide);
+                renderSlides();
+                if (slides.length === 1) {
+                    selectSlide(0);
+                }
+            } else if (eventName === 'error') {
+                throw new Error(payload.error);
+            }
+        };
+        
+        const pump = () => reader.read().then(({ done, value }) => {
+            if (done) {
+                return slides;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                handleEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+            return pump();
+        });
+        
+        return pump();
+    });
+}
+
+// Create slides from a topic with a single blocking request
+function createSlidesFromTopicBlocking(topic, slideCount) {
     return fetch('/generate_from_topic', {
         method: 'POST',
         headers: {
@@ -335,6 +425,7 @@ export function createSlidesFromTopic(topic, slideCount) {
     .then(data => {
         if (data.success) {
             slides = data.slides;
+            forgetSavedState();
             renderSlides();
             
             // Select the first slide
@@ -350,18 +441,413 @@ export function createSlidesFromTopic(topic, slideCount) {
     });
 }
 
-// Save current slides to the server
+// Record the state the server now holds
+function rememberSavedState(version, snapshot = JSON.parse(JSON.stringify(slides))) {
+    savedSlides = snapshot;
+    slidesVersion = version ?? null;
+}
+
+// Forget the server state so the next save sends the whole deck
+function forgetSavedState() {
+    savedSlides = null;
+    slidesVersion = null;
+}
+
+function escapePointer(key) {
+    return String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+}
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+// Append JSON Patch operations that turn `before` into `after`
+function diffJSON(before, after, path, ops) {
+    if (before === after) return;
+    
+    if (Array.isArray(before) && Array.isArray(after)) {
+        diffArray(before, after, path, ops);
+    } else if (isPlainObject(before) && isPlainObject(after)) {
+        Object.keys(before).forEach(key => {
+            if (!(key in after)) {
+                ops.push({ op: 'remove', path: `${path}/${escapePointer(key)}` });
+            }
+        });
+        Object.keys(after).forEach(key => {
+            const childPath = `${path}/${escapePointer(key)}`;
+            if (!(key in before)) {
+                ops.push({ op: 'add', path: childPath, value: after[key] });
+            } else {
+                diffJSON(before[key], after[key], childPath, ops);
+            }
+        });
+    } else if (JSON.stringify(before) !== JSON.stringify(after)) {
+        ops.push({ op: 'replace', path, value: after });
+    }
+}
+
+function diffArray(before, after, path, ops) {
+    const beforeKeys = before.map(item => JSON.stringify(item));
+    const afterKeys = after.map(item => JSON.stringify(item));
+    
+    // Skip the unchanged head and tail
+    let start = 0;
+    while (start < before.length && start < after.length && beforeKeys[start] === afterKeys[start]) {
+        start++;
+    }
+    let endBefore = before.length;
+    let endAfter = after.length;
+    while (endBefore > start && endAfter > start && beforeKeys[endBefore - 1] === afterKeys[endAfter - 1]) {
+        endBefore--;
+        endAfter--;
+    }
+    
+    const removed = endBefore - start;
+    const added = endAfter - start;
+    
+    // A single item moved from one end of the changed range to the other
+    if (removed === added && removed > 1) {
+        const rotatedForward = beforeKeys[start] === afterKeys[endAfter - 1] &&
+            beforeKeys.slice(start + 1, endBefore).join() === afterKeys.slice(start, endAfter - 1).join();
+        const rotatedBackward = beforeKeys[endBefore - 1] === afterKeys[start] &&
+            beforeKeys.slice(start, endBefore - 1).join() === afterKeys.slice(start + 1, endAfter).join();
+        if (rotatedForward) {
+            ops.push({ op: 'move', from: `${path}/${start}`, path: `${path}/${endAfter - 1}` });
+            return;
+        }
+        if (rotatedBackward) {
+            ops.push({ op: 'move', from: `${path}/${endBefore - 1}`, path: `${path}/${start}` });
+            return;
+        }
+    }
+    
+    // Diff items that kept their position, then remove or insert the rest
+    const paired = Math.min(removed, added);
+    for (let i = start; i < start + paired; i++) {
+        diffJSON(before[i], after[i], `${path}/${i}`, ops);
+    }
+    for (let i = endBefore - 1; i >= start + paired; i--) {
+        ops.push({ op: 'remove', path: `${path}/${i}` });
+    }
+    for (let i = start + paired; i < endAfter; i++) {
+        ops.push({ op: 'add', path: `${path}/${i}`, value: after[i] });
+    }
+}
+
+function parsePointer(path) {
+    return path.split('/').slice(1).map(token => token.replace(/~1/g, '/').replace(/~0/g, '~'));
+}
+
+// Container of the value at `path` and its key in it ([undefined] if the container is missing)
+function locatePointer(doc, path) {
+    const tokens = parsePointer(path);
+    const key = tokens.pop();
+    let parent = doc;
+    for (const token of tokens) {
+        if (parent === null || typeof parent !== 'object' || !(token in parent)) return [undefined, key];
+        parent = parent[token];
+    }
+    return [parent !== null && typeof parent === 'object' ? parent : undefined, key];
+}
+
+function valueAt(doc, path) {
+    const [parent, key] = locatePointer(doc, path);
+    return parent === undefined ? undefined : parent[key];
+}
+
+// Apply one operation produced by diffJSON to `doc` in place
+function applyPatchOp(doc, op) {
+    if (op.op === 'move') {
+        const [from, fromKey] = locatePointer(doc, op.from);
+        const value = from.splice(Number(fromKey), 1)[0];
+        const [to, toKey] = locatePointer(doc, op.path);
+        to.splice(Number(toKey), 0, value);
+        return;
+    }
+    const [parent, key] = locatePointer(doc, op.path);
+    if (Array.isArray(parent)) {
+        if (op.op === 'add') parent.splice(Number(key), 0, JSON.parse(JSON.stringify(op.value)));
+        else if (op.op === 'remove') parent.splice(Number(key), 1);
+        else parent[Number(key)] = JSON.parse(JSON.stringify(op.value));
+    } else if (op.op === 'remove') {
+        delete parent[key];
+    } else {
+        parent[key] = JSON.parse(JSON.stringify(op.value));
+    }
+}
+
+// Order of an array's items, by ID where they have one (slides, elements)
+function arrayShape(items) {
+    return JSON.stringify(items.map(item => (isPlainObject(item) && 'id' in item) ? item.id : JSON.stringify(item)));
+}
+
+/**
+ * Replay local edits (`ops`, diffed against `base`) on `server`, the deck
+ * another writer has changed since. Succeeds only if every value an edit
+ * replaces or removes is still as it was in `base`, and every array it
+ * inserts into, removes from or reorders still holds the same items in the
+ * same order; returns the merged slides or null.
+ */
+function rebaseOps(base, server, ops) {
+    const before = { slides: JSON.parse(JSON.stringify(base)) };
+    const merged = { slides: JSON.parse(JSON.stringify(server)) };
+    for (const op of ops) {
+        const parentPath = op.path.slice(0, op.path.lastIndexOf('/'));
+        const parentBefore = valueAt(before, parentPath);
+        const parentMerged = valueAt(merged, parentPath);
+        if (parentMerged === null || typeof parentMerged !== 'object' ||
+            Array.isArray(parentBefore) !== Array.isArray(parentMerged)) {
+            return null;
+        }
+        if (Array.isArray(parentBefore) && op.op !== 'replace' && arrayShape(parentBefore) !== arrayShape(parentMerged)) {
+            return null;
+        }
+        if (op.op !== 'move' && !(op.op === 'add' && Array.isArray(parentBefore)) &&
+            JSON.stringify(valueAt(before, op.path)) !== JSON.stringify(valueAt(merged, op.path))) {
+            return null;
+        }
+        applyPatchOp(before, op);
+        applyPatchOp(merged, op);
+    }
+    return merged.slides;
+}
+
+// Show a deck that replaced the local one
+function showSlides(newSlides) {
+    slides = newSlides;
+    renderSlides();
+    if (slides.length > 0) {
+        selectSlide(Math.min(currentSlideIndex, slides.length - 1));
+    }
+}
+
+/**
+ * Resolve a rejected save: fetch the server copy, replay the local edits
+ * made since the last save (`snapshot` is the deck that was being saved) on
+ * it and patch against its version. If the edits collide with the other
+ * writer's, the user chooses between keeping their deck and loading the
+ * server's. The whole deck is never written without a version.
+ */
+function rebaseSlides(snapshot, attempt = 0) {
+    return fetch('/get_slides', { headers: { 'Accept': 'application/json' }, cache: 'no-store' })
+        .then(response => response.json())
+        .then(server => {
+            if (!server.success) {
+                throw new Error(server.error);
+            }
+            let target = null;
+            if (savedSlides !== null) {
+                const localOps = [];
+                diffJSON(savedSlides, snapshot, '/slides', localOps);
+                target = rebaseOps(savedSlides, server.slides, localOps);
+            }
+            if (target === null) {
+                if (!confirm('다른 곳에서 이 프레젠테이션이 변경되었습니다.\n' +
+                             '확인: 내 변경 사항으로 덮어쓰기 / 취소: 서버의 슬라이드 불러오기')) {
+                    rememberSavedState(server.version, server.slides);
+                    showSlides(JSON.parse(JSON.stringify(server.slides)));
+                    return false;
+                }
+                target = snapshot;
+            }
+            
+            // Edits made while this save was in flight are kept on top of the result
+            const laterOps = [];
+            diffJSON(snapshot, slides, '/slides', laterOps);
+            const shown = laterOps.length ? rebaseOps(snapshot, target, laterOps) : target;
+            showSlides(JSON.parse(JSON.stringify(shown ?? target)));
+            
+            rememberSavedState(server.version, server.slides);
+            const ops = [];
+            diffJSON(server.slides, target, '/slides', ops);
+            if (ops.length === 0) {
+                return true;
+            }
+            return fetch('/patch_slides', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ ops, version: server.version })
+            })
+            .then(response => response.json().then(data => ({ status: response.status, data })))
+            .then(({ status, data }) => {
+                if (data.success) {
+                    rememberSavedState(data.version, target);
+                    console.log(`Slides saved after rebasing on version ${server.version}`);
+                    return true;
+                }
+                if (status === 409 && attempt < MAX_REBASE_ATTEMPTS) {
+                    return rebaseSlides(target, attempt + 1);
+                }
+                console.error('Failed to save slides:', data.error);
+                return false;
+            });
+        })
+        .catch(error => {
+            console.error('Error rebasing slides:', error);
+            return false;
+        });
+}
+
+// Edit the deck together with other editors: saves become co-editing operations
+export function startCoEditing() {
+    return startCollab(() => slides, remoteSlides => {
+        slides = remoteSlides;
+        forgetSavedState();
+        renderSlides();
+        if (slides.length > 0) {
+            selectSlide(Math.min(currentSlideIndex, slides.length - 1));
+        }
+    });
+}
+
+// Start co-editing and return a link that lets someone else join
+export function shareSlides() {
+    return startCoEditing().then(() => createInvite());
+}
+
+// Save current slides to the server, sending only what changed since the last save
 export function saveSlides() {
+    if (isCollabActive()) {
+        return submitChanges();
+    }
+    
+    // Saves are serialised so each patch is based on the version the previous one produced
+    pendingSave = pendingSave.then(() => {
+        if (savedSlides === null || slidesVersion === null) {
+            return saveAllSlides();
+        }
+        
+        const snapshot = JSON.parse(JSON.stringify(slides));
+        const ops = [];
+        diffJSON(savedSlides, snapshot, '/slides', ops);
+        if (ops.length === 0) {
+            return true;
+        }
+        
+        return fetch('/patch_slides', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ ops, version: slidesVersion })
+        })
+        .then(response => response.json().then(data => ({ status: response.status, data })))
+        .then(({ status, data }) => {
+            if (data.success) {
+                rememberSavedState(data.version, snapshot);
+                console.log(`Slides saved (${ops.length} changes)`);
+                return true;
+            }
+            if (status === 409 || status === 400) {
+                // The server copy changed or no longer matches: replay the edits on it
+                console.warn('Slide patch rejected, rebasing on the server copy:', data.error);
+                return rebaseSlides(snapshot);
+            }
+            if (status === 404) {
+                // The session is gone, so there is nothing to overwrite
+                forgetSavedState();
+                return saveAllSlides();
+            }
+            console.error('Failed to save slides:', data.error);
+            return false;
+        })
+        .catch(error => {
+            console.error('Error saving slides:', error);
+            return false;
+        });
+    });
+    return pendingSave;
+}
+
+// Move through the server-side undo history ('undo' or 'redo')
+function stepHistory(action) {
+    // Pending edits are saved first so they are the step that gets undone
+    return saveSlides()
+        .then(() => fetch(`/api/history/${action}`, { method: 'POST' }))
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                console.warn(`Cannot ${action}:`, data.error);
+                return false;
+            }
+            // While co-editing, the restored deck arrives as a snapshot for every editor
+            if (!isCollabActive()) {
+                slides = data.slides;
+                rememberSavedState(data.version);
+                renderSlides();
+                if (slides.length > 0) {
+                    selectSlide(Math.min(currentSlideIndex, slides.length - 1));
+                }
+            }
+            return true;
+        })
+        .catch(error => {
+            console.error(`Error during ${action}:`, error);
+            return false;
+        });
+}
+
+export function undoSlides() {
+    return stepHistory('undo');
+}
+
+export function redoSlides() {
+    return stepHistory('redo');
+}
+
+// Replace strings in `target` (in place) that the server rewrote between `sent` and `stored`
+function adoptRewrites(sent, stored, target) {
+    const rewrites = new Map();
+    (function collect(before, after) {
+        if (typeof before === 'string') {
+            if (before !== after && typeof after === 'string') rewrites.set(before, after);
+        } else if (before && after && typeof before === 'object' && typeof after === 'object') {
+            for (const key of Object.keys(before)) collect(before[key], after[key]);
+        }
+    })(sent, stored);
+    (function apply(value) {
+        if (!value || typeof value !== 'object') return;
+        for (const key of Object.keys(value)) {
+            if (typeof value[key] === 'string') {
+                if (rewrites.has(value[key])) value[key] = rewrites.get(value[key]);
+            } else {
+                apply(value[key]);
+            }
+        }
+    })(target);
+    return rewrites.size;
+}
+
+// Save the whole deck, replacing the server copy (unversioned only before anything was loaded or saved)
+function saveAllSlides() {
+    const snapshot = JSON.parse(JSON.stringify(slides));
     return fetch('/save_slides', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ slides })
+        // Based on the last saved version when there is one, so a concurrent change is not overwritten
+        body: JSON.stringify({ slides: snapshot, version: slidesVersion })
     })
-    .then(response => response.json())
-    .then(data => {
+    .then(response => response.json().then(data => ({ status: response.status, data })))
+    .then(({ status, data }) => {
+        if (status === 409) {
+            console.warn('Slide save rejected, rebasing on the server copy:', data.error);
+            return rebaseSlides(snapshot);
+        }
         if (data.success) {
+            // Inline images were moved to the image store: use their URLs from now on
+            if (data.slides && adoptRewrites(snapshot, data.slides, slides)) {
+                rememberSavedState(data.version, data.slides);
+                renderSlides();
+                if (slides.length > 0) {
+                    selectSlide(Math.min(currentSlideIndex, slides.length - 1));
+                }
+            } else {
+                rememberSavedState(data.version, snapshot);
+            }
             console.log('Slides saved successfully');
             return true;
         } else {
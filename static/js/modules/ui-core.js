@@ -4,7 +4,7 @@
 
 import { AppState, addNewSlide, duplicateCurrentSlide, deleteSelectedElement, deleteCurrentSlide, undo, redo, exportPresentation } from '../index.js';
 import { getThemeByName, getCurrentColorPalette, changeSlideBackground, applyThemeToAll } from './themes.js';
-import { addNewTextbox, addNewShape, addNewImage, addNewTable, addNewChart } from './elements.js';
+import { addNewTextbox, addNewShape, addNewImage, addNewTable, addNewChart, uploadImageFile } from './elements.js';
 
 // Initialize core UI components
 export function initCoreUI() {
@@ -426,25 +426,11 @@ function openImageUploader() {
         if (e.target.files && e.target.files[0]) {
             const file = e.target.files[0];
             
-            const formData = new FormData();
-            formData.append('image', file);
-            
-            fetch('/upload_image', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    addNewImage(data.image_url);
-                } else {
-                    console.error('Image upload failed:', data.error);
-                    alert('Failed to upload image: ' + data.error);
-                }
-            })
+            uploadImageFile(file)
+            .then(addNewImage)
             .catch(error => {
                 console.error('Error uploading image:', error);
-                alert('Error uploading image. Please try again.');
+                alert('Failed to upload image: ' + error.message);
             });
         }
         
@@ -3,7 +3,7 @@
  */
 
 import { AppState } from '../index.js';
-import { addShapeElement, addImageElement } from './elements.js';
+import { addShapeElement, addImageElement, uploadImageFile } from './elements.js';
 
 // Initialize modals
 export function initModals() {
@@ -234,12 +234,16 @@ function setupImageModalEvents() {
         });
     }
     
+    // 선택된 파일 (슬라이드에 추가할 때 업로드)
+    let selectedFile = null;
+    
     // 파일 처리 함수
     function handleFileSelect(file) {
         if (!file.type.match('image.*')) {
             alert('이미지 파일만 선택할 수 있습니다.');
             return;
         }
+        selectedFile = file;
         
         const reader = new FileReader();
         reader.onload = (e) => {
@@ -261,11 +265,17 @@ function setupImageModalEvents() {
     if (addToSlideBtn) {
         addToSlideBtn.addEventListener('click', () => {
             if (imagePreview.src) {
-                addImageElement(imagePreview.src);
+                // 업로드한 이미지는 URL로 추가하고, 업로드에 실패하면 미리보기 데이터를 그대로 사용
+                const previewSrc = imagePreview.src;
+                const upload = selectedFile ? uploadImageFile(selectedFile) : Promise.reject(new Error('No file'));
+                upload
+                    .catch(() => previewSrc)
+                    .then(src => addImageElement(src));
                 closeModal(imageModal);
                 
                 // 초기화
                 setTimeout(() => {
+                    selectedFile = null;
                     imagePreview.src = '';
                     imagePreview.style.display = 'none';
                     if (uploadInput) uploadInput.value = '';
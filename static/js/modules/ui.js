@@ -11,6 +11,7 @@ import { initShortcuts } from './ui-shortcuts.js';
 import { initAnalyzer, showPresentationAnalyzer } from './ui-analyzer.js';
 import { initPresenter, updatePresenterView, initPresenterMode } from './ui-presenter.js';
 import { initElementHandlers } from './elements.js';
+import { undoSlides, redoSlides } from './slides.js';
 import { AppState } from '../index.js';
 
 // Initialize UI components
@@ -103,13 +104,13 @@ function initEditorPanel() {
     
     if (undoBtn) {
         undoBtn.addEventListener('click', () => {
-            // Undo 로직 구현
+            undoSlides();
         });
     }
     
     if (redoBtn) {
         redoBtn.addEventListener('click', () => {
-            // Redo 로직 구현
+            redoSlides();
         });
     }
     
@@ -0,0 +1,5 @@
+import os
+
+# Must be set before the app package is imported
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+os.environ.setdefault("LOG_FILE", "")
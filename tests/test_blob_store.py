@@ -0,0 +1,52 @@
+"""Content-addressed image store: deduplication and renditions"""
+
+import os
+from io import BytesIO
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from app.services.blob_store import BlobStore
+
+
+def png_bytes(size):
+    out = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(out, 'PNG')
+    return out.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(root=str(tmp_path), renditions={'thumb': 32})
+
+
+def leftovers(store):
+    return [name for _, _, files in os.walk(store.root) for name in files if name.startswith('.')]
+
+
+def test_identical_uploads_are_stored_once(store):
+    meta, existed = store.put_bytes(png_bytes((64, 48)))
+    again, existed_again = store.put_bytes(png_bytes((64, 48)))
+    assert not existed and existed_again
+    assert again['hash'] == meta['hash']
+    assert (meta['width'], meta['height']) == (64, 48)
+
+
+def test_rendition_is_downscaled(store):
+    meta, _ = store.put_bytes(png_bytes((128, 64)))
+    path = store.rendition_path(meta['hash'], 'thumb')
+    assert path != store.path(meta['hash'])
+    with Image.open(path) as image:
+        assert max(image.size) == 32
+
+
+def test_failed_rendition_leaves_no_temp_file(store, monkeypatch):
+    meta, _ = store.put_bytes(png_bytes((128, 64)))
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Image.Image, 'save', fail)
+    assert store.rendition_path(meta['hash'], 'thumb') == store.path(meta['hash'])
+    assert leftovers(store) == []
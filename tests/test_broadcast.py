@@ -0,0 +1,196 @@
+"""Live broadcasts: fan-out to viewers, coalescing, and channel and hub pruning"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services import broadcast as broadcast_module
+from app.services.broadcast import (
+    BroadcastError,
+    create_broadcast,
+    end_broadcast,
+    follow,
+    follow_async,
+    get_broadcast
+)
+
+SLIDES = [{'title': f'슬라이드 {i}', 'content': '내용', 'elements': []} for i in range(3)]
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(broadcast_module, 'BROADCAST_MIN_INTERVAL', 0.01)
+    monkeypatch.setattr(broadcast_module, 'BROADCAST_KEEPALIVE', 5)
+
+
+def states(frames):
+    return [json.loads(data) for data in frames]
+
+
+async def viewer(broadcast, frames):
+    async def send_frame(frame, data):
+        frames.append(data)
+
+    await follow_async(broadcast, send_frame)
+
+
+async def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_every_viewer_gets_the_latest_state():
+    broadcast = create_broadcast(SLIDES, '발표')
+    received = [[] for _ in range(5)]
+
+    async def main():
+        tasks = [asyncio.create_task(viewer(broadcast, frames)) for frames in received]
+        await wait_for(lambda: all(received))
+        # Every viewer on the loop shares one channel
+        assert len(broadcast._channels) == 1
+        assert broadcast.viewers == 5
+        broadcast.publish(slide=2, laser={'x': 0.5, 'y': 2})
+        await wait_for(lambda: all(states(frames)[-1]['slide'] == 2 for frames in received))
+        broadcast.end()
+        await asyncio.wait_for(asyncio.gather(*tasks), 2)
+
+    asyncio.run(main())
+    for frames in received:
+        last = states(frames)[-1]
+        assert last['ended'] and last['slide'] == 2
+        assert last['laser'] == {'x': 0.5, 'y': 1.0}
+    assert broadcast.viewers == 0
+    assert broadcast._channels == {}
+
+
+def test_bursts_are_coalesced():
+    broadcast = create_broadcast(SLIDES)
+    frames = []
+
+    async def main():
+        task = asyncio.create_task(viewer(broadcast, frames))
+        await wait_for(lambda: frames)
+        for i in range(200):
+            broadcast.publish(laser={'x': i / 200, 'y': 0.5})
+        broadcast.end()
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(main())
+    assert len(frames) < 20
+    assert states(frames)[-1]['laser'] == {'x': 0.995, 'y': 0.5}
+    seqs = [state['seq'] for state in states(frames)]
+    assert seqs == sorted(set(seqs))
+
+
+def test_frames_are_encoded_once_per_state():
+    broadcast = create_broadcast(SLIDES)
+    first = broadcast.frame()
+    assert broadcast.frame() is first
+    broadcast.publish(slide=1)
+    seq, frame, data = broadcast.frame()
+    assert seq == first[0] + 1
+    assert frame.startswith(f"id: {seq}\nevent: state\n".encode())
+
+
+def test_channel_of_a_closed_loop_is_pruned():
+    broadcast = create_broadcast(SLIDES)
+
+    async def open_channel():
+        broadcast.channel()
+
+    # The loop is closed without the viewer releasing its channel
+    asyncio.run(open_channel())
+    assert len(broadcast._channels) == 1
+    broadcast.publish(slide=1)
+    assert broadcast._channels == {}
+
+
+def test_last_viewer_releases_the_channel():
+    broadcast = create_broadcast(SLIDES)
+
+    async def main():
+        first, second = broadcast.channel(), broadcast.channel()
+        assert first is second
+        first.enter()
+        second.enter()
+        broadcast.release_channel(first)
+        assert broadcast._channels == {first.loop: first}
+        broadcast.release_channel(second)
+        assert broadcast._channels == {}
+        assert first._keepalive_handle is None
+
+    asyncio.run(main())
+
+
+def test_blocking_follow_ends_with_the_broadcast():
+    broadcast = create_broadcast(SLIDES)
+    frames = follow(broadcast)
+    assert b'"slide":0' in next(frames)
+    assert broadcast.viewers == 1
+    broadcast.publish(slide=1)
+    assert b'"slide":1' in next(frames)
+    broadcast.end()
+    assert b'"ended":true' in next(frames)
+    assert list(frames) == []
+    assert broadcast.viewers == 0
+
+
+def test_snapshot_is_built_once_per_version_and_encoding():
+    broadcast = create_broadcast(SLIDES)
+    plain = broadcast.snapshot()
+    assert broadcast.snapshot() is plain
+    assert broadcast.snapshot('gzip') is not plain
+    broadcast.set_deck(SLIDES[:1])
+    body, encoding, etag = broadcast.snapshot()
+    assert etag != plain[2]
+    assert len(json.loads(body)['slides']) == 1
+
+
+def test_viewer_limit(monkeypatch):
+    monkeypatch.setattr(broadcast_module, 'BROADCAST_MAX_VIEWERS', 1)
+    broadcast = create_broadcast(SLIDES)
+    broadcast.join()
+    with pytest.raises(BroadcastError) as error:
+        broadcast.join()
+    assert error.value.status == 503
+
+
+def test_invalid_publish_is_rejected():
+    broadcast = create_broadcast(SLIDES)
+    for slide in (3, -1, True, '1'):
+        with pytest.raises(BroadcastError):
+            broadcast.publish(slide=slide)
+    with pytest.raises(BroadcastError):
+        broadcast.publish(laser={'x': 'left'})
+    with pytest.raises(BroadcastError):
+        create_broadcast([])
+
+
+def test_presenter_token_is_checked():
+    broadcast = create_broadcast(SLIDES)
+    assert get_broadcast(broadcast.id) is broadcast
+    assert get_broadcast(broadcast.id, broadcast.token) is broadcast
+    for token in ('wrong', '발표자'):
+        with pytest.raises(BroadcastError) as error:
+            get_broadcast(broadcast.id, token)
+        assert error.value.status == 403
+    end_broadcast(broadcast.id, broadcast.token)
+    with pytest.raises(BroadcastError) as error:
+        get_broadcast(broadcast.id)
+    assert error.value.status == 404
+
+
+def test_idle_broadcasts_without_viewers_are_pruned(monkeypatch):
+    idle, watched = create_broadcast(SLIDES), create_broadcast(SLIDES)
+    watched.join()
+    monkeypatch.setattr(broadcast_module, 'BROADCAST_IDLE_TTL', 0)
+    time.sleep(0.01)
+    create_broadcast(SLIDES)
+    assert idle.ended
+    with pytest.raises(BroadcastError):
+        get_broadcast(idle.id)
+    assert get_broadcast(watched.id) is watched
@@ -0,0 +1,205 @@
+"""Co-editing: operation log ordering, skipped operations and validation"""
+
+import copy
+import json
+import uuid
+
+import pytest
+
+from app.services import collab
+from app.services.collab import CollabDoc, CollabError, _DeckEditor
+from app.services.slide_service import create_session, get_session_deck, replace_session_slides
+
+
+def text(element_id, **fields):
+    return dict({'id': element_id, 'type': 'text', 'content': '본문',
+                 'x': 10, 'y': 10, 'width': 100, 'height': 40, 'style': {'color': 'red'}}, **fields)
+
+
+def make_slides():
+    return [{'id': 's1', 'title': '첫 슬라이드', 'content': '', 'elements': [text('a'), text('b')]},
+            {'id': 's2', 'title': '둘째 슬라이드', 'content': '', 'elements': [text('c')]}]
+
+
+@pytest.fixture
+def doc():
+    session_id = str(uuid.uuid4())
+    create_session(session_id)
+    replace_session_slides(session_id, make_slides())
+    doc = CollabDoc(session_id)
+    doc.load()
+    return doc
+
+
+def stored(doc):
+    return get_session_deck(doc.session_id)[0]
+
+
+def element(slides, element_id):
+    return next(e for s in slides for e in s.get('elements') or [] if e['id'] == element_id)
+
+
+def log(doc, since):
+    return json.loads(doc.changes(since, doc.epoch)[1])['ops']
+
+
+def test_operations_get_consecutive_sequence_numbers(doc):
+    start = doc.seq
+    seq, skipped = doc.submit('alice', [
+        {'type': 'update_element', 'elementId': 'a', 'changes': {'x': 50}, 'cid': 1},
+        {'type': 'set_theme', 'theme': 'dark', 'cid': 2}
+    ])
+    assert skipped == [] and seq == start + 2
+    doc.submit('bob', [{'type': 'update_element', 'elementId': 'a', 'changes': {'y': 70}, 'cid': 1}])
+    ops = log(doc, start)
+    assert [(op['seq'], op['client'], op['cid']) for op in ops] == \
+        [(start + 1, 'alice', 1), (start + 2, 'alice', 2), (start + 3, 'bob', 1)]
+    assert log(doc, start + 2) == ops[2:]
+    # Edits to different fields of one element both survive
+    assert (element(stored(doc), 'a')['x'], element(stored(doc), 'a')['y']) == (50, 70)
+
+
+def test_same_field_is_last_writer_wins(doc):
+    doc.submit('alice', [{'type': 'update_element', 'elementId': 'a', 'changes': {'content': '앨리스'}}])
+    doc.submit('bob', [{'type': 'update_element', 'elementId': 'a', 'changes': {'content': '밥'}}])
+    assert element(stored(doc), 'a')['content'] == '밥'
+
+
+def test_operations_on_removed_targets_are_skipped(doc):
+    start = doc.seq
+    seq, skipped = doc.submit('alice', [
+        {'type': 'remove_slide', 'slideId': 's2', 'cid': 1},
+        {'type': 'update_element', 'elementId': 'c', 'changes': {'x': 1}, 'cid': 2},
+        {'type': 'add_element', 'slideId': 's2', 'element': text('d'), 'cid': 3},
+        {'type': 'update_slide', 'slideId': 's2', 'changes': {'title': '다시'}, 'cid': 4},
+        {'type': 'remove_element', 'elementId': 'a', 'cid': 5},
+        {'type': 'move_element', 'elementId': 'a', 'slideId': 's1', 'cid': 6}
+    ])
+    assert skipped == [2, 3, 4, 6]
+    assert seq == start + 2
+    assert [op['cid'] for op in log(doc, start)] == [1, 5]
+    assert stored(doc) == [dict(make_slides()[0], elements=[text('b')])]
+
+
+def test_batch_of_only_skipped_operations_does_not_write(doc):
+    version = get_session_deck(doc.session_id)[1]
+    seq, skipped = doc.submit('alice', [{'type': 'remove_element', 'elementId': 'gone', 'cid': 1}])
+    assert skipped == [1] and seq == doc.seq
+    assert get_session_deck(doc.session_id)[1] == version
+
+
+def test_invalid_element_updates_are_skipped(doc):
+    seq, skipped = doc.submit('alice', [
+        {'type': 'update_element', 'elementId': 'a', 'changes': {'width': 0}, 'cid': 1},
+        {'type': 'update_element', 'elementId': 'a', 'changes': {'type': 'video'}, 'cid': 2},
+        {'type': 'update_element', 'elementId': 'a', 'changes': {'x': 'left'}, 'cid': 3},
+        {'type': 'update_element', 'elementId': 'a', 'changes': {'x': '25'}, 'cid': 4}
+    ])
+    assert skipped == [1, 2, 3]
+    assert element(stored(doc), 'a') == text('a', x=25.0)
+    # Peers get the normalized value
+    assert log(doc, seq - 1)[0]['changes'] == {'x': 25.0}
+
+
+def test_unset_of_a_required_field_sends_the_default(doc):
+    seq, _ = doc.submit('alice', [{'type': 'update_element', 'elementId': 'a', 'unset': ['width', 'style']}])
+    op = log(doc, seq - 1)[0]
+    assert op['unset'] == ['style']
+    assert op['changes'] == {'width': element(stored(doc), 'a')['width']}
+    assert 'style' not in element(stored(doc), 'a')
+
+
+def test_style_is_merged_key_by_key(doc):
+    seq, _ = doc.submit('alice', [{'type': 'update_element', 'elementId': 'a',
+                                    'changes': {'style': {'fontSize': '20px', 'color': None}}}])
+    assert element(stored(doc), 'a')['style'] == {'fontSize': '20px'}
+    # Peers merge the same patch
+    assert log(doc, seq - 1)[0]['changes'] == {'style': {'fontSize': '20px', 'color': None}}
+
+
+def test_style_that_is_not_a_dict_is_replaced():
+    data = {'slides': [{'id': 's1', 'elements': [text('a', style='color: red')]}]}
+    applied = _DeckEditor(data).apply({'type': 'update_element', 'elementId': 'a',
+                                       'changes': {'style': {'color': 'blue', 'bold': None}}})
+    assert data['slides'][0]['elements'][0]['style'] == {'color': 'blue'}
+    # Nothing to merge into: peers get the whole style
+    assert applied['changes'] == {'style': {'color': 'blue'}}
+
+
+def test_update_slide_keeps_elements_and_normalizes(doc):
+    seq, skipped = doc.submit('alice', [{'type': 'update_slide', 'slideId': 's1',
+                                         'changes': {'title': 42, 'elements': [], 'id': 'x'},
+                                         'unset': ['content', 'elements']}])
+    assert skipped == []
+    slide = stored(doc)[0]
+    assert slide['id'] == 's1' and slide['title'] == '42'
+    assert [e['id'] for e in slide['elements']] == ['a', 'b']
+    # validate_slide puts content back, so peers set it instead of removing it
+    op = log(doc, seq - 1)[0]
+    assert op['changes'] == {'title': '42', 'content': ''} and op['unset'] == []
+
+
+def test_inserted_ids_are_unique(doc):
+    doc.submit('alice', [
+        {'type': 'insert_slide', 'after': 's1', 'slide': {'id': 's1', 'title': '새', 'elements': [text('a')]}},
+        {'type': 'add_element', 'slideId': 's2', 'after': None, 'element': text('c')}
+    ])
+    slides = stored(doc)
+    assert [s['id'] for s in slides][0] == 's1' and len({s['id'] for s in slides}) == 3
+    ids = [e['id'] for s in slides for e in s['elements']]
+    assert len(ids) == len(set(ids)) == 5
+    assert slides[2]['elements'][1]['id'] == 'c'
+
+
+def test_peers_replaying_the_log_reach_the_stored_deck(doc):
+    since = doc.seq
+    peer = json.loads(doc.changes(None, None)[1])['snapshot']
+    doc.submit('alice', [
+        {'type': 'move_slide', 'slideId': 's2', 'after': None},
+        {'type': 'move_element', 'elementId': 'a', 'slideId': 's2', 'after': 'c'},
+        {'type': 'update_element', 'elementId': 'b', 'changes': {'style': {'bold': True}}, 'unset': ['content']},
+        {'type': 'add_element', 'slideId': 's1', 'element': {'type': 'shape', 'x': 1, 'y': 1,
+                                                             'width': 5, 'height': 5}}
+    ])
+    editor = _DeckEditor(peer)
+    for op in log(doc, since):
+        editor.apply(op)
+    assert peer['slides'] == stored(doc)
+
+
+def test_writes_outside_the_log_reset_it(doc):
+    doc.submit('alice', [{'type': 'set_theme', 'theme': 'dark'}])
+    seq, epoch = doc.seq, doc.epoch
+    replace_session_slides(doc.session_id, make_slides()[:1])
+    doc.load()
+    assert doc.seq == seq + 1
+    body = json.loads(doc.changes(seq, epoch)[1])
+    assert body['ops'] == []
+    assert len(body['snapshot']['slides']) == 1
+
+
+def test_log_is_compacted_into_a_snapshot(doc, monkeypatch):
+    monkeypatch.setattr(collab, 'COLLAB_SNAPSHOT_OPS', 3)
+    start = doc.seq
+    for x in range(4):
+        doc.submit('alice', [{'type': 'update_element', 'elementId': 'a', 'changes': {'x': x}}])
+    assert doc.snapshot_seq == start + 3
+    body = json.loads(doc.changes(start, doc.epoch)[1])
+    assert element(body['snapshot']['slides'], 'a')['x'] == 2
+    assert [op['changes'] for op in body['ops']] == [{'x': 3}]
+
+
+@pytest.mark.parametrize('op', [
+    'not an op',
+    {'type': 'drop_table'},
+    {'type': 'update_element', 'changes': {}},
+    {'type': 'update_slide', 'slideId': 's1', 'unset': 'title'},
+    {'type': 'add_element', 'slideId': 's1', 'element': [1]},
+    {'type': 'move_slide', 'slideId': 's1', 'after': 3},
+    {'type': 'set_theme', 'theme': True}
+])
+def test_malformed_operations_reject_the_batch(doc, op):
+    before = copy.deepcopy(stored(doc)), doc.seq
+    with pytest.raises(CollabError):
+        doc.submit('alice', [{'type': 'set_theme', 'theme': 'dark'}, op])
+    assert (stored(doc), doc.seq) == before
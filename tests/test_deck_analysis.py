@@ -0,0 +1,92 @@
+"""Deck analysis: per-slide result cache and deck-level findings"""
+
+import copy
+from collections import OrderedDict
+
+import pytest
+
+from app.services import deck_analysis, slide_analyzer
+
+
+def make_slide(title, color='#333333'):
+    return {'title': title, 'content': '', 'background': '#ffffff',
+            'elements': [{'id': f'{title}-t', 'type': 'text', 'content': f'{title} 본문',
+                          'x': 80, 'y': 120, 'width': 600, 'height': 80,
+                          'style': {'fontSize': '24px', 'textColor': color, 'fontFamily': 'Pretendard'}}]}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Slides passed to slide_analyzer.analyze, with an empty cache and inline analysis"""
+    monkeypatch.setattr(deck_analysis, '_cache', OrderedDict())
+    monkeypatch.setattr(deck_analysis, 'DECK_ANALYSIS_PARALLEL_THRESHOLD', 10 ** 6)
+    seen = []
+    analyze = slide_analyzer.analyze
+
+    def counting(slide):
+        seen.append(slide.get('title'))
+        return analyze(slide)
+
+    monkeypatch.setattr(slide_analyzer, 'analyze', counting)
+    return seen
+
+
+def test_unchanged_slides_are_not_analyzed_again(calls):
+    slides = [make_slide(f'슬라이드 {i}') for i in range(5)]
+    first = deck_analysis.analyze_deck(slides)
+    assert len(calls) == 5
+    assert first['deck']['analyzed'] == 5 and first['deck']['cached'] == 0
+
+    # A fresh copy, as read from a serializing session store, hits the cache
+    second = deck_analysis.analyze_deck(copy.deepcopy(slides))
+    assert len(calls) == 5
+    assert second['deck']['cached'] == 5
+    assert [r['analysis'] for r in second['slides']] == [r['analysis'] for r in first['slides']]
+
+
+def test_only_the_edited_slide_is_analyzed(calls):
+    slides = [make_slide(f'슬라이드 {i}') for i in range(5)]
+    deck_analysis.analyze_deck(slides)
+    slides[2]['elements'][0]['x'] = 90
+    result = deck_analysis.analyze_deck(slides)
+    assert calls[5:] == ['슬라이드 2']
+    assert [r['cached'] for r in result['slides']] == [True, True, False, True, True]
+
+
+def test_identical_slides_are_analyzed_once(calls):
+    result = deck_analysis.analyze_deck([make_slide('같음'), make_slide('같음')])
+    assert calls == ['같음']
+    assert result['slides'][0]['hash'] == result['slides'][1]['hash']
+
+
+def test_key_order_does_not_change_the_hash(calls):
+    slide = make_slide('순서')
+    reordered = dict(reversed(list(slide.items())))
+    deck_analysis.analyze_deck([slide])
+    deck_analysis.analyze_deck([reordered])
+    assert calls == ['순서']
+
+
+def test_cache_is_bounded(calls, monkeypatch):
+    monkeypatch.setattr(deck_analysis, 'DECK_ANALYSIS_CACHE_SIZE', 2)
+    slides = [make_slide(f'슬라이드 {i}') for i in range(3)]
+    deck_analysis.analyze_deck(slides)
+    deck_analysis.analyze_deck(slides[:1])
+    assert calls == ['슬라이드 0', '슬라이드 1', '슬라이드 2', '슬라이드 0']
+
+
+def test_selected_indexes(calls):
+    slides = [make_slide(f'슬라이드 {i}') for i in range(4)]
+    result = deck_analysis.analyze_deck(slides, indexes=[3, 1])
+    assert [r['index'] for r in result['slides']] == [1, 3]
+    assert sorted(calls) == ['슬라이드 1', '슬라이드 3']
+    with pytest.raises(IndexError):
+        deck_analysis.analyze_deck(slides, indexes=[4])
+
+
+def test_deck_findings_span_slides(calls):
+    colors = ['#111111', '#222222', '#333333', '#444444', '#555555', '#666666', '#777777']
+    slides = [make_slide('같은 제목', color) for color in colors]
+    findings = {f['check']: f for f in deck_analysis.analyze_deck(slides)['deck']['findings']}
+    assert findings['titles']['slides'] == list(range(len(colors)))
+    assert 'colors' in findings
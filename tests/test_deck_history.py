@@ -0,0 +1,229 @@
+"""Undo history: recording, coalescing, pruning, undo/redo and released references"""
+
+import pytest
+
+from app.services import deck_history as history_module
+from app.services.content_store import ContentStore
+from app.services.deck_history import DeckHistory, HistoryError, SessionHistory, StoredDeckHistory
+from app.services.session_store import SQLiteSessionStore
+
+EMPTY = {'slides': 0, 'payloads': 0, 'references': 0, 'bytes': 0}
+
+
+def make_slides(count, image=''):
+    return [{'id': f's{i}', 'title': f'Slide {i}', 'content': 'body',
+             'elements': [{'id': f'e{i}', 'type': 'image', 'content': image or f'img-{i}' * 10,
+                           'x': 0, 'y': 0, 'width': 10, 'height': 10}]}
+            for i in range(count)]
+
+
+@pytest.fixture
+def content(monkeypatch):
+    store = ContentStore(payload_min=32)
+    monkeypatch.setattr(history_module, 'get_content_store', lambda: store)
+    monkeypatch.setattr(history_module, 'HISTORY_COALESCE', 0)
+    return store
+
+
+def commit(histories, session_id, data, **changes):
+    """Apply changes to the deck and record it, as commit_version does"""
+    data.update(changes)
+    data['version'] = data.get('version', 0) + 1
+    histories.record(session_id, data)
+
+
+def step(histories, session_id, data, delta):
+    """Undo or redo, as step_session_history does"""
+    state = histories.step(session_id, data, delta)
+    data['version'] += 1
+    histories.written(session_id, data['version'])
+    return state
+
+
+def titles(data):
+    return [slide['title'] for slide in data['slides']]
+
+
+def test_record_shares_unchanged_slides(content):
+    history = SessionHistory(content)
+    slides = make_slides(20)
+    history.record({'slides': slides, 'version': 1}, coalesce=False)
+    edited = [dict(slide) for slide in slides]
+    edited[3]['title'] = 'Edited'
+    history.record({'slides': edited, 'version': 2}, coalesce=False)
+
+    assert len(history.versions) == 2
+    assert history.state()['uniqueSlides'] == 21
+    assert content.stats()['slides'] == 21
+
+
+def test_record_without_changes_adds_no_version(content):
+    history = SessionHistory(content)
+    history.record({'slides': make_slides(3), 'version': 1}, coalesce=False)
+    history.record({'slides': make_slides(3), 'version': 2})
+    assert len(history.versions) == 1
+
+
+def test_edits_within_coalesce_window_become_one_step(content, monkeypatch):
+    monkeypatch.setattr(history_module, 'HISTORY_COALESCE', 60)
+    history = SessionHistory(content)
+    history.record({'slides': make_slides(2), 'version': 1}, coalesce=False)
+    for i in range(5):
+        slides = make_slides(2)
+        slides[0]['title'] = f'Typing {i}'
+        history.record({'slides': slides, 'version': i + 2})
+
+    assert len(history.versions) == 2
+    assert history.versions[-1].slide_count == 2
+
+
+def test_oldest_versions_are_pruned(content, monkeypatch):
+    monkeypatch.setattr(history_module, 'HISTORY_MAX_VERSIONS', 3)
+    history = SessionHistory(content)
+    for i in range(6):
+        slides = make_slides(2)
+        slides[0]['title'] = f'Version {i}'
+        history.record({'slides': slides, 'version': i + 1})
+
+    assert len(history.versions) == 3
+    assert history.cursor == 2
+    # Only the slides of the versions left are still held
+    assert content.stats()['slides'] == 4
+
+
+def test_undo_and_redo(content):
+    histories = DeckHistory()
+    data = {'slides': make_slides(3), 'theme': 'default'}
+    commit(histories, 'a', data)
+    commit(histories, 'a', data, slides=data['slides'][:2])
+    commit(histories, 'a', data, theme='dark')
+
+    state = step(histories, 'a', data, -1)
+    assert data['theme'] == 'default' and len(data['slides']) == 2
+    assert state['canUndo'] and state['canRedo']
+
+    step(histories, 'a', data, -1)
+    assert titles(data) == ['Slide 0', 'Slide 1', 'Slide 2']
+    with pytest.raises(HistoryError):
+        histories.step('a', data, -1)
+
+    step(histories, 'a', data, 1)
+    step(histories, 'a', data, 1)
+    assert data['theme'] == 'dark' and len(data['slides']) == 2
+    with pytest.raises(HistoryError):
+        histories.step('a', data, 1)
+
+
+def test_edit_after_undo_drops_redo(content):
+    histories = DeckHistory()
+    data = {'slides': make_slides(2), 'theme': 'default'}
+    commit(histories, 'a', data)
+    commit(histories, 'a', data, theme='dark')
+    step(histories, 'a', data, -1)
+    commit(histories, 'a', data, theme='light')
+
+    state = histories.state('a')
+    assert state['versions'] == 2 and not state['canRedo']
+
+
+def test_discard_releases_every_reference(content):
+    histories = DeckHistory()
+    image = 'data:image/png;base64,' + 'A' * 200
+    data = {'slides': make_slides(4, image), 'theme': 'default'}
+    commit(histories, 'a', data)
+    commit(histories, 'a', data, slides=data['slides'][1:])
+    commit(histories, 'b', {'slides': make_slides(4, image), 'theme': 'default'})
+    assert content.stats()['payloads'] == 1
+
+    histories.discard('a')
+    assert content.stats()['slides'] == 4
+    histories.discard('b')
+    assert content.stats() == EMPTY
+
+
+def test_least_recently_used_history_is_released(content):
+    histories = DeckHistory(max_sessions=1)
+    commit(histories, 'a', {'slides': make_slides(2), 'theme': 'default'})
+    commit(histories, 'b', {'slides': make_slides(3, 'other' * 10), 'theme': 'default'})
+
+    assert histories.get('a') is None
+    assert content.stats()['slides'] == 3
+
+
+@pytest.fixture
+def sqlite_stores(tmp_path, monkeypatch):
+    """Session and record stores sharing one SQLite file, as with the default backend"""
+    monkeypatch.setattr(history_module, 'HISTORY_COALESCE', 0)
+    path = str(tmp_path / 'sessions.sqlite3')
+    return SQLiteSessionStore(path, idle_ttl=3600), SQLiteSessionStore(path, idle_ttl=3600, table='records')
+
+
+def save(sessions, histories, session_id, **changes):
+    """Change a session and record it inside its store transaction, as commit_version does"""
+    with sessions.transaction(session_id, create=True) as data:
+        data.update(changes)
+        data['version'] += 1
+        histories.record(session_id, data)
+
+
+def step_stored(sessions, histories, session_id, delta):
+    with sessions.transaction(session_id) as data:
+        state = histories.step(session_id, data, delta)
+        data['version'] += 1
+        histories.written(session_id, data['version'])
+    return state
+
+
+def test_stored_history_undo_and_redo_on_sqlite(sqlite_stores):
+    sessions, records = sqlite_stores
+    save(sessions, StoredDeckHistory(records), 'a', slides=make_slides(3))
+    save(sessions, StoredDeckHistory(records), 'a', slides=make_slides(3)[:2])
+    save(sessions, StoredDeckHistory(records), 'a', theme='dark')
+
+    # Each step through a different instance, as another worker would
+    state = step_stored(sessions, StoredDeckHistory(records), 'a', -1)
+    assert state['canUndo'] and state['canRedo']
+    data = sessions.get('a')
+    assert data['theme'] == 'default' and len(data['slides']) == 2
+
+    step_stored(sessions, StoredDeckHistory(records), 'a', -1)
+    assert titles(sessions.get('a')) == ['Slide 0', 'Slide 1', 'Slide 2']
+    with pytest.raises(HistoryError):
+        step_stored(sessions, StoredDeckHistory(records), 'a', -1)
+
+    step_stored(sessions, StoredDeckHistory(records), 'a', 1)
+    step_stored(sessions, StoredDeckHistory(records), 'a', 1)
+    data = sessions.get('a')
+    assert data['theme'] == 'dark' and len(data['slides']) == 2
+
+
+def test_stored_history_keeps_each_slide_once(sqlite_stores, monkeypatch):
+    monkeypatch.setattr(history_module, 'HISTORY_MAX_VERSIONS', 3)
+    sessions, records = sqlite_stores
+    histories = StoredDeckHistory(records)
+    for i in range(6):
+        slides = make_slides(4)
+        slides[0]['title'] = f'Version {i}'
+        save(sessions, histories, 'a', slides=slides)
+
+    state = histories.state('a')
+    assert state['versions'] == 3
+    assert state['uniqueSlides'] == 6
+    # Index plus one record per slide still used; pruned slides are deleted
+    assert len(records) == 1 + 6
+
+    histories.discard('a')
+    assert len(records) == 0
+    assert histories.state('a')['versions'] == 0
+
+
+def test_stored_history_picks_up_unrecorded_changes(sqlite_stores):
+    sessions, records = sqlite_stores
+    histories = StoredDeckHistory(records)
+    save(sessions, histories, 'a', slides=make_slides(2))
+    with sessions.transaction('a') as data:
+        data['slides'] = make_slides(1)  # written without recording, e.g. before an upgrade
+        data['version'] += 1
+
+    step_stored(sessions, histories, 'a', -1)
+    assert len(sessions.get('a')['slides']) == 2
@@ -0,0 +1,158 @@
+"""Deck element index: unique IDs, incremental updates and reuse between requests"""
+
+import copy
+
+from app.services.deck_model import Deck, DeckIndexCache, new_element_id
+
+
+def element(element_id=None, **fields):
+    fields.setdefault('type', 'text')
+    if element_id is not None:
+        fields['id'] = element_id
+    return fields
+
+
+def make_slides():
+    return [{'title': '첫 슬라이드', 'elements': [element('a'), element('b'), element('c')]},
+            {'title': '둘째 슬라이드', 'elements': [element('d')]},
+            {'title': '빈 슬라이드'}]
+
+
+def session(slides, version=1):
+    return {'slides': slides, 'version': version, 'deck_id': 'deck1'}
+
+
+def all_ids(slides):
+    return [el['id'] for slide in slides for el in slide.get('elements') or []]
+
+
+def test_new_element_ids_are_unique():
+    ids = {new_element_id() for _ in range(10000)}
+    assert len(ids) == 10000
+    assert new_element_id('image').startswith('image_')
+
+
+def test_ensure_ids_replaces_missing_and_duplicated_ids():
+    slides = [{'elements': [element('x'), element(), element('x')]},
+              {'elements': [element('x'), element()]}]
+    deck = Deck(slides).ensure_ids()
+    ids = all_ids(slides)
+    assert len(set(ids)) == len(ids) == 5
+    assert ids[0] == 'x'
+    assert all(deck.locate(i) is not None for i in ids)
+
+
+def test_add_elements_assigns_unique_ids():
+    slides = make_slides()
+    deck = Deck(slides)
+    added = [element('a'), element(), element('new')]
+    deck.add_elements(2, added)
+    ids = all_ids(slides)
+    assert len(set(ids)) == len(ids) == 7
+    assert added[0]['id'] != 'a' and added[2]['id'] == 'new'
+    assert deck.locate('new') == (2, 2)
+    assert deck.get_element('a') is slides[0]['elements'][0]
+
+
+def test_add_elements_updates_a_borrowed_index_in_place():
+    slides = make_slides()
+    index = Deck(slides).index
+    shared = dict(index)
+    deck = Deck(slides, index=index)
+    deck.add_elements(1, [element('e')])
+    assert deck.locate('e') == (1, 1)
+    # The lent index is copied before the change, not modified
+    assert index == shared
+
+
+def test_add_elements_rebuilds_a_stale_index():
+    slides = make_slides()
+    stale = Deck(copy.deepcopy(slides)).index
+    slides[1]['elements'].insert(0, element('z'))
+    deck = Deck(slides, index=stale)
+    deck.add_elements(1, [element('z')])
+    ids = all_ids(slides)
+    assert len(set(ids)) == len(ids)
+    assert deck.locate('d') == (1, 1)
+
+
+def test_remove_element_shifts_later_positions():
+    slides = make_slides()
+    deck = Deck(slides)
+    assert deck.remove_element('a')['id'] == 'a'
+    assert deck.locate('a') is None
+    assert deck.locate('b') == (0, 0) and deck.locate('c') == (0, 1)
+    assert deck.locate('d') == (1, 0)
+    assert deck.remove_element('a') is None
+
+
+def test_update_element_merges_style():
+    slides = [{'elements': [element('a', style={'color': 'red', 'bold': True})]}]
+    deck = Deck(slides)
+    deck.update_element('a', {'id': 'other', 'x': 5, 'style': {'color': 'blue'}})
+    assert slides[0]['elements'][0] == element('a', x=5, style={'color': 'blue', 'bold': True})
+
+
+def test_cached_lookup_rebuilds_when_slides_changed():
+    slides = make_slides()
+    index = Deck(copy.deepcopy(slides)).index
+    slides[0]['elements'].pop(0)
+    deck = Deck(slides, index=index)
+    assert deck.locate('b') == (0, 0)
+    assert deck.locate('a') is None
+
+
+def test_cache_reuses_index_for_the_same_version():
+    cache = DeckIndexCache(max_sessions=4)
+    data = session(make_slides())
+    first = cache.deck('s1', data)
+    first.locate('a')
+    cache.remember('s1', data, first)
+
+    second = cache.deck('s1', session(copy.deepcopy(data['slides'])))
+    assert second._index is first._index
+    assert second.locate('d') == (1, 0)
+
+
+def test_cache_misses_on_a_new_version_or_deck():
+    cache = DeckIndexCache(max_sessions=4)
+    data = session(make_slides())
+    deck = cache.deck('s1', data)
+    cache.remember('s1', data, deck)
+    assert cache.deck('s1', session(data['slides'], version=2))._index is None
+    assert cache.deck('s1', dict(data, deck_id='deck2'))._index is None
+    assert cache.deck('s2', data)._index is None
+
+
+def test_take_removes_the_index_from_the_cache():
+    cache = DeckIndexCache(max_sessions=4)
+    data = session(make_slides())
+    deck = cache.deck('s1', data)
+    index = deck.index
+    cache.remember('s1', data, deck)
+
+    writer = cache.deck('s1', data, take=True)
+    writer.add_elements(0, [element('e')])
+    # The writer owns the index and changes it without a copy
+    assert writer._index is index and index['e'] == (0, 3)
+    assert cache.deck('s1', data)._index is None
+
+
+def test_borrowing_readers_do_not_see_each_others_changes():
+    cache = DeckIndexCache(max_sessions=4)
+    data = session(make_slides())
+    deck = cache.deck('s1', data)
+    cache.remember('s1', data, deck)
+    reader = cache.deck('s1', session(copy.deepcopy(data['slides'])))
+    reader.remove_element('a')
+    assert cache.deck('s1', data).locate('a') == (0, 0)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = DeckIndexCache(max_sessions=2)
+    for session_id in ('s1', 's2', 's3'):
+        data = session(make_slides())
+        cache.remember(session_id, data, cache.deck(session_id, data))
+    data = session(make_slides())
+    assert cache.deck('s1', data)._index is None
+    assert cache.deck('s3', data)._index is not None
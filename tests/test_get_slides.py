@@ -0,0 +1,85 @@
+"""/get_slides: ETag revalidation and content negotiation"""
+
+import gzip
+import json
+import uuid
+
+import pytest
+
+from app import create_app
+from app.services.slide_service import create_session, replace_session_slides
+
+SLIDES = [{'title': f'슬라이드 {i}', 'content': '내용 ' * 200, 'elements': []} for i in range(3)]
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+@pytest.fixture
+def session_id(client):
+    session_id = str(uuid.uuid4())
+    create_session(session_id)
+    replace_session_slides(session_id, [dict(slide) for slide in SLIDES])
+    with client.session_transaction() as flask_session:
+        flask_session['session_id'] = session_id
+    return session_id
+
+
+def test_get_slides_requires_a_session(client):
+    assert client.get('/get_slides').status_code == 400
+
+
+def test_get_slides_returns_json_with_an_etag(client, session_id):
+    response = client.get('/get_slides')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['slides'] == SLIDES
+    assert response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Accept' in response.headers['Vary']
+
+
+def test_matching_etag_gets_304(client, session_id):
+    etag = client.get('/get_slides').headers['ETag']
+    response = client.get('/get_slides', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_new_version_changes_the_etag(client, session_id):
+    etag = client.get('/get_slides').headers['ETag']
+    replace_session_slides(session_id, [dict(slide) for slide in SLIDES[:1]])
+    response = client.get('/get_slides', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()['slides']) == 1
+
+
+def test_msgpack_is_negotiated_with_accept(client, session_id):
+    msgpack = pytest.importorskip('msgpack')
+    json_etag = client.get('/get_slides').headers['ETag']
+    response = client.get('/get_slides', headers={'Accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data, raw=False)['slides'] == SLIDES
+    # Each encoding has its own ETag, so a cached JSON body is not reused
+    assert response.headers['ETag'] != json_etag
+    again = client.get('/get_slides', headers={'Accept': 'application/msgpack',
+                                               'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_msgpack_with_zero_quality_is_not_used(client, session_id):
+    response = client.get('/get_slides', headers={'Accept': 'application/msgpack;q=0, application/json'})
+    assert response.mimetype == 'application/json'
+
+
+def test_gzip_is_negotiated_with_accept_encoding(client, session_id):
+    response = client.get('/get_slides', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data))['slides'] == SLIDES
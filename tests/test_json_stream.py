@@ -0,0 +1,78 @@
+"""Incremental JSON array parsing: fragments, wrapped output and truncated responses"""
+
+import json
+
+from app.utils.json_stream import JSONArrayStream, iter_array_items, parse_array_items
+
+SLIDES = [
+    {"title": "소개", "content": "배열 [괄호]와 {중괄호}가 든 \"문자열\""},
+    {"title": "본론", "content": "첫째\n둘째", "notes": {"tags": ["a", "b"]}},
+    {"title": "결론", "content": "끝\\"}
+]
+TEXT = json.dumps(SLIDES, ensure_ascii=False)
+
+
+def test_complete_array_wrapped_in_prose():
+    items, complete = parse_array_items(f"다음은 슬라이드입니다:\n```json\n{TEXT}\n```\n설명 끝 ]")
+    assert items == SLIDES
+    assert complete
+
+
+def test_items_are_emitted_as_they_close():
+    first_end = TEXT.index('}, {') + 1
+    stream = JSONArrayStream()
+    assert stream.feed(TEXT[:first_end - 1]) == []
+    # The first slide is returned as soon as its closing brace arrives
+    assert stream.feed(TEXT[first_end - 1]) == SLIDES[:1]
+    seen = [item for ch in TEXT[first_end:] for item in stream.feed(ch)]
+    assert seen == SLIDES[1:]
+    assert stream.finished and not stream.truncated
+
+
+def test_fragment_boundaries_do_not_matter():
+    for size in (1, 2, 7, 64):
+        fragments = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+        assert list(iter_array_items(fragments)) == SLIDES
+
+
+def test_truncated_response_keeps_completed_slides():
+    cut = TEXT.index('{"title": "결론"') + 10
+    items, complete = parse_array_items(TEXT[:cut])
+    assert items == SLIDES[:2]
+    assert not complete
+
+
+def test_truncated_inside_a_string_with_brackets():
+    cut = TEXT.index('[괄호]') + 2
+    items, complete = parse_array_items(TEXT[:cut])
+    assert items == []
+    assert not complete
+
+
+def test_stream_reports_truncation():
+    stream = JSONArrayStream()
+    assert not stream.truncated
+    stream.feed('앞말 [{"title": "A"}, ')
+    assert stream.started and stream.truncated
+
+
+def test_no_array_at_all():
+    items, complete = parse_array_items('죄송합니다. 슬라이드를 만들 수 없습니다.')
+    assert items == []
+    assert not complete
+
+
+def test_scalar_items_and_trailing_junk():
+    assert parse_array_items('[1, "two", null, 4]] 이후 텍스트 [5]') == ([1, "two", None, 4], True)
+
+
+def test_unparsable_item_is_skipped():
+    items, complete = parse_array_items('[{"title": "A"}, {title: B}, {"title": "C"}]')
+    assert items == [{"title": "A"}, {"title": "C"}]
+    assert complete
+
+
+def test_feed_after_finish_is_ignored():
+    stream = JSONArrayStream()
+    assert stream.feed('[{"a": 1}]') == [{"a": 1}]
+    assert stream.feed('[{"b": 2}]') == []
@@ -0,0 +1,115 @@
+"""LLM client against the local fake OpenAI server: retries, timeouts and the concurrency limit"""
+
+import threading
+import time
+
+import pytest
+
+from app.services.llm_client import LLMClient, LLMError, extract_message_content
+from app.utils.fake_openai import FakeOpenAIServer
+
+MESSAGES = [{"role": "user", "content": "안녕하세요"}]
+
+
+def make_client(server, **options):
+    options.setdefault('backoff_base', 0)
+    options.setdefault('max_retries', 2)
+    return LLMClient(api_url=server.url, api_key="test", **options)
+
+
+def test_chat_completion_returns_the_reply():
+    with FakeOpenAIServer(reply="반갑습니다") as server:
+        result = make_client(server).chat_completion(MESSAGES, "gpt-3.5-turbo", temperature=0.5)
+    assert extract_message_content(result) == "반갑습니다"
+    assert server.requests[0]["temperature"] == 0.5
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retryable_statuses_are_retried(status):
+    with FakeOpenAIServer(reply="OK", fail_first=2, fail_status=status) as server:
+        result = make_client(server).chat_completion(MESSAGES, "gpt-3.5-turbo")
+    assert extract_message_content(result) == "OK"
+    assert len(server.requests) == 3
+
+
+def test_retries_are_bounded():
+    with FakeOpenAIServer(fail_first=10, fail_status=503) as server:
+        with pytest.raises(LLMError) as error:
+            make_client(server, max_retries=2).chat_completion(MESSAGES, "gpt-3.5-turbo")
+    assert error.value.status_code == 503
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    with FakeOpenAIServer(fail_first=1, fail_status=400) as server:
+        with pytest.raises(LLMError) as error:
+            make_client(server).chat_completion(MESSAGES, "gpt-3.5-turbo")
+    assert error.value.status_code == 400
+    assert len(server.requests) == 1
+
+
+def test_read_timeout_is_retried_then_raised():
+    with FakeOpenAIServer(latency=0.5) as server:
+        client = make_client(server, read_timeout=0.1, max_retries=1)
+        with pytest.raises(LLMError):
+            client.chat_completion(MESSAGES, "gpt-3.5-turbo")
+    assert len(server.requests) == 2
+
+
+def test_connect_and_read_timeouts_are_sent(monkeypatch):
+    with FakeOpenAIServer() as server:
+        client = make_client(server, connect_timeout=1.5, read_timeout=7)
+        seen = []
+        post = client.session.post
+        monkeypatch.setattr(client.session, 'post', lambda *args, **kwargs: seen.append(kwargs['timeout']) or post(*args, **kwargs))
+        client.chat_completion(MESSAGES, "gpt-3.5-turbo")
+    assert seen == [(1.5, 7)]
+
+
+def test_connection_errors_raise_llm_error():
+    server = FakeOpenAIServer().start()
+    url = server.url
+    server.stop()
+    client = LLMClient(api_url=url, api_key="test", backoff_base=0, max_retries=1, connect_timeout=0.5)
+    with pytest.raises(LLMError):
+        client.chat_completion(MESSAGES, "gpt-3.5-turbo")
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b"not json", b'"text"'])
+def test_non_object_response_raises_llm_error(body):
+    with FakeOpenAIServer(raw_body=body) as server:
+        with pytest.raises(LLMError, match="JSON"):
+            make_client(server).chat_completion(MESSAGES, "gpt-3.5-turbo")
+
+
+def test_concurrency_is_limited_per_client():
+    with FakeOpenAIServer(latency=0.1) as server:
+        client = make_client(server, max_concurrency=2, queue_timeout=5)
+        threads = [threading.Thread(target=client.chat_completion, args=(MESSAGES, "gpt-3.5-turbo"))
+                   for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(server.requests) == 6
+    assert server.max_in_flight == 2
+
+
+def test_full_queue_times_out():
+    with FakeOpenAIServer(latency=0.5) as server:
+        client = make_client(server, max_concurrency=1, queue_timeout=0.05)
+        slow = threading.Thread(target=client.chat_completion, args=(MESSAGES, "gpt-3.5-turbo"))
+        slow.start()
+        while not server.in_flight:
+            time.sleep(0.01)
+        with pytest.raises(LLMError) as error:
+            client.chat_completion(MESSAGES, "gpt-3.5-turbo")
+        slow.join()
+    assert error.value.status_code == 503
+
+
+def test_stream_yields_chunks_in_order():
+    with FakeOpenAIServer(reply="스트리밍 응답입니다", chunk_size=3) as server:
+        chunks = list(make_client(server).stream_chat_completion(MESSAGES, "gpt-3.5-turbo"))
+    assert len(chunks) > 1
+    assert ''.join(chunks) == "스트리밍 응답입니다"
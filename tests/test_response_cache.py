@@ -0,0 +1,130 @@
+"""AI response cache: keys, hit/miss/bypass accounting, TTL and LRU eviction"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services import ai_service
+from app.services.llm_client import LLMClient
+from app.services.response_cache import (
+    MemoryCacheBackend,
+    ResponseCache,
+    SQLiteCacheBackend,
+    make_cache_key
+)
+from app.utils.fake_openai import FakeOpenAIServer
+
+MESSAGES = [{"role": "system", "content": "제목을 추천하세요"}, {"role": "user", "content": "AI  발표\n"}]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCacheBackend(max_entries=2)
+    return SQLiteCacheBackend(path=str(tmp_path / 'cache.sqlite3'), max_entries=2)
+
+
+def test_key_ignores_formatting_only_differences():
+    reformatted = [{"role": "system", "content": " 제목을  추천하세요"}, {"role": "user", "content": "AI 발표"}]
+    assert make_cache_key(MESSAGES, "gpt-3.5-turbo") == make_cache_key(reformatted, "gpt-3.5-turbo")
+
+
+def test_key_depends_on_model_and_params():
+    key = make_cache_key(MESSAGES, "gpt-3.5-turbo", {"temperature": 0.8})
+    assert key != make_cache_key(MESSAGES, "gpt-4", {"temperature": 0.8})
+    assert key != make_cache_key(MESSAGES, "gpt-3.5-turbo", {"temperature": 0.2})
+
+
+def test_miss_then_hit(backend):
+    cache = ResponseCache(backend, ttl=60)
+    calls = []
+    compute = lambda: calls.append(1) or "응답"
+    assert cache.get_or_compute("k", compute) == "응답"
+    assert cache.get_or_compute("k", compute) == "응답"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['bypassed']) == (1, 1, 0)
+
+
+def test_failures_are_not_cached(backend):
+    cache = ResponseCache(backend, ttl=60)
+    assert cache.get_or_compute("k", lambda: None) is None
+    assert cache.get_or_compute("k", lambda: "응답") == "응답"
+    assert cache.stats()['misses'] == 2
+
+
+def test_bypass_neither_reads_nor_writes(backend):
+    cache = ResponseCache(backend, ttl=60)
+    cache.get_or_compute("k", lambda: "cached")
+    assert cache.get_or_compute("k", lambda: "fresh", bypass=True) == "fresh"
+    assert cache.get_or_compute("k", lambda: "other") == "cached"
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['bypassed']) == (1, 1, 1)
+
+
+def test_disabled_cache_counts_nothing():
+    cache = ResponseCache(None)
+    assert cache.get_or_compute("k", lambda: "응답") == "응답"
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['bypassed']) == (0, 0, 0)
+
+
+def test_entries_expire(backend):
+    cache = ResponseCache(backend, ttl=0.05)
+    cache.get_or_compute("k", lambda: "old")
+    time.sleep(0.1)
+    assert cache.get_or_compute("k", lambda: "new") == "new"
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    cache = ResponseCache(backend, ttl=60)
+    cache.get_or_compute("a", lambda: "A")
+    time.sleep(0.01)
+    cache.get_or_compute("b", lambda: "B")
+    time.sleep(0.01)
+    cache.get_or_compute("a", lambda: "unused")  # 'a' is now the most recently used
+    time.sleep(0.01)
+    cache.get_or_compute("c", lambda: "C")
+    assert len(backend) == 2
+    assert cache.get_or_compute("a", lambda: "recomputed") == "A"
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+
+
+def test_async_lookup_on_blocking_backend(tmp_path):
+    cache = ResponseCache(SQLiteCacheBackend(path=str(tmp_path / 'cache.sqlite3')), ttl=60)
+
+    async def compute():
+        return "비동기 응답"
+
+    async def run():
+        first = await cache.get_or_compute_async("k", compute)
+        second = await cache.get_or_compute_async("k", compute)
+        return first, second
+
+    assert asyncio.run(run()) == ("비동기 응답", "비동기 응답")
+    assert cache.stats()['hits'] == 1
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """complete_chat against the fake server with a fresh memory cache"""
+    cache = ResponseCache(MemoryCacheBackend(), ttl=60)
+    monkeypatch.setattr(ai_service, 'response_cache', cache)
+    with FakeOpenAIServer(reply="제목 후보") as server:
+        client = LLMClient(api_url=server.url, api_key="test", max_retries=0)
+        monkeypatch.setattr(ai_service, 'get_llm_client', lambda: client)
+        yield server, cache
+
+
+def test_complete_chat_caches_only_when_asked(upstream):
+    server, cache = upstream
+    for _ in range(2):
+        assert ai_service.complete_chat(MESSAGES, use_cache=True, temperature=0.8) == "제목 후보"
+    assert len(server.requests) == 1
+
+    ai_service.complete_chat(MESSAGES, temperature=0.8)  # not cacheable
+    ai_service.complete_chat(MESSAGES, use_cache=False, temperature=0.8)  # explicit no-cache
+    assert len(server.requests) == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['bypassed']) == (1, 1, 1)
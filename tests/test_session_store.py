@@ -0,0 +1,227 @@
+"""Session stores: the backend contract, and packing cold sessions into the content store"""
+
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.services.content_store import ContentStore
+from app.services.session_store import (
+    MemorySessionStore,
+    SQLiteSessionStore,
+    RedisSessionStore,
+    RECORD_KEY_PREFIX,
+    _Packed
+)
+
+EMPTY = {'slides': 0, 'payloads': 0, 'references': 0, 'bytes': 0}
+IMAGE = 'data:image/png;base64,' + 'B' * 200
+
+
+def make_session(title, count=3):
+    return {'slides': [{'title': f'{title} {i}', 'content': '',
+                        'elements': [{'id': f'e{i}', 'type': 'image', 'content': IMAGE,
+                                      'x': 0, 'y': 0, 'width': 10, 'height': 10}]}
+                       for i in range(count)],
+            'theme': 'default', 'version': 1}
+
+
+@pytest.fixture
+def content():
+    return ContentStore(payload_min=32)
+
+
+@pytest.fixture
+def store(content):
+    return MemorySessionStore(max_sessions=10, idle_ttl=3600, hot_sessions=1, content=content)
+
+
+def is_packed(store, session_id):
+    return isinstance(store._sessions[session_id][0], _Packed)
+
+
+def test_cold_sessions_are_packed_and_unpacked(store, content):
+    store.set('a', make_session('A'))
+    store.set('b', make_session('B'))
+
+    assert is_packed(store, 'a') and not is_packed(store, 'b')
+    stats = content.stats()
+    assert stats['slides'] == 3 and stats['payloads'] == 1
+
+    assert store.get('a') == make_session('A')
+    # Unpacking 'a' made it hot and packed 'b'
+    assert not is_packed(store, 'a') and is_packed(store, 'b')
+    assert store.get('b') == make_session('B')
+
+
+def test_identical_slides_are_stored_once(store, content):
+    for session_id in 'abc':
+        store.set(session_id, make_session('Same'))
+    store.set('d', make_session('Other'))
+
+    stats = content.stats()
+    assert stats['slides'] == 3
+    assert stats['references'] == 9
+    assert stats['payloads'] == 1
+
+
+def test_delete_releases_packed_session(store, content):
+    store.set('a', make_session('A'))
+    store.set('b', make_session('B'))
+    store.delete('a')
+    store.delete('b')
+    assert content.stats() == EMPTY
+    assert len(store) == 0
+
+
+def test_overwrite_and_eviction_release_packed_sessions(content):
+    store = MemorySessionStore(max_sessions=2, idle_ttl=3600, hot_sessions=1, content=content)
+    store.set('a', make_session('A'))
+    store.set('b', make_session('B'))
+    store.set('a', make_session('A2'))  # replaces the packed 'a'
+    store.set('c', make_session('C'))  # evicts 'b'
+    store.delete('a')
+    store.delete('c')
+    assert content.stats() == EMPTY
+
+
+def test_expired_sessions_release_references(store, content):
+    store.set('a', make_session('A'))
+    store.set('b', make_session('B'))
+    store.idle_ttl = 0
+    time.sleep(0.01)
+    assert store.expire_idle() == 2
+    assert content.stats() == EMPTY
+
+
+# -- every backend -----------------------------------------------------------
+
+def redis_store(**options):
+    pytest.importorskip('redis')
+    url = os.getenv('TEST_REDIS_URL', 'redis://localhost:6379/15')
+    store = RedisSessionStore(url=url, key_prefix=f"test:{uuid.uuid4().hex}:", **options)
+    try:
+        store.client.ping()
+    except Exception:
+        pytest.skip(f"No Redis server at {url}")
+    return store
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend(request, tmp_path, content):
+    if request.param == 'memory':
+        yield MemorySessionStore(idle_ttl=3600, hot_sessions=0, content=content)
+        return
+    if request.param == 'sqlite':
+        yield SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'), idle_ttl=3600)
+        return
+    store = redis_store(idle_ttl=3600)
+    yield store
+    for key in store.client.scan_iter(match=f"{store.key_prefix}*"):
+        store.client.delete(key)
+
+
+def test_set_get_delete(backend):
+    assert backend.get('a') is None
+    backend.set('a', make_session('A'))
+    assert backend.get('a') == make_session('A')
+    assert 'a' in backend and len(backend) == 1
+    backend.delete('a')
+    assert backend.get('a') is None and 'a' not in backend
+
+
+def test_transaction_persists_changes(backend):
+    with backend.transaction('a') as data:
+        assert data is None
+    with backend.transaction('a', create=True) as data:
+        data['slides'].append({'title': '새 슬라이드'})
+        data['version'] += 1
+    stored = backend.get('a')
+    assert stored['version'] == 1 and stored['slides'] == [{'title': '새 슬라이드'}]
+    assert stored['deck_id']
+
+
+def test_transactions_do_not_lose_updates(backend):
+    backend.set('a', {'slides': [], 'version': 0})
+
+    def bump():
+        for _ in range(20):
+            with backend.transaction('a') as data:
+                data['version'] += 1
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.get('a')['version'] == 80
+
+
+def test_claim_until_the_record_expires(backend):
+    assert backend.claim('lease', {'state': 'pending'}, ttl=60)
+    assert not backend.claim('lease', {'state': 'pending'}, ttl=60)
+    # A record whose expires_at has passed can be claimed again
+    backend.set('lease', {'state': 'done', 'expires_at': time.time() - 1})
+    assert backend.claim('lease', {'state': 'pending'}, ttl=60)
+
+
+def test_idle_sessions_expire(backend):
+    if isinstance(backend, RedisSessionStore):
+        pytest.skip("Redis expires keys itself")
+    backend.set('a', make_session('A'))
+    backend.idle_ttl = 0
+    time.sleep(0.01)
+    backend.expire_idle()
+    assert backend.get('a') is None
+
+
+def test_memory_store_evicts_least_recently_used(content):
+    store = MemorySessionStore(max_sessions=2, idle_ttl=3600, hot_sessions=0, content=content)
+    store.set('a', make_session('A'))
+    store.set('b', make_session('B'))
+    store.get('a')
+    store.set('c', make_session('C'))
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'sessions.sqlite3')
+    SQLiteSessionStore(path, idle_ttl=3600).set('a', make_session('A'))
+    assert SQLiteSessionStore(path, idle_ttl=3600).get('a') == make_session('A')
+
+
+def test_sqlite_transaction_rolls_back_on_error(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'), idle_ttl=3600)
+    store.set('a', make_session('A'))
+    with pytest.raises(RuntimeError):
+        with store.transaction('a') as data:
+            data['theme'] = 'dark'
+            raise RuntimeError
+    assert store.get('a')['theme'] == 'default'
+
+
+def test_sqlite_peek_sees_new_writes(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'), idle_ttl=3600)
+    store.set('a', make_session('A'))
+    assert store.peek('a') is store.peek('a')
+    with store.transaction('a') as data:
+        data['theme'] = 'dark'
+    assert store.peek('a')['theme'] == 'dark'
+
+
+def test_record_store_is_a_separate_namespace(tmp_path):
+    path = str(tmp_path / 'sessions.sqlite3')
+    sessions = SQLiteSessionStore(path, idle_ttl=3600)
+    records = SQLiteSessionStore(path, idle_ttl=3600, table='records')
+    records.set('job', {'state': 'queued'})
+    assert sessions.get('job') is None and len(sessions) == 0
+    assert records.get('job') == {'state': 'queued'}
+
+
+def test_redis_record_store_uses_its_own_prefix():
+    store = redis_store(idle_ttl=3600)
+    assert store.key_prefix != RECORD_KEY_PREFIX
+    assert not store._key('a').startswith(RECORD_KEY_PREFIX)
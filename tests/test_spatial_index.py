@@ -0,0 +1,113 @@
+"""Spatial index: grid queries and placing new elements in free space"""
+
+import itertools
+
+from app.services.spatial_index import (
+    PLACEMENT_GAP,
+    SLIDE_BOUNDS,
+    SpatialIndex,
+    element_box,
+    free_position_for,
+    place_elements
+)
+
+
+def box(element_id, x, y, width, height):
+    return {'id': element_id, 'type': 'shape', 'x': x, 'y': y, 'width': width, 'height': height}
+
+
+def overlaps(a, b, gap=0):
+    a, b = element_box(a), element_box(b)
+    return a[0] < b[2] + gap and b[0] < a[2] + gap and a[1] < b[3] + gap and b[1] < a[3] + gap
+
+
+def inside_slide(element):
+    x0, y0, x1, y1 = element_box(element)
+    return x0 >= SLIDE_BOUNDS[0] and y0 >= SLIDE_BOUNDS[1] and x1 <= SLIDE_BOUNDS[2] and y1 <= SLIDE_BOUNDS[3]
+
+
+def test_query_and_hit_test_match_a_scan():
+    elements = [box(f'e{i}', (i * 97) % 800, (i * 53) % 400, 60 + i % 5 * 20, 40) for i in range(40)]
+    index = SpatialIndex.from_elements(elements, cell_size=32)
+    probe = box('probe', 300, 200, 150, 90)
+    expected = {el['id'] for el in elements if overlaps(el, probe)}
+    assert set(index.query(element_box(probe))) == expected
+    assert index.collides(element_box(probe)) == bool(expected)
+    hits = {el['id'] for el in elements
+            if element_box(el)[0] <= 310 <= element_box(el)[2] and element_box(el)[1] <= 210 <= element_box(el)[3]}
+    assert set(index.hit_test(310, 210)) == hits
+
+
+def test_remove_and_reinsert():
+    index = SpatialIndex()
+    index.insert('a', (0, 0, 100, 100))
+    index.insert('a', (500, 300, 600, 400))
+    assert index.query((0, 0, 50, 50)) == []
+    assert index.query((550, 350, 560, 360)) == ['a']
+    index.remove('a')
+    assert len(index) == 0 and 'a' not in index
+
+
+def test_backgrounds_are_not_obstacles():
+    index = SpatialIndex.from_elements([box('bg', 0, 0, 960, 540), box('a', 10, 10, 50, 50)])
+    assert 'bg' not in index and 'a' in index
+
+
+def test_non_overlapping_element_stays_put():
+    existing = [box('a', 40, 40, 200, 100)]
+    new = [box('b', 400, 300, 200, 100)]
+    assert place_elements(existing, new) == 0
+    assert (new[0]['x'], new[0]['y']) == (400, 300)
+
+
+def test_overlapping_elements_are_moved_to_free_space():
+    existing = [box('title', 40, 40, 880, 80), box('body', 40, 140, 420, 300)]
+    new = [box(f'n{i}', 60 + i * 30, 160 + i * 20, 200, 120) for i in range(4)]
+    moved = place_elements(existing, new)
+    assert moved == 4
+    for element in new:
+        assert inside_slide(element)
+        assert not any(overlaps(element, other) for other in existing)
+    for a, b in itertools.combinations(new, 2):
+        assert not overlaps(a, b)
+
+
+def test_moved_element_keeps_a_gap_from_neighbours():
+    existing = [box('a', 40, 40, 300, 200)]
+    new = [box('b', 100, 100, 200, 100)]
+    place_elements(existing, new)
+    assert not overlaps(new[0], existing[0], gap=PLACEMENT_GAP - 1)
+
+
+def test_off_slide_element_is_brought_back():
+    new = [box('b', 900, 500, 200, 100)]
+    assert place_elements([], new) == 1
+    assert inside_slide(new[0])
+
+
+def test_contained_label_moves_with_its_shape():
+    existing = [box('a', 300, 200, 300, 200)]
+    shape, label = box('shape', 320, 220, 200, 120), box('label', 340, 240, 100, 40)
+    place_elements(existing, [shape, label])
+    assert (label['x'] - shape['x'], label['y'] - shape['y']) == (20, 20)
+    assert not overlaps(shape, existing[0])
+
+
+def test_full_slide_leaves_elements_where_they_are():
+    existing = [box(f'e{x}-{y}', x, y, 96, 54) for x in range(0, 960, 96) for y in range(0, 540, 54)]
+    new = [box('b', 100, 100, 200, 100)]
+    assert place_elements(existing, new) == 0
+    assert (new[0]['x'], new[0]['y']) == (100, 100)
+
+
+def test_free_position_prefers_the_nearest_spot():
+    elements = [box('a', 40, 40, 400, 200)]
+    x, y = free_position_for(elements, 100, 100, near=(100, 60))
+    assert not overlaps(box('n', x, y, 100, 100), elements[0])
+    # Just below the obstacle is closer than right of it
+    assert x == 100 and 240 + PLACEMENT_GAP <= y < 240 + PLACEMENT_GAP + 16
+
+
+def test_free_position_for_too_large_an_element():
+    assert SpatialIndex().free_position(2000, 100) is None
+    assert free_position_for([], 2000, 100, near=(5, 5)) == (5, 5)